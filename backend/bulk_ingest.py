@@ -0,0 +1,122 @@
+import csv
+import datetime
+import io
+from typing import Iterator, Optional
+
+from sqlalchemy import column, or_, select, table, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from backend import dimensions, models
+from backend.config import settings
+
+# High-throughput write path for stock_prices.
+# - SQLite: multi-row INSERT ... RETURNING via SQLAlchemy's executemany ("insertmanyvalues") batching.
+# - PostgreSQL: COPY ... FROM STDIN, with IDs pre-allocated from the table's sequence so they can be returned without a re-read.
+# Rows are plain column dicts (see crud._stock_price_rows); ORM objects are never instantiated or refreshed.
+# Their symbol/data_source strings are swapped for stocks/data_sources ids (backend.dimensions) before writing.
+
+STOCK_PRICE_TABLE = models.StockPrice.__table__
+STOCK_PRICE_KEY_FIELDS = ("stock_id", "date", "source_id") # uq_stock_prices_stock_date_source
+STOCK_PRICE_VALUE_FIELDS = ("open", "high", "low", "close", "volume")
+STOCK_PRICE_INSERT_FIELDS = STOCK_PRICE_KEY_FIELDS + STOCK_PRICE_VALUE_FIELDS + ("created_at",)
+
+def _chunks(rows: list[dict], chunk_size: int) -> Iterator[list[dict]]:
+    for start in range(0, len(rows), chunk_size):
+        yield rows[start:start + chunk_size]
+
+def dialect_name(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+def dialect_insert(db: Session):
+    """Returns the dialect-specific insert() construct, which supports ON CONFLICT."""
+    name = dialect_name(db)
+    if name == "sqlite":
+        return sqlite.insert
+    if name == "postgresql":
+        return postgresql.insert
+    raise NotImplementedError(f"Upserts are not supported for the '{name}' database dialect.")
+
+def _copy_into(db: Session, table_name: str, columns: tuple[str, ...], rows: list[dict]) -> None:
+    """Streams rows into table_name with PostgreSQL COPY (CSV format; None becomes NULL)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor() # Raw psycopg2 cursor on the session's connection/transaction
+    try:
+        cursor.copy_expert(f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+def _pg_allocate_ids(db: Session, count: int) -> list[int]:
+    """Reserves `count` values from the stock_prices id sequence in one round trip."""
+    return db.execute(
+        text("SELECT nextval(pg_get_serial_sequence('stock_prices', 'id')) FROM generate_series(1, :n)"),
+        {"n": count}
+    ).scalars().all()
+
+def insert_stock_price_rows(db: Session, rows: list[dict], chunk_size: Optional[int] = None) -> tuple[list[int], datetime.datetime]:
+    """
+    Inserts rows into stock_prices with one statement per `chunk_size` rows (settings.BULK_INGEST_CHUNK_SIZE by
+    default), committing once after the last chunk: all rows are stored or, when any chunk fails, none are
+    (the caller rolls back). Returns the new IDs in input order and the created_at timestamp stamped on every row.
+    """
+    chunk_size = chunk_size or settings.BULK_INGEST_CHUNK_SIZE
+    created_at = datetime.datetime.now(datetime.timezone.utc)
+    use_copy = dialect_name(db) == "postgresql"
+    ids: list[int] = []
+    rows = dimensions.stock_price_columns(db, rows)
+    for chunk in _chunks(rows, chunk_size):
+        chunk = [{**row, "created_at": created_at} for row in chunk]
+        if use_copy:
+            chunk_ids = _pg_allocate_ids(db, len(chunk))
+            for row, row_id in zip(chunk, chunk_ids):
+                row["id"] = row_id
+            _copy_into(db, STOCK_PRICE_TABLE.name, ("id",) + STOCK_PRICE_INSERT_FIELDS, chunk)
+        else:
+            stmt = STOCK_PRICE_TABLE.insert().returning(STOCK_PRICE_TABLE.c.id, sort_by_parameter_order=True)
+            chunk_ids = db.execute(stmt, chunk).scalars().all()
+        ids.extend(chunk_ids)
+    db.commit()
+    return ids, created_at
+
+def upsert_stock_price_rows(db: Session, rows: list[dict], overwrite: bool = True, chunk_size: Optional[int] = None) -> None:
+    """
+    Writes rows with INSERT ... ON CONFLICT on (stock_id, date, source_id), committing per chunk
+    (safe to keep after a failure: re-running the same upsert converges on the same rows).
+    With overwrite, conflicting rows are updated only where a value differs; otherwise they are left alone.
+    PostgreSQL stages each chunk with COPY into a temporary table and merges it with one INSERT ... SELECT.
+    """
+    chunk_size = chunk_size or settings.BULK_INGEST_CHUNK_SIZE
+    created_at = datetime.datetime.now(datetime.timezone.utc)
+    insert = dialect_insert(db)
+    use_copy = dialect_name(db) == "postgresql"
+    rows = dimensions.stock_price_columns(db, rows)
+    for chunk in _chunks(rows, chunk_size):
+        chunk = [{**row, "created_at": created_at} for row in chunk]
+        stmt = insert(STOCK_PRICE_TABLE)
+        if use_copy:
+            columns = ", ".join(STOCK_PRICE_INSERT_FIELDS)
+            db.execute(text(
+                "CREATE TEMP TABLE IF NOT EXISTS stock_prices_staging ON COMMIT DELETE ROWS AS "
+                f"SELECT {columns} FROM stock_prices WITH NO DATA"
+            ))
+            _copy_into(db, "stock_prices_staging", STOCK_PRICE_INSERT_FIELDS, chunk)
+            staged = select(*(column(c) for c in STOCK_PRICE_INSERT_FIELDS)).select_from(table("stock_prices_staging"))
+            stmt = stmt.from_select(list(STOCK_PRICE_INSERT_FIELDS), staged)
+        if overwrite:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(STOCK_PRICE_KEY_FIELDS),
+                set_={f: stmt.excluded[f] for f in STOCK_PRICE_VALUE_FIELDS},
+                # Keeps concurrent writers from rewriting rows that already hold the same values
+                where=or_(*(STOCK_PRICE_TABLE.c[f] != stmt.excluded[f] for f in STOCK_PRICE_VALUE_FIELDS)),
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(STOCK_PRICE_KEY_FIELDS))
+        if use_copy:
+            db.execute(stmt)
+        else:
+            db.execute(stmt, chunk)
+        db.commit()
@@ -0,0 +1,230 @@
+import datetime
+import os
+import threading
+from collections import defaultdict
+from typing import Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import exists, select
+from sqlalchemy.orm import Session
+
+from backend import bulk_ingest, models
+from backend.column_store import _SAFE_SYMBOL
+from backend.config import settings
+from backend.services import arrow_export
+
+# Optional cold tier for old daily bars (settings.COLD_STORAGE_DIR; empty disables it).
+# archive() moves a symbol's bars from whole years older than the horizon out of stock_prices into
+# <dir>/<SYMBOL>/<year>.parquet (one file per calendar year, rows in (date, id) order) and records the boundary
+# in stock_price_archive. The daily readers in crud merge the archived rows back into reads whose range reaches
+# before the boundary: the row readers (get_stock_prices_by_symbol, get_stock_price_rows, stream_stock_price_rows,
+# the multi-symbol read) and the array readers (get_stock_price_arrays and its multi-symbol form, which feed
+# indicators, risk, correlation, backtests and as-of lookups). rollups recomputes periods before the boundary from
+# both tiers, and the DuckDB engine scans the year files itself. Only symbol_stats reads stock_prices alone, over
+# the last symbol_stats.LOOKBACK_DAYS, so the horizon should cover those (the default of 730 days does).
+# - Files are written first (temp file, fsync, os.replace); the hot rows are deleted and the boundary advanced in one
+#   transaction afterwards. Readers only take archived rows dated before the boundary, so a run interrupted between
+#   the two leaves the rows readable from stock_prices alone, and the next run folds them in again.
+# - Writes dated before the boundary land in stock_prices and are read from there, replacing an archived row of the
+#   same (date, data_source); crud.upsert_stock_prices compares against the archived rows, so unchanged bars are not
+#   written again. The next archive run moves them, the newest row winning per (date, data_source) as in stock_prices.
+# Writes are serialized by a process-wide lock, so one process should archive at a time.
+
+TABLE = models.STOCK_PRICE_ROWS
+ARCHIVE_TABLE = models.StockPriceArchive.__table__
+SCHEMA = pa.schema(
+    [pa.field("id", pa.int64())]
+    + [arrow_export.PRICE_SCHEMA.field(name) for name in arrow_export.PRICE_COLUMNS]
+    + [pa.field("created_at", pa.timestamp("us"))]
+)
+COLUMNS = tuple(SCHEMA.names)
+
+def cutoff_date(horizon_days: int, today: Optional[datetime.date] = None) -> datetime.date:
+    """January 1st of the year holding the day `horizon_days` ago: bars before it are archived (whole years only)."""
+    today = today or datetime.date.today()
+    return datetime.date((today - datetime.timedelta(days=horizon_days)).year, 1, 1)
+
+def get_archived_before(db: Session, symbol: str) -> Optional[datetime.date]:
+    """The symbol's archive boundary, or None when nothing of it is archived."""
+    return db.execute(select(ARCHIVE_TABLE.c.archived_before).where(ARCHIVE_TABLE.c.symbol == symbol)).scalar()
+
+def _merge_rows(rows: list[dict]) -> list[dict]:
+    """Rows in (date, id) order, keeping the newest (highest id) row per (date, data_source) and the last copy of each id."""
+    kept = {}
+    for row in sorted(rows, key=lambda r: r["id"]): # Stable: a re-read copy of an archived id replaces it
+        kept[("id", row["id"]) if row["data_source"] is None else (row["date"], row["data_source"])] = row
+    return sorted(kept.values(), key=lambda r: (r["date"], r["id"]))
+
+def _table_to_columns(table: pa.Table) -> dict[str, np.ndarray]:
+    """NumPy columns of an archive table; far cheaper than Table.to_pylist for the row objects readers build."""
+    columns = {}
+    for name in COLUMNS:
+        column = table[name].combine_chunks()
+        if name == "data_source":
+            sources = np.array(column.dictionary.to_pylist() + [None], dtype=object)
+            columns[name] = sources[column.indices.fill_null(-1).to_numpy()] # -1 picks None
+        else:
+            columns[name] = column.to_numpy(zero_copy_only=False)
+    return columns
+
+class ColdStorage:
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _path(self, symbol: str, year: int) -> str:
+        return os.path.join(self.root, symbol, f"{year}.parquet")
+
+    def years(self, symbol: str) -> list[int]:
+        """Years with an archive file for the symbol, oldest first."""
+        try:
+            names = os.listdir(os.path.join(self.root, symbol))
+        except FileNotFoundError:
+            return []
+        return sorted(int(name[:-len(".parquet")]) for name in names if name.endswith(".parquet") and name[:-len(".parquet")].isdigit())
+
+    def _read_year(self, symbol: str, year: int) -> pa.Table:
+        return pq.ParquetFile(self._path(symbol, year)).read() # Skips the dataset layer of pq.read_table
+
+    def _write_year(self, symbol: str, year: int, rows: list[dict]) -> None:
+        path = self._path(symbol, year)
+        if not rows:
+            os.remove(path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            pq.write_table(pa.Table.from_pylist(rows, schema=SCHEMA), f, compression="zstd")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    # --- Reads ---
+
+    def read(
+        self,
+        symbol: str,
+        archived_before: datetime.date,
+        start_date: Optional[datetime.date] = None,
+        end_date: Optional[datetime.date] = None,
+        before: Optional[tuple[datetime.date, int]] = None,
+        tail: Optional[int] = None
+    ) -> dict[str, np.ndarray]:
+        """
+        Chronological columns (COLUMNS; data_source as an object array of strings) of the archived rows of the date
+        range dated before `archived_before`. `before` keeps only rows strictly before a (date, id) keyset position and
+        `tail` only the last rows; year files are read newest first and older years are skipped once `tail` rows were found.
+        """
+        last_date = archived_before - datetime.timedelta(days=1)
+        if end_date:
+            last_date = min(last_date, end_date)
+        if before:
+            last_date = min(last_date, before[0])
+        tables, found = [], 0
+        for year in reversed(self.years(symbol)):
+            if year > last_date.year:
+                continue
+            if start_date and year < start_date.year:
+                break
+            table = self._read_year(symbol, year)
+            dates = table["date"]
+            mask = pc.less_equal(dates, pa.scalar(last_date, pa.date32()))
+            if start_date:
+                mask = pc.and_(mask, pc.greater_equal(dates, pa.scalar(start_date, pa.date32())))
+            if before:
+                before_date = pa.scalar(before[0], pa.date32())
+                mask = pc.and_(mask, pc.or_(
+                    pc.less(dates, before_date),
+                    pc.and_(pc.equal(dates, before_date), pc.less(table["id"], pa.scalar(before[1], pa.int64()))),
+                ))
+            table = table.filter(mask)
+            tables.append(table)
+            found += table.num_rows
+            if tail is not None and found >= tail:
+                break
+        table = pa.concat_tables(reversed(tables)) if tables else SCHEMA.empty_table()
+        if tail is not None:
+            table = table.slice(max(table.num_rows - tail, 0))
+        return _table_to_columns(table)
+
+    # --- Writes ---
+
+    def archive_symbol(self, db: Session, symbol: str, cutoff: datetime.date) -> int:
+        """
+        Moves the symbol's stock_prices rows dated before `cutoff` into its year files, then deletes them and advances
+        its boundary (committing). Returns the number of rows moved.
+        """
+        if not _SAFE_SYMBOL.match(symbol):
+            return 0 # Symbols are directory names
+        with self._lock:
+            rows = db.execute(
+                select(*(TABLE.c[name] for name in COLUMNS)).where(TABLE.c.symbol == symbol, TABLE.c.date < cutoff)
+                .order_by(TABLE.c.date, TABLE.c.id)
+            ).all()
+            if not rows:
+                return 0
+            by_year = defaultdict(list)
+            for row in rows:
+                by_year[row.date.year].append(row._asdict())
+            for year, year_rows in by_year.items():
+                if os.path.exists(self._path(symbol, year)):
+                    year_rows = _merge_rows(self._read_year(symbol, year).to_pylist() + year_rows)
+                self._write_year(symbol, year, year_rows)
+
+            # Rows inserted since the read have higher ids and stay hot until the next run
+            db.query(models.StockPrice).filter(
+                models.StockPrice.symbol == symbol,
+                models.StockPrice.date < cutoff,
+                models.StockPrice.id <= max(row.id for row in rows),
+            ).delete(synchronize_session=False)
+            # A longer horizon than before never moves the boundary back
+            archived_before = max(cutoff, get_archived_before(db, symbol) or cutoff)
+            stmt = bulk_ingest.dialect_insert(db)(ARCHIVE_TABLE)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["symbol"],
+                set_={"archived_before": stmt.excluded.archived_before, "updated_at": stmt.excluded.updated_at},
+            )
+            db.execute(stmt, {"symbol": symbol, "archived_before": archived_before, "updated_at": datetime.datetime.now(datetime.timezone.utc)})
+            db.commit()
+        return len(rows)
+
+    def delete_source(self, db: Session, symbol: str, data_source: str) -> int:
+        """
+        Removes the symbol's archived rows of `data_source` (rewriting its year files) and, once no file is left, its
+        boundary row in the caller's transaction. Returns the number of rows removed.
+        """
+        removed = 0
+        with self._lock:
+            for year in self.years(symbol):
+                table = self._read_year(symbol, year)
+                keep = pc.fill_null(pc.not_equal(table["data_source"].cast(pa.string()), data_source), True)
+                if pc.all(keep).as_py():
+                    continue
+                kept = table.filter(keep)
+                removed += table.num_rows - kept.num_rows
+                self._write_year(symbol, year, kept.to_pylist())
+            if removed and not self.years(symbol):
+                db.execute(ARCHIVE_TABLE.delete().where(ARCHIVE_TABLE.c.symbol == symbol))
+        return removed
+
+    def archive(self, db: Session, horizon_days: int, today: Optional[datetime.date] = None) -> dict[str, int]:
+        """archive_symbol for every symbol with bars before cutoff_date(horizon_days). Returns rows moved per symbol."""
+        cutoff = cutoff_date(horizon_days, today)
+        prices = models.StockPrice.__table__
+        stocks = models.Stock.__table__
+        # One (stock_id, date) index seek per stock rather than a scan of the dates
+        symbols = db.execute(
+            select(stocks.c.symbol).where(exists().where(prices.c.stock_id == stocks.c.id, prices.c.date < cutoff))
+            .order_by(stocks.c.symbol)
+        ).scalars().all()
+        moved = {}
+        for symbol in symbols:
+            count = self.archive_symbol(db, symbol, cutoff)
+            if count:
+                moved[symbol] = count
+        return moved
+
+store: Optional[ColdStorage] = ColdStorage(settings.COLD_STORAGE_DIR) if settings.COLD_STORAGE_DIR else None
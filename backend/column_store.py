@@ -0,0 +1,300 @@
+import datetime
+import json
+import os
+import re
+import shutil
+import threading
+from collections import defaultdict
+from typing import Iterable, Optional
+
+import numpy as np
+from cachetools import LRUCache
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from backend import models
+from backend.config import settings
+
+# Optional memory-mapped columnar copy of stock_prices (settings.COLUMN_STORE_DIR; empty disables it).
+# stock_prices stays the system of record; the store is a read path for daily bars that crud maintains after
+# every committed write and falls back from (to SQL) for symbols it does not hold.
+# - Each symbol's rows live in <dir>/<SYMBOL>/<generation>/ as one raw fixed-width file per column (COLUMNS),
+#   in (date, id) order. Reads open them with np.memmap and slice the maps, so a date range costs two binary
+#   searches and no copying.
+# - index.json maps each symbol to its row count, generation, last (date, id), data sources and the
+#   StockDataVersion it reflects. It is replaced atomically (temp file, fsync, os.replace) and readers only see
+#   the rows it counts, so a torn append or an unfinished rebuild is never visible.
+# - Appends: inserts dated on or after a symbol's last stored date are read back from SQL past the last stored
+#   (date, id) and appended to the column files. Anything else (updates, deletes, backfills, failed writes)
+#   rebuilds the symbol into a new generation directory; the old one is removed once the index points away.
+# Writes are serialized by a process-wide lock, so one API process should own the directory.
+
+TABLE = models.STOCK_PRICE_ROWS
+VERSIONS = models.StockDataVersion.__table__
+INDEX_FILE = "index.json"
+COLUMNS = {
+    "id": np.dtype("<i8"),
+    "date": np.dtype("<M8[D]"),
+    "open": np.dtype("<f8"),
+    "high": np.dtype("<f8"),
+    "low": np.dtype("<f8"),
+    "close": np.dtype("<f8"),
+    "volume": np.dtype("<i8"),
+    "source": np.dtype("<i2"), # Position in the symbol's "sources" list; -1 for NULL
+    "created_at": np.dtype("<M8[us]"),
+}
+_SAFE_SYMBOL = re.compile(r"^[A-Z0-9][A-Z0-9.\-_^=]*$") # Symbols are directory names
+
+def _read_sql_rows(db: Session, symbol: str, after: Optional[tuple[datetime.date, int]] = None) -> list:
+    stmt = select(
+        TABLE.c.id, TABLE.c.date, TABLE.c.open, TABLE.c.high, TABLE.c.low, TABLE.c.close, TABLE.c.volume,
+        TABLE.c.data_source, TABLE.c.created_at,
+    ).where(TABLE.c.symbol == symbol)
+    if after:
+        stmt = stmt.where(tuple_(TABLE.c.date, TABLE.c.id) > tuple_(*after))
+    return db.connection().execute(stmt.order_by(TABLE.c.date, TABLE.c.id)).all()
+
+def _rows_to_columns(rows: list, sources: list) -> dict[str, np.ndarray]:
+    """Column arrays (COLUMNS dtypes) for SQL rows; data sources not in `sources` yet are appended to it."""
+    ids, dates, opens, highs, lows, closes, volumes, data_sources, created = zip(*rows)
+    codes = {source: i for i, source in enumerate(sources)}
+    for source in data_sources:
+        if source is not None and source not in codes:
+            codes[source] = len(sources)
+            sources.append(source)
+    codes[None] = -1
+    return {
+        "id": np.array(ids, dtype=COLUMNS["id"]),
+        "date": np.array(dates, dtype=COLUMNS["date"]),
+        "open": np.array(opens, dtype=COLUMNS["open"]),
+        "high": np.array(highs, dtype=COLUMNS["high"]),
+        "low": np.array(lows, dtype=COLUMNS["low"]),
+        "close": np.array(closes, dtype=COLUMNS["close"]),
+        "volume": np.array(volumes, dtype=COLUMNS["volume"]),
+        "source": np.array([codes[source] for source in data_sources], dtype=COLUMNS["source"]),
+        "created_at": np.array([c.replace(tzinfo=None) if c else None for c in created], dtype=COLUMNS["created_at"]),
+    }
+
+def _symbol_versions(db: Session, symbols: Iterable[str]) -> dict[str, int]:
+    symbols = list(symbols)
+    versions = dict(db.execute(select(VERSIONS.c.symbol, VERSIONS.c.version).where(VERSIONS.c.symbol.in_(symbols))).all())
+    return {symbol: versions.get(symbol, 0) for symbol in symbols}
+
+class ColumnStore:
+    def __init__(self, root: str, open_symbols: int = 64):
+        self.root = root
+        self._lock = threading.RLock()
+        self._index: dict[str, dict] = {}
+        self._index_mtime: Optional[int] = None
+        # Each np.memmap holds a file descriptor, so only the most recently read symbols stay mapped
+        self._maps = LRUCache(maxsize=open_symbols)
+
+    # --- Index ---
+
+    def _index_path(self) -> str:
+        return os.path.join(self.root, INDEX_FILE)
+
+    def _load_index(self) -> dict[str, dict]:
+        """The symbol index, re-read when the file was replaced since the last read."""
+        try:
+            mtime = os.stat(self._index_path()).st_mtime_ns
+        except FileNotFoundError:
+            self._index, self._index_mtime = {}, None
+            return self._index
+        if mtime != self._index_mtime:
+            with open(self._index_path()) as f:
+                self._index = json.load(f)["symbols"]
+            self._index_mtime = mtime
+        return self._index
+
+    def _save_index(self, index: dict[str, dict]) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        temp_path = self._index_path() + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"format": 1, "symbols": index}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self._index_path())
+        self._index, self._index_mtime = index, os.stat(self._index_path()).st_mtime_ns
+
+    def _directory(self, symbol: str, generation: int) -> str:
+        return os.path.join(self.root, symbol, str(generation))
+
+    def symbols(self) -> list[str]:
+        with self._lock:
+            return sorted(self._load_index())
+
+    # --- Reads ---
+
+    def _columns(self, symbol: str, entry: dict) -> dict[str, np.ndarray]:
+        key = (symbol, entry["generation"], entry["rows"])
+        maps = self._maps.get(key)
+        if maps is None:
+            for stale in [cached for cached in self._maps if cached[0] == symbol]:
+                del self._maps[stale]
+            directory = self._directory(symbol, entry["generation"])
+            maps = {
+                column: np.memmap(os.path.join(directory, f"{column}.bin"), dtype=dtype, mode="r", shape=(entry["rows"],)).view(np.ndarray)
+                for column, dtype in COLUMNS.items()
+            }
+            self._maps[key] = maps
+        return maps
+
+    def read(
+        self,
+        symbol: str,
+        columns: Iterable[str],
+        start_date: Optional[datetime.date] = None,
+        end_date: Optional[datetime.date] = None,
+        lookback: int = 0,
+        before: Optional[tuple[datetime.date, int]] = None,
+        tail: Optional[int] = None
+    ) -> Optional[dict[str, np.ndarray]]:
+        """
+        Chronological read-only views of `columns` (COLUMNS names, or "data_source" for the decoded source strings)
+        over the date range, or None when the store does not hold the symbol. `lookback` adds up to that many
+        earlier rows before start_date; `before` keeps only rows strictly before a (date, id) keyset position and
+        `tail` only the last rows of the range.
+        """
+        with self._lock:
+            entry = self._load_index().get(symbol)
+            if entry is None:
+                return None
+            stored = self._columns(symbol, entry)
+            sources = entry["sources"]
+        dates = stored["date"]
+        lo = int(np.searchsorted(dates, np.datetime64(start_date, "D"), side="left")) if start_date else 0
+        hi = int(np.searchsorted(dates, np.datetime64(end_date, "D"), side="right")) if end_date else len(dates)
+        lo = max(lo - lookback, 0)
+        if before:
+            before_date = np.datetime64(before[0], "D")
+            first = int(np.searchsorted(dates, before_date, side="left"))
+            last = int(np.searchsorted(dates, before_date, side="right"))
+            hi = min(hi, first + int(np.searchsorted(stored["id"][first:last], before[1], side="left")))
+        hi = max(hi, lo)
+        if tail is not None:
+            lo = max(lo, hi - tail)
+        result = {}
+        for column in columns:
+            if column == "data_source":
+                result[column] = np.array(sources + [None], dtype=object)[stored["source"][lo:hi]] # -1 picks None
+            else:
+                result[column] = stored[column][lo:hi]
+        return result
+
+    # --- Writes ---
+
+    def _write(self, directory: str, arrays: dict[str, np.ndarray], keep_rows: Optional[int] = None) -> None:
+        """
+        Writes `arrays` to new column files in `directory`, or appends them after the first `keep_rows` rows of the
+        existing files (truncating bytes a torn append may have left behind the indexed rows).
+        """
+        os.makedirs(directory, exist_ok=True)
+        for column, dtype in COLUMNS.items():
+            with open(os.path.join(directory, f"{column}.bin"), "wb" if keep_rows is None else "r+b") as f:
+                if keep_rows is not None:
+                    f.truncate(keep_rows * dtype.itemsize)
+                    f.seek(0, os.SEEK_END)
+                f.write(np.ascontiguousarray(arrays[column], dtype=dtype).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _append(self, db: Session, symbol: str, entry: dict, version: int) -> None:
+        last_date, last_id = datetime.date.fromisoformat(entry["last"][0]), entry["last"][1]
+        rows = _read_sql_rows(db, symbol, after=(last_date, last_id))
+        entry = {**entry, "sources": list(entry["sources"]), "version": version}
+        if rows:
+            arrays = _rows_to_columns(rows, entry["sources"])
+            self._write(self._directory(symbol, entry["generation"]), arrays, keep_rows=entry["rows"])
+            entry.update(rows=entry["rows"] + len(rows), last=[str(arrays["date"][-1]), int(arrays["id"][-1])])
+        self._save_index({**self._load_index(), symbol: entry})
+
+    def _rebuild(self, db: Session, symbol: str, version: int) -> None:
+        index = dict(self._load_index())
+        previous = index.get(symbol)
+        rows = _read_sql_rows(db, symbol)
+        if rows:
+            generation = previous["generation"] + 1 if previous else 1
+            sources = []
+            arrays = _rows_to_columns(rows, sources)
+            self._write(self._directory(symbol, generation), arrays)
+            index[symbol] = {
+                "rows": len(rows), "generation": generation, "sources": sources, "version": version,
+                "last": [str(arrays["date"][-1]), int(arrays["id"][-1])],
+            }
+        else:
+            index.pop(symbol, None)
+        self._save_index(index)
+        # Readers holding maps of the old files keep them; unlinking does not invalidate a mapping
+        symbol_directory = os.path.join(self.root, symbol)
+        current = str(index[symbol]["generation"]) if rows else None
+        if os.path.isdir(symbol_directory):
+            for name in os.listdir(symbol_directory):
+                if name != current:
+                    shutil.rmtree(os.path.join(symbol_directory, name), ignore_errors=True)
+
+    def _forget(self, symbol: str) -> None:
+        """Drops a symbol whose files could not be updated, so reads fall back to SQL."""
+        try:
+            index = dict(self._load_index())
+            if index.pop(symbol, None) is not None:
+                self._save_index(index)
+        except OSError:
+            pass
+
+    def refresh_symbols(self, db: Session, symbols: Iterable[str]) -> None:
+        """Rebuilds `symbols` from the committed stock_prices rows (dropping symbols that have none)."""
+        symbols = {symbol.upper() for symbol in symbols}
+        versions = _symbol_versions(db, symbols)
+        with self._lock:
+            for symbol in sorted(symbols):
+                if not _SAFE_SYMBOL.match(symbol):
+                    continue
+                try:
+                    self._rebuild(db, symbol, versions[symbol])
+                except OSError:
+                    self._forget(symbol)
+
+    def on_bars_committed(self, db: Session, written_rows: Iterable[dict], inserted_only: bool) -> None:
+        """
+        Brings the symbols of committed `written_rows` (dicts with symbol and date) up to date: appended when the
+        write only inserted rows dated on or after the symbol's last stored date, rebuilt otherwise.
+        """
+        oldest_written = defaultdict(lambda: datetime.date.max)
+        for row in written_rows:
+            symbol = row["symbol"].upper()
+            oldest_written[symbol] = min(oldest_written[symbol], row["date"])
+        versions = _symbol_versions(db, oldest_written)
+        with self._lock:
+            index = self._load_index()
+            for symbol, oldest in sorted(oldest_written.items()):
+                if not _SAFE_SYMBOL.match(symbol):
+                    continue
+                entry = index.get(symbol)
+                try:
+                    if inserted_only and entry and oldest >= datetime.date.fromisoformat(entry["last"][0]):
+                        self._append(db, symbol, entry, versions[symbol])
+                    else:
+                        self._rebuild(db, symbol, versions[symbol])
+                except OSError:
+                    self._forget(symbol)
+                index = self._load_index()
+
+    def sync_all(self, db: Session) -> int:
+        """
+        Rebuilds every symbol whose stored StockDataVersion differs from the database (e.g. written while the store
+        was disabled) or that the store is missing, and drops symbols no longer in stock_prices.
+        Returns the number of symbols rebuilt or dropped.
+        """
+        database_symbols = set(db.execute(select(TABLE.c.symbol).distinct()).scalars())
+        versions = _symbol_versions(db, database_symbols)
+        with self._lock:
+            index = self._load_index()
+            stale = {symbol for symbol in database_symbols if index.get(symbol, {}).get("version", -1) != versions[symbol]}
+            stale |= set(index) - database_symbols
+        self.refresh_symbols(db, stale)
+        return len(stale)
+
+store: Optional[ColumnStore] = (
+    ColumnStore(settings.COLUMN_STORE_DIR, settings.COLUMN_STORE_OPEN_SYMBOLS) if settings.COLUMN_STORE_DIR else None
+)
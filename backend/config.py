@@ -8,6 +8,18 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    BULK_INGEST_CHUNK_SIZE: int = 5000 # Rows per statement in backend.bulk_ingest (and per commit for upserts)
+    PRICE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024 # Approximate memory budget of the stock read cache (0 disables it)
+    PRICE_CACHE_TTL_SECONDS: float = 300
+    MULTI_SYMBOL_MAX: int = 1000 # Most symbols accepted by one GET /stocks?symbols= call
+    MATRIX_CACHE_MAX_BYTES: int = 128 * 1024 * 1024 # Budget for cached correlation/covariance matrices (0 disables it)
+    MATRIX_CACHE_TTL_SECONDS: float = 3600
+    COLUMN_STORE_DIR: str = "" # Memory-mapped columnar copy of stock_prices (e.g. "data/columns"); empty disables it
+    COLUMN_STORE_OPEN_SYMBOLS: int = 64 # Symbols kept memory-mapped at once (each maps one file per column)
+    COLD_STORAGE_DIR: str = "" # Per-symbol, per-year Parquet archive of old stock_prices rows (e.g. "data/cold"); empty disables it
+    COLD_STORAGE_HORIZON_DAYS: int = 730 # Whole years of bars older than this are moved to the archive
+    ANALYTICS_ENGINE: str = "sqlalchemy" # "duckdb" runs the /stocks/analytics aggregates in embedded DuckDB (requirements-duckdb.txt plus its preinstalled sqlite/postgres extension)
+    DUCKDB_THREADS: int = 0 # Threads per DuckDB query; 0 uses DuckDB's default (one per core)
 
     # Pydantic V2 way to specify .env file
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
@@ -1,6 +1,18 @@
+from sqlalchemy import String, func, select, tuple_, type_coerce
 from sqlalchemy.orm import Session
-from typing import Optional # Added for type hinting
-from backend import models, schemas
+from typing import Iterator, Optional # Added for type hinting
+import base64
+import collections
+import datetime
+import functools
+import heapq
+import itertools
+from operator import attrgetter
+import numpy as np
+import pyarrow as pa
+from backend import models, schemas, bulk_ingest, cold_storage, column_store, duckdb_analytics, indicator_store, latest_quotes, rollups, symbol_stats
+from backend.services import analytics, correlation, downsampling
+from backend.services.price_cache import matrix_cache, price_cache
 from backend.auth import get_password_hash # For hashing password on create/update
 
 # --- User CRUD Operations ---
@@ -31,29 +43,299 @@ def create_user(db: Session, user_in: schemas.UserCreate) -> models.User:
 
 # --- StockPrice CRUD Operations ---
 
+def get_stock_data_version(db: Session, symbol: str) -> int:
+    """Current change counter for a symbol (0 if it was never written through crud)."""
+    version = db.query(models.StockDataVersion.version).filter(models.StockDataVersion.symbol == symbol.upper()).scalar()
+    return version or 0
+
+def get_stock_data_versions(db: Session, symbols: list[str]) -> dict[str, int]:
+    """get_stock_data_version for many symbols in one query."""
+    rows = db.query(models.StockDataVersion.symbol, models.StockDataVersion.version).filter(
+        models.StockDataVersion.symbol.in_(symbols)
+    ).all()
+    versions = dict(rows)
+    return {symbol: versions.get(symbol, 0) for symbol in symbols}
+
+def _bump_stock_data_versions(db: Session, symbols) -> None:
+    """Increments the StockDataVersion counter of each symbol (creating it at 1) in the current transaction."""
+    table = models.StockDataVersion.__table__
+    now = datetime.datetime.now(datetime.timezone.utc)
+    stmt = bulk_ingest.dialect_insert(db)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["symbol"],
+        set_={"version": table.c.version + 1, "updated_at": stmt.excluded.updated_at},
+    )
+    db.execute(stmt, [{"symbol": symbol, "version": 1, "updated_at": now} for symbol in sorted(symbols)])
+
+def _stock_data_changed(db: Session, written_rows: list[dict], complete: bool = True, inserted_only: bool = False) -> None:
+    """
+    Bookkeeping after the stock_prices rows in `written_rows` were committed: recomputes the rollup periods they
+    touch, advances (or drops) stored indicator series, refreshes latest_quote and symbol_stats, bumps the symbols'
+    data versions, drops their cached reads and updates the column store (appending when `inserted_only`).
+    Upserts commit in chunks, so this runs once after the last chunk, or with complete=False after a failure
+    (earlier chunks stay committed, so it is unknown which rows were written).
+    """
+    symbols = {row["symbol"].upper() for row in written_rows}
+    if db.in_transaction() and not db.get_transaction().is_active:
+        db.rollback() # A failed chunk left the session unusable
+    rollups.refresh_rollups(db, written_rows)
+    if complete:
+        indicator_store.on_bars_written(db, written_rows)
+        latest_quotes.on_bars_written(db, written_rows)
+        symbol_stats.on_bars_written(db, written_rows)
+    else:
+        indicator_store.drop_series(db, symbols)
+        latest_quotes.refresh_symbols(db, symbols)
+        symbol_stats.refresh_symbols(db, symbols)
+    _bump_stock_data_versions(db, symbols)
+    db.commit()
+    price_cache.invalidate_symbols(symbols)
+    if column_store.store:
+        column_store.store.on_bars_committed(db, written_rows, inserted_only=complete and inserted_only)
+
 def create_stock_price(db: Session, price_in: schemas.StockPriceCreate) -> models.StockPrice:
     db_price = models.StockPrice(**price_in.model_dump())
     db.add(db_price)
+    db.flush()
+    # Same transaction as the insert
+    written = [{"symbol": db_price.symbol, "date": db_price.date, "data_source": db_price.data_source, "close": db_price.close}]
+    rollups.refresh_rollups(db, written)
+    indicator_store.on_bars_written(db, written)
+    latest_quotes.on_bars_written(db, written)
+    symbol_stats.on_bars_written(db, written)
+    _bump_stock_data_versions(db, [db_price.symbol])
     db.commit()
+    price_cache.invalidate_symbols([db_price.symbol])
+    if column_store.store:
+        column_store.store.on_bars_committed(db, written, inserted_only=True)
     db.refresh(db_price)
     return db_price
 
-def create_stock_prices_bulk(db: Session, prices_in: schemas.StockPriceBulkCreate) -> list[models.StockPrice]:
-    db_prices = []
+def _stock_price_rows(prices_in: schemas.StockPriceBulkCreate) -> list[dict]:
+    """Plain column dicts for a bulk payload, with the common data_source applied where a price has none."""
+    rows = []
     for price_data in prices_in.prices:
-        # If a common data_source is provided in StockPriceBulkCreate and not in individual price_data
-        if prices_in.data_source and price_data.data_source is None:
-            final_price_data = price_data.model_dump()
-            final_price_data['data_source'] = prices_in.data_source
-            db_price = models.StockPrice(**final_price_data)
+        row = price_data.model_dump()
+        if prices_in.data_source and row["data_source"] is None:
+            row["data_source"] = prices_in.data_source
+        rows.append(row)
+    return rows
+
+def _transient_stock_price(symbol: str, data_source: Optional[str], **values) -> models.StockPrice:
+    """A detached StockPrice filled the way the ORM loader does (no per-attribute change events), for rows not read through the session."""
+    price = models.StockPrice.__mapper__.class_manager.new_instance()
+    price.__dict__.update(values, _symbol=symbol, _data_source=data_source)
+    return price
+
+def create_stock_prices_bulk(
+    db: Session,
+    prices_in: schemas.StockPriceBulkCreate,
+    chunk_size: Optional[int] = None
+) -> list[models.StockPrice]:
+    """
+    Inserts all prices through the bulk ingest engine (backend.bulk_ingest) in one transaction, `chunk_size` rows
+    per statement: when any row fails (e.g. IntegrityError on an existing key) nothing is stored and the error is raised.
+    IDs come back from INSERT ... RETURNING (SQLite) or the pre-allocated sequence values used by COPY (PostgreSQL),
+    so no per-row refresh is needed. The returned StockPrice objects are transient (not attached to the session).
+    """
+    rows = _stock_price_rows(prices_in)
+    if not rows:
+        return []
+    try:
+        ids, created_at = bulk_ingest.insert_stock_price_rows(db, rows, chunk_size=chunk_size)
+    except Exception:
+        db.rollback()
+        raise
+    _stock_data_changed(db, rows, inserted_only=True)
+    return [_transient_stock_price(id=row_id, created_at=created_at, **row) for row_id, row in zip(ids, rows)]
+
+def upsert_stock_prices(
+    db: Session,
+    prices_in: schemas.StockPriceBulkCreate,
+    overwrite: bool = True,
+    chunk_size: Optional[int] = None
+) -> dict[str, int]:
+    """
+    Idempotently stores prices keyed on (symbol, date, data_source).
+    New keys are inserted; existing keys are updated only if their OHLCV values differ (or skipped entirely
+    when overwrite is False). Rows that already match are never written. Keys in cold storage exist as well:
+    changed ones are written to stock_prices (counted as updated), where they replace the archived row.
+    Returns a dict with "inserted", "updated" and "unchanged" counts.
+    """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    rows = _stock_price_rows(prices_in)
+    if not rows:
+        return counts
+
+    # NULL data_source rows can never conflict (SQL NULL semantics), so they are plain inserts.
+    unkeyed_rows = [row for row in rows if row["data_source"] is None]
+    keyed_rows = {(row["symbol"], row["date"], row["data_source"]): row for row in rows if row["data_source"] is not None}
+
+    existing = {}
+    if keyed_rows:
+        symbols = {key[0] for key in keyed_rows}
+        sources = {key[2] for key in keyed_rows}
+        dates = [key[1] for key in keyed_rows]
+        table = models.STOCK_PRICE_ROWS.c
+        existing_rows = db.execute(select(
+            table.symbol, table.date, table.data_source, *(table[f] for f in bulk_ingest.STOCK_PRICE_VALUE_FIELDS)
+        ).where(
+            table.symbol.in_(symbols),
+            table.data_source.in_(sources),
+            table.date >= min(dates),
+            table.date <= max(dates),
+        )).all()
+        existing = {tuple(r[:3]): tuple(r[3:]) for r in existing_rows}
+        if cold_storage.store: # Keys moved to cold storage exist too; a row in stock_prices replaces the archived one
+            existing = {**_archived_price_values(db, keyed_rows), **existing}
+
+    new_rows, changed_rows = list(unkeyed_rows), []
+    for key, row in keyed_rows.items():
+        current = existing.get(key)
+        if current is None:
+            new_rows.append(row)
+        elif overwrite and current != tuple(row[f] for f in bulk_ingest.STOCK_PRICE_VALUE_FIELDS):
+            changed_rows.append(row)
         else:
-            db_price = models.StockPrice(**price_data.model_dump())
-        db.add(db_price)
-        db_prices.append(db_price)
-    db.commit()
-    for db_price in db_prices: # Refresh each object after commit to get DB-generated values like ID
-        db.refresh(db_price)
-    return db_prices
+            counts["unchanged"] += 1
+
+    to_write = new_rows + changed_rows
+    if to_write:
+        try:
+            bulk_ingest.upsert_stock_price_rows(db, to_write, overwrite=overwrite, chunk_size=chunk_size)
+        except BaseException:
+            try: # Earlier chunks may be committed; the original error is raised whatever happens here
+                _stock_data_changed(db, to_write, complete=False)
+            except Exception as e:
+                print(f"Error refreshing derived data after a failed upsert of {len(to_write)} stock_prices rows: {e}")
+            raise
+        _stock_data_changed(db, to_write, inserted_only=not changed_rows)
+
+    counts["inserted"] = len(new_rows)
+    counts["updated"] = len(changed_rows)
+    return counts
+
+def _archived_price_values(db: Session, keys) -> dict[tuple, tuple]:
+    """OHLCV values (bulk_ingest.STOCK_PRICE_VALUE_FIELDS) of the cold storage rows among (symbol, date, data_source) `keys`."""
+    dates_by_symbol = collections.defaultdict(list)
+    for symbol, date, _source in keys:
+        dates_by_symbol[symbol].append(date)
+    archive = models.StockPriceArchive
+    boundaries = db.execute(select(archive.symbol, archive.archived_before).where(archive.symbol.in_(list(dates_by_symbol)))).all()
+    values = {}
+    for symbol, archived_before in boundaries:
+        dates = [date for date in dates_by_symbol[symbol] if date < archived_before]
+        if not dates:
+            continue
+        cold = cold_storage.store.read(symbol, archived_before, start_date=min(dates), end_date=max(dates))
+        columns = [cold[name].tolist() for name in ("date", "data_source") + bulk_ingest.STOCK_PRICE_VALUE_FIELDS]
+        values.update({(symbol, date, source): tuple(row) for date, source, *row in zip(*columns)})
+    return values
+
+def encode_stock_price_cursor(date: datetime.date, price_id: int) -> str:
+    """Opaque keyset cursor for the row a page ended on."""
+    return base64.urlsafe_b64encode(f"{date.isoformat()}|{price_id}".encode()).decode().rstrip("=")
+
+def decode_stock_price_cursor(cursor: str) -> tuple[datetime.date, int]:
+    """Inverse of encode_stock_price_cursor. Raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date_str, id_str = raw.split("|")
+        return datetime.date.fromisoformat(date_str), int(id_str)
+    except (ValueError, UnicodeDecodeError) as e: # binascii.Error is a ValueError subclass
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+def _filter_stock_prices(
+    query,
+    symbol: str,
+    skip: int = 0,
+    limit: Optional[int] = 100,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    after: Optional[tuple[datetime.date, int]] = None,
+    model=models.StockPrice
+):
+    """
+    Applies the symbol/date/keyset filters and newest-first ordering to an ORM Query or a Core select().
+    limit=None leaves the result unbounded. `model` is StockPrice, StockPriceRollup or the columns of
+    models.STOCK_PRICE_ROWS (same column names).
+    """
+    query = query.filter(model.symbol == symbol.upper())
+    if start_date:
+        query = query.filter(model.date >= start_date)
+    if end_date:
+        query = query.filter(model.date <= end_date)
+    if after:
+        query = query.filter(tuple_(model.date, model.id) < tuple_(*after))
+
+    query = query.order_by(model.date.desc(), model.id.desc())
+    if skip:
+        query = query.offset(skip)
+    return query.limit(limit) if limit is not None else query
+
+_STORED_PRICE_COLUMNS = ("id", "date", "open", "high", "low", "close", "volume", "data_source", "created_at")
+
+def _stored_stock_prices(symbol: str, stored: dict[str, np.ndarray], skip: int = 0) -> list[models.StockPrice]:
+    """Transient StockPrice objects, newest first, for chronological column arrays (column store or cold storage) minus the newest `skip`."""
+    stop = max(len(stored["id"]) - skip, 0)
+    values = {name: column[:stop][::-1].tolist() for name, column in stored.items()}
+    return [_transient_stock_price(symbol=symbol, **dict(zip(values, row))) for row in zip(*values.values())]
+
+def _get_hot_stock_prices(
+    db: Session,
+    symbol: str,
+    skip: int,
+    limit: Optional[int],
+    start_date: Optional[datetime.date],
+    end_date: Optional[datetime.date],
+    after: Optional[tuple[datetime.date, int]]
+) -> list[models.StockPrice]:
+    """get_stock_prices_by_symbol over stock_prices alone: the column store when it holds the symbol, else SQL."""
+    stored = column_store.store.read(
+        symbol, _STORED_PRICE_COLUMNS, start_date=start_date, end_date=end_date, before=after,
+        tail=skip + limit if limit is not None else None
+    ) if column_store.store else None
+    if stored is not None:
+        return _stored_stock_prices(symbol, stored, skip)
+    return _filter_stock_prices(
+        db.query(models.StockPrice), symbol, skip=skip, limit=limit, start_date=start_date, end_date=end_date, after=after
+    ).all()
+
+def _merge_archived(
+    db: Session,
+    symbol: str,
+    read_hot,
+    read_cold,
+    skip: int,
+    limit: Optional[int],
+    start_date: Optional[datetime.date]
+) -> list:
+    """
+    Newest-first rows `skip` onward (at most `limit`) of a symbol's range across both tiers. read_hot(skip, limit)
+    reads stock_prices (or the column store); read_cold(archived_before, tail) the newest `tail` archived rows of the
+    range (all when None) as the same kind of rows. Cold storage is only read when the range reaches before the
+    symbol's archive boundary. Rows need date, id and data_source: a row in stock_prices replaces the archived row
+    of its (date, data_source), since it was written after the run that archived that one.
+    """
+    archived_before = cold_storage.get_archived_before(db, symbol) if cold_storage.store else None
+    if archived_before is None or (start_date and start_date >= archived_before):
+        return read_hot(skip, limit)
+
+    # The first skip + limit rows of the merged order are among the first skip + limit rows of each tier
+    window = skip + limit if limit is not None else None
+    hot = read_hot(0, window)
+    if window is not None and len(hot) == window and hot[-1].date >= archived_before:
+        return hot[skip:] # Every archived row is older than the last row needed
+    replaced = _replaced_keys(hot, archived_before)
+    # Replaced archived rows are dropped, so as many more are read (older replacements only shadow rows past the window)
+    cold = read_cold(archived_before, window + len(replaced) if window is not None else None)
+    merged = hot + [row for row in cold if (row.date, row.data_source) not in replaced]
+    merged.sort(key=attrgetter("date", "id"), reverse=True)
+    return merged[skip:window]
+
+def _replaced_keys(hot: list, archived_before: datetime.date) -> set[tuple]:
+    """(date, data_source) keys of hot rows dated before the archive boundary, which replace archived rows of the same key."""
+    return {(row.date, row.data_source) for row in hot if row.date < archived_before and row.data_source is not None}
 
 def get_stock_prices_by_symbol(
     db: Session,
@@ -61,15 +343,643 @@ def get_stock_prices_by_symbol(
     skip: int = 0,
     limit: int = 100,
     start_date: Optional[datetime.date] = None, # Use datetime.date from schemas
-    end_date: Optional[datetime.date] = None
+    end_date: Optional[datetime.date] = None,
+    after: Optional[tuple[datetime.date, int]] = None
 ) -> list[models.StockPrice]:
-    query = db.query(models.StockPrice).filter(models.StockPrice.symbol == symbol.upper())
+    """
+    Prices for a symbol, newest first (date desc, id desc).
+    `after` is a (date, id) keyset position: only rows strictly past it are returned, using a seek on
+    ix_stock_prices_stock_date_id instead of scanning and discarding `skip` rows.
+    Symbols held by the column store are sliced from its memory maps (as transient StockPrice objects).
+    Ranges reaching before the symbol's cold storage boundary merge in its archived rows (also transient).
+    """
+    symbol = symbol.upper()
+    return _merge_archived(
+        db, symbol,
+        lambda skip, limit: _get_hot_stock_prices(db, symbol, skip, limit, start_date, end_date, after),
+        lambda archived_before, tail: _stored_stock_prices(symbol, cold_storage.store.read(
+            symbol, archived_before, start_date=start_date, end_date=end_date, before=after, tail=tail
+        )),
+        skip, limit, start_date,
+    )
+
+def _select_stock_price_columns(columns: tuple[str, ...], table=models.STOCK_PRICE_ROWS, raw_dates: bool = False):
+    """
+    Core select() of id, date and the requested columns of `table` (ordered, de-duplicated): daily bars with their
+    symbol/data_source strings (models.STOCK_PRICE_ROWS) by default.
+    raw_dates skips SQLAlchemy's date conversion, so dates come back as the driver returns them
+    (ISO strings on SQLite, where parsing them into datetime.date is the dominant cost of large reads).
+    """
+    names = dict.fromkeys(("id", "date") + tuple(columns))
+    return select(*(
+        type_coerce(table.c.date, String).label("date") if name == "date" and raw_dates else table.c[name]
+        for name in names
+    ))
+
+def _select_interval_columns(columns: tuple[str, ...], interval: str, raw_dates: bool = False):
+    """
+    _select_stock_price_columns for a bar interval: daily bars come from stock_prices,
+    weekly/monthly/yearly bars from stock_price_rollups. Returns (select, columns to filter and order it by).
+    """
+    if interval == rollups.DAILY_INTERVAL:
+        return _select_stock_price_columns(columns, raw_dates=raw_dates), models.STOCK_PRICE_ROWS.c
+    if interval not in rollups.INTERVALS:
+        raise ValueError(f"Unknown interval '{interval}'. Use one of: {', '.join((rollups.DAILY_INTERVAL,) + rollups.INTERVALS)}.")
+    model = models.StockPriceRollup
+    return _select_stock_price_columns(columns, model.__table__, raw_dates).where(model.interval == interval), model
+
+@functools.lru_cache(maxsize=128)
+def _stored_row_type(fields: tuple[str, ...]) -> type:
+    """Row type for price rows built from column arrays: like a Core Row, it has _fields and attribute/index access."""
+    return collections.namedtuple("StoredPriceRow", fields)
+
+def _stored_rows(symbol: str, stored: dict[str, np.ndarray], fields: tuple[str, ...], skip: int = 0) -> list:
+    """Rows holding `fields`, newest first, for chronological column arrays (column store or cold storage) minus the newest `skip`."""
+    stop = max(len(stored["id"]) - skip, 0)
+    values = [itertools.repeat(symbol, stop) if name == "symbol" else stored[name][:stop][::-1].tolist() for name in fields]
+    return list(map(_stored_row_type(fields)._make, zip(*values)))
+
+def _read_column_store(symbol: str, fields: tuple[str, ...], **kwargs) -> Optional[dict[str, np.ndarray]]:
+    """column_store.store.read of `fields` (the symbol is implied), or None when the store is disabled or lacks the symbol."""
+    if not column_store.store:
+        return None
+    return column_store.store.read(symbol, [name for name in fields if name != "symbol"], **kwargs)
+
+def get_stock_price_rows(
+    db: Session,
+    symbol: str,
+    columns: tuple[str, ...],
+    skip: int = 0,
+    limit: Optional[int] = 100,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    after: Optional[tuple[datetime.date, int]] = None,
+    interval: str = rollups.DAILY_INTERVAL,
+    raw_dates: bool = False,
+    archived: bool = True
+) -> list:
+    """
+    Same rows as get_stock_prices_by_symbol, but as lightweight Core Row tuples holding only `columns`
+    (plus date and id, which pagination needs). No ORM instances or identity map entries are created.
+    limit=None reads the whole range. Other intervals than "1d" read pre-aggregated stock_price_rollups bars.
+    Daily bars of symbols held by the column store are sliced from its memory maps (as named tuples with the same fields).
+    Daily ranges reaching before the symbol's cold storage boundary merge in its archived rows; with cold storage
+    enabled, daily rows also hold data_source for that. archived=False reads stock_prices alone (the array readers,
+    which merge archived bars as arrays).
+    raw_dates: see _select_stock_price_columns (SQL reads with archived=False only).
+    """
+    symbol = symbol.upper()
+    if interval != rollups.DAILY_INTERVAL:
+        stmt, model = _select_interval_columns(columns, interval, raw_dates)
+        stmt = _filter_stock_prices(stmt, symbol, skip=skip, limit=limit, start_date=start_date, end_date=end_date, after=after, model=model)
+        return db.execute(stmt).all()
+
+    if not (archived and cold_storage.store):
+        return _get_hot_stock_price_rows(db, symbol, columns, skip, limit, start_date, end_date, after, raw_dates)
+    fields = tuple(dict.fromkeys(("id", "date") + tuple(columns) + ("data_source",)))
+    return _merge_archived(
+        db, symbol,
+        lambda skip, limit: _get_hot_stock_price_rows(db, symbol, fields, skip, limit, start_date, end_date, after),
+        lambda archived_before, tail: _stored_rows(symbol, cold_storage.store.read(
+            symbol, archived_before, start_date=start_date, end_date=end_date, before=after, tail=tail
+        ), fields),
+        skip, limit, start_date,
+    )
+
+def _get_hot_stock_price_rows(
+    db: Session,
+    symbol: str,
+    columns: tuple[str, ...],
+    skip: int,
+    limit: Optional[int],
+    start_date: Optional[datetime.date],
+    end_date: Optional[datetime.date],
+    after: Optional[tuple[datetime.date, int]],
+    raw_dates: bool = False
+) -> list:
+    """get_stock_price_rows of daily bars over stock_prices alone: the column store when it holds the symbol, else SQL."""
+    fields = tuple(dict.fromkeys(("id", "date") + tuple(columns)))
+    stored = _read_column_store(
+        symbol, fields, start_date=start_date, end_date=end_date, before=after, tail=skip + limit if limit is not None else None
+    )
+    if stored is not None:
+        return _stored_rows(symbol, stored, fields, skip)
+    stmt = _filter_stock_prices(
+        _select_stock_price_columns(columns, raw_dates=raw_dates), symbol, skip=skip, limit=limit, start_date=start_date,
+        end_date=end_date, after=after, model=models.STOCK_PRICE_ROWS.c
+    )
+    return db.execute(stmt).all()
+
+def stream_stock_price_rows(
+    db: Session,
+    symbol: str,
+    columns: tuple[str, ...],
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    after: Optional[tuple[datetime.date, int]] = None,
+    batch_size: int = 1000
+) -> Iterator[list]:
+    """
+    Unbounded variant of get_stock_price_rows that yields rows in batches of `batch_size`.
+    Symbols held by the column store are sliced from its memory maps one batch at a time; others are read through
+    a server-side cursor (stream_results/yield_per). Either way memory stays constant regardless of row count.
+    Archived rows follow the rows dated on or after the archive boundary, read one year file at a time.
+    """
+    symbol = symbol.upper()
+    archived_before = cold_storage.get_archived_before(db, symbol) if cold_storage.store else None
+    if archived_before is None or (start_date and start_date >= archived_before):
+        yield from _stream_hot_stock_price_rows(db, symbol, columns, start_date, end_date, after, batch_size)
+        return
+
+    # Every row dated on or after the boundary is in stock_prices
+    if not end_date or end_date >= archived_before:
+        yield from _stream_hot_stock_price_rows(db, symbol, columns, archived_before, end_date, after, batch_size)
+    # Before it, the few rows written into archived years since the last run are merged with the year files
+    last_date = archived_before - datetime.timedelta(days=1)
+    end_date = min(end_date, last_date) if end_date else last_date
+    fields = tuple(dict.fromkeys(("id", "date") + tuple(columns) + ("data_source",)))
+    hot = _get_hot_stock_price_rows(db, symbol, fields, 0, None, start_date, end_date, after)
+    replaced = _replaced_keys(hot, archived_before)
+    cold = (
+        row
+        for year in reversed(cold_storage.store.years(symbol)) if year <= end_date.year and not (start_date and year < start_date.year)
+        for row in _stored_rows(symbol, cold_storage.store.read(
+            symbol, archived_before, start_date=max(start_date or datetime.date.min, datetime.date(year, 1, 1)),
+            end_date=min(end_date, datetime.date(year, 12, 31)), before=after
+        ), fields)
+        if (row.date, row.data_source) not in replaced
+    )
+    merged = heapq.merge(hot, cold, key=attrgetter("date", "id"), reverse=True)
+    while batch := list(itertools.islice(merged, batch_size)):
+        yield batch
+
+def _stream_hot_stock_price_rows(
+    db: Session,
+    symbol: str,
+    columns: tuple[str, ...],
+    start_date: Optional[datetime.date],
+    end_date: Optional[datetime.date],
+    after: Optional[tuple[datetime.date, int]],
+    batch_size: int
+) -> Iterator[list]:
+    """stream_stock_price_rows over stock_prices alone: the column store when it holds the symbol, else SQL."""
+    fields = tuple(dict.fromkeys(("id", "date") + tuple(columns)))
+    stored = _read_column_store(symbol, fields, start_date=start_date, end_date=end_date, before=after)
+    if stored is not None:
+        for stop in range(len(stored["id"]), 0, -batch_size):
+            yield _stored_rows(symbol, {name: values[max(stop - batch_size, 0):stop] for name, values in stored.items()}, fields)
+        return
+    stmt = _filter_stock_prices(
+        _select_stock_price_columns(columns), symbol, limit=None, start_date=start_date, end_date=end_date, after=after,
+        model=models.STOCK_PRICE_ROWS.c
+    )
+    result = db.execute(stmt.execution_options(stream_results=True, yield_per=batch_size))
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+def get_stock_price_rows_for_symbols(
+    db: Session,
+    symbols: list[str],
+    columns: tuple[str, ...],
+    limit_per_symbol: int = 100,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None
+) -> list:
+    """
+    Newest `limit_per_symbol` rows of each symbol in one query, as Core rows holding symbol, id, date and `columns`.
+    Rows are grouped by symbol (ascending), newest first within a symbol. The per-symbol limit is applied in SQL
+    with ROW_NUMBER() OVER (PARTITION BY symbol ...), so the database never returns rows that would be dropped.
+    Symbols held by the column store are sliced from it instead and left out of the query, as are symbols whose
+    range reaches before their cold storage boundary, which are read through get_stock_price_rows.
+    """
+    table = models.STOCK_PRICE_ROWS
+    names = tuple(dict.fromkeys(("symbol", "id", "date") + tuple(columns)))
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+    separate = {} # Rows of the symbols left out of the query
+    if cold_storage.store:
+        archive = models.StockPriceArchive
+        boundaries = db.execute(select(archive.symbol, archive.archived_before).where(archive.symbol.in_(symbols))).all()
+        row_type, project = _stored_row_type(names), attrgetter(*names)
+        for symbol, archived_before in boundaries:
+            if not (start_date and start_date >= archived_before):
+                rows = get_stock_price_rows(db, symbol, names, limit=limit_per_symbol, start_date=start_date, end_date=end_date)
+                separate[symbol] = list(map(row_type._make, map(project, rows))) # Fields in the order of the query's rows
+    for symbol in symbols if column_store.store else ():
+        stored = None if symbol in separate else _read_column_store(
+            symbol, names, start_date=start_date, end_date=end_date, tail=limit_per_symbol
+        )
+        if stored is not None:
+            separate[symbol] = _stored_rows(symbol, stored, names)
+    separate_rows = [row for symbol in sorted(separate) for row in separate[symbol]]
+    unstored = [symbol for symbol in symbols if symbol not in separate]
+    if not unstored:
+        return separate_rows
+    rank = func.row_number().over(partition_by=table.c.symbol, order_by=(table.c.date.desc(), table.c.id.desc()))
+    ranked = select(*(table.c[name] for name in names), rank.label("symbol_rank")).where(table.c.symbol.in_(unstored))
     if start_date:
-        query = query.filter(models.StockPrice.date >= start_date)
+        ranked = ranked.where(table.c.date >= start_date)
     if end_date:
-        query = query.filter(models.StockPrice.date <= end_date)
+        ranked = ranked.where(table.c.date <= end_date)
+    ranked = ranked.subquery()
+    stmt = select(*(ranked.c[name] for name in names)).where(ranked.c.symbol_rank <= limit_per_symbol).order_by(
+        ranked.c.symbol, ranked.c.date.desc(), ranked.c.id.desc()
+    )
+    rows = db.execute(stmt).all()
+    return sorted(rows + separate_rows, key=attrgetter("symbol")) if separate_rows else rows # Stable: newest first within a symbol
+
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+def last_bar_per_date(arrays: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """
+    Keeps one bar per date of chronological, (date, id)-ordered arrays: the last one, i.e. the newest row when several
+    data sources share a date. Arrays without a repeated date are returned as they are (column store views stay views).
+    """
+    dates = arrays["date"]
+    if len(dates) < 2:
+        return arrays
+    repeated = dates[1:] == dates[:-1]
+    if not repeated.any():
+        return arrays
+    keep = np.append(~repeated, True)
+    return {name: values[keep] for name, values in arrays.items()}
+
+def get_stock_price_arrays(
+    db: Session,
+    symbol: str,
+    columns: tuple[str, ...] = ("close",),
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    lookback: int = 0,
+    interval: str = rollups.DAILY_INTERVAL
+) -> dict[str, np.ndarray]:
+    """
+    The date range as chronological (oldest first) NumPy arrays: "date" (datetime64[D]) plus float64 `columns`,
+    with one bar per date (last_bar_per_date), so returns and indicators are computed day over day.
+    `lookback` adds up to that many earlier bars before start_date, e.g. as warm-up history for indicators.
+    Daily bars of symbols held by the column store are views of its memory maps rather than copies.
+    Daily ranges (or lookbacks) reaching before the symbol's cold storage boundary merge in its archived bars.
+    """
+    symbol = symbol.upper()
+    fields = tuple(dict.fromkeys(tuple(columns) + ("id",)))
+    arrays = None
+    if column_store.store and interval == rollups.DAILY_INTERVAL:
+        stored = column_store.store.read(symbol, ("date",) + fields, start_date, end_date, lookback=lookback)
+        if stored is not None:
+            arrays = _float_columns(stored)
+    if arrays is None:
+        rows = get_stock_price_rows(
+            db, symbol, fields, limit=None, start_date=start_date, end_date=end_date, interval=interval, raw_dates=True, archived=False
+        )
+        if lookback and start_date:
+            rows += get_stock_price_rows(
+                db, symbol, fields, limit=lookback, end_date=start_date - datetime.timedelta(days=1), interval=interval,
+                raw_dates=True, archived=False
+            )
+        rows.reverse()
+        arrays = _rows_to_arrays(rows, fields)
+    if interval == rollups.DAILY_INTERVAL and cold_storage.store:
+        archived_before = cold_storage.get_archived_before(db, symbol)
+        if archived_before is not None:
+            arrays = _with_archived_arrays(symbol, arrays, archived_before, start_date, end_date, lookback)
+    return last_bar_per_date(_without_ids(arrays, columns))
+
+def _with_archived_arrays(
+    symbol: str,
+    arrays: dict[str, np.ndarray],
+    archived_before: datetime.date,
+    start_date: Optional[datetime.date],
+    end_date: Optional[datetime.date],
+    lookback: int = 0
+) -> dict[str, np.ndarray]:
+    """
+    Chronological arrays of stock_prices rows (with "id") plus the symbol's archived rows of the range and, when the
+    hot rows hold fewer than `lookback` before start_date, of the lookback, in (date, id) order. A row written to
+    stock_prices after the archive run sorts after the archived row of its date, so last_bar_per_date keeps it.
+    """
+    parts = []
+    if not (start_date and start_date >= archived_before):
+        parts.append(cold_storage.store.read(symbol, archived_before, start_date=start_date, end_date=end_date))
+    if lookback and start_date:
+        start = np.datetime64(start_date, "D")
+        if int(np.searchsorted(arrays["date"], start)) < lookback:
+            parts.append(cold_storage.store.read(symbol, archived_before, end_date=start_date - datetime.timedelta(days=1), tail=lookback))
+    parts = [part for part in parts if len(part["id"])]
+    if not parts:
+        return arrays
+    merged = {
+        name: np.concatenate([part[name].astype(values.dtype, copy=False) for part in parts] + [values])
+        for name, values in arrays.items()
+    }
+    order = np.lexsort((merged["id"], merged["date"]))
+    merged = {name: values[order] for name, values in merged.items()}
+    if lookback and start_date: # Only the last `lookback` bars before the range are kept, as from one tier
+        first = max(int(np.searchsorted(merged["date"], np.datetime64(start_date, "D"))) - lookback, 0)
+        merged = {name: values[first:] for name, values in merged.items()}
+    return merged
+
+def _without_ids(arrays: dict[str, np.ndarray], columns: tuple[str, ...]) -> dict[str, np.ndarray]:
+    return arrays if "id" in columns else {name: values for name, values in arrays.items() if name != "id"}
+
+def _float_columns(stored: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """Column store arrays with the dtypes of _rows_to_arrays (only volume is converted; prices stay views)."""
+    return {name: values if name == "date" else values.astype(np.float64, copy=False) for name, values in stored.items()}
+
+def _rows_to_arrays(rows: list, columns: tuple[str, ...]) -> dict[str, np.ndarray]:
+    values = dict(zip(rows[0]._fields, zip(*rows))) if rows else {}
+    dates = values.get("date", ())
+    if dates and isinstance(dates[0], str): # raw_dates on SQLite: NumPy parses ISO strings natively
+        arrays = {"date": np.array(dates, dtype="datetime64[D]")}
+    else:
+        # Via day ordinals: an order of magnitude faster than letting NumPy convert datetime.date objects
+        ordinals = np.fromiter((d.toordinal() for d in dates), dtype=np.int64, count=len(rows))
+        arrays = {"date": (ordinals - _EPOCH_ORDINAL).astype("datetime64[D]")}
+    for column in columns:
+        if column != "date":
+            arrays[column] = np.array(values.get(column, ()), dtype=np.float64)
+    return arrays
+
+def get_stock_price_arrays_for_symbols(
+    db: Session,
+    symbols: list[str],
+    columns: tuple[str, ...] = ("close",),
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    interval: str = rollups.DAILY_INTERVAL
+) -> dict[str, dict[str, np.ndarray]]:
+    """
+    get_stock_price_arrays for many symbols from a single query (ordered by symbol, then chronologically), also
+    with one bar per date. Every requested symbol is present in the result; symbols without bars map to empty arrays.
+    """
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+    fields = tuple(dict.fromkeys(tuple(columns) + ("id",)))
+    result = {}
+    if column_store.store and interval == rollups.DAILY_INTERVAL:
+        for symbol in symbols:
+            stored = column_store.store.read(symbol, ("date",) + fields, start_date, end_date)
+            if stored is not None:
+                result[symbol] = _float_columns(stored)
+    unstored = [symbol for symbol in symbols if symbol not in result]
+    if unstored:
+        stmt, model = _select_interval_columns(("symbol",) + fields, interval, raw_dates=True)
+        stmt = stmt.where(model.symbol.in_(unstored))
+        if start_date:
+            stmt = stmt.where(model.date >= start_date)
+        if end_date:
+            stmt = stmt.where(model.date <= end_date)
+        # On the session's connection directly: the ORM result wrapper costs about a third of a large multi-symbol read
+        rows = db.connection().execute(stmt.order_by(model.symbol, model.date, model.id)).all()
+        grouped = {symbol: list(group) for symbol, group in itertools.groupby(rows, key=attrgetter("symbol"))}
+        result.update({symbol: _rows_to_arrays(grouped.get(symbol, []), fields) for symbol in unstored})
+    if interval == rollups.DAILY_INTERVAL and cold_storage.store:
+        archive = models.StockPriceArchive
+        for symbol, archived_before in db.execute(select(archive.symbol, archive.archived_before).where(archive.symbol.in_(symbols))):
+            result[symbol] = _with_archived_arrays(symbol, result[symbol], archived_before, start_date, end_date)
+    return {symbol: last_bar_per_date(_without_ids(result[symbol], columns)) for symbol in symbols}
+
+def get_indicator_series(
+    db: Session,
+    symbol: str,
+    names: tuple[str, ...],
+    window: Optional[int] = None
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """
+    Full daily history of the named indicators (and the close) from indicator_store: stored series when the symbol's
+    indicators were read before, otherwise computed from get_stock_price_arrays and stored for the next read.
+    """
+    symbol = symbol.upper()
+    return indicator_store.get_series(db, symbol, names, window, load_daily=lambda: get_stock_price_arrays(db, symbol))
+
+def get_close_arrays(db: Session, symbols: list[str]) -> dict[str, dict[str, np.ndarray]]:
+    """
+    Full daily history of each symbol as chronological "date"/"close" arrays with one bar per date (the newest row
+    when several sources share one). Cached per symbol in price_cache, so writers invalidate them; the symbols not
+    cached yet are loaded together with one query.
+    """
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+
+    def load(missing: list[tuple]) -> dict:
+        arrays = get_stock_price_arrays_for_symbols(db, [key[0] for key in missing], ("close",))
+        return {key: arrays[key[0]] for key in missing}
+
+    cached = price_cache.get_many_or_load([(symbol, "close_arrays") for symbol in symbols], load)
+    return {symbol: cached[(symbol, "close_arrays")] for symbol in symbols}
+
+def get_close_asof(db: Session, symbols: list[str], dates: list[datetime.date]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    For each (symbols[i], dates[i]) pair, the close on that date or else the last trading day before it.
+    Returns parallel arrays: the trading day used (NaT when the symbol has no bar on or before the date)
+    and its close (NaN then). Each symbol's pairs are answered with one np.searchsorted over get_close_arrays.
+    """
+    positions = {}
+    for i, symbol in enumerate(symbols):
+        positions.setdefault(symbol.upper(), []).append(i)
+    ordinals = np.fromiter((d.toordinal() for d in dates), dtype=np.int64, count=len(dates))
+    wanted = (ordinals - _EPOCH_ORDINAL).astype("datetime64[D]")
+    price_dates = np.full(len(dates), np.datetime64("NaT"), dtype="datetime64[D]")
+    closes = np.full(len(dates), np.nan)
+    for symbol, series in get_close_arrays(db, list(positions)).items():
+        rows = np.array(positions[symbol])
+        index = np.searchsorted(series["date"], wanted[rows], side="right") - 1
+        found = index >= 0
+        price_dates[rows[found]] = series["date"][index[found]]
+        closes[rows[found]] = series["close"][index[found]]
+    return price_dates, closes
+
+def get_return_matrices(
+    db: Session,
+    symbols: list[str],
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    interval: str = rollups.DAILY_INTERVAL
+) -> dict:
+    """
+    Log-return covariance and correlation of `symbols` over the dates they all have bars for.
+    Returns a dict with "symbols" (sorted; those with data in the range), "missing" (without data), "dates" (the
+    common dates) and the "covariance"/"correlation" arrays. Results are cached in matrix_cache under the symbol set,
+    range and the symbols' data versions, so a write to any of them makes the cached entry unreachable.
+    """
+    symbols = sorted({symbol.upper() for symbol in symbols})
+    versions = get_stock_data_versions(db, symbols)
 
-    return query.order_by(models.StockPrice.date.desc()).offset(skip).limit(limit).all()
+    def load() -> dict:
+        arrays = get_stock_price_arrays_for_symbols(db, symbols, ("close",), start_date=start_date, end_date=end_date, interval=interval)
+        present = [symbol for symbol in symbols if len(arrays[symbol]["close"])]
+        dates, closes = correlation.align_closes([(arrays[symbol]["date"], arrays[symbol]["close"]) for symbol in present])
+        covariance, corr = correlation.return_matrices(closes)
+        return {
+            "symbols": present,
+            "missing": [symbol for symbol in symbols if symbol not in present],
+            "dates": dates,
+            "covariance": covariance,
+            "correlation": corr,
+        }
+
+    key = ("matrices", tuple(symbols), tuple(versions.get(symbol, 0) for symbol in symbols), start_date, end_date, interval)
+    return matrix_cache.get_or_load(key, load)
+
+def get_stock_prices_page(
+    db: Session,
+    symbol: str,
+    limit: int = 100,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    columns: Optional[tuple[str, ...]] = None,
+    interval: str = rollups.DAILY_INTERVAL
+) -> tuple[list, Optional[str]]:
+    """
+    One page of prices plus the cursor for the next page (None on the last page).
+    Returns StockPrice ORM objects, or Core rows via get_stock_price_rows when `columns` is given
+    (required for intervals other than "1d").
+    Core row pages are served from price_cache when possible; writers in this module invalidate it by symbol.
+    Reads limit + 1 rows so the last page is detected without an extra, empty request.
+    """
+    after = decode_stock_price_cursor(cursor) if cursor else None
+
+    def load() -> tuple[list, Optional[str]]:
+        if columns:
+            prices = get_stock_price_rows(
+                db, symbol, columns, skip=skip, limit=limit + 1, start_date=start_date, end_date=end_date, after=after,
+                interval=interval
+            )
+        else:
+            prices = get_stock_prices_by_symbol(
+                db, symbol, skip=skip, limit=limit + 1, start_date=start_date, end_date=end_date, after=after
+            )
+        if len(prices) <= limit:
+            return prices, None
+        last = prices[limit - 1]
+        return prices[:limit], encode_stock_price_cursor(last.date, last.id)
+
+    if not columns:
+        return load() # ORM objects belong to the session and are never shared through the cache
+    key = (symbol.upper(), interval, start_date, end_date, limit, skip, after, tuple(columns))
+    return price_cache.get_or_load(key, load)
+
+def get_downsampled_stock_price_rows(
+    db: Session,
+    symbol: str,
+    columns: tuple[str, ...],
+    max_points: int,
+    mode: str = "ohlc",
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    interval: str = rollups.DAILY_INTERVAL
+) -> list:
+    """
+    Every row (bar of `interval`) of the date range reduced to at most `max_points` rows by services.downsampling, newest first.
+    LTTB always reads `close` (the series it follows) even when it is not among `columns`.
+    Results are small, so they go through price_cache like regular pages.
+    """
+    read_columns = tuple(columns) + (("close",) if mode == "lttb" and "close" not in columns else ())
+
+    def load() -> tuple[list, None]:
+        rows = get_stock_price_rows(db, symbol, read_columns, limit=None, start_date=start_date, end_date=end_date, interval=interval)
+        return downsampling.downsample_rows(rows, max_points, mode), None
+
+    key = (symbol.upper(), "downsampled", interval, mode, max_points, start_date, end_date, read_columns)
+    return price_cache.get_or_load(key, load)[0]
+
+def get_analytics_arrays(
+    db: Session,
+    symbols: Optional[list[str]] = None,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None
+) -> dict[str, dict[str, np.ndarray]]:
+    """
+    Chronological daily arrays (date plus services.analytics.INPUT_COLUMNS) of `symbols`, or of every symbol when None,
+    including the rows moved to cold storage; one bar per date.
+    """
+    if symbols is None:
+        symbols = db.execute(select(models.Stock.symbol).order_by(models.Stock.symbol)).scalars().all()
+    series = get_stock_price_arrays_for_symbols(db, symbols, analytics.INPUT_COLUMNS, start_date=start_date, end_date=end_date)
+    if not cold_storage.store:
+        return series
+    archive = models.StockPriceArchive
+    boundaries = db.execute(select(archive.symbol, archive.archived_before).where(archive.symbol.in_(list(series)))).all()
+    for symbol, archived_before in boundaries:
+        if start_date and start_date >= archived_before:
+            continue
+        cold = cold_storage.store.read(symbol, archived_before, start_date=start_date, end_date=end_date)
+        if not len(cold["id"]):
+            continue
+        hot = series[symbol]
+        merged = {"date": np.concatenate((cold["date"], hot["date"]))}
+        merged.update({name: np.concatenate((cold[name].astype(np.float64), hot[name])) for name in analytics.INPUT_COLUMNS})
+        order = np.lexsort((merged["id"], merged["date"])) # Writes into archived years interleave with the archive
+        series[symbol] = last_bar_per_date({name: values[order] for name, values in merged.items()})
+    return series
+
+def get_symbol_summaries(
+    db: Session,
+    symbols: Optional[list[str]] = None,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None
+) -> pa.Table:
+    """services.analytics.summary_table of `symbols` (every symbol when None), computed in DuckDB when it is enabled."""
+    symbols = [symbol.upper() for symbol in symbols] if symbols is not None else None
+    if duckdb_analytics.engine:
+        return duckdb_analytics.engine.summary(symbols, start_date, end_date)
+    return analytics.summary_table(get_analytics_arrays(db, symbols, start_date, end_date))
+
+def get_market_breadth(
+    db: Session,
+    symbols: Optional[list[str]] = None,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None
+) -> pa.Table:
+    """services.analytics.breadth_table of `symbols` (every symbol when None), computed in DuckDB when it is enabled."""
+    symbols = [symbol.upper() for symbol in symbols] if symbols is not None else None
+    if duckdb_analytics.engine:
+        return duckdb_analytics.engine.breadth(symbols, start_date, end_date)
+    return analytics.breadth_table(get_analytics_arrays(db, symbols, start_date, end_date))
+
+def get_rolling_metrics(
+    db: Session,
+    symbols: list[str],
+    window: int = analytics.DEFAULT_WINDOW,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None
+) -> pa.Table:
+    """services.analytics.rolling_table of `symbols`, computed in DuckDB when it is enabled."""
+    symbols = [symbol.upper() for symbol in symbols]
+    if duckdb_analytics.engine:
+        return duckdb_analytics.engine.rolling(symbols, window, start_date, end_date)
+    return analytics.rolling_table(get_analytics_arrays(db, symbols, start_date, end_date), window)
+
+def get_latest_quotes(db: Session, symbols: list[str]) -> list:
+    """latest_quote rows (Core rows, without updated_at) of the symbols that have data, in `symbols` order."""
+    table = latest_quotes.QUOTE_TABLE
+    symbols = [symbol.upper() for symbol in symbols]
+    rows = db.execute(
+        select(*(column for column in table.columns if column.name != "updated_at")).where(table.c.symbol.in_(symbols))
+    ).all()
+    by_symbol = {row.symbol: row for row in rows}
+    return [by_symbol[symbol] for symbol in dict.fromkeys(symbols) if symbol in by_symbol]
+
+def screen_symbol_stats(
+    db: Session,
+    conditions: list[str],
+    sort: str = "symbol",
+    limit: int = 100,
+    symbols: Optional[list[str]] = None
+) -> list:
+    """
+    symbol_stats rows matching every condition (see symbol_stats.parse_condition), ordered by `sort` ("-field" for
+    descending). Each condition is a comparison on an indexed column, so no price history is read.
+    Raises ValueError for invalid conditions or sort fields.
+    """
+    table = symbol_stats.STATS_TABLE
+    stmt = select(*(column for column in table.columns if column.name != "updated_at"))
+    stmt = stmt.where(*(symbol_stats.parse_condition(condition) for condition in conditions))
+    if symbols:
+        stmt = stmt.where(table.c.symbol.in_([symbol.upper() for symbol in symbols]))
+    stmt = stmt.order_by(symbol_stats.parse_sort(sort), table.c.symbol).limit(limit)
+    return db.execute(stmt).all()
 
 def delete_stock_prices_by_symbol_and_source(db: Session, symbol: str, data_source: str) -> int:
     """
@@ -80,9 +990,39 @@ def delete_stock_prices_by_symbol_and_source(db: Session, symbol: str, data_sour
         models.StockPrice.symbol == symbol.upper(),
         models.StockPrice.data_source == data_source
     ).delete(synchronize_session=False) # False is usually fine for bulk deletes
+    if cold_storage.store:
+        num_deleted += cold_storage.store.delete_source(db, symbol.upper(), data_source)
+    if num_deleted:
+        rollups.delete_rollups(db, symbol.upper(), data_source)
+        indicator_store.drop_series(db, [symbol])
+        latest_quotes.refresh_symbols(db, [symbol])
+        symbol_stats.refresh_symbols(db, [symbol])
+        _bump_stock_data_versions(db, [symbol.upper()])
     db.commit()
+    if num_deleted:
+        price_cache.invalidate_symbols([symbol])
+        if column_store.store:
+            column_store.store.refresh_symbols(db, [symbol])
     return num_deleted
 
+def archive_stock_prices(db: Session, horizon_days: int) -> dict[str, int]:
+    """
+    Moves whole years of bars older than `horizon_days` from stock_prices into cold storage, committing per symbol.
+    Daily row and array reads, indicators and rollups still see the archived bars (see backend.cold_storage); the
+    data versions are bumped and cached reads dropped, since the moved rows are read from a different tier.
+    Returns rows moved per symbol. Raises ValueError when cold storage is disabled.
+    """
+    if not cold_storage.store:
+        raise ValueError("Cold storage is disabled (COLD_STORAGE_DIR is not set).")
+    moved = cold_storage.store.archive(db, horizon_days)
+    if moved:
+        _bump_stock_data_versions(db, moved)
+        db.commit()
+        price_cache.invalidate_symbols(moved)
+        if column_store.store:
+            column_store.store.refresh_symbols(db, moved)
+    return moved
+
 def update_user(db: Session, db_user: models.User, user_in: schemas.UserUpdate) -> models.User:
     update_data = user_in.model_dump(exclude_unset=True) # Pydantic V2
 
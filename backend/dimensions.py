@@ -0,0 +1,74 @@
+from typing import Iterable, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from backend import models
+
+# Get-or-create lookups for the stocks and data_sources dimension rows that stock_prices references by id.
+# Writers keep passing symbol/data_source strings: bulk_ingest converts its row dicts with stock_price_columns, and
+# ORM inserts (StockPrice(symbol=..., data_source=...)) are resolved by the before_flush listener below.
+# Ids are looked up per write rather than cached, since a dimension row disappears with a rolled-back transaction.
+
+STOCKS = models.Stock.__table__
+SOURCES = models.DataSource.__table__
+
+def _insert(db):
+    """Dialect insert() (for ON CONFLICT) for a Session or a Connection."""
+    dialect = db.dialect if hasattr(db, "dialect") else db.get_bind().dialect
+    if dialect.name == "postgresql":
+        return postgresql.insert
+    if dialect.name == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"Dimension lookups are not supported for the '{dialect.name}' database dialect.")
+
+def _ids(db, table, key: str, values: Iterable[Optional[str]], create: bool) -> dict[str, int]:
+    values = sorted({value for value in values if value is not None})
+    if not values:
+        return {}
+    ids = dict(db.execute(select(table.c[key], table.c.id).where(table.c[key].in_(values))).all())
+    missing = [value for value in values if value not in ids]
+    if create and missing:
+        # DO NOTHING: a concurrent writer may have created the same row
+        db.execute(_insert(db)(table).on_conflict_do_nothing(index_elements=[key]), [{key: value} for value in missing])
+        ids.update(db.execute(select(table.c[key], table.c.id).where(table.c[key].in_(missing))).all())
+    return ids
+
+def stock_ids(db, symbols: Iterable[str], create: bool = False) -> dict[str, int]:
+    """stocks.id of each symbol; with create, missing symbols are inserted (in the caller's transaction)."""
+    return _ids(db, STOCKS, "symbol", symbols, create)
+
+def source_ids(db, names: Iterable[Optional[str]], create: bool = False) -> dict[str, int]:
+    """data_sources.id of each source name (None has no id); with create, missing names are inserted."""
+    return _ids(db, SOURCES, "name", names, create)
+
+def stock_price_columns(db, rows: list[dict]) -> list[dict]:
+    """
+    stock_prices column dicts (stock_id, source_id) for row dicts holding symbol and data_source strings,
+    creating the dimension rows they need.
+    """
+    stocks = stock_ids(db, (row["symbol"] for row in rows), create=True)
+    sources = source_ids(db, (row["data_source"] for row in rows), create=True)
+    return [
+        {
+            **{name: value for name, value in row.items() if name not in ("symbol", "data_source")},
+            "stock_id": stocks[row["symbol"]],
+            "source_id": sources.get(row["data_source"]),
+        }
+        for row in rows
+    ]
+
+@event.listens_for(Session, "before_flush")
+def _resolve_stock_price_ids(session: Session, flush_context, instances) -> None:
+    """Sets stock_id/source_id of the StockPrice objects about to be inserted, with one lookup per dimension."""
+    pending = [obj for obj in session.new if isinstance(obj, models.StockPrice) and obj.stock_id is None]
+    if not pending:
+        return
+    connection = session.connection()
+    stocks = stock_ids(connection, (price.symbol for price in pending), create=True)
+    sources = source_ids(connection, (price.data_source for price in pending), create=True)
+    for price in pending:
+        price.stock_id = stocks[price.symbol]
+        if price.source_id is None:
+            price.source_id = sources.get(price.data_source)
@@ -0,0 +1,169 @@
+import datetime
+import glob
+import os
+import threading
+from typing import Optional
+
+import pyarrow as pa
+from sqlalchemy.engine import make_url
+
+from backend import cold_storage
+from backend.config import settings
+from backend.services import analytics
+
+# Optional embedded DuckDB engine for the cross-symbol aggregates of backend.services.analytics
+# (settings.ANALYTICS_ENGINE = "duckdb"; needs requirements-duckdb.txt). The application database is attached read-only
+# through DuckDB's sqlite (or postgres) scanner and the cold storage Parquet files are read in place, so an aggregate
+# over millions of bars runs as one vectorized, multi-threaded query instead of materializing rows in Python.
+# Results have the schemas of the NumPy path and equal values (up to floating-point summation order).
+# Every query sees the committed database state at the time it runs; nothing is copied or cached.
+# The scanner extension must be installed ahead of time (INSTALL sqlite / INSTALL postgres, e.g. in the image build):
+# the engine only LOADs it, so requests never download anything, and a missing extension fails at startup.
+
+# Dialect -> (DuckDB extension, ATTACH type)
+ATTACH_TYPES = {"sqlite": ("sqlite", "SQLITE"), "postgresql": ("postgres", "POSTGRES")}
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+class DuckDBAnalytics:
+    def __init__(self, database_url: str, threads: int = 0):
+        try:
+            import duckdb # Optional dependency: only imported when the engine is enabled
+        except ImportError as e:
+            raise RuntimeError("ANALYTICS_ENGINE=duckdb needs the duckdb package (pip install -r requirements-duckdb.txt).") from e
+
+        url = make_url(database_url)
+        dialect = url.get_backend_name()
+        if dialect not in ATTACH_TYPES:
+            raise ValueError(f"DuckDB analytics cannot attach a '{dialect}' database.")
+        self._duckdb = duckdb
+        self._extension, self._attach_type = ATTACH_TYPES[dialect]
+        if dialect == "sqlite":
+            self._target = os.path.abspath(url.database)
+        else: # libpq accepts the URL without the SQLAlchemy driver suffix
+            self._target = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        self._threads = threads
+        self._connection = None
+        self._lock = threading.Lock()
+        self._load_extension(duckdb.connect())
+
+    def _load_extension(self, connection) -> None:
+        """Loads the scanner extension into `connection`. Raises RuntimeError when it is not installed."""
+        try:
+            connection.execute(f"LOAD {self._extension}")
+        except self._duckdb.Error as e:
+            raise RuntimeError(
+                f"DuckDB analytics needs the '{self._extension}' extension, which is not installed. Install it once where the"
+                f" app runs, e.g. python -c \"import duckdb; duckdb.execute('INSTALL {self._extension}')\","
+                " or set ANALYTICS_ENGINE=sqlalchemy."
+            ) from e
+
+    def _connect(self):
+        """The DuckDB connection with the database attached, opened on first use (the database may not exist at import)."""
+        with self._lock:
+            if self._connection is None:
+                connection = self._duckdb.connect()
+                if self._threads:
+                    connection.execute(f"SET threads = {int(self._threads)}")
+                self._load_extension(connection)
+                connection.execute(f"ATTACH {_literal(self._target)} AS app (TYPE {self._attach_type}, READ_ONLY)")
+                self._connection = connection
+            return self._connection
+
+    def _query(self, sql: str, params: list, schema: pa.Schema) -> pa.Table:
+        # A cursor per call: connections are not safe to share between request threads
+        with self._connect().cursor() as cursor:
+            return cursor.execute(sql, params).to_arrow_table().cast(schema)
+
+    def _bars(self, symbols: Optional[list[str]], start_date: Optional[datetime.date], end_date: Optional[datetime.date]) -> tuple[str, list]:
+        """
+        SQL (and parameters) of the daily bars CTE: one row per (symbol, date), the newest one, from stock_prices
+        plus the archived rows before each symbol's cold storage boundary.
+        """
+        conditions, params = [], []
+        if symbols is not None:
+            conditions.append(f"{{symbol}} IN ({', '.join('?' for _ in symbols)})")
+            params += symbols
+        if start_date:
+            conditions.append("{date} >= ?")
+            params.append(start_date)
+        if end_date:
+            conditions.append("{date} <= ?")
+            params.append(end_date)
+
+        def where(symbol: str, date: str) -> str:
+            # Applied in every source rather than over the union, so Parquet row groups outside the range are skipped
+            return "".join(f" AND {condition.format(symbol=symbol, date=date)}" for condition in conditions)
+
+        sources = [
+            "SELECT s.symbol, p.id, p.date, p.high, p.low, p.close, p.volume"
+            " FROM app.stock_prices p JOIN app.stocks s ON s.id = p.stock_id WHERE TRUE" + where("s.symbol", "p.date")
+        ]
+        source_params = list(params)
+        if cold_storage.store and next(glob.iglob(os.path.join(glob.escape(cold_storage.store.root), "*", "*.parquet")), None):
+            # <dir>/<SYMBOL>/<year>.parquet: the symbol is the directory name
+            pattern = os.path.join(os.path.abspath(cold_storage.store.root), "*", "*.parquet")
+            sources.append(
+                "SELECT a.symbol, c.id, c.date, c.high, c.low, c.close, c.volume"
+                f" FROM read_parquet({_literal(pattern)}, filename = true) c"
+                " JOIN app.stock_price_archive a ON a.symbol = regexp_extract(c.filename, '([^/\\\\]+)[/\\\\][^/\\\\]+$', 1)"
+                " AND c.date < a.archived_before" + where("a.symbol", "c.date")
+            )
+            source_params += params
+        sql = (
+            "WITH daily AS ("
+            " SELECT symbol, date, arg_max(high, id) AS high, arg_max(low, id) AS low, arg_max(close, id) AS close,"
+            " arg_max(volume, id) AS volume"
+            f" FROM ({' UNION ALL '.join(sources)}) GROUP BY symbol, date"
+            "), bars AS ("
+            " SELECT *, ln(close / lag(close) OVER (PARTITION BY symbol ORDER BY date)) AS ret FROM daily"
+            ") "
+        )
+        return sql, source_params
+
+    def summary(self, symbols: Optional[list[str]] = None, start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None) -> pa.Table:
+        bars, params = self._bars(symbols, start_date, end_date)
+        return self._query(bars + f"""
+            SELECT symbol, count(*) AS bars, min(date) AS start_date, max(date) AS end_date,
+                arg_min(close, date) AS first_close, arg_max(close, date) AS last_close,
+                arg_max(close, date) / arg_min(close, date) - 1 AS total_return,
+                stddev_samp(ret) * sqrt({analytics.PERIODS_PER_YEAR}) AS volatility, min(drawdown) AS max_drawdown,
+                avg(volume) AS avg_volume, max(high) AS high, min(low) AS low
+            FROM (
+                SELECT *, close / max(close) OVER (PARTITION BY symbol ORDER BY date ROWS UNBOUNDED PRECEDING) - 1 AS drawdown
+                FROM bars
+            )
+            GROUP BY symbol ORDER BY symbol
+        """, params, analytics.SUMMARY_SCHEMA)
+
+    def breadth(self, symbols: Optional[list[str]] = None, start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None) -> pa.Table:
+        bars, params = self._bars(symbols, start_date, end_date)
+        return self._query(bars + """
+            SELECT date, count(*) AS symbols, count(*) FILTER (WHERE ret > 0) AS advancers,
+                count(*) FILTER (WHERE ret < 0) AS decliners, avg(ret) AS mean_return, sum(volume) AS volume
+            FROM bars GROUP BY date ORDER BY date
+        """, params, analytics.BREADTH_SCHEMA)
+
+    def rolling(
+        self,
+        symbols: list[str],
+        window: int = analytics.DEFAULT_WINDOW,
+        start_date: Optional[datetime.date] = None,
+        end_date: Optional[datetime.date] = None
+    ) -> pa.Table:
+        bars, params = self._bars(symbols, start_date, end_date)
+        window = int(window)
+        return self._query(bars + f"""
+            SELECT symbol, date, close, ret AS log_return, close / lag(close, {window}) OVER bar_order - 1 AS momentum,
+                CASE WHEN count(ret) OVER last_returns = {window}
+                    THEN stddev_samp(ret) OVER last_returns * sqrt({analytics.PERIODS_PER_YEAR}) END AS volatility
+            FROM bars
+            WINDOW bar_order AS (PARTITION BY symbol ORDER BY date),
+                last_returns AS (PARTITION BY symbol ORDER BY date ROWS BETWEEN {window - 1} PRECEDING AND CURRENT ROW)
+            ORDER BY symbol, date
+        """, params, analytics.ROLLING_SCHEMA)
+
+engine: Optional[DuckDBAnalytics] = (
+    DuckDBAnalytics(settings.DATABASE_URL, settings.DUCKDB_THREADS) if settings.ANALYTICS_ENGINE == "duckdb" else None
+)
@@ -0,0 +1,191 @@
+import datetime
+import json
+from collections import defaultdict
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend import models
+from backend.services import indicators
+
+# Persisted indicator series for the daily history of frequently read symbols (table indicator_series).
+# - Reads (crud.get_indicator_series) compute and store a series the first time it is requested; later reads
+#   decode the stored arrays instead of reloading prices and recomputing.
+# - Appends (new bars dated after every stored bar) advance each stored series one bar at a time from its state,
+#   so a daily fetch costs O(1) per bar and indicator rather than a pass over the whole history. Only the small
+#   state row (indicator_series) is updated; the new outputs are inserted as one chunk (indicator_series_chunks)
+#   and the stored bars are never rewritten. Past MAX_CHUNKS chunks a series's chunks are folded into one, so reads
+#   stay a few rows and folding costs an amortized O(history / MAX_CHUNKS) per append.
+# - Anything else (rewritten or deleted bars, several bars on one new date, failed writes) drops the symbol's
+#   series; they are rebuilt from scratch by the next read.
+
+CLOSE = "close" # Stored like an indicator so reads never need the price rows
+MAX_CHUNKS = 64
+CHUNKS = models.IndicatorSeriesChunk.__table__
+
+def _outputs(name: str) -> tuple[str, ...]:
+    return (CLOSE,) if name == CLOSE else indicators.INDICATOR_OUTPUTS[name]
+
+def _series_keys(names: Iterable[str], window: Optional[int]) -> list[tuple[str, int]]:
+    return [(CLOSE, 0)] + [(name, indicators.effective_window(name, window)) for name in names]
+
+def _day_numbers(dates: np.ndarray) -> bytes:
+    return dates.astype("datetime64[D]").astype(np.int32).tobytes()
+
+def _bar_values(outputs: dict[str, np.ndarray], name: str) -> bytes:
+    # Bar-major (bar_count x outputs) so appending bars is a byte concatenation
+    return np.column_stack([np.asarray(outputs[key], dtype=np.float64) for key in _outputs(name)]).tobytes()
+
+def _load_chunks(db: Session, series_ids) -> dict[int, tuple[bytes, bytes]]:
+    """(dates, values) bytes of each series, its chunks concatenated in bar order."""
+    chunks = defaultdict(lambda: ([], []))
+    for series_id, dates, values in db.execute(
+        select(CHUNKS.c.series_id, CHUNKS.c.dates, CHUNKS.c["values"]) # .c.values is the collection's method
+        .where(CHUNKS.c.series_id.in_(series_ids)).order_by(CHUNKS.c.series_id, CHUNKS.c.first_bar)
+    ):
+        chunks[series_id][0].append(dates)
+        chunks[series_id][1].append(values)
+    return {series_id: (b"".join(dates), b"".join(values)) for series_id, (dates, values) in chunks.items()}
+
+def _delete_chunks(db: Session, series_ids) -> None:
+    db.execute(delete(CHUNKS).where(CHUNKS.c.series_id.in_(series_ids)))
+
+def _fold_chunks(db: Session, series_ids: list[int]) -> None:
+    """Replaces the chunks of each series by a single one holding all of its bars."""
+    folded = _load_chunks(db, series_ids)
+    _delete_chunks(db, series_ids)
+    db.execute(CHUNKS.insert(), [
+        {"series_id": series_id, "first_bar": 0, "dates": dates, "values": values}
+        for series_id, (dates, values) in folded.items()
+    ])
+
+def _decode(name: str, values: bytes) -> dict[str, np.ndarray]:
+    keys = _outputs(name)
+    bar_values = np.frombuffer(values, dtype=np.float64).reshape(-1, len(keys))
+    return {key: bar_values[:, i] for i, key in enumerate(keys)}
+
+def _build_entry(symbol: str, name: str, window: int, arrays: dict[str, np.ndarray], now: datetime.datetime) -> tuple[models.IndicatorSeries, tuple[bytes, bytes]]:
+    """A new series row and the (dates, values) bytes of its first chunk."""
+    close = arrays["close"]
+    if name == CLOSE:
+        outputs, state = {CLOSE: close}, {}
+    else:
+        outputs = indicators.compute(close, (name,), window or None)
+        state = indicators.final_state(name, close, window or None)
+    entry = models.IndicatorSeries(
+        symbol=symbol, name=name, window=window,
+        last_date=arrays["date"][-1].item(), bar_count=len(close), state=json.dumps(state), updated_at=now,
+    )
+    return entry, (_day_numbers(arrays["date"]), _bar_values(outputs, name))
+
+def get_series(
+    db: Session,
+    symbol: str,
+    names: tuple[str, ...],
+    window: Optional[int],
+    load_daily: Callable[[], dict[str, np.ndarray]]
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """
+    Chronological dates and every output series (plus "close") of the named indicators over the full daily history.
+    Stored series are used when present; missing ones are computed from load_daily() (crud.get_stock_price_arrays)
+    and stored, committing the session.
+    """
+    keys = _series_keys(names, window)
+    stored = {
+        (entry.name, entry.window): entry
+        for entry in db.query(models.IndicatorSeries).filter(
+            models.IndicatorSeries.symbol == symbol,
+            models.IndicatorSeries.name.in_({name for name, _w in keys}),
+        )
+    }
+    entries = [stored.get(key) for key in keys]
+    chunks = _load_chunks(db, [entry.id for entry in entries if entry is not None])
+    blobs = [chunks.get(entry.id) if entry is not None else None for entry in entries]
+    if any(blob is None for blob in blobs):
+        arrays = load_daily()
+        if not len(arrays["close"]):
+            return arrays["date"], {key: arrays["close"] for name, _w in keys for key in _outputs(name)}
+        now = datetime.datetime.now(datetime.timezone.utc)
+        new_entries = []
+        for i, (name, window_key) in enumerate(keys):
+            if blobs[i] is None or entries[i].bar_count != len(arrays["close"]): # Also replaces out-of-step series
+                if entries[i] is not None:
+                    _delete_chunks(db, [entries[i].id])
+                    db.delete(entries[i])
+                    db.flush()
+                entries[i], blobs[i] = _build_entry(symbol, name, window_key, arrays, now)
+                new_entries.append(i)
+        try:
+            db.add_all(entries[i] for i in new_entries)
+            db.flush()
+            db.execute(CHUNKS.insert(), [
+                {"series_id": entries[i].id, "first_bar": 0, "dates": blobs[i][0], "values": blobs[i][1]} for i in new_entries
+            ])
+            db.commit()
+        except IntegrityError:
+            db.rollback() # A concurrent read stored the same series first; the computed one is still valid
+
+    series = {}
+    for (name, _w), (_dates, values) in zip(keys, blobs):
+        series.update(_decode(name, values))
+    return np.frombuffer(blobs[0][0], dtype=np.int32).astype("datetime64[D]"), series
+
+def drop_series(db: Session, symbols: Iterable[str]) -> None:
+    """Deletes the stored series of `symbols`; the next read rebuilds them. Does not commit."""
+    symbols = {symbol.upper() for symbol in symbols}
+    if symbols:
+        _delete_chunks(db, select(models.IndicatorSeries.id).where(models.IndicatorSeries.symbol.in_(symbols)))
+        db.execute(delete(models.IndicatorSeries.__table__).where(models.IndicatorSeries.symbol.in_(symbols)))
+
+def on_bars_written(db: Session, written_rows: Iterable[dict]) -> None:
+    """
+    Brings stored series up to date after daily bars (dicts with symbol, date, close) were written. Pure appends
+    advance every series of the symbol by the new bars; any other change drops them. Does not commit.
+    """
+    bars_by_symbol = defaultdict(list)
+    for row in written_rows:
+        bars_by_symbol[row["symbol"].upper()].append((row["date"], row["close"]))
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for symbol, bars in bars_by_symbol.items():
+        entries = db.query(models.IndicatorSeries).filter(models.IndicatorSeries.symbol == symbol).all()
+        if not entries:
+            continue
+        bars.sort()
+        dates = [date for date, _close in bars]
+        last_date = max(entry.last_date for entry in entries)
+        appends = (
+            dates[0] > last_date
+            and len(set(dates)) == len(dates)
+            and len({(entry.last_date, entry.bar_count) for entry in entries}) == 1
+        )
+        if not appends:
+            drop_series(db, [symbol])
+            continue
+        new_dates = _day_numbers(np.array(dates, dtype="datetime64[D]"))
+        series_ids = [entry.id for entry in entries]
+        chunk_counts = dict(db.execute(
+            select(CHUNKS.c.series_id, func.count()).where(CHUNKS.c.series_id.in_(series_ids)).group_by(CHUNKS.c.series_id)
+        ).all())
+        new_chunks = []
+        for entry in entries:
+            if entry.name == CLOSE:
+                outputs = {CLOSE: [close for _date, close in bars]}
+            else:
+                state = json.loads(entry.state)
+                steps = [indicators.advance(entry.name, state, close, entry.window or None) for _date, close in bars]
+                outputs = {key: [step[key] for step in steps] for key in _outputs(entry.name)}
+                entry.state = json.dumps(state)
+            new_chunks.append({
+                "series_id": entry.id, "first_bar": entry.bar_count, "dates": new_dates, "values": _bar_values(outputs, entry.name),
+            })
+            entry.bar_count += len(bars)
+            entry.last_date = dates[-1]
+            entry.updated_at = now
+        db.execute(CHUNKS.insert(), new_chunks)
+        full = [series_id for series_id in series_ids if chunk_counts.get(series_id, 0) + 1 > MAX_CHUNKS]
+        if full:
+            _fold_chunks(db, full)
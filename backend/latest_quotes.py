@@ -0,0 +1,80 @@
+import datetime
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from backend import bulk_ingest, models
+
+# Newest bar per symbol (table latest_quote), maintained by the stock_prices writers in crud within their
+# transaction. A refresh costs two seeks on ix_stock_prices_stock_date_id per symbol, after resolving the symbol on
+# the stocks unique index (the newest row, then the newest row of an earlier date); writes that only touch bars
+# older than the stored previous day skip it.
+
+QUOTE_TABLE = models.LatestQuote.__table__
+DAILY_TABLE = models.STOCK_PRICE_ROWS
+BAR_COLUMNS = ("date", "open", "high", "low", "close", "volume", "data_source")
+
+def _newest_row(db: Session, symbol: str, before: Optional[datetime.date] = None):
+    stmt = select(*(DAILY_TABLE.c[name] for name in BAR_COLUMNS)).where(DAILY_TABLE.c.symbol == symbol)
+    if before is not None:
+        stmt = stmt.where(DAILY_TABLE.c.date < before)
+    return db.execute(stmt.order_by(DAILY_TABLE.c.date.desc(), DAILY_TABLE.c.id.desc()).limit(1)).first()
+
+def refresh_symbols(db: Session, symbols: Iterable[str]) -> int:
+    """
+    Recomputes the latest_quote rows of `symbols` from the bars in the session's transaction, deleting the rows of
+    symbols without bars. Does not commit. Returns the number of rows written.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    rows, gone = [], []
+    for symbol in sorted({symbol.upper() for symbol in symbols}):
+        latest = _newest_row(db, symbol)
+        if latest is None:
+            gone.append(symbol)
+            continue
+        previous = _newest_row(db, symbol, before=latest.date)
+        prev_close = previous.close if previous else None
+        rows.append({
+            "symbol": symbol,
+            **latest._asdict(),
+            "prev_date": previous.date if previous else None,
+            "prev_close": prev_close,
+            "change": latest.close - prev_close if prev_close is not None else None,
+            "change_pct": latest.close / prev_close - 1.0 if prev_close else None,
+            "updated_at": now,
+        })
+    if gone:
+        db.execute(delete(QUOTE_TABLE).where(QUOTE_TABLE.c.symbol.in_(gone)))
+    if rows:
+        stmt = bulk_ingest.dialect_insert(db)(QUOTE_TABLE)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["symbol"],
+            set_={column.name: stmt.excluded[column.name] for column in QUOTE_TABLE.columns if column.name != "symbol"},
+        )
+        db.execute(stmt, rows)
+    return len(rows)
+
+def on_bars_written(db: Session, written_rows: Iterable[dict]) -> int:
+    """
+    Refreshes the quotes of symbols with a written bar (dicts with symbol and date) on or after their stored
+    previous day, or without a quote (or previous day) yet. Does not commit. Returns the number of rows written.
+    """
+    newest_written = defaultdict(lambda: datetime.date.min)
+    for row in written_rows:
+        symbol = row["symbol"].upper()
+        newest_written[symbol] = max(newest_written[symbol], row["date"])
+    if not newest_written:
+        return 0
+    prev_dates = dict(db.execute(
+        select(QUOTE_TABLE.c.symbol, QUOTE_TABLE.c.prev_date).where(QUOTE_TABLE.c.symbol.in_(newest_written))
+    ).all())
+    return refresh_symbols(db, [
+        symbol for symbol, newest in newest_written.items()
+        if prev_dates.get(symbol) is None or newest >= prev_dates[symbol]
+    ])
+
+def rebuild_all_quotes(db: Session) -> int:
+    """Recomputes the quote of every symbol in stock_prices (used to backfill existing databases). Does not commit."""
+    return refresh_symbols(db, db.execute(select(DAILY_TABLE.c.symbol).distinct()).scalars())
@@ -3,6 +3,7 @@ from contextlib import asynccontextmanager
 import os
 
 from backend.database import engine, Base # type: ignore
+from backend.migrations import upgrade_schema
 # Updated to include stocks_router
 from backend.routers import auth_router, users_router, websockets_router, stocks_router
 # Import other routers as they are created, e.g.:
@@ -25,6 +26,7 @@ async def lifespan(app: FastAPI):
             os.makedirs(db_dir, exist_ok=True)
             print(f"Created directory for SQLite DB: {db_dir}")
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine) # Adds indexes introduced after the tables were first created
     print("Database tables checked/created.")
     yield
     # Shutdown: Any cleanup can go here
@@ -0,0 +1,232 @@
+import sys
+
+from sqlalchemy import exists, inspect, select, text
+from sqlalchemy.engine import Engine
+
+from sqlalchemy.orm import Session
+
+from backend import column_store, latest_quotes, models, rollups, symbol_stats
+
+# Lightweight in-place schema upgrades for databases created before a change to models.py.
+# Base.metadata.create_all() only creates missing tables; it never adds indexes to a table that already exists.
+# upgrade_schema runs at every startup and never deletes or rewrites stock_prices rows; those steps are explicit
+# commands (python -m backend.migrations <command>, see COMMANDS at the end).
+
+def _existing_index_names(engine: Engine, table_name: str) -> set[str]:
+    return {ix["name"] for ix in inspect(engine).get_indexes(table_name)}
+
+# (symbol, date, data_source, row count) of each key of stock_prices held by more than one row, keyed by the key
+# columns of the current and of the pre-dimension layout. Rows without a source never conflict (unique indexes
+# treat NULLs as distinct), so they are neither reported nor deleted.
+_DUPLICATE_KEYS = {
+    "stock_id, date, source_id": (
+        "SELECT s.symbol, k.date, d.name, k.n FROM ("
+        " SELECT stock_id, date, source_id, COUNT(*) AS n FROM stock_prices WHERE source_id IS NOT NULL"
+        " GROUP BY stock_id, date, source_id HAVING COUNT(*) > 1"
+        ") k JOIN stocks s ON s.id = k.stock_id JOIN data_sources d ON d.id = k.source_id ORDER BY s.symbol, k.date, d.name"
+    ),
+    "symbol, date, data_source": (
+        "SELECT symbol, date, data_source, COUNT(*) FROM stock_prices WHERE data_source IS NOT NULL"
+        " GROUP BY symbol, date, data_source HAVING COUNT(*) > 1 ORDER BY symbol, date, data_source"
+    ),
+}
+_LISTED_KEYS = 20
+
+def _price_key_columns(engine: Engine) -> str:
+    if "symbol" in {column["name"] for column in inspect(engine).get_columns("stock_prices")}:
+        return "symbol, date, data_source"
+    return "stock_id, date, source_id"
+
+def _duplicate_price_keys(engine: Engine, key_columns: str) -> list:
+    with engine.connect() as conn:
+        return conn.execute(text(_DUPLICATE_KEYS[key_columns])).all()
+
+def _check_no_duplicate_prices(engine: Engine, blocked: str) -> None:
+    """Raises with the conflicting keys listed when stock_prices holds duplicates, which `blocked` (the reason) cannot take."""
+    duplicates = _duplicate_price_keys(engine, _price_key_columns(engine))
+    if not duplicates:
+        return
+    listed = "\n".join(f"  {symbol} {date} {source}: {rows} rows" for symbol, date, source, rows in duplicates[:_LISTED_KEYS])
+    if len(duplicates) > _LISTED_KEYS:
+        listed += f"\n  ... and {len(duplicates) - _LISTED_KEYS} more"
+    raise RuntimeError(
+        f"stock_prices holds more than one row for {len(duplicates)} (symbol, date, data_source) keys, so {blocked}:\n"
+        f"{listed}\nReview them, then run `python -m backend.migrations dedupe-stock-prices` to keep the most recently"
+        " inserted row of each key."
+    )
+
+def dedupe_stock_prices(engine: Engine) -> int:
+    """
+    Deletes the duplicate rows of stock_prices on (stock_id, date, source_id), or (symbol, date, data_source) before
+    the dimension tables, keeping the most recently inserted one, and prints each key it touches. Rows without a
+    source are kept. An explicit command: upgrade_schema never deletes rows.
+    """
+    key_columns = _price_key_columns(engine)
+    source_column = key_columns.rsplit(", ", 1)[-1]
+    for symbol, date, source, rows in _duplicate_price_keys(engine, key_columns):
+        print(f"Keeping the newest of {rows} stock_prices rows for {symbol} {date} {source}.")
+    with engine.begin() as conn:
+        removed = conn.execute(text(
+            f"DELETE FROM stock_prices WHERE {source_column} IS NOT NULL AND id NOT IN ("
+            f" SELECT MAX(id) FROM stock_prices WHERE {source_column} IS NOT NULL GROUP BY {key_columns}"
+            ")"
+        )).rowcount or 0
+    print(f"Removed {removed} duplicate stock_prices rows.")
+    return removed
+
+_PRICE_VALUE_COLUMNS = "date, open, high, low, close, volume"
+_MIGRATION_BATCH_ROWS = 100_000
+
+def _dimension_migration_pending(engine: Engine) -> bool:
+    inspector = inspect(engine)
+    return inspector.has_table("stock_prices_legacy") or "symbol" in {column["name"] for column in inspector.get_columns("stock_prices")}
+
+def _copy_legacy_prices(conn, batch_rows: int) -> int:
+    """Copies the next `batch_rows` rows of stock_prices_legacy (by id, after the highest id already moved)."""
+    return conn.execute(text(
+        f"INSERT INTO stock_prices (id, stock_id, source_id, created_at, {_PRICE_VALUE_COLUMNS})"
+        f" SELECT p.id, s.id, d.id, p.created_at, {', '.join('p.' + c for c in _PRICE_VALUE_COLUMNS.split(', '))}"
+        " FROM stock_prices_legacy p JOIN stocks s ON s.symbol = p.symbol"
+        " LEFT JOIN data_sources d ON d.name = p.data_source"
+        " WHERE p.id > (SELECT COALESCE(MAX(id), 0) FROM stock_prices) ORDER BY p.id LIMIT :batch_rows"
+    ), {"batch_rows": batch_rows}).rowcount
+
+def migrate_to_dimension_ids(engine: Engine, batch_rows: int = _MIGRATION_BATCH_ROWS) -> int:
+    """
+    Converts a stock_prices table that still repeats symbol/data_source strings on every row (created before the
+    stocks and data_sources tables) to the stock_id/source_id layout, keeping row ids; returns the rows moved.
+    The table is renamed to stock_prices_legacy and recreated from models.py, then refilled in id order, one
+    transaction per `batch_rows` rows, and the legacy table is dropped at the end. An interrupted run resumes after
+    the highest id already moved when started again. Duplicate keys must be removed first (dedupe-stock-prices).
+    """
+    if not _dimension_migration_pending(engine):
+        print("stock_prices already uses stock_id/source_id keys.")
+        return 0
+    for table in (models.Stock.__table__, models.DataSource.__table__):
+        table.create(bind=engine, checkfirst=True)
+    inspector = inspect(engine)
+    if not inspector.has_table("stock_prices_legacy"):
+        _check_no_duplicate_prices(engine, "they cannot be moved to stock_id/source_id keys")
+        legacy_indexes = [ix["name"] for ix in inspector.get_indexes("stock_prices")]
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO stocks (symbol) SELECT DISTINCT symbol FROM stock_prices WHERE symbol NOT IN (SELECT symbol FROM stocks)"))
+            conn.execute(text(
+                "INSERT INTO data_sources (name) SELECT DISTINCT data_source FROM stock_prices"
+                " WHERE data_source IS NOT NULL AND data_source NOT IN (SELECT name FROM data_sources)"
+            ))
+            conn.execute(text("ALTER TABLE stock_prices RENAME TO stock_prices_legacy"))
+            for name in legacy_indexes: # Index names are per schema, and the new table reuses some of them
+                conn.execute(text(f"DROP INDEX {name}"))
+            if engine.dialect.name == "postgresql":
+                conn.execute(text("ALTER TABLE stock_prices_legacy RENAME CONSTRAINT stock_prices_pkey TO stock_prices_legacy_pkey"))
+            models.StockPrice.__table__.create(bind=conn)
+    with engine.connect() as conn:
+        total = conn.execute(text("SELECT COUNT(*) FROM stock_prices_legacy")).scalar()
+        moved = conn.execute(text("SELECT COUNT(*) FROM stock_prices")).scalar()
+    if moved:
+        print(f"Resuming after {moved} of {total} stock_prices rows already moved.")
+    while True:
+        with engine.begin() as conn:
+            copied = _copy_legacy_prices(conn, batch_rows)
+        if not copied:
+            break
+        moved += copied
+        print(f"Moved {moved} of {total} stock_prices rows to stock_id/source_id keys.")
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("SELECT setval(pg_get_serial_sequence('stock_prices', 'id'), COALESCE(MAX(id), 1)) FROM stock_prices"))
+        conn.execute(text("DROP TABLE stock_prices_legacy"))
+    return moved
+
+def _recreate_indicator_series(engine: Engine) -> None:
+    """
+    Drops an indicator_series table that still holds the bars in its own row (before indicator_series_chunks) and
+    recreates it. The table is a cache: reads rebuild the series from stock_prices.
+    """
+    if "values" not in {column["name"] for column in inspect(engine).get_columns("indicator_series")}:
+        return
+    models.IndicatorSeries.__table__.drop(bind=engine)
+    models.IndicatorSeries.__table__.create(bind=engine)
+    print("Recreated indicator_series; stored indicator series are rebuilt by the next reads.")
+
+def upgrade_schema(engine: Engine) -> None:
+    """
+    Brings an existing database up to date with the tables and indexes declared in models.py and backfills derived
+    tables. Safe to call on every startup (after Base.metadata.create_all): it never deletes stock_prices rows, and
+    raises instead when duplicate keys keep the unique index from being built.
+    """
+    if _dimension_migration_pending(engine):
+        raise RuntimeError(
+            "stock_prices still repeats symbol/data_source strings on every row (or their move was interrupted). Run"
+            " `python -m backend.migrations migrate-dimension-ids` to move it to stock_id/source_id keys."
+        )
+    table = models.StockPrice.__table__
+    existing = _existing_index_names(engine, table.name)
+    for index in table.indexes:
+        if index.name in existing:
+            continue
+        if index.unique and index.name == "uq_stock_prices_stock_date_source":
+            _check_no_duplicate_prices(engine, f"{index.name} cannot be created")
+        index.create(bind=engine)
+        print(f"Created missing index {index.name} on {table.name}.")
+    _recreate_indicator_series(engine)
+    backfill_rollups(engine)
+    backfill_latest_quotes(engine)
+    backfill_symbol_stats(engine)
+    sync_column_store(engine)
+
+def backfill_rollups(engine: Engine) -> None:
+    """Builds stock_price_rollups for databases that have daily bars but no rollups yet (e.g. created before rollups existed)."""
+    with Session(engine) as db:
+        has_prices = db.execute(select(exists().where(models.StockPrice.id.isnot(None)))).scalar()
+        has_rollups = db.execute(select(exists().where(models.StockPriceRollup.id.isnot(None)))).scalar()
+        if not has_prices or has_rollups:
+            return
+        written = rollups.rebuild_all_rollups(db)
+        db.commit()
+    print(f"Backfilled {written} stock_price_rollups rows.")
+
+def backfill_latest_quotes(engine: Engine) -> None:
+    """Builds latest_quote for databases that have daily bars but no quotes yet."""
+    with Session(engine) as db:
+        has_prices = db.execute(select(exists().where(models.StockPrice.id.isnot(None)))).scalar()
+        has_quotes = db.execute(select(exists().where(models.LatestQuote.symbol.isnot(None)))).scalar()
+        if not has_prices or has_quotes:
+            return
+        written = latest_quotes.rebuild_all_quotes(db)
+        db.commit()
+    print(f"Backfilled {written} latest_quote rows.")
+
+def backfill_symbol_stats(engine: Engine) -> None:
+    """Builds symbol_stats for databases that have daily bars but no stats yet."""
+    with Session(engine) as db:
+        has_prices = db.execute(select(exists().where(models.StockPrice.id.isnot(None)))).scalar()
+        has_stats = db.execute(select(exists().where(models.SymbolStats.symbol.isnot(None)))).scalar()
+        if not has_prices or has_stats:
+            return
+        written = symbol_stats.rebuild_all_stats(db)
+        db.commit()
+    print(f"Backfilled {written} symbol_stats rows.")
+
+def sync_column_store(engine: Engine) -> None:
+    """Brings the column store (when enabled) up to date with stock_prices, e.g. after writes made while it was disabled."""
+    if not column_store.store:
+        return
+    with Session(engine) as db:
+        synced = column_store.store.sync_all(db)
+    if synced:
+        print(f"Synced {synced} symbols into the column store.")
+
+COMMANDS = {
+    "dedupe-stock-prices": dedupe_stock_prices,
+    "migrate-dimension-ids": migrate_to_dimension_ids,
+}
+
+def main(command: str) -> None:
+    from backend.database import engine
+    if command not in COMMANDS:
+        raise SystemExit(f"Unknown command {command!r}; expected one of: {', '.join(COMMANDS)}")
+    COMMANDS[command](engine)
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "")
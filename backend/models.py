@@ -19,41 +19,299 @@ class User(Base):
         return f"<User(id={self.id}, username='{self.username}', email='{self.email}')>"
 
 # Add other models here as needed:
-from sqlalchemy import Float, Date, ForeignKey # Added Float, Date, ForeignKey
-# from sqlalchemy.orm import relationship
+from sqlalchemy import Float, Date, ForeignKey, Index, BigInteger, LargeBinary, SmallInteger, Text, select # Added Float, Date, ForeignKey
+from sqlalchemy.ext.hybrid import Comparator, hybrid_property
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import operators
 
-# Could have a separate Stock model for metadata if needed:
-# class Stock(Base):
-#     __tablename__ = "stocks"
-#     id = Column(Integer, primary_key=True, index=True)
-#     symbol = Column(String, unique=True, index=True, nullable=False)
-#     company_name = Column(String, nullable=True)
-#     exchange = Column(String, nullable=True)
-#     # prices = relationship("StockPrice", back_populates="stock_info")
+
+class Stock(Base):
+    """Symbol dimension: stock_prices rows reference it by stock_id instead of repeating the symbol string."""
+    __tablename__ = "stocks"
+
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String, unique=True, nullable=False)
+    name = Column(String, nullable=True)
+    exchange = Column(String, nullable=True)
+
+    def __repr__(self):
+        return f"<Stock(id={self.id}, symbol='{self.symbol}')>"
+
+
+class DataSource(Base):
+    """Lookup of stock_prices data sources (e.g. 'AlphaVantage'), referenced by source_id."""
+    __tablename__ = "data_sources"
+
+    # SMALLINT on PostgreSQL; SQLite only auto-assigns ids to INTEGER PRIMARY KEY columns
+    id = Column(SmallInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+    def __repr__(self):
+        return f"<DataSource(id={self.id}, name='{self.name}')>"
+
+
+class _DimensionComparator(Comparator):
+    """
+    SQL side of StockPrice.symbol / StockPrice.data_source. Equality and IN look the ids up once (an uncorrelated
+    subquery on the dimension's unique index), so filters still seek on the integer stock_prices indexes;
+    anything else (ordering, other operators, selecting it) uses a correlated lookup per row.
+    """
+    def __init__(self, key, dimension):
+        self.key, self.dimension = key, dimension
+        super().__init__(select(dimension.c[1]).where(dimension.c.id == key).scalar_subquery())
+
+    def _ids(self, condition):
+        return select(self.dimension.c.id).where(condition)
+
+    def operate(self, op, *other, **kwargs):
+        name = self.dimension.c[1]
+        if op is operators.eq:
+            return self.key.is_(None) if other[0] is None else self.key == self._ids(name == other[0]).scalar_subquery()
+        if op is operators.in_op:
+            return self.key.in_(self._ids(name.in_(other[0])))
+        return op(self.expression, *other, **kwargs)
 
 
 class StockPrice(Base):
     __tablename__ = "stock_prices"
+    __table_args__ = (
+        # One bar per symbol, trading day and source. Upserts (crud.upsert_stock_prices) use it as the ON CONFLICT target.
+        # Note: rows with a NULL source_id never conflict with each other (SQL NULL semantics).
+        Index("uq_stock_prices_stock_date_source", "stock_id", "date", "source_id", unique=True),
+        # Keyset pagination: WHERE stock_id = ? AND (date, id) < (?, ?) ORDER BY date DESC, id DESC is a single index range scan.
+        Index("ix_stock_prices_stock_date_id", "stock_id", "date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    # stock_id = Column(Integer, ForeignKey("stocks.id"), nullable=True) # If using Stock model
-    symbol = Column(String, index=True, nullable=False) # For now, symbol directly here
+    # Small integer keys instead of repeated strings; `symbol` and `data_source` below keep the string interface
+    stock_id = Column(Integer, ForeignKey("stocks.id"), nullable=False)
     date = Column(Date, nullable=False, index=True)
     open = Column(Float, nullable=False)
     high = Column(Float, nullable=False)
     low = Column(Float, nullable=False)
     close = Column(Float, nullable=False)
     volume = Column(Integer, nullable=False) # Integer is fine for volume
-    data_source = Column(String, nullable=True) # E.g., 'AlphaVantage', 'UserUpload', 'YahooFinance'
+    source_id = Column(DataSource.id.type, ForeignKey("data_sources.id"), nullable=True) # NULL when the source is unknown
 
     created_at = Column(DateTime, default=datetime.datetime.now(datetime.timezone.utc))
 
-    # If using Stock model:
-    # stock_info = relationship("Stock", back_populates="prices")
+    stock = relationship(Stock, lazy="joined", innerjoin=True)
+    source = relationship(DataSource, lazy="joined")
+
+    # Set through the constructor (StockPrice(symbol="AAPL", ...)); backend.dimensions resolves the ids on insert
+    @hybrid_property
+    def symbol(self):
+        pending = self.__dict__.get("_symbol")
+        return pending if pending is not None or self.stock is None else self.stock.symbol
+
+    @symbol.inplace.setter
+    def _symbol_setter(self, value):
+        self._symbol = value
+
+    @symbol.inplace.comparator
+    @classmethod
+    def _symbol_comparator(cls):
+        return _DimensionComparator(cls.stock_id, Stock.__table__)
+
+    @hybrid_property
+    def data_source(self):
+        if "_data_source" in self.__dict__:
+            return self._data_source
+        return self.source.name if self.source is not None else None
+
+    @data_source.inplace.setter
+    def _data_source_setter(self, value):
+        self._data_source = value
+
+    @data_source.inplace.comparator
+    @classmethod
+    def _data_source_comparator(cls):
+        return _DimensionComparator(cls.source_id, DataSource.__table__)
 
     def __repr__(self):
         return f"<StockPrice(symbol='{self.symbol}', date='{self.date}', close={self.close})>"
 
 
+# stock_prices with the symbol and data_source strings joined back in, under the pre-dimension column names.
+# Core reads select from it like a table (STOCK_PRICE_ROWS.c.symbol == ...); SQLite and PostgreSQL flatten the
+# subquery, so filters on symbol seek the stocks unique index and then (stock_id, date, id).
+_prices, _stocks, _sources = StockPrice.__table__, Stock.__table__, DataSource.__table__
+STOCK_PRICE_ROWS = select(
+    _prices.c.id, _stocks.c.symbol, _prices.c.date, _prices.c.open, _prices.c.high, _prices.c.low, _prices.c.close,
+    _prices.c.volume, _sources.c.name.label("data_source"), _prices.c.created_at, _prices.c.stock_id, _prices.c.source_id,
+).select_from(
+    _prices.join(_stocks, _stocks.c.id == _prices.c.stock_id).outerjoin(_sources, _sources.c.id == _prices.c.source_id)
+).subquery("stock_price_rows")
+
+
+class StockPriceRollup(Base):
+    """
+    Weekly ("1w"), monthly ("1mo") and yearly ("1y") OHLCV bars per symbol and source, maintained from
+    stock_prices by backend.rollups. `date` is the first day of the period.
+    Column names match StockPrice so the same read and serialization code serves both tables.
+    """
+    __tablename__ = "stock_price_rollups"
+    __table_args__ = (
+        # Reads: WHERE symbol = ? AND interval = ? ORDER BY date DESC, id DESC (and keyset pagination on (date, id))
+        Index("ix_stock_price_rollups_symbol_interval_date_id", "symbol", "interval", "date", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String, nullable=False)
+    interval = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    volume = Column(BigInteger, nullable=False) # Yearly sums overflow 32-bit integers
+    data_source = Column(String, nullable=True)
+    bar_count = Column(Integer, nullable=False) # Daily bars in the period
+    created_at = Column(DateTime, nullable=True) # When the bar was last recomputed
+
+    def __repr__(self):
+        return f"<StockPriceRollup(symbol='{self.symbol}', interval='{self.interval}', date='{self.date}', close={self.close})>"
+
+
+class IndicatorSeries(Base):
+    """
+    Stored indicator output for the full daily history of a symbol, plus the state needed to extend it by one bar
+    (backend.indicator_store). `name` is an indicator from services.indicators or "close"; `window` is its
+    effective window (0 when it has none). The bars themselves are in indicator_series_chunks, so advancing the
+    state never rewrites them.
+    """
+    __tablename__ = "indicator_series"
+    __table_args__ = (
+        Index("uq_indicator_series_symbol_name_window", "symbol", "name", "window", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    window = Column(Integer, nullable=False)
+    last_date = Column(Date, nullable=False) # Date of the newest bar included
+    bar_count = Column(Integer, nullable=False)
+    state = Column(Text, nullable=False) # JSON, see services.indicators.final_state
+    updated_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<IndicatorSeries(symbol='{self.symbol}', name='{self.name}', window={self.window}, bars={self.bar_count})>"
+
+
+class IndicatorSeriesChunk(Base):
+    """
+    Consecutive bars of an IndicatorSeries: the bars it was built from, then one chunk per append. Chunks are only
+    inserted, until backend.indicator_store folds a series' chunks back into one.
+    """
+    __tablename__ = "indicator_series_chunks"
+
+    series_id = Column(Integer, ForeignKey("indicator_series.id"), primary_key=True)
+    first_bar = Column(Integer, primary_key=True) # Position of the chunk's first bar in the series
+    dates = Column(LargeBinary, nullable=False) # int32 days since 1970-01-01
+    values = Column(LargeBinary, nullable=False) # float64, bar-major: one row of outputs per bar
+
+    def __repr__(self):
+        return f"<IndicatorSeriesChunk(series_id={self.series_id}, first_bar={self.first_bar})>"
+
+
+class StockDataVersion(Base):
+    """
+    Per-symbol change counter, bumped by every stock_prices writer in crud.
+    Lets readers detect "nothing changed since" with a primary-key lookup (e.g. for HTTP ETags).
+    """
+    __tablename__ = "stock_data_versions"
+
+    symbol = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<StockDataVersion(symbol='{self.symbol}', version={self.version})>"
+
+
+class SymbolStats(Base):
+    """
+    Screening figures per symbol, computed from its latest year of daily bars and kept current by the stock_prices
+    writers in crud (backend.symbol_stats). Derived ratios are stored so that screens such as "within 2% of the
+    52-week high" are plain indexed comparisons. Percentages are fractions (-0.02 is -2%).
+    """
+    __tablename__ = "symbol_stats"
+    __table_args__ = tuple(
+        Index(f"ix_symbol_stats_{name}", name)
+        for name in (
+            "last_close", "change_pct", "avg_volume_20", "volume_ratio_20", "pct_from_high_52w", "pct_from_low_52w",
+            "return_1w", "return_1m", "return_3m", "return_6m", "return_1y", "return_ytd",
+        )
+    )
+
+    symbol = Column(String, primary_key=True)
+    last_date = Column(Date, nullable=False)
+    last_close = Column(Float, nullable=False)
+    prev_close = Column(Float, nullable=True)
+    change_pct = Column(Float, nullable=True) # last_close / prev_close - 1
+    last_volume = Column(BigInteger, nullable=False)
+    avg_volume_20 = Column(Float, nullable=True) # Mean volume of the 20 bars before the last one
+    avg_volume_50 = Column(Float, nullable=True)
+    volume_ratio_20 = Column(Float, nullable=True) # last_volume / avg_volume_20
+    high_52w = Column(Float, nullable=False) # Highest high / lowest low of the last 52 weeks
+    low_52w = Column(Float, nullable=False)
+    pct_from_high_52w = Column(Float, nullable=False) # last_close / high_52w - 1 (<= 0)
+    pct_from_low_52w = Column(Float, nullable=False) # last_close / low_52w - 1 (>= 0)
+    return_1w = Column(Float, nullable=True) # Versus the last close on or before the horizon; NULL without that history
+    return_1m = Column(Float, nullable=True)
+    return_3m = Column(Float, nullable=True)
+    return_6m = Column(Float, nullable=True)
+    return_1y = Column(Float, nullable=True)
+    return_ytd = Column(Float, nullable=True) # Versus the last close of the previous year
+    updated_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<SymbolStats(symbol='{self.symbol}', last_date='{self.last_date}', last_close={self.last_close})>"
+
+
+class LatestQuote(Base):
+    """
+    The newest daily bar of each symbol and its change against the previous trading day, kept current by the
+    stock_prices writers in crud (backend.latest_quotes). Dashboard tiles read it with primary-key lookups
+    instead of an ORDER BY date DESC LIMIT 1 per symbol. With several sources on one date, the newest row wins.
+    """
+    __tablename__ = "latest_quote"
+
+    symbol = Column(String, primary_key=True)
+    date = Column(Date, nullable=False)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    volume = Column(BigInteger, nullable=False)
+    data_source = Column(String, nullable=True)
+    prev_date = Column(Date, nullable=True) # Previous trading day; NULL for a symbol with a single day of data
+    prev_close = Column(Float, nullable=True)
+    change = Column(Float, nullable=True) # close - prev_close
+    change_pct = Column(Float, nullable=True) # close / prev_close - 1
+    updated_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<LatestQuote(symbol='{self.symbol}', date='{self.date}', close={self.close})>"
+
+
+class StockPriceArchive(Base):
+    """
+    Per-symbol boundary of the cold Parquet archive (backend.cold_storage): the symbol's bars dated before
+    archived_before were moved out of stock_prices. Advanced in the same transaction that deletes the archived rows,
+    so archive files holding rows past it (from an interrupted run) are ignored by readers.
+    """
+    __tablename__ = "stock_price_archive"
+
+    symbol = Column(String, primary_key=True)
+    archived_before = Column(Date, nullable=False)
+    updated_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<StockPriceArchive(symbol='{self.symbol}', archived_before='{self.archived_before}')>"
+
+
 # class ForexPair(Base): ...
 # class UserDataPreference(Base): ...
+
+from backend import dimensions # Registers the flush listener that resolves StockPrice symbol/data_source ids
@@ -0,0 +1,160 @@
+import datetime
+import itertools
+from collections import defaultdict, namedtuple
+from operator import attrgetter
+from typing import Iterable
+
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.orm import Session
+
+from backend import cold_storage, models
+
+# Weekly / monthly / yearly OHLCV bars per symbol and source, stored in stock_price_rollups.
+# crud keeps them current: after daily bars are written, every period containing a written date is recomputed from
+# the daily rows of that symbol and source (delete + insert), so updates, re-fetches and late bars are all handled
+# the same way. Periods reaching before the symbol's cold storage boundary read the archived rows too, so a late
+# bar in an archived year does not shrink its rollups to the bars still in stock_prices.
+# A rollup row's `date` is the first day of its period (Monday, the 1st, or January 1st).
+
+DAILY_INTERVAL = "1d"
+INTERVALS = ("1w", "1mo", "1y")
+
+ROLLUP_TABLE = models.StockPriceRollup.__table__
+DAILY_TABLE = models.STOCK_PRICE_ROWS
+DAILY_COLUMNS = ("id", "date", "open", "high", "low", "close", "volume")
+_DailyRow = namedtuple("DailyRow", DAILY_COLUMNS)
+
+def period_bounds(day: datetime.date, interval: str) -> tuple[datetime.date, datetime.date]:
+    """First and last calendar day of the `interval` period containing `day`."""
+    if interval == "1w":
+        start = day - datetime.timedelta(days=day.weekday())
+        return start, start + datetime.timedelta(days=6)
+    if interval == "1mo":
+        start = day.replace(day=1)
+        next_month = (start + datetime.timedelta(days=32)).replace(day=1)
+        return start, next_month - datetime.timedelta(days=1)
+    if interval == "1y":
+        return day.replace(month=1, day=1), day.replace(month=12, day=31)
+    raise ValueError(f"Unknown interval '{interval}'. Use one of: {', '.join(INTERVALS)}.")
+
+def _aggregate(daily_rows: list, interval: str, symbol: str, data_source, created_at: datetime.datetime) -> list[dict]:
+    """One rollup row per period from chronologically ordered (date, open, high, low, close, volume) rows."""
+    bars = []
+    for start, group in itertools.groupby(daily_rows, key=lambda row: period_bounds(row.date, interval)[0]):
+        group = list(group)
+        bars.append({
+            "symbol": symbol,
+            "interval": interval,
+            "date": start,
+            "open": group[0].open,
+            "high": max(row.high for row in group),
+            "low": min(row.low for row in group),
+            "close": group[-1].close,
+            "volume": sum(row.volume for row in group),
+            "data_source": data_source,
+            "bar_count": len(group),
+            "created_at": created_at,
+        })
+    return bars
+
+def _spans(periods: dict[str, set[datetime.date]]) -> list[tuple[datetime.date, datetime.date]]:
+    """Chronological, non-overlapping date ranges covering every period of `periods` (interval -> period starts)."""
+    spans = []
+    for start, end in sorted(period_bounds(day, interval) for interval, starts in periods.items() for day in starts):
+        if spans and start <= spans[-1][1] + datetime.timedelta(days=1):
+            spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+        else:
+            spans.append((start, end))
+    return spans
+
+def _with_archived_rows(db: Session, symbol: str, data_source, spans: list, hot_rows: list) -> list:
+    """
+    `hot_rows` plus the symbol's cold storage rows of `data_source` within `spans`, in (date, id) order. As in the
+    readers in crud, a stock_prices row dated before the boundary replaces the archived row of its date and source.
+    """
+    if not cold_storage.store:
+        return hot_rows
+    archived_before = cold_storage.get_archived_before(db, symbol)
+    if archived_before is None or spans[0][0] >= archived_before:
+        return hot_rows
+    replaced = {row.date for row in hot_rows if row.date < archived_before} if data_source is not None else set()
+    archived = []
+    for start, end in spans:
+        if start >= archived_before:
+            break
+        columns = cold_storage.store.read(symbol, archived_before, start_date=start, end_date=end)
+        for source, *values in zip(*(columns[name].tolist() for name in ("data_source",) + DAILY_COLUMNS)):
+            row = _DailyRow(*values)
+            if source == data_source and row.date not in replaced:
+                archived.append(row)
+    if not archived:
+        return hot_rows
+    return sorted([_DailyRow(*row) for row in hot_rows] + archived, key=attrgetter("date", "id"))
+
+def _refresh_periods(db: Session, symbol: str, data_source, periods: dict[str, set[datetime.date]], created_at: datetime.datetime) -> int:
+    """Recomputes the rollup rows of `periods` (interval -> period starts) of one symbol and source."""
+    spans = _spans(periods)
+    daily_rows = db.execute(
+        select(*(DAILY_TABLE.c[name] for name in DAILY_COLUMNS))
+        .where(
+            DAILY_TABLE.c.symbol == symbol,
+            DAILY_TABLE.c.data_source == data_source, # IS NULL when data_source is None
+            or_(*(DAILY_TABLE.c.date.between(start, end) for start, end in spans)),
+        )
+        .order_by(DAILY_TABLE.c.date, DAILY_TABLE.c.id)
+    ).all()
+    daily_rows = _with_archived_rows(db, symbol, data_source, spans, daily_rows)
+
+    bars = []
+    for interval, starts in periods.items():
+        db.execute(delete(ROLLUP_TABLE).where(
+            ROLLUP_TABLE.c.symbol == symbol,
+            ROLLUP_TABLE.c.interval == interval,
+            ROLLUP_TABLE.c.data_source == data_source,
+            ROLLUP_TABLE.c.date.in_(starts),
+        ))
+        in_periods = [row for row in daily_rows if period_bounds(row.date, interval)[0] in starts]
+        bars.extend(_aggregate(in_periods, interval, symbol, data_source, created_at))
+    if bars:
+        db.execute(ROLLUP_TABLE.insert(), bars)
+    return len(bars)
+
+def refresh_rollups(db: Session, written_rows: Iterable[dict]) -> int:
+    """
+    Recomputes the rollup periods containing the dates of `written_rows` (dicts with symbol, date and data_source)
+    from the daily bars currently in the session's transaction, plus archived bars for periods before the symbol's
+    cold storage boundary. Does not commit. Returns the number of rollup rows written.
+    """
+    touched = defaultdict(set) # (symbol, data_source) -> dates written
+    for row in written_rows:
+        touched[(row["symbol"], row["data_source"])].add(row["date"])
+
+    created_at = datetime.datetime.now(datetime.timezone.utc)
+    written = 0
+    for (symbol, data_source), dates in touched.items():
+        periods = {interval: {period_bounds(day, interval)[0] for day in dates} for interval in INTERVALS}
+        written += _refresh_periods(db, symbol, data_source, periods, created_at)
+    return written
+
+def delete_rollups(db: Session, symbol: str, data_source) -> None:
+    """Drops every rollup of a symbol and source (after all of its daily bars were deleted). Does not commit."""
+    db.execute(delete(ROLLUP_TABLE).where(ROLLUP_TABLE.c.symbol == symbol, ROLLUP_TABLE.c.data_source == data_source))
+
+def rebuild_all_rollups(db: Session) -> int:
+    """Recomputes the rollups of every symbol and source from scratch (used to backfill existing databases). Does not commit."""
+    spans = db.execute(
+        select(DAILY_TABLE.c.symbol, DAILY_TABLE.c.data_source, func.min(DAILY_TABLE.c.date), func.max(DAILY_TABLE.c.date))
+        .group_by(DAILY_TABLE.c.symbol, DAILY_TABLE.c.data_source)
+    ).all()
+    created_at = datetime.datetime.now(datetime.timezone.utc)
+    written = 0
+    for symbol, data_source, first, last in spans:
+        periods = {}
+        for interval in INTERVALS:
+            start, starts = period_bounds(first, interval)[0], set()
+            while start <= last:
+                starts.add(start)
+                start = period_bounds(start, interval)[1] + datetime.timedelta(days=1)
+            periods[interval] = starts
+        written += _refresh_periods(db, symbol, data_source, periods, created_at)
+    return written
@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, Header
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Annotated, Optional
+from typing import List, Annotated, Optional, Union
 import datetime
+import hashlib
+import json
+import numpy as np
 
-from backend import schemas, crud, models, auth # Assuming auth might be needed for protected routes
+from backend import schemas, crud, models, auth, cold_storage, rollups, symbol_stats # Assuming auth might be needed for protected routes
+from backend.config import settings
 from backend.database import get_db
+from backend.services import analytics, arrow_export, backtest, correlation, downsampling, indicators, price_format, risk
+from backend.services.price_cache import price_cache
 
 router = APIRouter()
 
@@ -20,17 +28,15 @@ def create_single_stock_price(
     Ensures symbol is uppercase.
     """
     price_in.symbol = price_in.symbol.upper()
-    # Optional: Check if data for this exact symbol and date already exists to prevent duplicates
-    # existing_entry = db.query(models.StockPrice).filter(
-    #     models.StockPrice.symbol == price_in.symbol,
-    #     models.StockPrice.date == price_in.date
-    # ).first()
-    # if existing_entry:
-    #     raise HTTPException(
-    #         status_code=status.HTTP_409_CONFLICT,
-    #         detail=f"Stock price for {price_in.symbol} on {price_in.date} already exists."
-    #     )
-    return crud.create_stock_price(db=db, price_in=price_in)
+    try:
+        return crud.create_stock_price(db=db, price_in=price_in)
+    except IntegrityError:
+        # uq_stock_prices_symbol_date_source: one bar per symbol, date and source
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Stock price for {price_in.symbol} on {price_in.date} from source '{price_in.data_source}' already exists."
+        )
 
 @router.post("/bulk", response_model=List[schemas.StockPricePublic], status_code=status.HTTP_201_CREATED,
               summary="Create Multiple Stock Price Entries (Bulk)",
@@ -42,52 +48,666 @@ def create_bulk_stock_prices(
     """
     Create multiple stock price entries in bulk. Requires superuser privileges.
     Ensures all symbols are uppercase.
+    All rows are stored in one transaction: on a 409 conflict nothing is stored, so the request can be
+    retried as a whole once the conflicting rows are removed from it (or from the database).
     """
     for price in prices_in.prices:
         price.symbol = price.symbol.upper()
-    # Optional: Add more sophisticated duplicate checking for bulk operations if needed.
-    return crud.create_stock_prices_bulk(db=db, prices_in=prices_in)
+    try:
+        return crud.create_stock_prices_bulk(db=db, prices_in=prices_in)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="One or more prices already exist for the same symbol, date and data source. Use POST /stocks/fetch/{symbol} or delete the existing rows first."
+        )
+
+@router.get("/cache/stats", response_model=schemas.PriceCacheStats,
+            summary="Stock Read Cache Statistics",
+            dependencies=[Depends(auth.get_current_active_superuser)])
+def get_price_cache_stats():
+    """
+    Hit/miss/eviction counters and memory use of this process's stock read cache, for tuning
+    PRICE_CACHE_MAX_BYTES and PRICE_CACHE_TTL_SECONDS. Requires superuser privileges.
+    """
+    return price_cache.stats()
+
+# Binary formats selectable through the Accept header (or explicitly via ?format=)
+BINARY_FORMATS = {
+    arrow_export.ARROW_STREAM_MEDIA_TYPE: "arrow",
+    arrow_export.PARQUET_MEDIA_TYPE: "parquet",
+}
+
+def _negotiate_format(format: Optional[str], accept: Optional[str], default: str = "records") -> str:
+    """An explicit ?format= wins; otherwise the first binary media type named in Accept; otherwise `default`."""
+    if format:
+        return format
+    for media_range in (accept or "").split(","):
+        media_type = media_range.split(";")[0].strip().lower()
+        if media_type in BINARY_FORMATS:
+            return BINARY_FORMATS[media_type]
+    return default
+
+# Fields each read format can project (the symbol is implied for columnar/arrow/parquet)
+FORMAT_FIELDS = {
+    "records": price_format.RECORD_FIELDS,
+    "columnar": ("date",) + price_format.COLUMNAR_FIELDS + ("data_source",),
+    "arrow": arrow_export.PRICE_COLUMNS,
+    "parquet": arrow_export.PRICE_COLUMNS,
+}
+
+def _parse_fields_or_400(fields: Optional[str], allowed: tuple[str, ...]) -> Optional[tuple[str, ...]]:
+    try:
+        return price_format.parse_fields(fields, allowed)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+def _price_etag(symbol: str, version: int, *params) -> str:
+    """Strong ETag for a stock price read: the symbol's data version plus every parameter that shapes the body."""
+    digest = hashlib.sha1(repr((symbol, version) + params).encode()).hexdigest()[:20]
+    return f'"{symbol}-{version}-{digest}"'
+
+def _etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """If-None-Match uses weak comparison, so W/ prefixes are ignored; `*` matches any current representation."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
 
-@router.get("/{symbol}", response_model=List[schemas.StockPricePublic],
-            summary="Get Stock Prices by Symbol")
+FIELDS_DESCRIPTION = "Comma-separated sparse fieldset, e.g. date,close. Only these columns are read from the database and returned."
+
+WINDOWS_DESCRIPTION = "Comma-separated rolling windows in bars, e.g. 20,60,252"
+INTERVAL_DESCRIPTION = "Bar size the metrics are computed on; volatility is annualized accordingly"
+
+def _parse_windows_or_400(windows: str) -> tuple[int, ...]:
+    try:
+        return risk.parse_windows(windows)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+# Declared before /{symbol} so that "risk" is not taken for a symbol (symbols are upper-cased, routes match exactly)
+@router.get("/risk", response_model=schemas.StockRiskBatch, summary="Risk Summaries for Several Symbols")
+def get_stock_risk_for_symbols(
+    db: Annotated[Session, Depends(get_db)],
+    symbols: str = Query(..., description="Comma-separated symbols, e.g. AAPL,MSFT,GOOG"),
+    windows: str = Query(",".join(map(str, risk.DEFAULT_WINDOWS)), description=WINDOWS_DESCRIPTION),
+    confidence: float = Query(risk.DEFAULT_CONFIDENCE, gt=0.5, lt=1.0, description="VaR confidence level"),
+    start_date: Optional[datetime.date] = Query(None, description="Filter by start date (YYYY-MM-DD)"),
+    end_date: Optional[datetime.date] = Query(None, description="Filter by end date (YYYY-MM-DD)"),
+    interval: str = Query(rollups.DAILY_INTERVAL, enum=[rollups.DAILY_INTERVAL, *rollups.INTERVALS], description=INTERVAL_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None, include_in_schema=False),
+):
+    """
+    The risk summary of GET /stocks/{symbol}/risk for many symbols at once, e.g. for a morning risk screen.
+    Closes of all symbols are read with a single query; results follow the request order and symbols
+    without data get a summary with bars=0.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date cannot be after end date.")
+    symbol_list = _parse_symbols_or_400(symbols)
+    window_list = _parse_windows_or_400(windows)
+    versions = crud.get_stock_data_versions(db, symbol_list)
+    etag = _price_etag("MULTI", sum(versions.values()), tuple(versions.items()), "risk", window_list, confidence, start_date, end_date, interval)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        arrays = crud.get_stock_price_arrays_for_symbols(db, symbol_list, ("close",), start_date=start_date, end_date=end_date, interval=interval)
+    except ValueError as e: # Unknown interval
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    periods = risk.PERIODS_PER_YEAR[interval]
+    return JSONResponse({
+        "interval": interval,
+        "results": [
+            {"symbol": symbol, **risk.summarize(a["date"], a["close"], window_list, confidence, periods)}
+            for symbol, a in arrays.items()
+        ],
+    }, headers=headers)
+
+@router.get("/correlation", response_model=schemas.StockCorrelation, summary="Return Correlation and Covariance of Several Symbols")
+def get_stock_correlation(
+    db: Annotated[Session, Depends(get_db)],
+    symbols: str = Query(..., description="Comma-separated symbols, e.g. AAPL,MSFT,GOOG"),
+    start_date: Optional[datetime.date] = Query(None, description="Filter by start date (YYYY-MM-DD)"),
+    end_date: Optional[datetime.date] = Query(None, description="Filter by end date (YYYY-MM-DD)"),
+    interval: str = Query(rollups.DAILY_INTERVAL, enum=[rollups.DAILY_INTERVAL, *rollups.INTERVALS], description="Bar size the returns are computed on"),
+    if_none_match: Optional[str] = Header(None, include_in_schema=False),
+):
+    """
+    Covariance and correlation matrices of log returns, with every symbol aligned on the dates all of them have
+    bars for. Closes are read with one query and the matrices computed in one NumPy pass (backend.services.correlation);
+    results are cached per symbol set, range and data version, so repeated loads of a basket are served from memory.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date cannot be after end date.")
+    symbol_list = _parse_symbols_or_400(symbols)
+    versions = crud.get_stock_data_versions(db, symbol_list)
+    etag = _price_etag("MULTI", sum(versions.values()), tuple(versions.items()), "correlation", start_date, end_date, interval)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        result = crud.get_return_matrices(db, symbol_list, start_date=start_date, end_date=end_date, interval=interval)
+    except ValueError as e: # Unknown interval
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    # Cached matrices are in sorted symbol order; reorder them to the request
+    position = {symbol: i for i, symbol in enumerate(result["symbols"])}
+    ordered = [symbol for symbol in symbol_list if symbol in position]
+    order = np.ix_([position[s] for s in ordered], [position[s] for s in ordered])
+    dates = result["dates"]
+    return JSONResponse({
+        "symbols": ordered,
+        "missing": [symbol for symbol in symbol_list if symbol not in position],
+        "interval": interval,
+        "start_date": str(dates[0]) if len(dates) else None,
+        "end_date": str(dates[-1]) if len(dates) else None,
+        "observations": max(len(dates) - 1, 0),
+        "covariance": correlation.to_json_matrix(result["covariance"][order]),
+        "correlation": correlation.to_json_matrix(result["correlation"][order]),
+    }, headers=headers)
+
+@router.get("/latest", response_model=List[schemas.LatestQuote], summary="Latest Quotes for Several Symbols")
+def get_latest_quotes(
+    db: Annotated[Session, Depends(get_db)],
+    symbols: str = Query(..., description="Comma-separated symbols, e.g. AAPL,MSFT,GOOG"),
+    if_none_match: Optional[str] = Header(None, include_in_schema=False),
+):
+    """
+    Last close, change and volume of each symbol from the latest_quote table, which every stock_prices writer
+    keeps current: one primary-key lookup per symbol instead of a newest-row query against the price history.
+    Quotes follow the request order; symbols without data are left out.
+    """
+    symbol_list = _parse_symbols_or_400(symbols)
+    versions = crud.get_stock_data_versions(db, symbol_list)
+    etag = _price_etag("MULTI", sum(versions.values()), tuple(versions.items()), "latest")
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse([
+        {**row._asdict(), "date": row.date.isoformat(), "prev_date": row.prev_date.isoformat() if row.prev_date else None}
+        for row in crud.get_latest_quotes(db, symbol_list)
+    ], headers=headers)
+
+@router.get("/screen", response_model=List[schemas.SymbolStats], summary="Screen Symbols by Precomputed Statistics")
+def screen_stocks(
+    db: Annotated[Session, Depends(get_db)],
+    where: List[str] = Query([], description=f"Conditions combined with AND, each <field><op><number> with op one of >=, <=, >, <, =, !=, e.g. where=pct_from_high_52w>=-0.02&where=volume_ratio_20>=3. Fields: {', '.join(symbol_stats.SCREEN_FIELDS)}"),
+    sort: str = Query("symbol", description="Field to sort by; prefix with - for descending, e.g. -volume_ratio_20"),
+    limit: int = Query(100, ge=1, le=10000, description="Maximum number of symbols to return"),
+    symbols: Optional[str] = Query(None, description="Comma-separated symbols to restrict the screen to"),
+):
+    """
+    Filters and sorts the symbol_stats table (last close, 52-week high/low, average volumes, returns over standard
+    horizons), which the stock_prices writers keep current. Every condition is an indexed comparison on one row
+    per symbol, so screening the whole universe does not touch the price history.
+    """
+    symbol_list = _parse_symbols_or_400(symbols) if symbols else None
+    try:
+        rows = crud.screen_symbol_stats(db, where, sort=sort, limit=limit, symbols=symbol_list)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return JSONResponse([
+        {**row._asdict(), "last_date": row.last_date.isoformat()} for row in rows
+    ])
+
+ANALYTICS_FORMAT_DESCRIPTION = "records: list of row objects; arrow/parquet: binary table. Defaults to content negotiation on Accept."
+ANALYTICS_RESPONSES = {200: {"content": {arrow_export.ARROW_STREAM_MEDIA_TYPE: {}, arrow_export.PARQUET_MEDIA_TYPE: {}}}}
+
+def _analytics_response(table, format: Optional[str], accept: Optional[str]) -> Response:
+    format = _negotiate_format(format, accept)
+    if format == "arrow":
+        return Response(arrow_export.table_to_arrow_stream(table), media_type=arrow_export.ARROW_STREAM_MEDIA_TYPE)
+    if format == "parquet":
+        return Response(arrow_export.table_to_parquet(table), media_type=arrow_export.PARQUET_MEDIA_TYPE)
+    return JSONResponse(analytics.table_to_records(table))
+
+@router.get("/analytics/summary", response_model=List[schemas.SymbolSummary], summary="Range Statistics of Every Symbol",
+            responses=ANALYTICS_RESPONSES)
+def get_symbol_summaries(
+    db: Annotated[Session, Depends(get_db)],
+    symbols: Optional[str] = Query(None, description="Comma-separated symbols; all symbols when omitted"),
+    start_date: Optional[datetime.date] = Query(None, description="Filter by start date (YYYY-MM-DD)"),
+    end_date: Optional[datetime.date] = Query(None, description="Filter by end date (YYYY-MM-DD)"),
+    format: Optional[str] = Query(None, enum=["records", "arrow", "parquet"], description=ANALYTICS_FORMAT_DESCRIPTION),
+    accept: Optional[str] = Header(None, include_in_schema=False),
+):
+    """
+    Bar count, first/last close, total return, annualized volatility, maximum drawdown, average volume and
+    high/low of each symbol's daily bars in the range (cold storage included), in symbol order.
+    Runs in embedded DuckDB when ANALYTICS_ENGINE=duckdb, otherwise over NumPy arrays.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date cannot be after end date.")
+    symbol_list = _parse_symbols_or_400(symbols) if symbols else None
+    return _analytics_response(crud.get_symbol_summaries(db, symbol_list, start_date, end_date), format, accept)
+
+@router.get("/analytics/breadth", response_model=List[schemas.MarketBreadth], summary="Daily Market Breadth",
+            responses=ANALYTICS_RESPONSES)
+def get_market_breadth(
+    db: Annotated[Session, Depends(get_db)],
+    symbols: Optional[str] = Query(None, description="Comma-separated symbols; all symbols when omitted"),
+    start_date: Optional[datetime.date] = Query(None, description="Filter by start date (YYYY-MM-DD)"),
+    end_date: Optional[datetime.date] = Query(None, description="Filter by end date (YYYY-MM-DD)"),
+    format: Optional[str] = Query(None, enum=["records", "arrow", "parquet"], description=ANALYTICS_FORMAT_DESCRIPTION),
+    accept: Optional[str] = Header(None, include_in_schema=False),
+):
+    """
+    For every date in the range: how many symbols have a bar, advanced or declined, their equal-weighted mean log
+    return and the total volume. Runs in embedded DuckDB when ANALYTICS_ENGINE=duckdb, otherwise over NumPy arrays.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date cannot be after end date.")
+    symbol_list = _parse_symbols_or_400(symbols) if symbols else None
+    return _analytics_response(crud.get_market_breadth(db, symbol_list, start_date, end_date), format, accept)
+
+@router.get("/analytics/rolling", response_model=List[schemas.RollingMetrics], summary="Rolling Metrics of Several Symbols",
+            responses=ANALYTICS_RESPONSES)
+def get_rolling_metrics(
+    db: Annotated[Session, Depends(get_db)],
+    symbols: str = Query(..., description="Comma-separated symbols, e.g. AAPL,MSFT,GOOG"),
+    window: int = Query(analytics.DEFAULT_WINDOW, ge=2, le=2520, description="Trailing window in bars"),
+    start_date: Optional[datetime.date] = Query(None, description="Filter by start date (YYYY-MM-DD)"),
+    end_date: Optional[datetime.date] = Query(None, description="Filter by end date (YYYY-MM-DD)"),
+    format: Optional[str] = Query(None, enum=["records", "arrow", "parquet"], description=ANALYTICS_FORMAT_DESCRIPTION),
+    accept: Optional[str] = Header(None, include_in_schema=False),
+):
+    """
+    Every daily bar of the symbols with its log return, `window`-bar momentum and annualized volatility of the last
+    `window` returns, ordered by symbol and date. Windows start at start_date (no earlier bars are read).
+    Runs in embedded DuckDB when ANALYTICS_ENGINE=duckdb, otherwise over NumPy arrays.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date cannot be after end date.")
+    symbol_list = _parse_symbols_or_400(symbols)
+    return _analytics_response(crud.get_rolling_metrics(db, symbol_list, window, start_date, end_date), format, accept)
+
+@router.get("/{symbol}", response_model=Union[List[schemas.StockPricePublic], schemas.StockPriceColumnar, List[schemas.StockPricePartial]],
+            summary="Get Stock Prices by Symbol",
+            responses={200: {"content": {arrow_export.ARROW_STREAM_MEDIA_TYPE: {}, arrow_export.PARQUET_MEDIA_TYPE: {}}}})
 def get_stock_prices(
     symbol: str,
     db: Annotated[Session, Depends(get_db)],
-    skip: int = Query(0, ge=0, description="Number of records to skip for pagination"),
+    skip: int = Query(0, ge=0, description="Number of records to skip for pagination (offset; prefer `cursor` for deep pages)"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     start_date: Optional[datetime.date] = Query(None, description="Filter by start date (YYYY-MM-DD)"),
     end_date: Optional[datetime.date] = Query(None, description="Filter by end date (YYYY-MM-DD)"),
+    cursor: Optional[str] = Query(None, description="Opaque keyset cursor from the X-Next-Cursor header of the previous page"),
+    format: Optional[str] = Query(None, enum=["records", "columnar", "arrow", "parquet"], description="records: list of price objects; columnar: one object of parallel arrays; arrow/parquet: binary table. Defaults to content negotiation on Accept."),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    interval: str = Query(rollups.DAILY_INTERVAL, enum=[rollups.DAILY_INTERVAL, *rollups.INTERVALS], description="Bar size: daily bars, or weekly/monthly/yearly bars pre-aggregated on ingest (dated by the first day of the period)"),
+    max_points: Optional[int] = Query(None, ge=3, le=10000, description="Downsample the whole date range to at most this many points (limit, skip and cursor do not apply)"),
+    downsample: str = Query("ohlc", enum=list(downsampling.DOWNSAMPLE_MODES), description="With max_points: ohlc merges buckets into candles; lttb keeps the rows that best preserve the close series"),
+    accept: Optional[str] = Header(None, include_in_schema=False),
+    if_none_match: Optional[str] = Header(None, include_in_schema=False),
     # current_user: models.User = Depends(auth.get_current_active_user) # If all stock data access needs auth
 ):
     """
-    Get historical stock prices for a given symbol.
+    Get historical stock prices for a given symbol, newest first.
     Supports pagination and date range filtering.
+    When more rows remain, the `X-Next-Cursor` response header carries the cursor for the next page;
+    cursor pages cost the same no matter how deep they are, unlike `skip`.
+    `format=columnar` returns a StockPriceColumnar object (symbol and source sent once, values as arrays).
+    `Accept: application/vnd.apache.arrow.stream` (or `application/x-parquet`) returns a typed Arrow IPC stream
+    (or Parquet file) with date/open/high/low/close/volume/data_source columns and the symbol in the schema metadata.
+    `fields=date,close` limits every format to the named fields, pushed down into the SQL column list.
+    Responses carry an `ETag` derived from the symbol's data version; sending it back in `If-None-Match`
+    returns 304 Not Modified without reading any price rows until the symbol's data changes.
+    `max_points=N` returns a chart-ready series of at most N points covering the whole date range:
+    OHLC candles merged per bucket (`downsample=ohlc`, keeping every bucket's high and low) or the rows
+    selected by Largest-Triangle-Three-Buckets on the close (`downsample=lttb`).
+    `interval=1w|1mo|1y` serves weekly/monthly/yearly OHLCV bars from the rollup table instead of daily bars,
+    so a 20-year monthly chart reads about 240 rows.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date cannot be after end date.")
+    if cursor and skip:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Use either skip or cursor for pagination, not both.")
+    if max_points and (cursor or skip):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="max_points covers the whole date range and cannot be combined with skip or cursor.")
+    format = _negotiate_format(format, accept)
+    selected_fields = _parse_fields_or_400(fields, FORMAT_FIELDS[format])
+    # Every format reads Core rows holding only the needed columns; no ORM instances are built.
+    columns = selected_fields or FORMAT_FIELDS[format]
+    etag = _price_etag(
+        symbol.upper(), crud.get_stock_data_version(db, symbol), format, columns, interval, skip, limit, start_date, end_date, cursor,
+        max_points, downsample if max_points else None
+    )
+    # Vary: the body depends on Accept when format is negotiated
+    cache_headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if _etag_matches(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    try:
+        if max_points:
+            prices = crud.get_downsampled_stock_price_rows(
+                db, symbol.upper(), columns, max_points, mode=downsample, start_date=start_date, end_date=end_date, interval=interval
+            )
+            next_cursor = None
+        else:
+            prices, next_cursor = crud.get_stock_prices_page(
+                db=db,
+                symbol=symbol.upper(),
+                skip=skip,
+                limit=limit,
+                start_date=start_date,
+                end_date=end_date,
+                cursor=cursor,
+                columns=columns,
+                interval=interval
+            )
+    except ValueError as e: # Bad cursor, interval or downsampling mode
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    headers = dict(cache_headers)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    # JSON is built directly from Core rows and returned as a Response, so FastAPI skips response_model validation
+    if format == "columnar":
+        return JSONResponse(price_format.rows_to_columnar(symbol.upper(), prices, next_cursor, columns), headers=headers)
+    if format in ("arrow", "parquet"):
+        table = arrow_export.price_rows_to_table(symbol.upper(), prices, next_cursor, columns)
+        if format == "arrow":
+            return Response(arrow_export.table_to_arrow_stream(table), media_type=arrow_export.ARROW_STREAM_MEDIA_TYPE, headers=headers)
+        headers["Content-Disposition"] = f'attachment; filename="{symbol.upper()}.parquet"'
+        return Response(arrow_export.table_to_parquet(table), media_type=arrow_export.PARQUET_MEDIA_TYPE, headers=headers)
+    # Rows come straight from our own table, so they are trusted and not re-validated against StockPricePublic.
+    return JSONResponse(price_format.rows_to_records(prices, columns), headers=headers)
+
+def _parse_symbols_or_400(symbols: str) -> list[str]:
+    """Upper-cased, de-duplicated symbols in request order; 400 when empty or above settings.MULTI_SYMBOL_MAX."""
+    parsed = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    if not parsed:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="symbols must name at least one symbol.")
+    if len(parsed) > settings.MULTI_SYMBOL_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.MULTI_SYMBOL_MAX} symbols can be requested at once ({len(parsed)} given)."
+        )
+    return parsed
+
+@router.get("", response_model=schemas.StockPriceColumnarBatch,
+            summary="Get Stock Prices for Several Symbols",
+            responses={200: {"content": {arrow_export.ARROW_STREAM_MEDIA_TYPE: {}, arrow_export.PARQUET_MEDIA_TYPE: {}}}})
+@router.get("/", response_model=schemas.StockPriceColumnarBatch, include_in_schema=False)
+def get_stock_prices_for_symbols(
+    db: Annotated[Session, Depends(get_db)],
+    symbols: str = Query(..., description="Comma-separated symbols, e.g. AAPL,MSFT,GOOG"),
+    limit: int = Query(100, ge=1, le=10000, description="Maximum number of (newest) records per symbol"),
+    start_date: Optional[datetime.date] = Query(None, description="Filter by start date (YYYY-MM-DD)"),
+    end_date: Optional[datetime.date] = Query(None, description="Filter by end date (YYYY-MM-DD)"),
+    format: Optional[str] = Query(None, enum=["columnar", "arrow", "parquet"], description="columnar: one StockPriceColumnar per symbol; arrow/parquet: one binary table with a symbol column. Defaults to content negotiation on Accept."),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    accept: Optional[str] = Header(None, include_in_schema=False),
+    if_none_match: Optional[str] = Header(None, include_in_schema=False),
+):
+    """
+    Get the price series of many symbols with a single database query (one `symbol IN (...)` read on the
+    symbol/date index), newest first per symbol. `limit` applies to each symbol separately and is enforced in SQL.
+    Columnar output lists one series per requested symbol, in request order (empty when the symbol has no data);
+    Arrow/Parquet output is one table sorted by symbol, then newest first.
     """
     if start_date and end_date and start_date > end_date:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date cannot be after end date.")
+    symbol_list = _parse_symbols_or_400(symbols)
+    format = _negotiate_format(format, accept, default="columnar")
+    columns = _parse_fields_or_400(fields, FORMAT_FIELDS[format]) or FORMAT_FIELDS[format]
+    versions = crud.get_stock_data_versions(db, symbol_list)
+    etag = _price_etag("MULTI", sum(versions.values()), tuple(versions.items()), format, columns, limit, start_date, end_date)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if _etag_matches(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
-    prices = crud.get_stock_prices_by_symbol(
-        db=db,
-        symbol=symbol.upper(),
-        skip=skip,
-        limit=limit,
-        start_date=start_date,
-        end_date=end_date
+    rows = crud.get_stock_price_rows_for_symbols(
+        db, symbol_list, columns, limit_per_symbol=limit, start_date=start_date, end_date=end_date
     )
-    if not prices:
-        # Distinguish between no data found and symbol not existing if necessary
-        # For now, just return empty list, client can interpret.
-        # raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No stock prices found for symbol {symbol.upper()}")
-        pass
-    return prices
+    if format == "columnar":
+        return JSONResponse(price_format.rows_to_columnar_batch(symbol_list, rows, columns), headers=headers)
+    table = arrow_export.batch_rows_to_table(rows, columns)
+    if format == "arrow":
+        return Response(arrow_export.table_to_arrow_stream(table), media_type=arrow_export.ARROW_STREAM_MEDIA_TYPE, headers=headers)
+    headers["Content-Disposition"] = 'attachment; filename="stocks.parquet"'
+    return Response(arrow_export.table_to_parquet(table), media_type=arrow_export.PARQUET_MEDIA_TYPE, headers=headers)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def _ndjson_lines(
+    db: Session,
+    symbol: str,
+    start_date: Optional[datetime.date],
+    end_date: Optional[datetime.date],
+    batch_size: int,
+    fields: tuple[str, ...] = price_format.RECORD_FIELDS
+):
+    """Yields one text chunk per database batch, each holding one JSON object (StockPricePublic `fields`) per line."""
+    try:
+        for batch in crud.stream_stock_price_rows(db, symbol, fields, start_date=start_date, end_date=end_date, batch_size=batch_size):
+            yield "".join(json.dumps(record) + "\n" for record in price_format.rows_to_records(batch, fields))
+    finally:
+        # The get_db dependency may already have closed the session before the body is sent;
+        # close again so the connection used for streaming is always returned to the pool.
+        db.close()
+
+@router.get("/{symbol}/stream", summary="Stream Stock Prices by Symbol (NDJSON)",
+            response_class=StreamingResponse,
+            responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}, "description": "One StockPricePublic JSON object per line"}})
+def stream_stock_prices(
+    symbol: str,
+    db: Annotated[Session, Depends(get_db)],
+    start_date: Optional[datetime.date] = Query(None, description="Filter by start date (YYYY-MM-DD)"),
+    end_date: Optional[datetime.date] = Query(None, description="Filter by end date (YYYY-MM-DD)"),
+    batch_size: int = Query(1000, ge=1, le=50000, description="Rows fetched from the database per batch"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+):
+    """
+    Stream every stock price for a symbol in the date range as newline-delimited JSON, newest first.
+    There is no row limit: rows are read through a server-side cursor and written as they arrive,
+    so server memory does not grow with the size of the range.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date cannot be after end date.")
+    selected_fields = _parse_fields_or_400(fields, price_format.RECORD_FIELDS) or price_format.RECORD_FIELDS
+    return StreamingResponse(
+        _ndjson_lines(db, symbol.upper(), start_date, end_date, batch_size, selected_fields),
+        media_type=NDJSON_MEDIA_TYPE
+    )
+
+@router.get("/{symbol}/indicators", response_model=schemas.StockIndicators,
+            summary="Technical Indicators for a Symbol")
+def get_stock_indicators(
+    symbol: str,
+    db: Annotated[Session, Depends(get_db)],
+    names: str = Query(",".join(indicators.INDICATORS), description=f"Comma-separated indicators: {', '.join(indicators.INDICATORS)}"),
+    window: Optional[int] = Query(None, ge=2, le=1000, description="Window for sma/ema/rsi/bollinger (defaults: sma 20, ema 20, rsi 14, bollinger 20). MACD always uses 12/26/9."),
+    start_date: Optional[datetime.date] = Query(None, description="Filter by start date (YYYY-MM-DD)"),
+    end_date: Optional[datetime.date] = Query(None, description="Filter by end date (YYYY-MM-DD)"),
+    interval: str = Query(rollups.DAILY_INTERVAL, enum=[rollups.DAILY_INTERVAL, *rollups.INTERVALS], description="Bar size the indicators are computed on"),
+    if_none_match: Optional[str] = Header(None, include_in_schema=False),
+):
+    """
+    SMA, EMA, RSI (Wilder), MACD and Bollinger Bands over the close, oldest first.
+    Computed with vectorized NumPy (backend.services.indicators) including the history before `start_date`,
+    so values at the start of the range are already settled. Daily series are stored on first read and
+    advanced bar by bar as new prices arrive, so repeated reads do not recompute them.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date cannot be after end date.")
+    try:
+        names_list = indicators.parse_names(names)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    etag = _price_etag(symbol.upper(), crud.get_stock_data_version(db, symbol), "indicators", names_list, window, start_date, end_date, interval)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        if interval == rollups.DAILY_INTERVAL:
+            # Served from stored series, which writers keep current (backend.indicator_store)
+            dates, series = crud.get_indicator_series(db, symbol, names_list, window)
+        else:
+            arrays = crud.get_stock_price_arrays(
+                db, symbol.upper(), ("close",), start_date=start_date, end_date=end_date,
+                lookback=indicators.warmup_bars(names_list, window), interval=interval
+            )
+            dates, series = arrays["date"], {"close": arrays["close"], **indicators.compute(arrays["close"], names_list, window)}
+    except ValueError as e: # Unknown interval
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    # Only the requested range; bars before it served as warm-up
+    first = np.searchsorted(dates, np.datetime64(start_date)) if start_date else 0
+    last = np.searchsorted(dates, np.datetime64(end_date), side="right") if end_date else len(dates)
+    close = series.pop("close")
+    return JSONResponse({
+        "symbol": symbol.upper(),
+        "interval": interval,
+        "dates": np.datetime_as_string(dates[first:last]).tolist(),
+        "close": close[first:last].tolist(),
+        "indicators": {name: indicators.to_json_list(values[first:last]) for name, values in series.items()},
+    }, headers=headers)
+
+@router.get("/{symbol}/risk", response_model=schemas.StockRisk, summary="Risk Metrics for a Symbol")
+def get_stock_risk(
+    symbol: str,
+    db: Annotated[Session, Depends(get_db)],
+    windows: str = Query(",".join(map(str, risk.DEFAULT_WINDOWS)), description=WINDOWS_DESCRIPTION),
+    confidence: float = Query(risk.DEFAULT_CONFIDENCE, gt=0.5, lt=1.0, description="VaR confidence level"),
+    start_date: Optional[datetime.date] = Query(None, description="Filter by start date (YYYY-MM-DD)"),
+    end_date: Optional[datetime.date] = Query(None, description="Filter by end date (YYYY-MM-DD)"),
+    interval: str = Query(rollups.DAILY_INTERVAL, enum=[rollups.DAILY_INTERVAL, *rollups.INTERVALS], description=INTERVAL_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None, include_in_schema=False),
+):
+    """
+    Log returns, drawdown, rolling volatility and rolling historical VaR for every window, plus a summary with
+    max drawdown and historical/parametric VaR, all from the closes in the date range (backend.services.risk).
+    Rolling series are null until their window is full within the range.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date cannot be after end date.")
+    window_list = _parse_windows_or_400(windows)
+    etag = _price_etag(symbol.upper(), crud.get_stock_data_version(db, symbol), "risk", window_list, confidence, start_date, end_date, interval)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        arrays = crud.get_stock_price_arrays(db, symbol.upper(), ("close",), start_date=start_date, end_date=end_date, interval=interval)
+    except ValueError as e: # Unknown interval
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    result = risk.compute(arrays["date"], arrays["close"], window_list, confidence, risk.PERIODS_PER_YEAR[interval])
+    result["summary"]["symbol"] = symbol.upper()
+    return JSONResponse({"symbol": symbol.upper(), "interval": interval, **result}, headers=headers)
+
+@router.post("/asof", response_model=schemas.AsOfResponse, summary="Batch As-Of Close Lookup")
+def get_stock_prices_asof(
+    request: schemas.AsOfRequest,
+    db: Annotated[Session, Depends(get_db)],
+):
+    """
+    Close of each (symbol, date) pair on that date, or on the last trading day before it. Answered by binary search
+    (numpy.searchsorted) over per-symbol date/close arrays that are loaded once (one query for all uncached symbols)
+    and kept in the read cache until a writer changes the symbol.
+    """
+    symbols = [query.symbol.upper() for query in request.queries]
+    dates = [query.date for query in request.queries]
+    price_dates, closes = crud.get_close_asof(db, symbols, dates)
+    found = ~np.isnan(closes)
+    price_date_strings = np.where(found, np.datetime_as_string(price_dates), None).tolist()
+    close_values = np.where(found, closes, None).tolist()
+    return JSONResponse({"results": [
+        {"symbol": symbol, "date": date.isoformat(), "price_date": price_date, "close": close}
+        for symbol, date, price_date, close in zip(symbols, dates, price_date_strings, close_values)
+    ]})
+
+def _load_backtest_closes(db: Session, symbol: str, request: Union[schemas.BacktestRequest, schemas.BacktestSweepRequest]) -> dict:
+    """The request's close series; 400 for bad ranges or intervals, 404 without enough history."""
+    if request.start_date and request.end_date and request.start_date > request.end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date cannot be after end date.")
+    try:
+        arrays = crud.get_stock_price_arrays(db, symbol, ("close",), start_date=request.start_date, end_date=request.end_date, interval=request.interval)
+    except ValueError as e: # Unknown interval
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if len(arrays["close"]) < backtest.MIN_BARS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Not enough price history for {symbol} to backtest ({len(arrays['close'])} bars, {backtest.MIN_BARS} needed)."
+        )
+    return arrays
+
+@router.post("/{symbol}/backtest", response_model=schemas.BacktestResult, summary="Backtest a Strategy on a Symbol")
+def run_stock_backtest(
+    symbol: str,
+    request: schemas.BacktestRequest,
+    db: Annotated[Session, Depends(get_db)],
+):
+    """
+    Runs one long-only strategy over the stored closes (backend.services.backtest) and returns the equity curve,
+    position, trades and summary statistics. Signals act on the close they are computed from; the position is held
+    from the next bar.
+    """
+    symbol = symbol.upper()
+    try:
+        params = backtest.validate_params(request.strategy, request.params)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    arrays = _load_backtest_closes(db, symbol, request)
+    dates, close = arrays["date"], arrays["close"]
+    result = backtest.run(request.strategy, close, [params], request.cost_bps, risk.PERIODS_PER_YEAR[request.interval])
+    return JSONResponse({
+        "symbol": symbol,
+        "strategy": request.strategy,
+        "params": params,
+        "interval": request.interval,
+        "summary": backtest.summary_of(result, 0),
+        "dates": np.datetime_as_string(dates).tolist(),
+        "equity": result["equity"][0].tolist(),
+        "position": result["position"][0].tolist(),
+        "trades": backtest.trades_of(result, 0, dates, close),
+    })
+
+@router.post("/{symbol}/backtest/sweep", response_model=schemas.BacktestSweepResult, summary="Backtest a Parameter Grid on a Symbol")
+def run_stock_backtest_sweep(
+    symbol: str,
+    request: schemas.BacktestSweepRequest,
+    db: Annotated[Session, Depends(get_db)],
+):
+    """
+    Runs every valid combination of the grid (up to 1000) in one vectorized pass, each parameter set being a row
+    of the signal/position/equity matrices, and returns their summaries ranked by `sort_by`.
+    """
+    symbol = symbol.upper()
+    if request.sort_by not in backtest.SUMMARY_FIELDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"sort_by must be one of: {', '.join(backtest.SUMMARY_FIELDS)}.")
+    try:
+        param_sets = backtest.expand_grid(request.strategy, request.grid)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not param_sets:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The grid contains no valid parameter set.")
+    arrays = _load_backtest_closes(db, symbol, request)
+    result = backtest.run(request.strategy, arrays["close"], param_sets, request.cost_bps, risk.PERIODS_PER_YEAR[request.interval])
+    entries = [{"params": params, "summary": backtest.summary_of(result, i)} for i, params in enumerate(param_sets)]
+    entries.sort(key=lambda entry: backtest.sort_key(request.sort_by, entry["summary"]))
+    return JSONResponse({
+        "symbol": symbol,
+        "strategy": request.strategy,
+        "interval": request.interval,
+        "start_date": str(arrays["date"][0]),
+        "end_date": str(arrays["date"][-1]),
+        "bars": len(arrays["close"]),
+        "evaluated": len(param_sets),
+        "results": entries[:request.top],
+    })
 
 @router.delete("/{symbol}", response_model=schemas.Message,
               summary="Delete Stock Prices by Symbol and Source",
               dependencies=[Depends(auth.get_current_active_superuser)]) # Example: Protected
 def delete_stock_data(
+    db: Annotated[Session, Depends(get_db)],
     symbol: str,
     data_source: str = Query(..., description="Specify the data source to delete (e.g., 'AlphaVantage', 'UserUpload')"),
-    db: Annotated[Session, Depends(get_db)],
 ):
     """
     Delete all stock price entries for a given symbol and data source.
@@ -99,22 +719,46 @@ def delete_stock_data(
         return schemas.Message(message=f"No stock prices found for symbol {symbol.upper()} from source '{data_source}' to delete.")
     return schemas.Message(message=f"Successfully deleted {num_deleted} entries for symbol {symbol.upper()} from source '{data_source}'.")
 
+@router.post("/archive", response_model=schemas.StockPriceArchiveResult,
+             summary="Archive Old Stock Prices to Cold Storage",
+             dependencies=[Depends(auth.get_current_active_superuser)])
+def archive_stock_prices(
+    db: Annotated[Session, Depends(get_db)],
+    horizon_days: Optional[int] = Query(None, ge=366, description="Archive whole years of bars older than this many days (default COLD_STORAGE_HORIZON_DAYS)"),
+):
+    """
+    Moves old daily bars out of the stock_prices table into per-symbol, per-year Parquet files.
+    Requires superuser privileges and COLD_STORAGE_DIR. Price reads (GET /stocks/{symbol}, its stream and the
+    multi-symbol read), interval bars, indicators and the array-based analytics keep seeing the archived bars.
+    Screens use symbol_stats, which reads the bars left in the table over about the last year.
+    """
+    horizon_days = horizon_days if horizon_days is not None else settings.COLD_STORAGE_HORIZON_DAYS
+    try:
+        moved = crud.archive_stock_prices(db, horizon_days)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return schemas.StockPriceArchiveResult(
+        message=f"Archived {sum(moved.values())} rows of {len(moved)} symbols.",
+        archived_before=cold_storage.cutoff_date(horizon_days), symbols=len(moved), rows=sum(moved.values()),
+    )
+
 # Need to import the service
 from backend.services.financial_data_service import alpha_vantage_service
 
 @router.post("/fetch/{symbol}",
-             response_model=schemas.Message, # Or List[schemas.StockPricePublic] to return the fetched data
+             response_model=schemas.StockPriceUpsertResult,
              summary="Fetch and Store Stock Data from Alpha Vantage",
              dependencies=[Depends(auth.get_current_active_superuser)])
 def fetch_and_store_stock_data(
     symbol: str,
     db: Annotated[Session, Depends(get_db)],
     output_size: str = Query("compact", enum=["compact", "full"], description="Output size for Alpha Vantage (compact: 100 points, full: all data)"),
-    refresh_data: bool = Query(True, description="Delete existing data from AlphaVantage for this symbol before fetching new data.")
+    refresh_data: bool = Query(True, description="Overwrite existing AlphaVantage rows whose values changed. If false, only dates not yet stored are added.")
 ):
     """
     Fetches daily adjusted stock data for the given symbol from Alpha Vantage
-    and stores it in the database. Requires superuser privileges.
+    and upserts it into the database. Requires superuser privileges.
+    Re-fetching is idempotent: only new or changed bars are written.
     """
     try:
         fetched_prices_schemes = alpha_vantage_service.get_daily_adjusted_stock_data(
@@ -129,22 +773,28 @@ def fetch_and_store_stock_data(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An unexpected error occurred while fetching data: {str(e)}")
 
     if not fetched_prices_schemes:
-        return schemas.Message(message=f"No data fetched from Alpha Vantage for symbol {symbol.upper()}. Nothing stored.")
+        return schemas.StockPriceUpsertResult(message=f"No data fetched from Alpha Vantage for symbol {symbol.upper()}. Nothing stored.")
 
-    if refresh_data:
-        crud.delete_stock_prices_by_symbol_and_source(db=db, symbol=symbol.upper(), data_source="AlphaVantage")
-
-    # Prepare for bulk creation
+    # Prepare for bulk upsert
     bulk_create_input = schemas.StockPriceBulkCreate(
         prices=fetched_prices_schemes,
         # data_source="AlphaVantage" # This is now set within each StockPriceCreate object by the service
     )
 
     try:
-        stored_prices = crud.create_stock_prices_bulk(db=db, prices_in=bulk_create_input)
+        counts = crud.upsert_stock_prices(db=db, prices_in=bulk_create_input, overwrite=refresh_data)
     except Exception as e:
-        # Handle potential DB errors during bulk insert
-        # Log e
+        # Handle potential DB errors during the upsert
+        db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error storing fetched data: {str(e)}")
 
-    return schemas.Message(message=f"Successfully fetched and stored {len(stored_prices)} data points for symbol {symbol.upper()} from Alpha Vantage.")
+    # Only inserted and updated rows were written; an unchanged re-fetch stores nothing
+    written = counts["inserted"] + counts["updated"]
+    return schemas.StockPriceUpsertResult(
+        message=(
+            f"Fetched {len(fetched_prices_schemes)} data points for symbol {symbol.upper()} from Alpha Vantage: "
+            f"{counts['inserted']} inserted, {counts['updated']} updated, {counts['unchanged']} unchanged"
+            f"{'' if written else ' (nothing stored)'}."
+        ),
+        **counts
+    )
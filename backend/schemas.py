@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List # Added List
+from typing import Optional, List, Dict # Added List
 import datetime
 
 # --- User Schemas ---
@@ -69,6 +69,257 @@ class StockPricePublic(StockPriceBase):
 
     model_config = {"from_attributes": True}
 
+class StockPricePartial(BaseModel):
+    """A StockPricePublic restricted to a sparse fieldset (`fields=date,close`); unrequested fields are omitted."""
+    id: Optional[int] = None
+    symbol: Optional[str] = None
+    date: Optional[datetime.date] = None
+    open: Optional[float] = None
+    high: Optional[float] = None
+    low: Optional[float] = None
+    close: Optional[float] = None
+    volume: Optional[int] = None
+    data_source: Optional[str] = None
+    created_at: Optional[datetime.datetime] = None
+
 class StockPriceBulkCreate(BaseModel):
     prices: List[StockPriceCreate]
     data_source: Optional[str] = Field(None, description="Common data source for all prices in the bulk load")
+
+class StockPriceUpsertResult(Message):
+    inserted: int = Field(0, description="Rows that did not exist before and were inserted")
+    updated: int = Field(0, description="Existing rows whose values changed and were overwritten")
+    unchanged: int = Field(0, description="Existing rows that already matched and were not written")
+
+class SymbolSummary(BaseModel):
+    """Range statistics of one symbol's daily bars; returns are log returns, volatility is annualized."""
+    symbol: str
+    bars: int
+    start_date: datetime.date
+    end_date: datetime.date
+    first_close: float
+    last_close: float
+    total_return: float = Field(..., description="last_close / first_close - 1")
+    volatility: Optional[float] = Field(None, description="Annualized standard deviation of daily log returns (null with fewer than 3 bars)")
+    max_drawdown: float = Field(..., description="Largest fall from a running peak close, as a fraction (<= 0)")
+    avg_volume: float
+    high: float
+    low: float
+
+class MarketBreadth(BaseModel):
+    """Cross-symbol figures of one trading date."""
+    date: datetime.date
+    symbols: int = Field(..., description="Symbols with a bar on the date")
+    advancers: int = Field(..., description="Symbols that closed above their previous bar")
+    decliners: int = Field(..., description="Symbols that closed below their previous bar")
+    mean_return: Optional[float] = Field(None, description="Equal-weighted mean log return (null when no symbol has a previous bar)")
+    volume: int
+
+class RollingMetrics(BaseModel):
+    """One bar of a symbol with its log return and trailing-window metrics (null until the window is full)."""
+    symbol: str
+    date: datetime.date
+    close: float
+    log_return: Optional[float] = None
+    momentum: Optional[float] = Field(None, description="close / close `window` bars earlier - 1")
+    volatility: Optional[float] = Field(None, description="Annualized standard deviation of the last `window` log returns")
+
+class StockPriceArchiveResult(Message):
+    archived_before: datetime.date = Field(..., description="Bars dated before this day were moved to cold storage")
+    symbols: int = Field(0, description="Symbols that had bars to archive")
+    rows: int = Field(0, description="Rows moved out of stock_prices")
+
+class StockPriceColumnar(BaseModel):
+    """Column-oriented price series: fields shared by every row are sent once, values as parallel arrays."""
+    symbol: str
+    data_source: Optional[str] = Field(None, description="Source shared by every row (null when rows come from several sources)")
+    dates: List[datetime.date] = Field(default_factory=list)
+    open: List[float] = Field(default_factory=list)
+    high: List[float] = Field(default_factory=list)
+    low: List[float] = Field(default_factory=list)
+    close: List[float] = Field(default_factory=list)
+    volume: List[int] = Field(default_factory=list)
+    data_sources: Optional[List[Optional[str]]] = Field(None, description="Per-row sources, only present when rows mix sources")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, if more rows remain")
+
+class StockPriceColumnarBatch(BaseModel):
+    """Several columnar series from one multi-symbol read, in the order the symbols were requested."""
+    series: List[StockPriceColumnar] = Field(default_factory=list)
+
+class StockIndicators(BaseModel):
+    """Technical indicator series aligned with `dates` (oldest first); null where there is not enough history yet."""
+    symbol: str
+    interval: str
+    dates: List[datetime.date] = Field(default_factory=list)
+    close: List[float] = Field(default_factory=list)
+    indicators: Dict[str, List[Optional[float]]] = Field(default_factory=dict, description="Series per output, e.g. rsi, macd, macd_signal, macd_hist, bb_upper")
+
+class RiskSummary(BaseModel):
+    """Risk figures over a date range. Returns are log returns; VaR and expected shortfall are positive one-bar losses."""
+    symbol: str
+    bars: int
+    start_date: Optional[datetime.date] = None
+    end_date: Optional[datetime.date] = None
+    total_return: Optional[float] = None
+    volatility: Optional[float] = Field(None, description="Annualized volatility of the returns over the whole range")
+    rolling_volatility: Dict[str, Optional[float]] = Field(default_factory=dict, description="Latest annualized volatility per window (bars)")
+    max_drawdown: Optional[float] = Field(None, description="Largest peak-to-trough decline of the close, e.g. -0.25")
+    max_drawdown_peak: Optional[datetime.date] = None
+    max_drawdown_trough: Optional[datetime.date] = None
+    confidence: float
+    var_historical: Optional[float] = Field(None, description="Empirical loss quantile of the returns at `confidence`")
+    var_parametric: Optional[float] = Field(None, description="Gaussian (mean/std) VaR at `confidence`")
+    expected_shortfall: Optional[float] = Field(None, description="Mean loss beyond the historical VaR")
+
+class StockRisk(BaseModel):
+    """Risk summary plus per-bar series aligned with `dates` (the second bar onwards); null until a window is full."""
+    symbol: str
+    interval: str
+    summary: RiskSummary
+    dates: List[datetime.date] = Field(default_factory=list)
+    returns: List[float] = Field(default_factory=list)
+    drawdown: List[float] = Field(default_factory=list)
+    rolling_volatility: Dict[str, List[Optional[float]]] = Field(default_factory=dict, description="Annualized volatility series per window")
+    rolling_var: Dict[str, List[Optional[float]]] = Field(default_factory=dict, description="Historical VaR series per window")
+
+class StockRiskBatch(BaseModel):
+    """Risk summaries of several symbols, in the order the symbols were requested."""
+    interval: str
+    results: List[RiskSummary] = Field(default_factory=list)
+
+class StockCorrelation(BaseModel):
+    """Log-return covariance and correlation matrices; rows and columns follow `symbols`. null where undefined."""
+    symbols: List[str] = Field(default_factory=list, description="Requested symbols with data in the range, in request order")
+    missing: List[str] = Field(default_factory=list, description="Requested symbols without data in the range (left out of the matrices)")
+    interval: str
+    start_date: Optional[datetime.date] = Field(None, description="First date all symbols have a bar for")
+    end_date: Optional[datetime.date] = None
+    observations: int = Field(..., description="Returns per symbol the matrices are computed from")
+    covariance: List[List[Optional[float]]] = Field(default_factory=list)
+    correlation: List[List[Optional[float]]] = Field(default_factory=list)
+
+class AsOfQuery(BaseModel):
+    symbol: str
+    date: datetime.date
+
+class AsOfRequest(BaseModel):
+    queries: List[AsOfQuery] = Field(..., max_length=100_000, description="(symbol, date) pairs to price")
+
+class AsOfPrice(BaseModel):
+    symbol: str
+    date: datetime.date = Field(..., description="The requested date")
+    price_date: Optional[datetime.date] = Field(None, description="The trading day the close is from: the requested date or the last one before it")
+    close: Optional[float] = Field(None, description="null when the symbol has no bar on or before the date")
+
+class AsOfResponse(BaseModel):
+    results: List[AsOfPrice] = Field(default_factory=list, description="One result per query, in request order")
+
+class LatestQuote(BaseModel):
+    """Newest daily bar of a symbol with its change against the previous trading day."""
+    symbol: str
+    date: datetime.date
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int
+    data_source: Optional[str] = None
+    prev_date: Optional[datetime.date] = None
+    prev_close: Optional[float] = None
+    change: Optional[float] = None
+    change_pct: Optional[float] = Field(None, description="close / prev_close - 1")
+
+class SymbolStats(BaseModel):
+    """Screening figures from the latest year of daily bars; percentages are fractions (-0.02 is -2%)."""
+    symbol: str
+    last_date: datetime.date
+    last_close: float
+    prev_close: Optional[float] = None
+    change_pct: Optional[float] = None
+    last_volume: int
+    avg_volume_20: Optional[float] = Field(None, description="Mean volume of the 20 bars before the last one")
+    avg_volume_50: Optional[float] = None
+    volume_ratio_20: Optional[float] = Field(None, description="last_volume / avg_volume_20")
+    high_52w: float
+    low_52w: float
+    pct_from_high_52w: float = Field(..., description="last_close / high_52w - 1")
+    pct_from_low_52w: float = Field(..., description="last_close / low_52w - 1")
+    return_1w: Optional[float] = None
+    return_1m: Optional[float] = None
+    return_3m: Optional[float] = None
+    return_6m: Optional[float] = None
+    return_1y: Optional[float] = None
+    return_ytd: Optional[float] = None
+
+# --- Backtest Schemas ---
+class BacktestRequest(BaseModel):
+    strategy: str = Field(..., description="buy_and_hold, ma_crossover (fast, slow) or rsi (window, lower, upper)")
+    params: Dict[str, float] = Field(default_factory=dict, description="Strategy parameters; omitted ones use their defaults")
+    start_date: Optional[datetime.date] = None
+    end_date: Optional[datetime.date] = None
+    interval: str = Field("1d", description="Bar size the strategy trades on")
+    cost_bps: float = Field(0.0, ge=0, le=1000, description="Cost per change of position, in basis points")
+
+class BacktestSweepRequest(BaseModel):
+    strategy: str = Field(..., description="buy_and_hold, ma_crossover (fast, slow) or rsi (window, lower, upper)")
+    grid: Dict[str, List[float]] = Field(..., description="Values per parameter; every valid combination is run, e.g. {\"fast\": [10, 20], \"slow\": [50, 100, 200]}")
+    start_date: Optional[datetime.date] = None
+    end_date: Optional[datetime.date] = None
+    interval: str = Field("1d", description="Bar size the strategy trades on")
+    cost_bps: float = Field(0.0, ge=0, le=1000, description="Cost per change of position, in basis points")
+    sort_by: str = Field("sharpe", description="Summary field the results are ranked by, best first")
+    top: Optional[int] = Field(None, ge=1, description="Return only the best `top` parameter sets")
+
+class BacktestSummary(BaseModel):
+    total_return: Optional[float] = None
+    cagr: Optional[float] = Field(None, description="Compound annual growth rate")
+    volatility: Optional[float] = Field(None, description="Annualized volatility of the strategy's returns")
+    sharpe: Optional[float] = Field(None, description="Annualized Sharpe ratio with a zero risk-free rate")
+    max_drawdown: Optional[float] = None
+    exposure: Optional[float] = Field(None, description="Fraction of bars with a position")
+    trades: int = 0
+    win_rate: Optional[float] = None
+
+class BacktestTrade(BaseModel):
+    entry_date: datetime.date
+    entry_price: float
+    exit_date: datetime.date
+    exit_price: float
+    return_: float = Field(..., alias="return", description="Net of costs")
+    open: bool = Field(False, description="Still held at the last bar (marked to market)")
+
+class BacktestResult(BaseModel):
+    """Equity curve (starting at 1.0) and position aligned with `dates`, plus trades and summary."""
+    symbol: str
+    strategy: str
+    params: Dict[str, float] = Field(default_factory=dict)
+    interval: str
+    summary: BacktestSummary
+    dates: List[datetime.date] = Field(default_factory=list)
+    equity: List[float] = Field(default_factory=list)
+    position: List[int] = Field(default_factory=list)
+    trades: List[BacktestTrade] = Field(default_factory=list)
+
+class BacktestSweepEntry(BaseModel):
+    params: Dict[str, float]
+    summary: BacktestSummary
+
+class BacktestSweepResult(BaseModel):
+    symbol: str
+    strategy: str
+    interval: str
+    start_date: datetime.date
+    end_date: datetime.date
+    bars: int
+    evaluated: int = Field(..., description="Valid parameter sets run (invalid grid combinations are skipped)")
+    results: List[BacktestSweepEntry] = Field(default_factory=list)
+
+class PriceCacheStats(BaseModel):
+    hits: int
+    misses: int
+    evictions: int = Field(..., description="Entries dropped to stay within the memory budget")
+    invalidations: int = Field(..., description="Entries dropped because a writer changed their symbol")
+    entries: int
+    current_bytes: int = Field(..., description="Approximate memory held by cached pages")
+    max_bytes: int
+    ttl_seconds: float
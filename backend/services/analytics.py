@@ -0,0 +1,139 @@
+import numpy as np
+import pyarrow as pa
+
+from backend.services import arrow_export, risk
+
+# Cross-symbol aggregates over daily bars, as Arrow tables: per-symbol range summaries, daily market breadth and
+# rolling metrics. Inputs are chronological per-symbol arrays (crud.get_analytics_arrays) holding id, date, high,
+# low, close and volume, with one bar per date (the newest row when several data sources share a date).
+# Returns are log returns between a symbol's consecutive bars in the range; volatilities are annualized.
+# backend.duckdb_analytics computes the same tables in SQL, with the same schemas.
+
+PERIODS_PER_YEAR = risk.PERIODS_PER_YEAR["1d"]
+INPUT_COLUMNS = ("id", "high", "low", "close", "volume")
+DEFAULT_WINDOW = 20
+
+SUMMARY_SCHEMA = pa.schema([
+    ("symbol", pa.string()),
+    ("bars", pa.int64()),
+    ("start_date", pa.date32()),
+    ("end_date", pa.date32()),
+    ("first_close", pa.float64()),
+    ("last_close", pa.float64()),
+    ("total_return", pa.float64()),
+    ("volatility", pa.float64()),
+    ("max_drawdown", pa.float64()),
+    ("avg_volume", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+])
+BREADTH_SCHEMA = pa.schema([
+    ("date", pa.date32()),
+    ("symbols", pa.int64()), # Symbols with a bar on the date
+    ("advancers", pa.int64()),
+    ("decliners", pa.int64()),
+    ("mean_return", pa.float64()), # Equal-weighted mean log return of the symbols with a previous bar
+    ("volume", pa.int64()),
+])
+ROLLING_SCHEMA = pa.schema([
+    arrow_export.SYMBOL_FIELD,
+    ("date", pa.date32()),
+    ("close", pa.float64()),
+    ("log_return", pa.float64()),
+    ("momentum", pa.float64()), # close / close `window` bars earlier - 1
+    ("volatility", pa.float64()), # Over the last `window` returns
+])
+
+def _bar_returns(close: np.ndarray) -> np.ndarray:
+    """Log return of every bar against the previous one, aligned with `close` (NaN for the first bar)."""
+    return np.concatenate(([np.nan], risk.log_returns(close))) if len(close) else close
+
+def _table(schema: pa.Schema, columns: dict[str, list | np.ndarray]) -> pa.Table:
+    """Arrow table with NaN floats as nulls (what SQL aggregates of no values return)."""
+    arrays = []
+    for field in schema:
+        values = columns[field.name]
+        if pa.types.is_floating(field.type):
+            values = np.asarray(values, dtype=np.float64)
+            arrays.append(pa.array(values, type=field.type, mask=np.isnan(values)))
+        elif pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def summary_table(series: dict[str, dict[str, np.ndarray]]) -> pa.Table:
+    """One row per symbol with bars (symbol order): range, first/last close, total return, volatility, drawdown, volume, extremes."""
+    columns = {name: [] for name in SUMMARY_SCHEMA.names}
+    for symbol in sorted(series):
+        arrays = series[symbol]
+        close = arrays["close"]
+        if not len(close):
+            continue
+        returns = risk.log_returns(close)
+        for name, value in (
+            ("symbol", symbol), ("bars", len(close)), ("start_date", arrays["date"][0]), ("end_date", arrays["date"][-1]),
+            ("first_close", close[0]), ("last_close", close[-1]), ("total_return", close[-1] / close[0] - 1.0),
+            ("volatility", returns.std(ddof=1) * np.sqrt(PERIODS_PER_YEAR) if len(returns) >= 2 else np.nan),
+            ("max_drawdown", risk.drawdown(close).min()), ("avg_volume", arrays["volume"].mean()),
+            ("high", arrays["high"].max()), ("low", arrays["low"].min()),
+        ):
+            columns[name].append(value)
+    columns["start_date"] = np.array(columns["start_date"], dtype="datetime64[D]")
+    columns["end_date"] = np.array(columns["end_date"], dtype="datetime64[D]")
+    return _table(SUMMARY_SCHEMA, columns)
+
+def breadth_table(series: dict[str, dict[str, np.ndarray]]) -> pa.Table:
+    """One row per date any symbol has a bar on: bar count, advancers/decliners, mean return and total volume."""
+    bars = list(series.values())
+    if not bars:
+        return BREADTH_SCHEMA.empty_table()
+    dates = np.concatenate([arrays["date"] for arrays in bars])
+    returns = np.concatenate([_bar_returns(arrays["close"]) for arrays in bars])
+    volumes = np.concatenate([arrays["volume"] for arrays in bars])
+    unique_dates, position = np.unique(dates, return_inverse=True)
+    n = len(unique_dates)
+    has_return = ~np.isnan(returns)
+    counted = np.bincount(position[has_return], minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_return = np.bincount(position[has_return], weights=returns[has_return], minlength=n) / counted
+    return _table(BREADTH_SCHEMA, {
+        "date": unique_dates,
+        "symbols": np.bincount(position, minlength=n),
+        "advancers": np.bincount(position[has_return & (returns > 0)], minlength=n),
+        "decliners": np.bincount(position[has_return & (returns < 0)], minlength=n),
+        "mean_return": mean_return,
+        "volume": np.bincount(position, weights=volumes, minlength=n).round().astype(np.int64),
+    })
+
+def rolling_table(series: dict[str, dict[str, np.ndarray]], window: int = DEFAULT_WINDOW) -> pa.Table:
+    """Every bar of every symbol (symbol, then date order) with its log return, `window`-bar momentum and rolling volatility."""
+    columns = {name: [] for name in ROLLING_SCHEMA.names}
+    for symbol in sorted(series):
+        arrays = series[symbol]
+        close = arrays["close"]
+        n = len(close)
+        if not n:
+            continue
+        momentum = np.full(n, np.nan)
+        momentum[window:] = close[window:] / close[:-window] - 1.0 # Empty when window >= n
+        volatility = np.full(n, np.nan)
+        volatility[1:] = risk.rolling_volatility(risk.log_returns(close), (window,), PERIODS_PER_YEAR)[window]
+        for name, values in (
+            ("symbol", np.full(n, symbol)), ("date", arrays["date"]), ("close", close), ("log_return", _bar_returns(close)),
+            ("momentum", momentum), ("volatility", volatility),
+        ):
+            columns[name].append(values)
+    if not columns["symbol"]:
+        return ROLLING_SCHEMA.empty_table()
+    return _table(ROLLING_SCHEMA, {name: np.concatenate(parts) for name, parts in columns.items()})
+
+def table_to_records(table: pa.Table) -> list[dict]:
+    """JSON-ready rows of an analytics table (ISO dates, nulls as None)."""
+    date_columns = [field.name for field in table.schema if pa.types.is_date(field.type)]
+    records = table.to_pylist()
+    for record in records:
+        for name in date_columns:
+            if record[name] is not None:
+                record[name] = record[name].isoformat()
+    return records
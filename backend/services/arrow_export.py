@@ -0,0 +1,60 @@
+import io
+from typing import Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Binary export formats for price series. Content types follow the Arrow project's registrations.
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/x-parquet"
+
+PRICE_SCHEMA = pa.schema([
+    ("date", pa.date32()),
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.int64()),
+    ("data_source", pa.dictionary(pa.int32(), pa.string())),
+])
+PRICE_COLUMNS = tuple(PRICE_SCHEMA.names)
+# Multi-symbol tables carry the symbol as a (dictionary-encoded) leading column instead of metadata
+SYMBOL_FIELD = pa.field("symbol", pa.dictionary(pa.int32(), pa.string()))
+
+def _rows_to_arrays(schema: pa.Schema, rows: list) -> list[pa.Array]:
+    columns = dict(zip(rows[0]._fields, zip(*rows))) if rows else {}
+    arrays = []
+    for field in schema:
+        values = columns.get(field.name, ())
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return arrays
+
+def price_rows_to_table(symbol: str, rows: list, next_cursor: Optional[str] = None, fields: tuple[str, ...] = PRICE_COLUMNS) -> pa.Table:
+    """
+    Builds a typed Arrow table from Core rows (crud.get_stock_price_rows) holding `fields`, a subset of PRICE_COLUMNS.
+    The symbol (and the pagination cursor, if any) go into the schema metadata rather than a repeated column.
+    """
+    schema = pa.schema([PRICE_SCHEMA.field(name) for name in fields])
+    metadata = {"symbol": symbol}
+    if next_cursor:
+        metadata["next_cursor"] = next_cursor
+    return pa.Table.from_arrays(_rows_to_arrays(schema, rows), schema=schema.with_metadata(metadata))
+
+def batch_rows_to_table(rows: list, fields: tuple[str, ...] = PRICE_COLUMNS) -> pa.Table:
+    """One Arrow table for several symbols (crud.get_stock_price_rows_for_symbols): a symbol column followed by `fields`."""
+    schema = pa.schema([SYMBOL_FIELD] + [PRICE_SCHEMA.field(name) for name in fields])
+    return pa.Table.from_arrays(_rows_to_arrays(schema, rows), schema=schema)
+
+def table_to_arrow_stream(table: pa.Table) -> bytes:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def table_to_parquet(table: pa.Table) -> bytes:
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression="zstd")
+    return buffer.getvalue()
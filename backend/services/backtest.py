@@ -0,0 +1,157 @@
+import itertools
+from typing import Optional
+
+import numpy as np
+
+from backend.services import indicators
+
+# Vectorized long-only backtests over chronological close arrays.
+# Every parameter set is one row of a (sets x bars) matrix, so a sweep evaluates signals, positions, equity and
+# statistics as whole-array operations instead of looping per bar and per set.
+# Signals are taken on a bar's close and acted on at that close: the position is held from the next bar on, so a
+# signal never uses the return it is trading. Costs are charged on every change of position.
+
+# Parameters of each strategy with their defaults
+STRATEGIES = {
+    "buy_and_hold": {},
+    "ma_crossover": {"fast": 20, "slow": 50}, # Long while SMA(fast) > SMA(slow)
+    "rsi": {"window": 14, "lower": 30.0, "upper": 70.0}, # Enter when RSI < lower, exit when RSI > upper
+}
+WINDOW_PARAMS = {"fast", "slow", "window"}
+MAX_SWEEP_SETS = 1000
+MIN_BARS = 3
+SUMMARY_FIELDS = ("total_return", "cagr", "volatility", "sharpe", "max_drawdown", "exposure", "trades", "win_rate")
+LOWER_IS_BETTER = {"volatility"}
+
+def validate_params(strategy: str, params: dict) -> dict:
+    """Defaults filled in and windows as ints. Raises ValueError for unknown strategies, parameters or invalid values."""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'. Use one of: {', '.join(STRATEGIES)}.")
+    unknown = set(params) - set(STRATEGIES[strategy])
+    if unknown:
+        raise ValueError(f"Unknown parameter(s) for {strategy}: {', '.join(sorted(unknown))}.")
+    merged = {**STRATEGIES[strategy], **params}
+    for name in WINDOW_PARAMS & set(merged):
+        if merged[name] != int(merged[name]) or not 2 <= merged[name] <= 1000:
+            raise ValueError(f"{name} must be an integer from 2 to 1000.")
+        merged[name] = int(merged[name])
+    if strategy == "ma_crossover" and merged["fast"] >= merged["slow"]:
+        raise ValueError("fast must be shorter than slow.")
+    if strategy == "rsi" and not 0 <= merged["lower"] < merged["upper"] <= 100:
+        raise ValueError("RSI thresholds need 0 <= lower < upper <= 100.")
+    return merged
+
+def expand_grid(strategy: str, grid: dict[str, list]) -> list[dict]:
+    """
+    Every combination of the grid's values (other parameters at their defaults), in grid order. Invalid
+    combinations such as fast >= slow are skipped. Raises ValueError for unknown names or oversized grids.
+    """
+    validate_params(strategy, {}) # Unknown strategy
+    unknown = set(grid) - set(STRATEGIES[strategy])
+    if unknown:
+        raise ValueError(f"Unknown parameter(s) for {strategy}: {', '.join(sorted(unknown))}.")
+    names = list(grid)
+    combinations = list(itertools.product(*(grid[name] for name in names)))
+    if len(combinations) > MAX_SWEEP_SETS:
+        raise ValueError(f"The grid has {len(combinations)} parameter sets; at most {MAX_SWEEP_SETS} are allowed.")
+    param_sets = []
+    for values in combinations:
+        try:
+            param_sets.append(validate_params(strategy, dict(zip(names, values))))
+        except ValueError:
+            continue
+    return param_sets
+
+def _signals(strategy: str, close: np.ndarray, param_sets: list[dict]) -> np.ndarray:
+    """(sets x bars) bool matrix: whether the strategy wants to be long after each bar's close."""
+    if strategy == "buy_and_hold":
+        return np.ones((len(param_sets), len(close)), dtype=bool)
+    if strategy == "ma_crossover":
+        averages = {w: indicators.sma(close, w) for w in {p[k] for p in param_sets for k in ("fast", "slow")}}
+        fast = np.stack([averages[p["fast"]] for p in param_sets])
+        slow = np.stack([averages[p["slow"]] for p in param_sets])
+        return fast > slow # NaN (not enough history) compares False
+    if strategy == "rsi":
+        values = {w: indicators.rsi(close, w) for w in {p["window"] for p in param_sets}}
+        rsi = np.stack([values[p["window"]] for p in param_sets])
+        enter = rsi < np.array([[p["lower"]] for p in param_sets])
+        leave = rsi > np.array([[p["upper"]] for p in param_sets])
+        # Hold the state of the latest enter/exit event: forward-fill its index along each row
+        bars = np.arange(len(close))
+        last_event = np.maximum.accumulate(np.where(enter | leave, bars, -1), axis=1)
+        return (last_event >= 0) & np.take_along_axis(enter, np.maximum(last_event, 0), axis=1)
+    raise ValueError(f"Unknown strategy '{strategy}'.")
+
+def run(strategy: str, close: np.ndarray, param_sets: list[dict], cost_bps: float = 0.0, periods_per_year: int = 252) -> dict:
+    """
+    Backtests every parameter set over `close` (at least MIN_BARS bars). Returns (sets x bars) "position" and
+    "equity" (starting at 1.0) matrices, per-set "summary" arrays (SUMMARY_FIELDS) and the trades as parallel arrays:
+    "trade_set", "trade_entry" (signal bar), "trade_exit" (last bar held) and "trade_return" (net of costs).
+    """
+    close = np.asarray(close, dtype=np.float64)
+    sets, n = len(param_sets), len(close)
+    if n < MIN_BARS:
+        raise ValueError(f"A backtest needs at least {MIN_BARS} bars of price history ({n} found).")
+    position = np.zeros((sets, n), dtype=np.int8)
+    position[:, 1:] = _signals(strategy, close, param_sets)[:, :-1] # Held from the bar after the signal
+    bar_returns = np.zeros(n)
+    bar_returns[1:] = close[1:] / close[:-1] - 1.0
+    turnover = np.abs(np.diff(position, axis=1, prepend=0))
+    returns = position * bar_returns - turnover * (cost_bps / 10_000)
+    equity = np.cumprod(1.0 + returns, axis=1)
+
+    # Trades are runs of held bars; starts and ends pair up in row-major order
+    previous = np.pad(position[:, :-1], ((0, 0), (1, 0)))
+    following = np.pad(position[:, 1:], ((0, 0), (0, 1)))
+    trade_set, trade_start = np.nonzero((position == 1) & (previous == 0))
+    _rows, trade_end = np.nonzero((position == 1) & (following == 0))
+    # Up to the bar after the last one held, so the exit cost is included
+    trade_return = equity[trade_set, np.minimum(trade_end + 1, n - 1)] / equity[trade_set, trade_start - 1] - 1.0
+
+    trades = np.bincount(trade_set, minlength=sets)
+    wins = np.bincount(trade_set[trade_return > 0], minlength=sets)
+    period_returns = returns[:, 1:]
+    mean, std = period_returns.mean(axis=1), period_returns.std(axis=1, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        summary = {
+            "total_return": equity[:, -1] - 1.0,
+            "cagr": equity[:, -1] ** (periods_per_year / (n - 1)) - 1.0,
+            "volatility": std * np.sqrt(periods_per_year),
+            "sharpe": np.where(std > 0, mean / std * np.sqrt(periods_per_year), np.nan),
+            "max_drawdown": (equity / np.maximum.accumulate(equity, axis=1) - 1.0).min(axis=1),
+            "exposure": position.mean(axis=1),
+            "trades": trades,
+            "win_rate": np.where(trades > 0, wins / np.maximum(trades, 1), np.nan),
+        }
+    return {
+        "position": position, "equity": equity, "summary": summary,
+        "trade_set": trade_set, "trade_entry": trade_start - 1, "trade_exit": trade_end, "trade_return": trade_return,
+    }
+
+def summary_of(result: dict, index: int) -> dict:
+    """Plain-Python summary of one parameter set (NaN as None)."""
+    values = {}
+    for field in SUMMARY_FIELDS:
+        value = result["summary"][field][index].item()
+        values[field] = None if isinstance(value, float) and np.isnan(value) else value
+    return values
+
+def trades_of(result: dict, index: int, dates: np.ndarray, close: np.ndarray) -> list[dict]:
+    """Trades of one parameter set; a trade still open at the last bar has open=True and is marked to market."""
+    selected = result["trade_set"] == index
+    last = len(close) - 1
+    return [
+        {
+            "entry_date": str(dates[entry]), "entry_price": float(close[entry]),
+            "exit_date": str(dates[exit_]), "exit_price": float(close[exit_]),
+            "return": float(ret), "open": bool(exit_ == last),
+        }
+        for entry, exit_, ret in zip(result["trade_entry"][selected], result["trade_exit"][selected], result["trade_return"][selected])
+    ]
+
+def sort_key(field: str, summary: dict) -> tuple:
+    """Sort key for sweep results: best `field` first (highest, or lowest for LOWER_IS_BETTER), missing values last."""
+    value: Optional[float] = summary[field]
+    if value is None:
+        return (True, 0.0)
+    return (False, value if field in LOWER_IS_BETTER else -value)
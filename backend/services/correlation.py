@@ -0,0 +1,40 @@
+import numpy as np
+
+# Cross-symbol return correlation and covariance over NumPy arrays.
+# Series are aligned on the dates every symbol has a bar for; returns are log returns between consecutive
+# common dates, and the matrices come from one product of the (dates x symbols) return matrix with itself.
+
+def align_closes(series: list[tuple[np.ndarray, np.ndarray]]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Common dates of chronological (dates, close) series with one bar per date (crud.last_bar_per_date) and a
+    (dates x series) close matrix on them. A date is kept only when every series has a bar on it.
+    """
+    if not series:
+        return np.array([], dtype="datetime64[D]"), np.empty((0, 0))
+    all_dates, counts = np.unique(np.concatenate([dates for dates, _close in series]), return_counts=True)
+    common = all_dates[counts == len(series)]
+    matrix = np.empty((len(common), len(series)))
+    for i, (dates, close) in enumerate(series):
+        matrix[:, i] = close[np.searchsorted(dates, common)]
+    return common, matrix
+
+def return_matrices(closes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sample covariance (ddof=1) and Pearson correlation of the log returns of a (dates x symbols) close matrix.
+    Symbols whose returns never vary get NaN correlations, including with themselves.
+    """
+    n = closes.shape[1]
+    returns = np.diff(np.log(closes), axis=0)
+    if len(returns) < 2:
+        return np.full((n, n), np.nan), np.full((n, n), np.nan)
+    centered = returns - returns.mean(axis=0)
+    covariance = centered.T @ centered / (len(returns) - 1)
+    std = np.sqrt(np.diag(covariance))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlation = np.clip(covariance / np.outer(std, std), -1.0, 1.0)
+    correlation[np.diag_indices(n)] = np.where(std > 0, 1.0, np.nan) # Exactly 1 despite rounding
+    return covariance, correlation
+
+def to_json_matrix(matrix: np.ndarray) -> list:
+    """Nested lists of plain floats with NaN as None."""
+    return np.where(np.isnan(matrix), None, matrix).tolist()
@@ -0,0 +1,96 @@
+from collections import namedtuple
+from typing import Sequence
+
+import numpy as np
+
+# Chart-oriented reduction of price series to at most `max_points` rows.
+# - lttb: Largest-Triangle-Three-Buckets picks real rows that preserve the shape of one value series (line charts).
+# - ohlc: contiguous buckets are merged into one candle each (first open, max high, min low, last close, summed volume).
+# Input rows are Core rows as returned by crud.get_stock_price_rows (newest first); output keeps that order and
+# the rows' fields, so price_format / arrow_export serialize them like any other page.
+
+DOWNSAMPLE_MODES = ("ohlc", "lttb")
+
+def _bucket_starts(n: int, buckets: int) -> np.ndarray:
+    """Start offsets of `buckets` contiguous, near-equal buckets covering range(n)."""
+    return np.unique(np.linspace(0, n, buckets + 1).astype(np.int64)[:-1])
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Indices of the points Largest-Triangle-Three-Buckets keeps from the series (x ascending).
+    The first and last points are always kept; each inner bucket contributes the point forming the largest
+    triangle with the previously kept point and the mean of the next bucket. Bucket means are computed in one
+    vectorized pass; only the (inherently sequential) selection loops over buckets.
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+    # Inner buckets split the points between the first and the last one
+    starts = _bucket_starts(n - 2, max_points - 2) + 1
+    ends = np.append(starts[1:], n - 1)
+    counts = ends - starts
+    mean_x = np.add.reduceat(x[1:n - 1], starts - 1) / counts
+    mean_y = np.add.reduceat(y[1:n - 1], starts - 1) / counts
+    # The bucket after the last inner bucket is the final point
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(len(starts) + 2, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for b, (start, end) in enumerate(zip(starts, ends)):
+        xs, ys = x[start:end], y[start:end]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((x[a] - next_x[b]) * (ys - y[a]) - (x[a] - xs) * (next_y[b] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[b + 1] = a
+    return selected
+
+def lttb_rows(rows: Sequence, max_points: int, value_field: str = "close") -> list:
+    """The rows LTTB keeps for a line chart of `value_field` against date, newest first like the input."""
+    if len(rows) <= max_points:
+        return list(rows)
+    chronological = rows[::-1]
+    x = np.fromiter((row.date.toordinal() for row in chronological), dtype=np.float64, count=len(rows))
+    y = np.fromiter((getattr(row, value_field) for row in chronological), dtype=np.float64, count=len(rows))
+    return [chronological[i] for i in lttb_indices(x, y, max_points)[::-1]]
+
+# How each value column of a bucket is combined; any other field takes its value from the bucket's first row
+# (so `date` is the date the candle opens on)
+_OHLC_REDUCERS = {
+    "open": lambda values, starts, ends: values[starts],
+    "high": lambda values, starts, ends: np.maximum.reduceat(values, starts),
+    "low": lambda values, starts, ends: np.minimum.reduceat(values, starts),
+    "close": lambda values, starts, ends: values[ends - 1],
+    "volume": lambda values, starts, ends: np.add.reduceat(values, starts),
+}
+
+def ohlc_bucket_rows(rows: Sequence, max_points: int) -> list:
+    """
+    Merges chronologically contiguous rows into at most `max_points` candles, newest first like the input.
+    The extremes survive: every bucket's high/low is the max/min over all of its rows.
+    """
+    if len(rows) <= max_points:
+        return list(rows)
+    fields = rows[0]._fields
+    chronological = rows[::-1]
+    columns = dict(zip(fields, zip(*chronological)))
+    starts = _bucket_starts(len(rows), max_points)
+    ends = np.append(starts[1:], len(rows))
+    merged = {}
+    for field in fields:
+        reducer = _OHLC_REDUCERS.get(field)
+        if reducer is None:
+            merged[field] = [columns[field][i] for i in starts]
+        else:
+            values = np.asarray(columns[field], dtype=np.int64 if field == "volume" else np.float64)
+            merged[field] = reducer(values, starts, ends).tolist() # tolist(): native ints/floats for JSON
+    row_type = namedtuple("DownsampledRow", fields)
+    return [row_type(*values) for values in zip(*(merged[f] for f in fields))][::-1]
+
+def downsample_rows(rows: Sequence, max_points: int, mode: str = "ohlc") -> list:
+    if mode == "lttb":
+        return lttb_rows(rows, max_points)
+    if mode == "ohlc":
+        return ohlc_bucket_rows(rows, max_points)
+    raise ValueError(f"Unknown downsampling mode '{mode}'. Use one of: {', '.join(DOWNSAMPLE_MODES)}.")
@@ -0,0 +1,213 @@
+import numpy as np
+
+# Technical indicators over NumPy float64 arrays in chronological order (oldest first).
+# Every function returns arrays as long as its input; positions without enough history hold NaN.
+# Recursive smoothings (EMA, Wilder's RSI) are evaluated block-wise in closed form, so no function loops per bar.
+
+DEFAULT_WINDOWS = {"sma": 20, "ema": 20, "rsi": 14, "bollinger": 20}
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BOLLINGER_STD = 2.0
+
+# Output series produced by each indicator name
+INDICATOR_OUTPUTS = {
+    "sma": ("sma",),
+    "ema": ("ema",),
+    "rsi": ("rsi",),
+    "macd": ("macd", "macd_signal", "macd_hist"),
+    "bollinger": ("bb_middle", "bb_upper", "bb_lower"),
+}
+INDICATORS = tuple(INDICATOR_OUTPUTS)
+
+def parse_names(names: str) -> tuple[str, ...]:
+    """Parses `names=rsi,macd` into indicator names in INDICATORS order. Raises ValueError for unknown or empty lists."""
+    requested = {n.strip().lower() for n in names.split(",") if n.strip()}
+    unknown = requested - set(INDICATORS)
+    if unknown:
+        raise ValueError(f"Unknown indicator(s): {', '.join(sorted(unknown))}. Available: {', '.join(INDICATORS)}.")
+    if not requested:
+        raise ValueError("names must list at least one indicator.")
+    return tuple(n for n in INDICATORS if n in requested)
+
+def sma(values: np.ndarray, window: int) -> np.ndarray:
+    """Simple moving average over the last `window` values (cumulative-sum difference)."""
+    out = np.full(len(values), np.nan)
+    if window <= len(values):
+        cumsum = np.cumsum(np.insert(values, 0, 0.0))
+        out[window - 1:] = (cumsum[window:] - cumsum[:-window]) / window
+    return out
+
+def _exp_smooth(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    y[0] = x[0], y[t] = alpha * x[t] + (1 - alpha) * y[t-1] (pandas ewm(adjust=False)).
+    Within a block, y[s+j] = d^(j+1) y[s-1] + alpha d^j sum_k x[s+k] d^-k with d = 1 - alpha, which is a cumsum.
+    Blocks are sized so d^-k stays far from overflow; only the (few) blocks are iterated in Python.
+    """
+    n = len(values)
+    out = np.empty(n)
+    if n == 0:
+        return out
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        return values.astype(np.float64, copy=True)
+    block = max(1, min(n, int(np.log(1e150) / -np.log(decay))))
+    powers = decay ** np.arange(block) # d^j
+    inverse = 1.0 / powers # d^-k
+    previous = values[0]
+    for start in range(0, n, block):
+        chunk = values[start:start + block]
+        m = len(chunk)
+        out[start:start + m] = powers[:m] * decay * previous + alpha * powers[:m] * np.cumsum(chunk * inverse[:m])
+        previous = out[start + m - 1]
+    return out
+
+def ema(values: np.ndarray, span: int) -> np.ndarray:
+    """Exponential moving average with alpha = 2 / (span + 1), seeded with the first value."""
+    return _exp_smooth(values, 2.0 / (span + 1))
+
+def rsi(close: np.ndarray, window: int = DEFAULT_WINDOWS["rsi"]) -> np.ndarray:
+    """Relative Strength Index with Wilder's smoothing (alpha = 1 / window); the first `window` bars are NaN."""
+    out = np.full(len(close), np.nan)
+    if len(close) <= window:
+        return out
+    delta = np.diff(close)
+    avg_gain = _exp_smooth(np.clip(delta, 0.0, None), 1.0 / window)
+    avg_loss = _exp_smooth(np.clip(-delta, 0.0, None), 1.0 / window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    values[avg_loss == 0.0] = 100.0
+    values[(avg_loss == 0.0) & (avg_gain == 0.0)] = 50.0 # Flat series
+    out[window:] = values[window - 1:]
+    return out
+
+def macd(close: np.ndarray, fast: int = MACD_FAST, slow: int = MACD_SLOW, signal: int = MACD_SIGNAL) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD line (fast EMA - slow EMA), its signal EMA and the histogram."""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+def bollinger(close: np.ndarray, window: int = DEFAULT_WINDOWS["bollinger"], num_std: float = BOLLINGER_STD) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Middle band (SMA) and the bands `num_std` population standard deviations above and below it."""
+    middle = sma(close, window)
+    std = np.full(len(close), np.nan)
+    if window <= len(close):
+        # Var = E[x^2] - E[x]^2 from running sums; centering on the series mean keeps the cancellation small
+        centered = close - close.mean()
+        mean = sma(centered, window)[window - 1:]
+        mean_sq = sma(centered * centered, window)[window - 1:]
+        std[window - 1:] = np.sqrt(np.maximum(mean_sq - mean * mean, 0.0))
+    return middle, middle + num_std * std, middle - num_std * std
+
+def warmup_bars(names: tuple[str, ...], window: int | None = None) -> int:
+    """
+    Bars of history to load before the first requested date so indicators are settled there.
+    Windowed averages need window - 1 bars; exponential smoothings get about 3 time constants.
+    """
+    bars = 0
+    for name in names:
+        if name == "macd":
+            bars = max(bars, 3 * MACD_SLOW + MACD_SIGNAL)
+        elif name in ("ema", "rsi"):
+            bars = max(bars, 3 * (window or DEFAULT_WINDOWS[name]))
+        else:
+            bars = max(bars, (window or DEFAULT_WINDOWS[name]) - 1)
+    return bars
+
+def compute(close: np.ndarray, names: tuple[str, ...], window: int | None = None) -> dict[str, np.ndarray]:
+    """Every output series of the named indicators (see INDICATOR_OUTPUTS); `window` overrides DEFAULT_WINDOWS."""
+    close = np.asarray(close, dtype=np.float64)
+    results = {}
+    for name in names:
+        if name == "sma":
+            results["sma"] = sma(close, window or DEFAULT_WINDOWS["sma"])
+        elif name == "ema":
+            results["ema"] = ema(close, window or DEFAULT_WINDOWS["ema"])
+        elif name == "rsi":
+            results["rsi"] = rsi(close, window or DEFAULT_WINDOWS["rsi"])
+        elif name == "macd":
+            results["macd"], results["macd_signal"], results["macd_hist"] = macd(close)
+        elif name == "bollinger":
+            results["bb_middle"], results["bb_upper"], results["bb_lower"] = bollinger(close, window or DEFAULT_WINDOWS["bollinger"])
+    return results
+
+# --- Incremental evaluation ---
+# A state holds what an indicator needs to extend its series by one bar: the last EMA values, Wilder's
+# average gain/loss, or the buffer of the last `window` closes. advance() continues a series exactly as compute()
+# would over the longer history (up to floating point rounding).
+
+def effective_window(name: str, window: int | None = None) -> int:
+    """The window an indicator actually uses (0 for fixed-parameter indicators such as MACD)."""
+    return (window or DEFAULT_WINDOWS[name]) if name in DEFAULT_WINDOWS else 0
+
+def final_state(name: str, close: np.ndarray, window: int | None = None) -> dict:
+    """State after the last bar of `close` (non-empty, chronological)."""
+    close = np.asarray(close, dtype=np.float64)
+    window = effective_window(name, window)
+    state = {"count": len(close)}
+    if name in ("sma", "bollinger"):
+        state["buffer"] = close[-window:].tolist()
+    elif name == "ema":
+        state["ema"] = float(ema(close, window)[-1])
+    elif name == "rsi":
+        state["prev_close"] = float(close[-1])
+        if len(close) > 1:
+            delta = np.diff(close)
+            state["avg_gain"] = float(_exp_smooth(np.clip(delta, 0.0, None), 1.0 / window)[-1])
+            state["avg_loss"] = float(_exp_smooth(np.clip(-delta, 0.0, None), 1.0 / window)[-1])
+    elif name == "macd":
+        fast, slow = ema(close, MACD_FAST), ema(close, MACD_SLOW)
+        state.update(fast=float(fast[-1]), slow=float(slow[-1]), signal=float(ema(fast - slow, MACD_SIGNAL)[-1]))
+    return state
+
+def _rsi_value(avg_gain: float, avg_loss: float) -> float:
+    if avg_loss == 0.0:
+        return 50.0 if avg_gain == 0.0 else 100.0
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+def advance(name: str, state: dict, close: float, window: int | None = None) -> dict[str, float]:
+    """Extends `state` (in place) by one bar closing at `close`. Returns the indicator's outputs for that bar."""
+    window = effective_window(name, window)
+    index = state.get("count", 0) # Position of the new bar in the series
+    state["count"] = index + 1
+    if name in ("sma", "bollinger"):
+        buffer = state.setdefault("buffer", [])
+        buffer.append(close)
+        del buffer[:-window]
+        if index + 1 < window:
+            return {key: np.nan for key in INDICATOR_OUTPUTS[name]}
+        mean = sum(buffer) / window
+        if name == "sma":
+            return {"sma": mean}
+        std = (sum((v - mean) ** 2 for v in buffer) / window) ** 0.5
+        return {"bb_middle": mean, "bb_upper": mean + BOLLINGER_STD * std, "bb_lower": mean - BOLLINGER_STD * std}
+    if name == "ema":
+        alpha = 2.0 / (window + 1)
+        state["ema"] = close if index == 0 else alpha * close + (1.0 - alpha) * state["ema"]
+        return {"ema": state["ema"]}
+    if name == "rsi":
+        if index == 0:
+            state["prev_close"] = close
+            return {"rsi": np.nan}
+        delta, state["prev_close"] = close - state["prev_close"], close
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        if index == 1: # Smoothing is seeded with the first change
+            state["avg_gain"], state["avg_loss"] = gain, loss
+        else:
+            alpha = 1.0 / window
+            state["avg_gain"] = alpha * gain + (1.0 - alpha) * state["avg_gain"]
+            state["avg_loss"] = alpha * loss + (1.0 - alpha) * state["avg_loss"]
+        return {"rsi": np.nan if index < window else _rsi_value(state["avg_gain"], state["avg_loss"])}
+    if name == "macd":
+        if index == 0:
+            state.update(fast=close, slow=close, signal=0.0)
+        else:
+            fast_alpha, slow_alpha, signal_alpha = (2.0 / (span + 1) for span in (MACD_FAST, MACD_SLOW, MACD_SIGNAL))
+            state["fast"] = fast_alpha * close + (1.0 - fast_alpha) * state["fast"]
+            state["slow"] = slow_alpha * close + (1.0 - slow_alpha) * state["slow"]
+            state["signal"] = signal_alpha * (state["fast"] - state["slow"]) + (1.0 - signal_alpha) * state["signal"]
+        line = state["fast"] - state["slow"]
+        return {"macd": line, "macd_signal": state["signal"], "macd_hist": line - state["signal"]}
+    raise ValueError(f"Unknown indicator '{name}'.")
+
+def to_json_list(values: np.ndarray) -> list:
+    """Plain floats with NaN as None, ready for json.dumps."""
+    return np.where(np.isnan(values), None, values).tolist()
@@ -0,0 +1,141 @@
+import sys
+import threading
+from typing import Any, Callable, Hashable
+
+import numpy as np
+from cachetools import TTLCache
+
+from backend.config import settings
+
+# In-process cache for stock price reads (crud.get_stock_prices_page with Core rows).
+# Bounded by an approximate memory budget (LRU eviction) and a TTL. Writers in crud invalidate
+# every entry of the symbols they touch. The cache is per process: with several workers, the TTL bounds
+# how long another worker can serve rows that were changed through a different process.
+# matrix_cache holds cross-symbol NumPy results (crud.get_return_matrices); their keys carry the symbols'
+# data versions, so a write makes old entries unreachable instead of invalidating them.
+
+class _CountingTTLCache(TTLCache):
+    """TTLCache that counts LRU evictions (popitem is only called when the size budget is exceeded)."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.evictions = 0
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+def _estimate_size(value: Any) -> int:
+    """
+    Approximate bytes held by a cached (rows, next_cursor) page, extrapolated from its first row,
+    or by a dict of NumPy arrays (crud.get_close_arrays).
+    """
+    if isinstance(value, dict):
+        return _estimate_array_size(value)
+    rows, next_cursor = value
+    size = sys.getsizeof(rows) + sys.getsizeof(next_cursor)
+    if rows:
+        sample = rows[0]
+        size += len(rows) * (sys.getsizeof(sample) + sum(sys.getsizeof(v) for v in sample))
+    return size
+
+def _estimate_array_size(value: dict) -> int:
+    """Approximate bytes held by a cached dict of NumPy arrays and small scalars."""
+    return sys.getsizeof(value) + sum(v.nbytes if isinstance(v, np.ndarray) else sys.getsizeof(v) for v in value.values())
+
+class PriceCache:
+    def __init__(self, max_bytes: int, ttl_seconds: float, getsizeof: Callable[[Any], int] = _estimate_size):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._cache = _CountingTTLCache(maxsize=max(max_bytes, 1), ttl=ttl_seconds, getsizeof=getsizeof)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.ttl_seconds > 0
+
+    def get_or_load(self, key: tuple, loader: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value for key, or calls loader() and caches its result.
+        key[0] must be the (upper-case) symbol so invalidate_symbols can find the entry.
+        """
+        if not self.enabled:
+            return loader()
+        with self._lock:
+            try:
+                value = self._cache[key]
+                self.hits += 1
+                return value
+            except KeyError:
+                self.misses += 1
+        value = loader() # Outside the lock: concurrent misses may both load, which is harmless
+        with self._lock:
+            try:
+                self._cache[key] = value
+            except ValueError:
+                pass # Larger than the whole budget; serve it uncached
+        return value
+
+    def get_many_or_load(self, keys: list[tuple], loader: Callable[[list[tuple]], dict]) -> dict:
+        """
+        get_or_load for several keys at once: loader(missing_keys) returns {key: value} for the keys that were
+        not cached, so a batch of misses can be loaded with one query.
+        """
+        if not self.enabled:
+            return loader(keys)
+        found = {}
+        with self._lock:
+            for key in keys:
+                try:
+                    found[key] = self._cache[key]
+                except KeyError:
+                    pass
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            loaded = loader(missing)
+            with self._lock:
+                for key, value in loaded.items():
+                    try:
+                        self._cache[key] = value
+                    except ValueError:
+                        pass
+            found.update(loaded)
+        return found
+
+    def invalidate_symbols(self, symbols) -> int:
+        """Drops every cached entry for the given symbols. Returns the number of entries removed."""
+        symbols = {s.upper() for s in symbols}
+        if not symbols:
+            return 0
+        with self._lock:
+            stale: list[Hashable] = [key for key in list(self._cache.keys()) if key[0] in symbols]
+            for key in stale:
+                self._cache.pop(key, None)
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._cache.expire()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self._cache.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._cache),
+                "current_bytes": int(self._cache.currsize),
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+price_cache = PriceCache(settings.PRICE_CACHE_MAX_BYTES, settings.PRICE_CACHE_TTL_SECONDS)
+matrix_cache = PriceCache(settings.MATRIX_CACHE_MAX_BYTES, settings.MATRIX_CACHE_TTL_SECONDS, getsizeof=_estimate_array_size)
@@ -0,0 +1,74 @@
+import itertools
+from operator import attrgetter
+from typing import Optional
+
+# JSON shapes for stock price reads built directly from Core rows (see crud.get_stock_price_rows),
+# so large responses never create an ORM instance or a Pydantic model per row.
+
+# Every field of schemas.StockPricePublic, in response order
+RECORD_FIELDS = ("id", "symbol", "date", "open", "high", "low", "close", "volume", "data_source", "created_at")
+# Per-row value columns of schemas.StockPriceColumnar (dates are always included)
+COLUMNAR_FIELDS = ("open", "high", "low", "close", "volume")
+
+def parse_fields(fields: Optional[str], allowed: tuple[str, ...]) -> Optional[tuple[str, ...]]:
+    """
+    Parses a `fields=date,close` sparse fieldset into a tuple ordered like `allowed`.
+    Returns None when no fieldset was requested. Raises ValueError for unknown or empty fieldsets.
+    """
+    if fields is None:
+        return None
+    requested = {f.strip().lower() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}.")
+    if not requested:
+        raise ValueError("fields must name at least one field.")
+    return tuple(f for f in allowed if f in requested)
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+# Fields that need conversion before json.dumps; everything else is already a JSON-native type
+_FIELD_CONVERTERS = {"date": _isoformat, "created_at": _isoformat}
+
+def rows_to_records(rows: list, fields: tuple[str, ...] = RECORD_FIELDS) -> list[dict]:
+    """
+    StockPricePublic-shaped dicts for many Core rows. Column positions and converters are resolved once
+    per call instead of once per value, which keeps this the cheapest way to serialize trusted rows.
+    """
+    if not rows:
+        return []
+    positions = {name: i for i, name in enumerate(rows[0]._fields)}
+    plan = [(f, positions[f], _FIELD_CONVERTERS.get(f)) for f in fields]
+    if not any(convert for _f, _i, convert in plan):
+        return [{f: row[i] for f, i, _c in plan} for row in rows]
+    return [{f: (convert(row[i]) if convert else row[i]) for f, i, convert in plan} for row in rows]
+
+def rows_to_columnar(symbol: str, rows: list, next_cursor: Optional[str], fields: tuple[str, ...] = COLUMNAR_FIELDS + ("data_source",)) -> dict:
+    """
+    Builds the StockPriceColumnar body by transposing Core rows that hold date plus `fields`.
+    Only the value arrays named in `fields` are included; data_source is sent once when every row shares it.
+    """
+    value_fields = [f for f in COLUMNAR_FIELDS if f in fields]
+    payload = {"symbol": symbol, "data_source": None, "dates": [], **{f: [] for f in value_fields}, "next_cursor": next_cursor}
+    if not rows:
+        return payload
+    columns = dict(zip(rows[0]._fields, zip(*rows)))
+    payload["dates"] = [d.isoformat() for d in columns["date"]]
+    for field in value_fields:
+        payload[field] = list(columns[field])
+    if "data_source" in fields:
+        sources = columns["data_source"]
+        if len(set(sources)) == 1:
+            payload["data_source"] = sources[0]
+        else:
+            payload["data_sources"] = list(sources)
+    return payload
+
+def rows_to_columnar_batch(symbols: list[str], rows: list, fields: tuple[str, ...] = COLUMNAR_FIELDS + ("data_source",)) -> dict:
+    """
+    Builds the StockPriceColumnarBatch body from rows grouped by symbol (crud.get_stock_price_rows_for_symbols).
+    Series follow the order of `symbols`; symbols without rows get an empty series.
+    """
+    grouped = {symbol: list(group) for symbol, group in itertools.groupby(rows, key=attrgetter("symbol"))}
+    return {"series": [rows_to_columnar(symbol, grouped.get(symbol, []), None, fields) for symbol in symbols]}
@@ -0,0 +1,125 @@
+from statistics import NormalDist
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Risk metrics over chronological close arrays (oldest first), vectorized with NumPy.
+# Returns are log returns; volatilities are annualized with the bar interval's periods per year.
+# VaR and expected shortfall are reported as positive loss fractions of one bar's log return.
+
+PERIODS_PER_YEAR = {"1d": 252, "1w": 52, "1mo": 12, "1y": 1}
+DEFAULT_WINDOWS = (20, 60, 252)
+DEFAULT_CONFIDENCE = 0.95
+
+def parse_windows(windows: str) -> tuple[int, ...]:
+    """Parses `windows=20,60` into sorted unique window lengths. Raises ValueError for invalid lists."""
+    try:
+        parsed = sorted({int(w) for w in windows.split(",") if w.strip()})
+    except ValueError:
+        raise ValueError(f"windows must be comma-separated integers, got {windows!r}.")
+    if not parsed or parsed[0] < 2 or parsed[-1] > 2520:
+        raise ValueError("windows must list at least one integer, each from 2 to 2520.")
+    return tuple(parsed)
+
+def log_returns(close: np.ndarray) -> np.ndarray:
+    """log(close[t] / close[t-1]); one element shorter than close."""
+    return np.diff(np.log(close))
+
+def rolling_volatility(returns: np.ndarray, windows: tuple[int, ...], periods_per_year: int) -> dict[int, np.ndarray]:
+    """
+    Annualized rolling sample standard deviation of returns for every window, aligned with `returns`
+    (NaN until a window is full). All windows come from one pair of prefix sums over the (centered) returns.
+    """
+    n = len(returns)
+    centered = returns - returns.mean() if n else returns # Centering keeps E[x^2] - E[x]^2 well conditioned
+    sums = np.concatenate(([0.0], np.cumsum(centered)))
+    squares = np.concatenate(([0.0], np.cumsum(centered * centered)))
+    result = {}
+    for window in windows:
+        out = np.full(n, np.nan)
+        if window <= n:
+            s1 = sums[window:] - sums[:-window]
+            s2 = squares[window:] - squares[:-window]
+            variance = np.maximum((s2 - s1 * s1 / window) / (window - 1), 0.0)
+            out[window - 1:] = np.sqrt(variance * periods_per_year)
+        result[window] = out
+    return result
+
+def rolling_var(returns: np.ndarray, window: int, confidence: float) -> np.ndarray:
+    """Rolling historical VaR (loss quantile) over sliding windows of `returns`; NaN until the window is full."""
+    out = np.full(len(returns), np.nan)
+    if window <= len(returns):
+        out[window - 1:] = -np.quantile(sliding_window_view(returns, window), 1.0 - confidence, axis=1)
+    return out
+
+def drawdown(close: np.ndarray) -> np.ndarray:
+    """Fractional distance of each close below its running peak (0 at new highs, negative otherwise)."""
+    return close / np.maximum.accumulate(close) - 1.0
+
+def _float(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else value
+
+def summarize(
+    dates: np.ndarray,
+    close: np.ndarray,
+    windows: tuple[int, ...] = DEFAULT_WINDOWS,
+    confidence: float = DEFAULT_CONFIDENCE,
+    periods_per_year: int = PERIODS_PER_YEAR["1d"],
+    volatility: Optional[dict[int, np.ndarray]] = None,
+) -> dict:
+    """
+    Scalar risk figures for one series (schemas.RiskSummary fields except symbol). Pass `volatility` when the
+    rolling series were already computed to reuse them for the latest values.
+    """
+    summary = {
+        "bars": len(close), "start_date": None, "end_date": None, "total_return": None, "volatility": None,
+        "rolling_volatility": {str(w): None for w in windows}, "max_drawdown": None,
+        "max_drawdown_peak": None, "max_drawdown_trough": None, "confidence": confidence,
+        "var_historical": None, "var_parametric": None, "expected_shortfall": None,
+    }
+    if len(close) == 0:
+        return summary
+    summary.update(start_date=str(dates[0]), end_date=str(dates[-1]), total_return=_float(close[-1] / close[0] - 1.0))
+
+    drawdowns = drawdown(close)
+    trough = int(np.argmin(drawdowns))
+    peak = int(np.argmax(close[:trough + 1]))
+    summary.update(max_drawdown=_float(drawdowns[trough]), max_drawdown_peak=str(dates[peak]), max_drawdown_trough=str(dates[trough]))
+
+    returns = log_returns(close)
+    if len(returns) < 2:
+        return summary
+    volatility = volatility or rolling_volatility(returns, windows, periods_per_year)
+    summary["rolling_volatility"] = {str(w): _float(series[-1]) for w, series in volatility.items()}
+    mean, std = returns.mean(), returns.std(ddof=1)
+    cutoff = np.quantile(returns, 1.0 - confidence)
+    summary.update(
+        volatility=_float(std * np.sqrt(periods_per_year)),
+        var_historical=_float(-cutoff),
+        var_parametric=_float(-(mean + NormalDist().inv_cdf(1.0 - confidence) * std)),
+        expected_shortfall=_float(-returns[returns <= cutoff].mean()),
+    )
+    return summary
+
+def compute(
+    dates: np.ndarray,
+    close: np.ndarray,
+    windows: tuple[int, ...] = DEFAULT_WINDOWS,
+    confidence: float = DEFAULT_CONFIDENCE,
+    periods_per_year: int = PERIODS_PER_YEAR["1d"],
+) -> dict:
+    """Summary plus the per-bar series (schemas.StockRisk fields except symbol and interval)."""
+    returns = log_returns(close) if len(close) else close
+    volatility = rolling_volatility(returns, windows, periods_per_year)
+    to_list = lambda values: np.where(np.isnan(values), None, values).tolist()
+    return {
+        "summary": summarize(dates, close, windows, confidence, periods_per_year, volatility),
+        # Return series start at the second bar
+        "dates": np.datetime_as_string(dates[1:]).tolist(),
+        "returns": returns.tolist(),
+        "drawdown": drawdown(close)[1:].tolist() if len(close) else [],
+        "rolling_volatility": {str(w): to_list(series) for w, series in volatility.items()},
+        "rolling_var": {str(w): to_list(rolling_var(returns, w, confidence)) for w in windows},
+    }
@@ -0,0 +1,146 @@
+import datetime
+import operator
+import re
+from collections import defaultdict
+from typing import Iterable
+
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from backend import bulk_ingest, models
+
+# Per-symbol screening figures (table symbol_stats), one row per symbol.
+# Every figure depends only on the latest LOOKBACK_DAYS of daily bars, so crud refreshes a symbol by reading that
+# bounded slice after each write: the cost does not grow with the length of the history, and writes that only
+# touch older bars (backfills) leave the row alone. Several sources on one date count once (the newest row).
+
+STATS_TABLE = models.SymbolStats.__table__
+DAILY_TABLE = models.STOCK_PRICE_ROWS
+
+WEEKS_52 = np.timedelta64(52 * 7, "D")
+RETURN_HORIZON_DAYS = {"return_1w": 7, "return_1m": 30, "return_3m": 91, "return_6m": 182, "return_1y": 365}
+VOLUME_WINDOWS = (20, 50)
+LOOKBACK_DAYS = 372 # The 1y horizon plus a week to find the last close on or before it
+
+# Columns a screen can filter and sort on
+SCREEN_FIELDS = tuple(column.name for column in STATS_TABLE.columns if column.name not in ("symbol", "last_date", "updated_at"))
+_OPERATORS = {">=": operator.ge, "<=": operator.le, "!=": operator.ne, ">": operator.gt, "<": operator.lt, "=": operator.eq}
+_CONDITION = re.compile(r"^\s*(\w+)\s*(>=|<=|!=|>|<|=)\s*(\S+)\s*$")
+
+def _ratio(numerator, denominator):
+    return float(numerator / denominator - 1.0) if denominator else None
+
+def compute_stats(symbol: str, dates: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray) -> dict:
+    """symbol_stats row from chronological daily bars (one per date) covering at least the last LOOKBACK_DAYS."""
+    last = dates[-1]
+    in_52w = dates > last - WEEKS_52
+    high_52w, low_52w = float(high[in_52w].max()), float(low[in_52w].min())
+    stats = {
+        "symbol": symbol,
+        "last_date": last.item(),
+        "last_close": float(close[-1]),
+        "prev_close": float(close[-2]) if len(close) > 1 else None,
+        "change_pct": _ratio(close[-1], close[-2]) if len(close) > 1 else None,
+        "last_volume": int(volume[-1]),
+        "high_52w": high_52w,
+        "low_52w": low_52w,
+        "pct_from_high_52w": _ratio(close[-1], high_52w),
+        "pct_from_low_52w": _ratio(close[-1], low_52w),
+    }
+    earlier_volume = volume[:-1]
+    for window in VOLUME_WINDOWS:
+        stats[f"avg_volume_{window}"] = float(earlier_volume[-window:].mean()) if len(earlier_volume) >= window else None
+    stats["volume_ratio_20"] = float(volume[-1] / stats["avg_volume_20"]) if stats["avg_volume_20"] else None
+
+    # Last close on or before each horizon (and before January 1st for year to date)
+    targets = {name: last - np.timedelta64(days, "D") for name, days in RETURN_HORIZON_DAYS.items()}
+    targets["return_ytd"] = last.astype("datetime64[Y]").astype("datetime64[D]") - np.timedelta64(1, "D")
+    for name, target in targets.items():
+        index = np.searchsorted(dates, target, side="right") - 1
+        stats[name] = _ratio(close[-1], close[index]) if index >= 0 else None
+    return stats
+
+def refresh_symbols(db: Session, symbols: Iterable[str]) -> int:
+    """
+    Recomputes the symbol_stats rows of `symbols` from the bars in the session's transaction, deleting the rows of
+    symbols that no longer have any. Does not commit. Returns the number of rows written.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    rows, gone = [], []
+    for symbol in sorted({symbol.upper() for symbol in symbols}):
+        last_date = db.execute(select(func.max(DAILY_TABLE.c.date)).where(DAILY_TABLE.c.symbol == symbol)).scalar()
+        if last_date is None:
+            gone.append(symbol)
+            continue
+        bars = db.execute(
+            select(DAILY_TABLE.c.date, DAILY_TABLE.c.high, DAILY_TABLE.c.low, DAILY_TABLE.c.close, DAILY_TABLE.c.volume)
+            .where(DAILY_TABLE.c.symbol == symbol, DAILY_TABLE.c.date >= last_date - datetime.timedelta(days=LOOKBACK_DAYS))
+            .order_by(DAILY_TABLE.c.date, DAILY_TABLE.c.id)
+        ).all()
+        dates, high, low, close, volume = (np.array(values) for values in zip(*bars))
+        dates = dates.astype("datetime64[D]")
+        newest = np.append(dates[1:] != dates[:-1], True) # Last row of each date
+        rows.append({
+            **compute_stats(symbol, dates[newest], high[newest], low[newest], close[newest], volume[newest]),
+            "updated_at": now,
+        })
+    if gone:
+        db.execute(delete(STATS_TABLE).where(STATS_TABLE.c.symbol.in_(gone)))
+    if rows:
+        stmt = bulk_ingest.dialect_insert(db)(STATS_TABLE)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["symbol"],
+            set_={column.name: stmt.excluded[column.name] for column in STATS_TABLE.columns if column.name != "symbol"},
+        )
+        db.execute(stmt, rows)
+    return len(rows)
+
+def on_bars_written(db: Session, written_rows: Iterable[dict]) -> int:
+    """
+    Refreshes the stats of symbols whose written bars (dicts with symbol and date) fall inside their current
+    lookback, or that have no stats yet. Does not commit. Returns the number of rows written.
+    """
+    newest_written = defaultdict(lambda: datetime.date.min)
+    for row in written_rows:
+        symbol = row["symbol"].upper()
+        newest_written[symbol] = max(newest_written[symbol], row["date"])
+    if not newest_written:
+        return 0
+    current = dict(db.execute(
+        select(STATS_TABLE.c.symbol, STATS_TABLE.c.last_date).where(STATS_TABLE.c.symbol.in_(newest_written))
+    ).all())
+    stale = [
+        symbol for symbol, newest in newest_written.items()
+        if symbol not in current or newest >= current[symbol] - datetime.timedelta(days=LOOKBACK_DAYS)
+    ]
+    return refresh_symbols(db, stale)
+
+def rebuild_all_stats(db: Session) -> int:
+    """Recomputes the stats of every symbol in stock_prices (used to backfill existing databases). Does not commit."""
+    return refresh_symbols(db, db.execute(select(DAILY_TABLE.c.symbol).distinct()).scalars())
+
+def parse_condition(condition: str):
+    """
+    SQL predicate for a screen condition such as "pct_from_high_52w>=-0.02" (field, operator, number).
+    Raises ValueError for unknown fields, operators or values.
+    """
+    match = _CONDITION.match(condition)
+    if not match:
+        raise ValueError(f"Invalid condition {condition!r}; expected <field><op><number> with op one of {', '.join(_OPERATORS)}.")
+    field, op, value = match.groups()
+    if field not in SCREEN_FIELDS:
+        raise ValueError(f"Unknown field '{field}'. Available: {', '.join(SCREEN_FIELDS)}.")
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"Invalid number {value!r} in condition {condition!r}.")
+    return _OPERATORS[op](STATS_TABLE.c[field], number)
+
+def parse_sort(sort: str):
+    """ORDER BY clause for "field" (ascending) or "-field" (descending); NULLs always sort last."""
+    field = sort.lstrip("-")
+    if field != "symbol" and field not in SCREEN_FIELDS:
+        raise ValueError(f"Unknown sort field '{field}'. Available: symbol, {', '.join(SCREEN_FIELDS)}.")
+    column = STATS_TABLE.c[field]
+    return (column.desc() if sort.startswith("-") else column.asc()).nulls_last()
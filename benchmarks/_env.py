@@ -0,0 +1,8 @@
+import os
+
+# Settings are required at import time; the benchmarks only need a database.
+# Imported by every benchmark before anything from backend.
+os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
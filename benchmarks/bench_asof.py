@@ -0,0 +1,77 @@
+"""
+Batch as-of closes: cached per-symbol arrays with numpy.searchsorted vs. one "date <= D ORDER BY date DESC LIMIT 1"
+query per (symbol, date) pair.
+
+Run from the project root:
+    python -m benchmarks.bench_asof [symbols] [bars] [pairs]
+"""
+import datetime
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks import _env # noqa: F401 (settings environment, before any backend import)
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud, models
+from backend.database import Base
+from backend.services.price_cache import price_cache
+from benchmarks.bench_bulk_ingest import make_payload
+
+
+def timed(label: str, fn, repeat: int = 3):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f"{label:<44} {(time.perf_counter() - started) / repeat * 1000:9.2f} ms")
+    return result
+
+
+def query_per_pair(db, symbols: list[str], dates: list[datetime.date]) -> list:
+    """The naive approach: the newest bar on or before each date, one indexed query per pair."""
+    closes = []
+    for symbol, date in zip(symbols, dates):
+        row = (
+            db.query(models.StockPrice.close)
+            .filter(models.StockPrice.symbol == symbol, models.StockPrice.date <= date)
+            .order_by(models.StockPrice.date.desc(), models.StockPrice.id.desc())
+            .first()
+        )
+        closes.append(row.close if row else None)
+    return closes
+
+
+def main(symbols: int, bars: int, pairs: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = session_factory()
+        names = [f"AS{i:04d}" for i in range(symbols)]
+        for name in names:
+            crud.create_stock_prices_bulk(db, make_payload(name, bars))
+        first, last = crud.get_stock_price_arrays(db, names[0], ("close",))["date"][[0, -1]].tolist()
+        rng = random.Random(0)
+        query_symbols = [rng.choice(names) for _ in range(pairs)]
+        query_dates = [first + datetime.timedelta(days=rng.randrange((last - first).days + 30) - 15) for _ in range(pairs)]
+
+        print(f"{symbols} symbols x {bars} bars, {pairs} (symbol, date) pairs")
+        slow = timed("query per pair (ORM)", lambda: query_per_pair(db, query_symbols, query_dates), repeat=1)
+        price_cache.clear()
+        timed("searchsorted, cold cache (one load query)", lambda: crud.get_close_asof(db, query_symbols, query_dates), repeat=1)
+        _dates, fast = timed("searchsorted, warm cache", lambda: crud.get_close_asof(db, query_symbols, query_dates))
+        assert np.where(np.isnan(fast), None, fast).tolist() == slow
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1000,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 20_000,
+    )
@@ -0,0 +1,74 @@
+"""
+Parameter sweep throughput: backend.services.backtest (one vectorized pass) vs. a per-bar, per-set Python loop.
+
+Run from the project root:
+    python -m benchmarks.bench_backtest [bars]
+
+Sweeps an MA-crossover grid (fast x slow) and an RSI grid (window x lower x upper) over `bars` daily closes
+(default 20 years). The loop baseline runs a sample of the sets and is extrapolated to the whole grid.
+"""
+import sys
+import time
+
+import numpy as np
+
+from backend.services import backtest, indicators
+
+LOOP_SAMPLE = 5
+
+
+def loop_backtest(close: np.ndarray, signal: np.ndarray) -> dict:
+    """The straightforward version: walk the bars, updating position, equity, drawdown and trades one at a time."""
+    equity, peak, max_drawdown, position, trades = 1.0, 1.0, 0.0, 0, 0
+    for t in range(1, len(close)):
+        if position:
+            equity *= close[t] / close[t - 1]
+        peak = max(peak, equity)
+        max_drawdown = min(max_drawdown, equity / peak - 1)
+        if signal[t] and not position:
+            trades += 1
+        position = 1 if signal[t] else 0
+    return {"equity": equity, "max_drawdown": max_drawdown, "trades": trades}
+
+
+def sweep(label: str, strategy: str, grid: dict, close: np.ndarray, signal_of) -> None:
+    param_sets = backtest.expand_grid(strategy, grid)
+    started = time.perf_counter()
+    result = backtest.run(strategy, close, param_sets)
+    vectorized = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for params in param_sets:
+        backtest.run(strategy, close, [params])
+    one_by_one = time.perf_counter() - started
+
+    signals = [signal_of(params) for params in param_sets[:LOOP_SAMPLE]] # Not timed: favours the loop
+    started = time.perf_counter()
+    for signal in signals:
+        loop_backtest(close, signal)
+    looped = (time.perf_counter() - started) / LOOP_SAMPLE * len(param_sets)
+
+    best = max(range(len(param_sets)), key=lambda i: np.nan_to_num(result["summary"]["sharpe"][i], nan=-np.inf))
+    print(f"{label} grid, {len(param_sets)} sets (best by Sharpe: {param_sets[best]})")
+    for name, elapsed in (("one vectorized sweep", vectorized), ("run() per set", one_by_one), ("per-bar loop (extrapolated)", looped)):
+        print(f"  {name:<30} {elapsed * 1000:9.1f} ms  {len(param_sets) / elapsed:>9,.0f} sets/s")
+
+
+def main(bars: int) -> None:
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, size=bars)))
+    print(f"{bars:,} bars")
+    sweep(
+        "ma_crossover", "ma_crossover",
+        {"fast": list(range(5, 65, 3)), "slow": list(range(50, 260, 14))}, close,
+        lambda p: indicators.sma(close, p["fast"]) > indicators.sma(close, p["slow"]),
+    )
+    sweep(
+        "rsi", "rsi",
+        {"window": [7, 10, 14, 21, 28, 42], "lower": [20, 25, 30, 35, 40], "upper": [60, 65, 70, 75, 80, 85]}, close,
+        lambda p: indicators.rsi(close, p["window"]) < p["lower"], # Entry signal only: enough to time the loop
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20 * 252)
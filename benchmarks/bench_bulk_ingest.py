@@ -0,0 +1,82 @@
+"""
+Bulk ingest throughput: legacy per-row ORM add + refresh vs. backend.bulk_ingest.
+
+Run from the project root:
+    python -m benchmarks.bench_bulk_ingest [rows]
+
+Uses a throw-away SQLite file database; nothing in ./data is touched.
+"""
+import datetime
+import sys
+import tempfile
+import time
+
+from benchmarks import _env # noqa: F401 (settings environment, before any backend import)
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud, models, schemas
+from backend.database import Base
+
+
+def make_payload(symbol: str, rows: int) -> schemas.StockPriceBulkCreate:
+    start = datetime.date(1990, 1, 1)
+    return schemas.StockPriceBulkCreate(
+        prices=[
+            schemas.StockPriceCreate(
+                symbol=symbol, date=start + datetime.timedelta(days=i),
+                open=100 + i % 50, high=101 + i % 50, low=99 + i % 50, close=100.5 + i % 50, volume=1_000_000 + i
+            )
+            for i in range(rows)
+        ],
+        data_source="Benchmark",
+    )
+
+
+def legacy_create_stock_prices_bulk(db, prices_in: schemas.StockPriceBulkCreate) -> list[models.StockPrice]:
+    """The pre-bulk-engine implementation: ORM add per row, one commit, one refresh SELECT per row."""
+    db_prices = []
+    for price_data in prices_in.prices:
+        final_price_data = price_data.model_dump()
+        if prices_in.data_source and price_data.data_source is None:
+            final_price_data["data_source"] = prices_in.data_source
+        db_price = models.StockPrice(**final_price_data)
+        db.add(db_price)
+        db_prices.append(db_price)
+    db.commit()
+    for db_price in db_prices:
+        db.refresh(db_price)
+    return db_prices
+
+
+def run(label: str, fn, session_factory, payload) -> None:
+    db = session_factory()
+    try:
+        started = time.perf_counter()
+        result = fn(db, payload)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+    assert len(result) == len(payload.prices)
+    print(f"{label:<28} {len(result):>8} rows  {elapsed:8.3f} s  {len(result) / elapsed:>12,.0f} rows/s")
+
+
+def main(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        print(f"SQLite, {rows} rows per run")
+        run("legacy ORM + refresh", legacy_create_stock_prices_bulk, session_factory, make_payload("LEGACY", rows))
+        run("bulk_ingest (RETURNING)", crud.create_stock_prices_bulk, session_factory, make_payload("ENGINE", rows))
+        run("upsert (fresh symbol)", lambda db, p: [0] * sum(crud.upsert_stock_prices(db, p).values()),
+            session_factory, make_payload("UPSERT", rows))
+        run("upsert (re-fetch, no-op)", lambda db, p: [0] * sum(crud.upsert_stock_prices(db, p).values()),
+            session_factory, make_payload("UPSERT", rows))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
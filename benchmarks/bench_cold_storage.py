@@ -0,0 +1,109 @@
+"""
+stock_prices size and get_stock_prices_by_symbol latency before and after moving old years to cold storage
+(backend.cold_storage). Index sizes come from SQLite's dbstat table.
+
+Run from the project root:
+    python -m benchmarks.bench_cold_storage [symbols] [bars] [horizon_days]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks import _env # noqa: F401 (settings environment, before any backend import)
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend import cold_storage, crud, schemas
+from backend.database import Base
+
+TODAY = datetime.date.today()
+
+
+def make_payload(symbol: str, bars: int) -> schemas.StockPriceBulkCreate:
+    """One bar per calendar day, ending today."""
+    start = TODAY - datetime.timedelta(days=bars - 1)
+    return schemas.StockPriceBulkCreate(
+        prices=[
+            schemas.StockPriceCreate(
+                symbol=symbol, date=start + datetime.timedelta(days=i),
+                open=100 + i % 50, high=101 + i % 50, low=99 + i % 50, close=100.5 + i % 50, volume=1_000_000 + i
+            )
+            for i in range(bars)
+        ],
+        data_source="Benchmark",
+    )
+
+
+def sizes(db) -> dict[str, float]:
+    """MiB used by stock_prices and its indexes."""
+    rows = db.execute(text(
+        "SELECT name, SUM(pgsize) FROM dbstat WHERE name = 'stock_prices' OR name LIKE '%stock_prices%' GROUP BY name"
+    )).all()
+    return {name: size / 2 ** 20 for name, size in rows}
+
+
+def timed(label: str, fn, repeat: int = 20):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f"{label:<58} {(time.perf_counter() - started) / repeat * 1000:9.2f} ms")
+    return result
+
+
+def reads(db, name: str, tier: str) -> dict[str, list]:
+    old_year = TODAY.year - 15
+    results = {
+        "page": timed(f"page of 100 newest rows ({tier})", lambda: crud.get_stock_prices_by_symbol(db, name, limit=100)),
+        "last year": timed(f"last 365 days ({tier})", lambda: crud.get_stock_prices_by_symbol(
+            db, name, limit=None, start_date=TODAY - datetime.timedelta(days=365)
+        )),
+        "old year": timed(f"calendar year {old_year} ({tier})", lambda: crud.get_stock_prices_by_symbol(
+            db, name, limit=None, start_date=datetime.date(old_year, 1, 1), end_date=datetime.date(old_year, 12, 31)
+        )),
+        "all": timed(f"full history ({tier})", lambda: crud.get_stock_prices_by_symbol(db, name, limit=None), repeat=5),
+    }
+    return {label: [(p.id, p.date, p.close) for p in rows] for label, rows in results.items()}
+
+
+def main(symbols: int, bars: int, horizon_days: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        names = [f"CD{i:04d}" for i in range(symbols)]
+        for name in names:
+            crud.create_stock_prices_bulk(db, make_payload(name, bars))
+        print(f"{symbols} symbols x {bars} daily bars, horizon {horizon_days} days (archive before {cold_storage.cutoff_date(horizon_days)})")
+
+        before_sizes = sizes(db)
+        before = reads(db, names[0], "all rows in stock_prices")
+
+        cold_storage.store = cold_storage.ColdStorage(f"{tmp}/cold")
+        started = time.perf_counter()
+        moved = crud.archive_stock_prices(db, horizon_days)
+        elapsed = time.perf_counter() - started
+        print(f"archived {sum(moved.values())} rows in {elapsed:.1f} s ({sum(moved.values()) / elapsed:,.0f} rows/s)")
+        db.execute(text("VACUUM"))
+        after_sizes = sizes(db)
+        after = reads(db, names[0], "hot + cold")
+        for label, rows in before.items():
+            assert rows == after[label], label
+
+        print(f"{'':<34} {'before':>10} {'after':>10}")
+        for name in sorted(before_sizes):
+            print(f"{name:<34} {before_sizes[name]:6.1f} MiB {after_sizes.get(name, 0):6.1f} MiB")
+        cold_bytes = sum(entry.stat().st_size for directory in os.scandir(f"{tmp}/cold") for entry in os.scandir(directory))
+        print(f"{'parquet files':<34} {'':>10} {cold_bytes / 2 ** 20:6.1f} MiB")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10000,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 730,
+    )
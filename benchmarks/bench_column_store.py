@@ -0,0 +1,79 @@
+"""
+Daily-bar reads from stock_prices (SQL) vs. the memory-mapped column store (backend.column_store).
+
+Run from the project root:
+    python -m benchmarks.bench_column_store [symbols] [bars]
+"""
+import datetime
+import sys
+import tempfile
+import time
+
+from benchmarks import _env # noqa: F401 (settings environment, before any backend import)
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import column_store, crud
+from backend.database import Base
+from backend.services import price_format
+from benchmarks.bench_bulk_ingest import make_payload
+
+
+def timed(label: str, fn, repeat: int = 5):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f"{label:<52} {(time.perf_counter() - started) / repeat * 1000:9.2f} ms")
+    return result
+
+
+def compare(label: str, store: column_store.ColumnStore, fn, repeat: int = 5) -> None:
+    column_store.store = None
+    expected = timed(f"{label} (SQL)", fn, repeat)
+    column_store.store = store
+    actual = timed(f"{label} (column store)", fn, repeat)
+    if isinstance(expected, dict):
+        assert expected.keys() == actual.keys() and all(np.array_equal(expected[k], actual[k]) for k in expected)
+    else:
+        assert [(p.id, p.date, p.close) for p in expected] == [(p.id, p.date, p.close) for p in actual]
+
+
+def main(symbols: int, bars: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = session_factory()
+        store = column_store.ColumnStore(f"{tmp}/columns")
+        column_store.store = store
+        names = [f"CS{i:04d}" for i in range(symbols)]
+        started = time.perf_counter()
+        for name in names:
+            crud.create_stock_prices_bulk(db, make_payload(name, bars))
+        print(f"{symbols} symbols x {bars} bars (ingest with the store enabled: {time.perf_counter() - started:.1f} s)")
+
+        last_year = datetime.date(1990, 1, 1) + datetime.timedelta(days=bars - 365)
+        compare("full history, close+volume arrays", store, lambda: crud.get_stock_price_arrays(db, names[0], ("close", "volume")))
+        compare("last year, OHLC arrays", store, lambda: crud.get_stock_price_arrays(db, names[0], ("open", "high", "low", "close"), start_date=last_year))
+        # The row readers behind GET /stocks/{symbol}, /stream and GET /stocks?symbols=
+        compare("page of 100 record rows", store, lambda: crud.get_stock_price_rows(db, names[0], price_format.RECORD_FIELDS, limit=100))
+        compare("streamed full history, records", store, lambda: [
+            row for batch in crud.stream_stock_price_rows(db, names[0], price_format.RECORD_FIELDS) for row in batch
+        ])
+        compare(f"newest 100 rows of {min(symbols, 100)} symbols", store, lambda: crud.get_stock_price_rows_for_symbols(
+            db, names[:100], ("date", "close"), limit_per_symbol=100
+        ))
+        compare(f"last year closes of {symbols} symbols", store, lambda: {
+            name: arrays["close"] for name, arrays in crud.get_stock_price_arrays_for_symbols(db, names, start_date=last_year).items()
+        }, repeat=2)
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5000,
+    )
@@ -0,0 +1,61 @@
+"""
+Correlation/covariance matrices for a large basket: cold (read + align + compute), cached, and JSON encoding.
+
+Run from the project root:
+    python -m benchmarks.bench_correlation [bars] [symbols]
+
+Loads `symbols` series into a throw-away SQLite database and times crud.get_return_matrices, which backs
+GET /stocks/correlation, against np.corrcoef on an already aligned matrix.
+"""
+import json
+import sys
+import tempfile
+import time
+
+from benchmarks import _env # noqa: F401 (settings environment, before any backend import)
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud
+from backend.database import Base
+from backend.services import correlation
+from backend.services.price_cache import matrix_cache
+from benchmarks.bench_bulk_ingest import make_payload
+
+
+def timed(label: str, fn):
+    started = time.perf_counter()
+    result = fn()
+    print(f"{label:<40} {(time.perf_counter() - started) * 1000:9.1f} ms")
+    return result
+
+
+def main(bars: int, symbols: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = session_factory()
+        names = [f"COR{i:03d}" for i in range(symbols)]
+        for name in names:
+            crud.create_stock_prices_bulk(db, make_payload(name, bars))
+
+        print(f"{symbols} symbols x {bars} bars -> {symbols}x{symbols} matrices")
+        result = timed("cold: read + align + compute", lambda: crud.get_return_matrices(db, names))
+        timed("warm: served from matrix_cache", lambda: crud.get_return_matrices(db, names))
+        timed("compute only (aligned matrix)", lambda: correlation.return_matrices(np.exp(np.cumsum(np.ones((bars, symbols)) * 1e-3, axis=0))))
+        timed("JSON encode both matrices", lambda: json.dumps([
+            correlation.to_json_matrix(result["covariance"]), correlation.to_json_matrix(result["correlation"])
+        ]))
+        print(f"matrix_cache: {matrix_cache.stats()['current_bytes'] / 1e6:.1f} MB")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 500,
+    )
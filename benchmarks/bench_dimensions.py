@@ -0,0 +1,134 @@
+"""
+stock_prices size and read speed: symbol/data_source strings on every row (the layout before the stocks and
+data_sources dimension tables) vs. integer stock_id/source_id keys.
+Both layouts are bulk-loaded with sqlite3 directly and measured with SQLite's dbstat table (bytes per table/index).
+
+Run from the project root (the default is 10M rows; that needs a few GB of disk and several minutes):
+    python -m benchmarks.bench_dimensions [rows] [symbols]
+"""
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from benchmarks import _env # noqa: F401 (settings environment, before any backend import)
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from backend import models
+
+SOURCES = ("AlphaVantage", "YahooFinance", "UserUpload")
+LEGACY_TABLE = (
+    "CREATE TABLE stock_prices (id INTEGER NOT NULL PRIMARY KEY, symbol VARCHAR NOT NULL, date DATE NOT NULL,"
+    " open FLOAT NOT NULL, high FLOAT NOT NULL, low FLOAT NOT NULL, close FLOAT NOT NULL, volume INTEGER NOT NULL,"
+    " data_source VARCHAR, created_at DATETIME)"
+)
+LEGACY_INDEXES = (
+    "CREATE INDEX ix_stock_prices_id ON stock_prices (id)",
+    "CREATE INDEX ix_stock_prices_symbol ON stock_prices (symbol)",
+    "CREATE INDEX ix_stock_prices_date ON stock_prices (date)",
+    "CREATE UNIQUE INDEX uq_stock_prices_symbol_date_source ON stock_prices (symbol, date, data_source)",
+    "CREATE INDEX ix_stock_prices_symbol_date_id ON stock_prices (symbol, date, id)",
+)
+
+
+def ddl(element) -> str:
+    return str(element.compile(dialect=sqlite.dialect()))
+
+
+def generate(rows: int, symbols: int):
+    """(id, symbol index, date, ohlcv, source index, created_at) rows: each symbol's bars are consecutive days."""
+    per_symbol = rows // symbols
+    start = datetime.date(1990, 1, 1)
+    created_at = "2024-01-01 00:00:00.000000"
+    row_id = 0
+    for s in range(symbols):
+        for i in range(per_symbol):
+            row_id += 1
+            price = 100.0 + (i % 50)
+            yield row_id, s, (start + datetime.timedelta(days=i)).isoformat(), price, price + 1, price - 1, price + 0.5, 1_000_000 + i, s % len(SOURCES), created_at
+
+
+def load(path: str, layout: str, rows: int, symbols: int) -> float:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    names = [f"SYM{s:05d}" for s in range(symbols)]
+    started = time.perf_counter()
+    if layout == "legacy":
+        conn.execute(LEGACY_TABLE)
+        conn.executemany(
+            "INSERT INTO stock_prices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((i, names[s], d, o, h, l, c, v, SOURCES[src], t) for i, s, d, o, h, l, c, v, src, t in generate(rows, symbols)),
+        )
+        indexes = LEGACY_INDEXES
+    else:
+        for table in (models.Stock.__table__, models.DataSource.__table__, models.StockPrice.__table__):
+            conn.execute(ddl(CreateTable(table)))
+        conn.executemany("INSERT INTO stocks (id, symbol) VALUES (?, ?)", ((s + 1, name) for s, name in enumerate(names)))
+        conn.executemany("INSERT INTO data_sources (id, name) VALUES (?, ?)", ((i + 1, name) for i, name in enumerate(SOURCES)))
+        conn.executemany(
+            "INSERT INTO stock_prices (id, stock_id, date, open, high, low, close, volume, source_id, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((i, s + 1, d, o, h, l, c, v, src + 1, t) for i, s, d, o, h, l, c, v, src, t in generate(rows, symbols)),
+        )
+        indexes = [ddl(CreateIndex(index)) for index in models.StockPrice.__table__.indexes]
+    for statement in indexes:
+        conn.execute(statement)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return time.perf_counter() - started
+
+
+def sizes(path: str) -> dict[str, int]:
+    conn = sqlite3.connect(path)
+    result = dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall())
+    conn.close()
+    return result
+
+
+def time_reads(path: str, statement: str, symbols: int, repeat: int = 2000) -> float:
+    conn = sqlite3.connect(path)
+    rng = random.Random(0)
+    names = [f"SYM{rng.randrange(symbols):05d}" for _ in range(repeat)]
+    started = time.perf_counter()
+    for name in names:
+        rows = conn.execute(statement, (name,)).fetchall()
+        assert len(rows) == 252
+    conn.close()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main(rows: int, symbols: int) -> None:
+    view = models.STOCK_PRICE_ROWS.c # What crud reads daily bars through
+    reads = {
+        "legacy": "SELECT date, close FROM stock_prices WHERE symbol = ? ORDER BY date DESC, id DESC LIMIT 252",
+        "dimension": ddl(select(view.date, view.close).where(view.symbol == bindparam("symbol")).order_by(view.date.desc(), view.id.desc())) + " LIMIT 252",
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{rows:,} rows, {symbols:,} symbols")
+        results = {}
+        for layout in ("legacy", "dimension"):
+            path = f"{tmp}/{layout}.db"
+            seconds = load(path, layout, rows, symbols)
+            results[layout] = sizes(path)
+            print(f"\n{layout} layout (loaded and indexed in {seconds:.0f} s); last year of one symbol: {time_reads(path, reads[layout], symbols):.3f} ms")
+            for name, size in sorted(results[layout].items(), key=lambda item: -item[1]):
+                if size >= 1 << 20:
+                    print(f"  {name:<40} {size / (1 << 20):10.1f} MiB")
+            os.remove(path)
+        legacy, dimension = (sum(result.values()) for result in (results["legacy"], results["dimension"]))
+        print(f"\ntotal: legacy {legacy / (1 << 20):.1f} MiB, dimension ids {dimension / (1 << 20):.1f} MiB ({1 - dimension / legacy:.0%} smaller)")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 2_000,
+    )
@@ -0,0 +1,99 @@
+"""
+Cross-symbol analytics (per-symbol summaries, daily breadth, rolling metrics) over a multi-million-row stock_prices:
+the default SQLAlchemy + NumPy path vs. the embedded DuckDB engine (backend.duckdb_analytics) attached to the
+same SQLite file, with and without half of each symbol's history in cold storage Parquet files.
+
+Run from the project root (needs requirements-duckdb.txt and the installed sqlite extension):
+    python -m benchmarks.bench_duckdb_analytics [symbols] [bars]
+"""
+import datetime
+import sys
+import tempfile
+import time
+
+from benchmarks import _env # noqa: F401 (settings environment, before any backend import)
+
+import numpy as np
+import pyarrow as pa
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import bulk_ingest, cold_storage, crud, duckdb_analytics
+from backend.database import Base
+
+TODAY = datetime.date.today()
+
+
+def make_rows(symbol: str, bars: int, rng: np.random.Generator) -> list[dict]:
+    """One bar per calendar day ending today, as a random walk."""
+    start = TODAY - datetime.timedelta(days=bars - 1)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, bars)))
+    return [
+        {"symbol": symbol, "date": start + datetime.timedelta(days=i), "open": c, "high": c * 1.01, "low": c * 0.99,
+         "close": c, "volume": 1_000_000 + i, "data_source": "Benchmark"}
+        for i, c in enumerate(close.tolist())
+    ]
+
+
+def timed(label: str, fn, repeat: int = 3) -> pa.Table:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f"{label:<52} {(time.perf_counter() - started) / repeat * 1000:9.1f} ms  ({result.num_rows:,} rows)")
+    return result
+
+
+def run(db, engine: duckdb_analytics.DuckDBAnalytics, names: list[str], tier: str) -> None:
+    rolling_symbols = names[:50]
+    year_ago = TODAY - datetime.timedelta(days=365)
+    cases = {
+        "summary, all symbols": lambda: crud.get_symbol_summaries(db),
+        "summary, all symbols, last year": lambda: crud.get_symbol_summaries(db, start_date=year_ago),
+        "breadth, all symbols": lambda: crud.get_market_breadth(db),
+        f"rolling 20, {len(rolling_symbols)} symbols": lambda: crud.get_rolling_metrics(db, rolling_symbols, 20),
+    }
+    for label, fn in cases.items():
+        duckdb_analytics.engine = None
+        expected = timed(f"{label} ({tier}, numpy)", fn)
+        duckdb_analytics.engine = engine
+        actual = timed(f"{label} ({tier}, duckdb)", fn)
+        duckdb_analytics.engine = None
+        assert actual.schema == expected.schema and actual.num_rows == expected.num_rows, label
+        for name in expected.column_names:
+            left, right = expected.column(name).to_numpy(zero_copy_only=False), actual.column(name).to_numpy(zero_copy_only=False)
+            if pa.types.is_floating(expected.schema.field(name).type):
+                np.testing.assert_allclose(right, left, rtol=1e-9, atol=1e-12, equal_nan=True, err_msg=f"{label}: {name}")
+            else:
+                assert (left == right).all(), f"{label}: {name}"
+
+
+def main(symbols: int, bars: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        db_engine = create_engine(url, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=db_engine)
+        db = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)()
+        rng = np.random.default_rng(11)
+        names = [f"DA{i:04d}" for i in range(symbols)]
+        started = time.perf_counter()
+        for name in names:
+            bulk_ingest.insert_stock_price_rows(db, make_rows(name, bars, rng))
+        print(f"{symbols} symbols x {bars} daily bars = {symbols * bars:,} rows, loaded in {time.perf_counter() - started:.0f} s")
+
+        engine = duckdb_analytics.DuckDBAnalytics(url)
+        run(db, engine, names, "stock_prices")
+
+        cold_storage.store = cold_storage.ColdStorage(f"{tmp}/cold")
+        horizon_days = bars // 2
+        moved = crud.archive_stock_prices(db, horizon_days)
+        print(f"archived {sum(moved.values()):,} rows before {cold_storage.cutoff_date(horizon_days)}")
+        run(db, engine, names, "hot + cold")
+        db.close()
+        db_engine.dispose()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5000,
+    )
@@ -0,0 +1,89 @@
+"""
+Indicator throughput: backend.services.indicators (NumPy) vs. a naive pandas implementation.
+
+Run from the project root:
+    python -m benchmarks.bench_indicators [bars] [symbols]
+
+Computes SMA(20), EMA(20), RSI(14), MACD(12/26/9) and Bollinger(20, 2) for every symbol, first on in-memory
+arrays, then end to end from a throw-away SQLite database through crud.get_stock_price_arrays.
+"""
+import sys
+import tempfile
+import time
+
+from benchmarks import _env # noqa: F401 (settings environment, before any backend import)
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud
+from backend.database import Base
+from backend.services import indicators
+from benchmarks.bench_bulk_ingest import make_payload
+
+NAMES = indicators.INDICATORS
+
+
+def pandas_indicators(close: list[float]) -> dict[str, pd.Series]:
+    """The straightforward pandas version: a Series per symbol, rolling/ewm per indicator."""
+    s = pd.Series(close)
+    delta = s.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / 14, adjust=False).mean()
+    macd = s.ewm(span=12, adjust=False).mean() - s.ewm(span=26, adjust=False).mean()
+    signal = macd.ewm(span=9, adjust=False).mean()
+    middle = s.rolling(20).mean()
+    std = s.rolling(20).std(ddof=0)
+    return {
+        "sma": s.rolling(20).mean(),
+        "ema": s.ewm(span=20, adjust=False).mean(),
+        "rsi": 100 - 100 / (1 + gain / loss),
+        "macd": macd, "macd_signal": signal, "macd_hist": macd - signal,
+        "bb_middle": middle, "bb_upper": middle + 2 * std, "bb_lower": middle - 2 * std,
+    }
+
+
+def timed(label: str, fn, symbols: int, bars: int) -> float:
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<34} {elapsed * 1000:9.1f} ms  {symbols / elapsed:>9,.0f} symbols/s  ({bars:,} bars each)")
+    return elapsed
+
+
+def main(bars: int, symbols: int) -> None:
+    rng = np.random.default_rng(0)
+    series = [100 + np.cumsum(rng.normal(size=bars)) for _ in range(symbols)]
+    lists = [s.tolist() for s in series]
+
+    print(f"In memory, {symbols} symbols x {bars} bars, indicators: {', '.join(NAMES)}")
+    numpy_time = timed("numpy (services.indicators)", lambda: [indicators.compute(s, NAMES) for s in series], symbols, bars)
+    pandas_time = timed("naive pandas", lambda: [pandas_indicators(c) for c in lists], symbols, bars)
+    print(f"speedup: {pandas_time / numpy_time:.1f}x")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = session_factory()
+        names = [f"IND{i:03d}" for i in range(symbols)]
+        for name in names:
+            crud.create_stock_prices_bulk(db, make_payload(name, bars))
+
+        def end_to_end():
+            for name in names:
+                indicators.compute(crud.get_stock_price_arrays(db, name)["close"], NAMES)
+
+        print("\nSQLite end to end (load + compute)")
+        timed("crud.get_stock_price_arrays + numpy", end_to_end, symbols, bars)
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 50,
+    )
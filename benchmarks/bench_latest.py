@@ -0,0 +1,60 @@
+"""
+Latest quotes for a dashboard: latest_quote primary-key lookups vs. a newest-row query per symbol.
+
+Run from the project root:
+    python -m benchmarks.bench_latest [symbols] [bars]
+"""
+import sys
+import tempfile
+import time
+
+from benchmarks import _env # noqa: F401 (settings environment, before any backend import)
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud, models
+from backend.database import Base
+from benchmarks.bench_bulk_ingest import make_payload
+
+
+def timed(label: str, fn, repeat: int = 5):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f"{label:<44} {(time.perf_counter() - started) / repeat * 1000:9.2f} ms")
+    return result
+
+
+def newest_per_symbol(db, symbols: list[str]) -> list:
+    """The pre-latest_quote approach: ORDER BY date DESC LIMIT 1 (twice, for the change) per symbol."""
+    quotes = []
+    for symbol in symbols:
+        rows = db.query(models.StockPrice).filter(models.StockPrice.symbol == symbol).order_by(models.StockPrice.date.desc()).limit(2).all()
+        quotes.append((rows[0].close, rows[0].close - rows[1].close, rows[0].volume))
+    return quotes
+
+
+def main(symbols: int, bars: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = session_factory()
+        names = [f"LQ{i:04d}" for i in range(symbols)]
+        for name in names:
+            crud.create_stock_prices_bulk(db, make_payload(name, bars))
+
+        print(f"{symbols} symbols x {bars} bars")
+        slow = timed("newest-row query per symbol (ORM)", lambda: newest_per_symbol(db, names))
+        fast = timed("latest_quote lookups (crud.get_latest_quotes)", lambda: crud.get_latest_quotes(db, names))
+        assert [(row.close, row.change, row.volume) for row in fast] == slow
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1000,
+    )
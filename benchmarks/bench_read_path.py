@@ -0,0 +1,76 @@
+"""
+Per-request CPU time of the GET /stocks/{symbol} records path:
+legacy ORM entities + response_model validation vs. Core rows serialized directly.
+
+Run from the project root:
+    python -m benchmarks.bench_read_path
+
+Uses a throw-away SQLite file database; nothing in ./data is touched.
+"""
+import json
+import tempfile
+import time
+from typing import List
+
+from benchmarks import _env # noqa: F401 (settings environment, before any backend import)
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud, schemas
+from backend.database import Base
+from backend.services import price_format
+from benchmarks.bench_bulk_ingest import make_payload
+
+SIZES = (1_000, 10_000, 100_000)
+REPEATS = 3
+PUBLIC_LIST = TypeAdapter(List[schemas.StockPricePublic])
+
+
+def legacy_request(db, symbol: str, limit: int) -> bytes:
+    """ORM entities, then FastAPI-style response_model validation and serialization."""
+    prices = crud.get_stock_prices_by_symbol(db, symbol, limit=limit)
+    validated = PUBLIC_LIST.validate_python(prices, from_attributes=True)
+    return PUBLIC_LIST.dump_json(validated)
+
+
+def core_request(db, symbol: str, limit: int) -> bytes:
+    """Core rows serialized straight to JSON, as the router does now."""
+    rows = crud.get_stock_price_rows(db, symbol, price_format.RECORD_FIELDS, limit=limit)
+    return json.dumps(price_format.rows_to_records(rows)).encode()
+
+
+def cpu_time(fn, session_factory, symbol: str, limit: int) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        db = session_factory()
+        try:
+            started = time.process_time()
+            fn(db, symbol, limit)
+            best = min(best, time.process_time() - started)
+        finally:
+            db.close()
+    return best
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = session_factory()
+        crud.create_stock_prices_bulk(db, make_payload("READ", max(SIZES)))
+        db.close()
+
+        print(f"SQLite, best of {REPEATS}, CPU seconds per request")
+        print(f"{'rows':>8} {'ORM+validate':>14} {'Core direct':>12} {'speedup':>8}")
+        for size in SIZES:
+            legacy = cpu_time(legacy_request, session_factory, "READ", size)
+            core = cpu_time(core_request, session_factory, "READ", size)
+            print(f"{size:>8} {legacy:>14.4f} {core:>12.4f} {legacy / core:>7.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Risk-screen throughput: backend.services.risk (NumPy) vs. a naive pandas implementation.
+
+Run from the project root:
+    python -m benchmarks.bench_risk [bars] [symbols]
+
+Computes log returns, rolling volatility over 20/60/252 bars, max drawdown and historical/parametric VaR for
+every symbol, first on in-memory arrays, then end to end from a throw-away SQLite database through the single-query
+crud.get_stock_price_arrays_for_symbols used by GET /stocks/risk.
+"""
+import sys
+import tempfile
+
+from benchmarks import _env # noqa: F401 (settings environment, before any backend import)
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud
+from backend.database import Base
+from backend.services import risk
+from benchmarks.bench_bulk_ingest import make_payload
+from benchmarks.bench_indicators import timed
+
+WINDOWS = (20, 60, 252)
+CONFIDENCE = 0.95
+
+
+def pandas_risk(close: list[float]) -> dict:
+    """The straightforward pandas version: one rolling std per window, quantile and drawdown on Series."""
+    s = pd.Series(close)
+    returns = np.log(s).diff().dropna()
+    return {
+        "rolling_volatility": {w: returns.rolling(w).std().iloc[-1] * np.sqrt(252) for w in WINDOWS},
+        "max_drawdown": (s / s.cummax() - 1).min(),
+        "var_historical": -returns.quantile(1 - CONFIDENCE),
+        "var_parametric": -(returns.mean() - 1.6448536 * returns.std()),
+    }
+
+
+def main(bars: int, symbols: int) -> None:
+    rng = np.random.default_rng(0)
+    series = [100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=bars))) for _ in range(symbols)]
+    lists = [s.tolist() for s in series]
+    dates = np.datetime64("2000-01-01") + np.arange(bars)
+
+    print(f"In memory, {symbols} symbols x {bars} bars, windows {WINDOWS}")
+    numpy_time = timed("numpy (risk.summarize)", lambda: [risk.summarize(dates, s, WINDOWS, CONFIDENCE) for s in series], symbols, bars)
+    pandas_time = timed("naive pandas", lambda: [pandas_risk(c) for c in lists], symbols, bars)
+    print(f"speedup: {pandas_time / numpy_time:.1f}x")
+    timed("numpy with series (risk.compute)", lambda: [risk.compute(dates, s, WINDOWS, CONFIDENCE) for s in series], symbols, bars)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = session_factory()
+        names = [f"RSK{i:03d}" for i in range(symbols)]
+        for name in names:
+            crud.create_stock_prices_bulk(db, make_payload(name, bars))
+
+        def per_symbol():
+            for name in names:
+                arrays = crud.get_stock_price_arrays(db, name)
+                risk.summarize(arrays["date"], arrays["close"], WINDOWS, CONFIDENCE)
+
+        def one_query():
+            for arrays in crud.get_stock_price_arrays_for_symbols(db, names).values():
+                risk.summarize(arrays["date"], arrays["close"], WINDOWS, CONFIDENCE)
+
+        print("\nSQLite end to end (load + summarize)")
+        timed("one query per symbol", per_symbol, symbols, bars)
+        timed("one query for all symbols", one_query, symbols, bars)
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2520,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+    )
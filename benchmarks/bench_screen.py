@@ -0,0 +1,71 @@
+"""
+Screening the universe: symbol_stats (precomputed, indexed) vs. aggregating stock_prices per request.
+
+Run from the project root:
+    python -m benchmarks.bench_screen [symbols] [bars]
+
+Loads `symbols` daily series into a throw-away SQLite database (the writers maintain symbol_stats), then runs
+"within 2% of the 52-week high" both ways, plus the cost of keeping symbol_stats current on a one-bar append.
+"""
+import datetime
+import sys
+import tempfile
+import time
+
+from benchmarks import _env # noqa: F401 (settings environment, before any backend import)
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud, schemas
+from backend.database import Base
+from benchmarks.bench_bulk_ingest import make_payload
+
+# The ad-hoc equivalent: latest close and 52-week high per symbol straight from the daily bars
+SCAN_SQL = text("""
+    SELECT p.symbol FROM stock_prices p
+    JOIN (SELECT symbol, MAX(date) AS last_date FROM stock_prices GROUP BY symbol) l
+      ON p.symbol = l.symbol AND p.date = l.last_date
+    JOIN (SELECT s.symbol, MAX(s.high) AS high_52w FROM stock_prices s
+          JOIN (SELECT symbol, MAX(date) AS last_date FROM stock_prices GROUP BY symbol) m ON s.symbol = m.symbol
+          WHERE s.date > DATE(m.last_date, '-364 days') GROUP BY s.symbol) h
+      ON p.symbol = h.symbol
+    WHERE p.close >= 0.98 * h.high_52w
+""")
+
+
+def timed(label: str, fn, repeat: int = 5):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f"{label:<44} {(time.perf_counter() - started) / repeat * 1000:9.2f} ms")
+    return result
+
+
+def main(symbols: int, bars: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = session_factory()
+        names = [f"SCR{i:04d}" for i in range(symbols)]
+        for name in names:
+            crud.create_stock_prices_bulk(db, make_payload(name, bars))
+
+        print(f"{symbols} symbols x {bars} bars")
+        fast = timed("symbol_stats screen", lambda: crud.screen_symbol_stats(db, ["pct_from_high_52w>=-0.02"], limit=symbols))
+        slow = timed("aggregate stock_prices per request", lambda: db.execute(SCAN_SQL).all(), repeat=1)
+        assert {row.symbol for row in fast} == {row.symbol for row in slow}
+
+        last = make_payload(names[0], bars).prices[-1]
+        appended = schemas.StockPriceCreate(**{**last.model_dump(), "date": last.date + datetime.timedelta(days=1)})
+        timed("append one bar (incl. stats refresh)", lambda: crud.create_stock_price(db, appended), repeat=1)
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1000,
+    )
@@ -22,7 +22,7 @@ if user_info.get("is_superuser"):
         with st.form("fetch_data_form"):
             fetch_symbol = st.text_input("Stock Symbol to Fetch", placeholder="e.g., MSFT", key="fetch_symbol_input")
             fetch_output_size = st.selectbox("Output Size", ["compact", "full"], index=0, key="fetch_output_size_select")
-            fetch_refresh_data = st.checkbox("Refresh data (delete existing before fetching)", value=True, key="fetch_refresh_data_checkbox")
+            fetch_refresh_data = st.checkbox("Refresh data (overwrite stored bars that changed)", value=True, key="fetch_refresh_data_checkbox")
             submit_fetch = st.form_submit_button("Fetch and Store Data")
 
             if submit_fetch and fetch_symbol:
@@ -84,6 +84,10 @@ with col2:
 with col3:
     end_date = st.date_input("End Date", value=today, key="stock_stock_end_date")
 
+# Weekly/monthly/yearly bars are pre-aggregated by the backend, so long ranges stay small
+BAR_INTERVALS = {"Daily": "1d", "Weekly": "1w", "Monthly": "1mo", "Yearly": "1y"}
+bar_interval = st.radio("Bar Interval", list(BAR_INTERVALS), horizontal=True, key="stock_bar_interval")
+
 
 if st.button("Load Stock Data", key="load_stock_data_button") and "selected_stock_symbol" in st.session_state:
     symbol_to_load = st.session_state.selected_stock_symbol
@@ -97,30 +101,40 @@ if st.button("Load Stock Data", key="load_stock_data_button") and "selected_stoc
         params = {
             "start_date": start_date.isoformat(),
             "end_date": end_date.isoformat(),
-            "limit": 1000 # Max limit for a single fetch, can be adjusted
+            "max_points": 1500, # Whole range, merged server-side into at most this many candles
+            "interval": BAR_INTERVALS[bar_interval],
+            "format": "columnar" # Parallel arrays: symbol/source sent once instead of per row
         }
-        stock_data_list = api_call(
+        stock_data = api_call(
             method="GET",
             endpoint=f"/stocks/{symbol_to_load}",
             token=st.session_state.auth_token, # Assuming token might be needed if endpoint becomes protected
             params=params
         )
 
-        if stock_data_list is not None: # api_call returns None on error
-            if not stock_data_list: # Empty list means no data found for criteria
+        if stock_data is not None: # api_call returns None on error
+            if not stock_data["dates"]: # Empty series means no data found for criteria
                 st.warning(f"No stock data found for {symbol_to_load} in the selected date range.")
                 st.session_state.stock_error = f"No data for {symbol_to_load}"
             else:
                 try:
-                    df = pd.DataFrame(stock_data_list)
-                    df['date'] = pd.to_datetime(df['date'])
+                    df = pd.DataFrame({
+                        "date": pd.to_datetime(stock_data["dates"]),
+                        "open": stock_data["open"],
+                        "high": stock_data["high"],
+                        "low": stock_data["low"],
+                        "close": stock_data["close"],
+                        "volume": stock_data["volume"],
+                        "data_source": stock_data.get("data_sources") or stock_data["data_source"],
+                    })
+                    df["symbol"] = stock_data["symbol"]
                     df = df.sort_values(by='date') # Ensure data is sorted by date for plotting
                     st.session_state.stock_data_df = df
                     st.success(f"Loaded {len(df)} data points for {symbol_to_load}.")
                 except Exception as e:
                     st.error(f"Error processing fetched data: {e}")
                     st.session_state.stock_error = "Data processing error"
-        # If stock_data_list is None, api_call already displayed an error.
+        # If stock_data is None, api_call already displayed an error.
         # We can set stock_error if needed: else: st.session_state.stock_error = "API fetch error"
 
 # --- Display Chart and Data Table ---
@@ -159,7 +173,57 @@ elif "stock_error" in st.session_state and st.session_state.stock_error:
     pass # Error/warning already shown
 
 st.divider()
-st.subheader("Technical Indicators (Placeholder)")
-st.write("- RSI: To be implemented")
-st.write("- MACD: To be implemented")
-st.write("- Moving Averages: To be implemented")
+st.subheader("Technical Indicators")
+
+if "stock_data_df" in st.session_state and st.session_state.stock_data_df is not None:
+    ind_col1, ind_col2 = st.columns([3, 1])
+    with ind_col1:
+        selected_indicators = st.multiselect(
+            "Indicators", ["sma", "ema", "rsi", "macd", "bollinger"], default=["sma", "rsi", "macd"], key="indicator_names"
+        )
+    with ind_col2:
+        indicator_window = st.number_input("Window (SMA/EMA/RSI/Bollinger)", min_value=2, max_value=1000, value=20, key="indicator_window")
+
+    if selected_indicators:
+        # Computed server-side (NumPy) over the same symbol, range and bar interval as the chart above
+        indicator_data = api_call(
+            method="GET",
+            endpoint=f"/stocks/{st.session_state.selected_stock_symbol}/indicators",
+            token=st.session_state.auth_token,
+            params={
+                "names": ",".join(selected_indicators),
+                "window": int(indicator_window),
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "interval": BAR_INTERVALS[bar_interval],
+            }
+        )
+        if indicator_data and indicator_data["dates"]:
+            ind_df = pd.DataFrame({"date": pd.to_datetime(indicator_data["dates"]), "close": indicator_data["close"], **indicator_data["indicators"]})
+
+            # Overlays share the price axis
+            overlays = [c for c in ("sma", "ema", "bb_upper", "bb_middle", "bb_lower") if c in ind_df]
+            if overlays:
+                overlay_fig = go.Figure([go.Scatter(x=ind_df["date"], y=ind_df["close"], name="close")])
+                for column in overlays:
+                    overlay_fig.add_trace(go.Scatter(x=ind_df["date"], y=ind_df[column], name=column))
+                overlay_fig.update_layout(title="Price Overlays", height=400)
+                st.plotly_chart(overlay_fig, use_container_width=True)
+
+            if "rsi" in ind_df:
+                rsi_fig = go.Figure([go.Scatter(x=ind_df["date"], y=ind_df["rsi"], name="RSI")])
+                rsi_fig.add_hline(y=70, line_dash="dash")
+                rsi_fig.add_hline(y=30, line_dash="dash")
+                rsi_fig.update_layout(title="RSI", yaxis_range=[0, 100], height=250)
+                st.plotly_chart(rsi_fig, use_container_width=True)
+
+            if "macd" in ind_df:
+                macd_fig = go.Figure([
+                    go.Bar(x=ind_df["date"], y=ind_df["macd_hist"], name="Histogram"),
+                    go.Scatter(x=ind_df["date"], y=ind_df["macd"], name="MACD"),
+                    go.Scatter(x=ind_df["date"], y=ind_df["macd_signal"], name="Signal"),
+                ])
+                macd_fig.update_layout(title="MACD (12, 26, 9)", height=300)
+                st.plotly_chart(macd_fig, use_container_width=True)
+else:
+    st.info("Load stock data above to see indicators.")
@@ -1,11 +1,22 @@
 import streamlit as st
 import requests
+import hashlib
 import os
 
 # Centralized backend URL getter
 def get_backend_url():
     return os.getenv("BACKEND_URL", "http://localhost:8000")
 
+# Validators (ETags) of recent GET responses, kept per browser session so unchanged data is not re-downloaded
+ETAG_CACHE_KEY = "_etag_cache"
+ETAG_CACHE_MAX_ENTRIES = 20
+
+def _etag_cache_key(endpoint: str, params, token: str = None) -> tuple:
+    # The token is part of the key (hashed, so it is not kept twice in session state): a body remembered for one
+    # user or login is never replayed to another on a 304
+    token_hash = hashlib.sha256(token.encode()).hexdigest() if token else None
+    return (endpoint, tuple(sorted((params or {}).items())), token_hash)
+
 # Example utility for making API calls
 def api_call(method: str, endpoint: str, token: str = None, json_data=None, params=None, data=None):
     """
@@ -16,10 +27,16 @@ def api_call(method: str, endpoint: str, token: str = None, json_data=None, para
     `json_data` is for POST/PUT request body (sends as JSON).
     `params` is for URL query parameters.
     `data` is for form-encoded data (e.g. for OAuth2PasswordRequestForm).
+    GET responses with an ETag are remembered; repeating the call sends If-None-Match
+    and a 304 Not Modified answer returns the remembered JSON.
     """
     headers = {}
     if token:
         headers["Authorization"] = f"Bearer {token}"
+    etag_cache = st.session_state.setdefault(ETAG_CACHE_KEY, {})
+    cache_key = _etag_cache_key(endpoint, params, token) if method.upper() == "GET" else None
+    if cache_key in etag_cache:
+        headers["If-None-Match"] = etag_cache[cache_key][0]
 
     try:
         full_url = f"{get_backend_url()}{endpoint}"
@@ -32,10 +49,18 @@ def api_call(method: str, endpoint: str, token: str = None, json_data=None, para
         response = requests.request(method, full_url, headers=headers, json=json_data, params=params, data=data, timeout=10)
         response.raise_for_status() # Raises HTTPError for bad responses (4XX or 5XX)
 
+        if response.status_code == 304 and cache_key in etag_cache:
+            return etag_cache[cache_key][1]
         # Handle cases where response might be empty but successful (e.g., 204 No Content)
         if response.status_code == 204:
             return None
-        return response.json()
+        result = response.json()
+        if cache_key is not None and response.headers.get("ETag"):
+            etag_cache.pop(cache_key, None) # Re-insert so the dict stays in least-recently-stored order
+            etag_cache[cache_key] = (response.headers["ETag"], result)
+            while len(etag_cache) > ETAG_CACHE_MAX_ENTRIES:
+                etag_cache.pop(next(iter(etag_cache)))
+        return result
     except requests.exceptions.HTTPError as http_err:
         # Try to parse error message from response if possible
         error_detail = http_err.response.text
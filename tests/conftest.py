@@ -1,3 +1,5 @@
+import datetime
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -6,8 +8,10 @@ from typing import Generator
 
 # Import your FastAPI app and database models/setup
 from backend.main import app  # Your FastAPI application
+from backend import schemas
 from backend.database import Base, get_db
 from backend.models import User # To help with setup/teardown if needed
+from backend.services.price_cache import matrix_cache, price_cache
 
 # --- Test Database Setup ---
 # Use an in-memory SQLite database for testing
@@ -68,6 +72,8 @@ def db_session(create_test_database) -> Generator[Session, None, None]:
             db.execute(table.delete())
         db.commit()
         db.close()
+        price_cache.clear() # Rows were deleted behind crud's back, so cached reads are stale
+        matrix_cache.clear() # Data versions restart as well, so version-keyed results could be reused
 
 # --- Helper Fixtures for Auth ---
 
@@ -135,3 +141,18 @@ def superuser_auth_headers(client: TestClient, db_session: Session) -> dict:
     token_info = response.json()
 
     return {"Authorization": f"Bearer {token_info['access_token']}"}
+
+# --- Price Data Helpers (imported by the test modules: from conftest import daily_bars, price) ---
+
+def price(symbol: str, date: datetime.date, close: float, source: str = "S1", volume: int = 100) -> schemas.StockPriceCreate:
+    """A daily bar closing at `close`: open = close, high = close + 1 and low = close / 2."""
+    return schemas.StockPriceCreate(
+        symbol=symbol, date=date, open=close, high=close + 1, low=close / 2, close=close, volume=volume, data_source=source
+    )
+
+def daily_bars(symbol: str, start: datetime.date, closes, source: str = "S1", volumes=None) -> schemas.StockPriceBulkCreate:
+    """One price() per close on consecutive days from `start`."""
+    volumes = volumes or [100] * len(closes)
+    return schemas.StockPriceBulkCreate(prices=[
+        price(symbol, start + datetime.timedelta(days=i), close, source, volume) for i, (close, volume) in enumerate(zip(closes, volumes))
+    ])
@@ -0,0 +1,114 @@
+import datetime
+import math
+
+import numpy as np
+import pyarrow as pa
+import pytest
+from sqlalchemy.orm import Session
+
+from backend import cold_storage, crud, duckdb_analytics
+from backend.services import analytics
+from conftest import daily_bars, price
+
+START = datetime.date(2002, 1, 1)
+RECENT = datetime.date.today() - datetime.timedelta(days=40)
+
+
+@pytest.fixture
+def numpy_path(monkeypatch):
+    """The NumPy path whatever ANALYTICS_ENGINE is (a DuckDB engine from settings attaches another database)."""
+    monkeypatch.setattr(duckdb_analytics, "engine", None)
+
+
+def test_tables_from_arrays():
+    dates = np.datetime64("2024-01-01") + np.arange(4)
+    series = {
+        "BB": {"id": np.array([1.0, 5, 3, 4]), "date": dates, "high": np.array([11.0, 13, 14, 15]),
+               "low": np.array([9.0, 7, 6, 5]), "close": np.array([10.0, 12, 9, 12]), "volume": np.array([1.0, 3, 4, 5])},
+        "AA": {"id": np.array([6.0]), "date": dates[:1], "high": np.array([2.0]), "low": np.array([1.0]),
+               "close": np.array([1.5]), "volume": np.array([7.0])},
+    }
+    summary = analytics.summary_table(series).to_pylist()
+    assert [row["symbol"] for row in summary] == ["AA", "BB"]
+    assert summary[0]["bars"] == 1 and summary[0]["volatility"] is None and summary[0]["max_drawdown"] == 0.0
+    bb = summary[1]
+    assert bb["bars"] == 4 and bb["last_close"] == 12.0 and bb["total_return"] == pytest.approx(0.2)
+    assert bb["max_drawdown"] == pytest.approx(9 / 12 - 1) and bb["high"] == 15.0 and bb["low"] == 5.0
+    assert bb["volatility"] == pytest.approx(np.diff(np.log([10.0, 12, 9, 12])).std(ddof=1) * math.sqrt(252))
+
+    breadth = analytics.breadth_table(series).to_pylist()
+    assert [(row["symbols"], row["advancers"], row["decliners"], row["volume"]) for row in breadth] == [
+        (2, 0, 0, 8), (1, 1, 0, 3), (1, 0, 1, 4), (1, 1, 0, 5)
+    ]
+    assert breadth[0]["mean_return"] is None and breadth[1]["mean_return"] == pytest.approx(math.log(1.2))
+
+    rolling = analytics.rolling_table(series, window=2)
+    assert rolling.schema == analytics.ROLLING_SCHEMA and rolling.num_rows == 5
+    bb_rows = rolling.to_pylist()[1:]
+    assert [row["momentum"] for row in bb_rows[:2]] == [None, None] and bb_rows[2]["momentum"] == pytest.approx(9 / 10 - 1)
+    assert bb_rows[1]["volatility"] is None
+    assert bb_rows[2]["volatility"] == pytest.approx(np.std(np.log([1.2, 0.75]), ddof=1) * math.sqrt(252))
+    assert analytics.table_to_records(rolling)[0]["date"] == "2024-01-01"
+    assert analytics.rolling_table({}).num_rows == 0 and analytics.breadth_table({}).num_rows == 0
+
+
+def test_analytics_include_cold_rows_and_match_duckdb(db_session: Session, tmp_path, monkeypatch, numpy_path):
+    rng = np.random.default_rng(7)
+    for symbol in ("ANA", "ANB"):
+        crud.create_stock_prices_bulk(db_session, daily_bars(symbol, START, list(100 * np.exp(np.cumsum(rng.normal(0, 0.02, 60))))))
+        crud.create_stock_prices_bulk(db_session, daily_bars(symbol, RECENT, list(100 * np.exp(np.cumsum(rng.normal(0, 0.02, 30))))))
+    crud.create_stock_price(db_session, price("ANA", START + datetime.timedelta(days=3), 250.0, source="S2"))
+    symbols = ["ana", "ANB"]
+    before = [
+        crud.get_symbol_summaries(db_session, symbols), crud.get_market_breadth(db_session, symbols),
+        crud.get_rolling_metrics(db_session, symbols, 5, start_date=START + datetime.timedelta(days=10)),
+    ]
+    assert before[0].column("bars").to_pylist() == [90, 90]
+    assert before[0].column("high").to_pylist()[0] == 251.0 # The newer source on day 3
+
+    monkeypatch.setattr(cold_storage, "store", cold_storage.ColdStorage(str(tmp_path / "cold")))
+    moved = crud.archive_stock_prices(db_session, 730)
+    assert (moved["ANA"], moved["ANB"]) == (61, 60)
+    after = [
+        crud.get_symbol_summaries(db_session, symbols), crud.get_market_breadth(db_session, symbols),
+        crud.get_rolling_metrics(db_session, symbols, 5, start_date=START + datetime.timedelta(days=10)),
+    ]
+    assert [table.to_pylist() for table in after] == [table.to_pylist() for table in before]
+
+    pytest.importorskip("duckdb")
+    try:
+        engine = duckdb_analytics.DuckDBAnalytics(str(db_session.get_bind().url))
+    except RuntimeError as e: # The sqlite extension is not installed (it is never downloaded at runtime)
+        pytest.skip(str(e))
+    monkeypatch.setattr(duckdb_analytics, "engine", engine)
+    in_duckdb = [
+        crud.get_symbol_summaries(db_session, symbols), crud.get_market_breadth(db_session, symbols),
+        crud.get_rolling_metrics(db_session, symbols, 5, start_date=START + datetime.timedelta(days=10)),
+    ]
+    for expected, actual in zip(before, in_duckdb):
+        assert actual.schema == expected.schema and actual.num_rows == expected.num_rows
+        for name in expected.column_names:
+            if pa.types.is_floating(expected.schema.field(name).type):
+                assert actual.column(name).to_pylist() == pytest.approx(expected.column(name).to_pylist(), rel=1e-9, abs=1e-12, nan_ok=True)
+            else:
+                assert actual.column(name).to_pylist() == expected.column(name).to_pylist(), name
+
+
+def test_analytics_endpoints(client, db_session: Session, numpy_path):
+    crud.create_stock_prices_bulk(db_session, daily_bars("ANE", START, [10.0, 11, 12, 11]))
+    crud.create_stock_prices_bulk(db_session, daily_bars("ANF", START, [20.0, 19, 21]))
+    response = client.get("/stocks/analytics/summary", params={"symbols": "ANE,ANF"})
+    assert response.status_code == 200
+    assert [(row["symbol"], row["bars"], row["start_date"]) for row in response.json()] == [("ANE", 4, "2002-01-01"), ("ANF", 3, "2002-01-01")]
+
+    response = client.get("/stocks/analytics/breadth", params={"symbols": "ANE,ANF", "end_date": "2002-01-02"})
+    assert [(row["date"], row["advancers"], row["decliners"]) for row in response.json()] == [("2002-01-01", 0, 0), ("2002-01-02", 1, 1)]
+
+    response = client.get("/stocks/analytics/rolling", params={"symbols": "ANE", "window": 2, "format": "arrow"})
+    assert response.headers["content-type"].startswith("application/vnd.apache.arrow.stream")
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column("momentum").to_pylist()[2:] == pytest.approx([0.2, 0.0])
+
+    assert client.get("/stocks/analytics/rolling", params={"symbols": "ANE", "window": 1}).status_code == 422
+    response = client.get("/stocks/analytics/summary", params={"start_date": "2002-02-01", "end_date": "2002-01-01"})
+    assert response.status_code == 400
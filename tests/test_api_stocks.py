@@ -2,7 +2,14 @@ from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session # For type hinting
 from backend import schemas, models # For type hinting and direct DB checks
 import datetime
+import pytest
+import io
+import json
+import pyarrow as pa
+import pyarrow.parquet as pq
+import numpy as np
 from unittest.mock import patch # For mocking external services like Alpha Vantage
+from backend.services.price_cache import matrix_cache
 
 # --- Test Stock Price Creation (Admin/Superuser) ---
 def test_create_single_stock_price(client: TestClient, superuser_auth_headers: dict, db_session: Session):
@@ -57,6 +64,22 @@ def test_create_bulk_stock_prices(client: TestClient, superuser_auth_headers: di
     ).count()
     assert count_in_db == 2
 
+def test_create_bulk_stock_prices_conflict_stores_nothing(client: TestClient, superuser_auth_headers: dict, db_session: Session, monkeypatch):
+    from backend.config import settings
+    monkeypatch.setattr(settings, "BULK_INGEST_CHUNK_SIZE", 2)
+    existing = {"symbol": "BULKATOM", "date": "2023-10-05", "open": 1, "high": 1, "low": 1, "close": 1, "volume": 1, "data_source": "S"}
+    assert client.post("/stocks/", headers=superuser_auth_headers, json=existing).status_code == 201
+    prices = [{**existing, "date": f"2023-10-0{day}", "close": day} for day in range(1, 8)] # Day 5 conflicts, in the third chunk
+    response = client.post("/stocks/bulk", headers=superuser_auth_headers, json={"prices": prices})
+    assert response.status_code == 409
+    assert db_session.query(models.StockPrice).filter(models.StockPrice.symbol == "BULKATOM").count() == 1 # Earlier chunks rolled back
+    assert len(client.get("/stocks/BULKATOM").json()) == 1
+
+    # The same request minus the conflicting row then goes through as a whole
+    response = client.post("/stocks/bulk", headers=superuser_auth_headers, json={"prices": prices[:4] + prices[5:]})
+    assert response.status_code == 201, f"Response: {response.text}"
+    assert db_session.query(models.StockPrice).filter(models.StockPrice.symbol == "BULKATOM").count() == 7
+
 
 # --- Test Get Stock Prices ---
 def test_get_stock_prices_by_symbol(client: TestClient, superuser_auth_headers: dict, db_session: Session):
@@ -77,6 +100,9 @@ def test_get_stock_prices_by_symbol(client: TestClient, superuser_auth_headers:
     assert prices[1]["date"] == "2023-10-01"
     for p in prices:
         assert p["symbol"] == "GETTEST"
+        # The Core fast path must still produce exactly the StockPricePublic shape
+        assert set(p) == set(schemas.StockPricePublic.model_fields)
+        schemas.StockPricePublic.model_validate(p)
 
 def test_get_stock_prices_with_date_filters(client: TestClient, superuser_auth_headers: dict, db_session: Session):
     # Data created in previous test might interfere if db_session isn't cleaning properly.
@@ -116,6 +142,436 @@ def test_get_stock_prices_with_date_filters(client: TestClient, superuser_auth_h
     assert "Start date cannot be after end date" in response_invalid_range.json()["detail"]
 
 
+def test_get_stock_prices_cursor_pagination(client: TestClient, superuser_auth_headers: dict, db_session: Session):
+    db_session.add_all([
+        models.StockPrice(symbol="PAGED", date=datetime.date(2023,10,d), open=d,high=d,low=d,close=d,volume=100*d, data_source="S1")
+        for d in range(1, 6)
+    ] + [
+        # Same date from another source: the id tie-breaker keeps the page order deterministic
+        models.StockPrice(symbol="PAGED", date=datetime.date(2023,10,3), open=9,high=9,low=9,close=9,volume=900, data_source="S2"),
+    ])
+    db_session.commit()
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/stocks/PAGED", params=params, headers=superuser_auth_headers)
+        assert response.status_code == 200, f"Response: {response.text}"
+        seen.extend(response.json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert len(seen) == 6
+    assert len({p["id"] for p in seen}) == 6
+    assert [p["date"] for p in seen] == sorted((p["date"] for p in seen), reverse=True)
+
+    # Offset pagination is still supported and matches the cursor order
+    offset_page = client.get("/stocks/PAGED", params={"limit": 2, "skip": 2}, headers=superuser_auth_headers).json()
+    assert [p["id"] for p in offset_page] == [p["id"] for p in seen[2:4]]
+
+def test_get_stock_prices_invalid_cursor(client: TestClient, superuser_auth_headers: dict):
+    response = client.get("/stocks/PAGED?cursor=not-a-cursor", headers=superuser_auth_headers)
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.json()["detail"]
+
+def test_get_stock_prices_columnar(client: TestClient, superuser_auth_headers: dict, db_session: Session):
+    db_session.add_all([
+        models.StockPrice(symbol="COLS", date=datetime.date(2023,10,1), open=1,high=2,low=0.5,close=1.5,volume=100, data_source="S1"),
+        models.StockPrice(symbol="COLS", date=datetime.date(2023,10,2), open=2,high=3,low=1.5,close=2.5,volume=200, data_source="S1"),
+        models.StockPrice(symbol="COLS", date=datetime.date(2023,10,3), open=3,high=4,low=2.5,close=3.5,volume=300, data_source="S1"),
+    ])
+    db_session.commit()
+
+    response = client.get("/stocks/cols?format=columnar&limit=2", headers=superuser_auth_headers)
+    assert response.status_code == 200, f"Response: {response.text}"
+    body = response.json()
+    assert body["symbol"] == "COLS"
+    assert body["data_source"] == "S1"
+    assert body["dates"] == ["2023-10-03", "2023-10-02"] # Same newest-first order as the records format
+    assert body["open"] == [3, 2]
+    assert body["close"] == [3.5, 2.5]
+    assert body["volume"] == [300, 200]
+    assert "id" not in body and "data_sources" not in body
+    assert body["next_cursor"] == response.headers["X-Next-Cursor"]
+
+    last_page = client.get(f"/stocks/COLS?format=columnar&limit=2&cursor={body['next_cursor']}", headers=superuser_auth_headers).json()
+    assert last_page["dates"] == ["2023-10-01"]
+    assert last_page["next_cursor"] is None
+
+    # Mixed sources: the per-row sources are included
+    db_session.add(models.StockPrice(symbol="COLS", date=datetime.date(2023,10,3), open=3,high=4,low=2.5,close=3.6,volume=310, data_source="S2"))
+    db_session.commit()
+    mixed = client.get("/stocks/COLS?format=columnar", headers=superuser_auth_headers).json()
+    assert mixed["data_source"] is None
+    assert sorted(mixed["data_sources"][:2]) == ["S1", "S2"]
+
+def test_get_stock_prices_columnar_empty(client: TestClient, superuser_auth_headers: dict):
+    response = client.get("/stocks/NOSUCHSYMBOL?format=columnar", headers=superuser_auth_headers)
+    assert response.status_code == 200
+    assert response.json()["dates"] == []
+
+def test_get_stock_prices_arrow_and_parquet(client: TestClient, superuser_auth_headers: dict, db_session: Session):
+    db_session.add_all([
+        models.StockPrice(symbol="ARROW", date=datetime.date(2023,10,d), open=d,high=d+1,low=d-0.5,close=d+0.5,volume=1000*d, data_source="S1")
+        for d in range(1, 4)
+    ])
+    db_session.commit()
+
+    # Content negotiation via Accept
+    response = client.get("/stocks/ARROW", headers={**superuser_auth_headers, "Accept": "application/vnd.apache.arrow.stream"})
+    assert response.status_code == 200, f"Response: {response.text}"
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.schema.metadata[b"symbol"] == b"ARROW"
+    assert table.schema.field("date").type == pa.date32()
+    assert table.schema.field("volume").type == pa.int64()
+    assert table.column("date").to_pylist() == [datetime.date(2023,10,3), datetime.date(2023,10,2), datetime.date(2023,10,1)]
+    assert table.column("close").to_pylist() == [3.5, 2.5, 1.5]
+    assert table.column("data_source").to_pylist() == ["S1", "S1", "S1"]
+
+    # Parquet, with date filtering
+    response = client.get("/stocks/ARROW?start_date=2023-10-02", headers={**superuser_auth_headers, "Accept": "application/x-parquet"})
+    assert response.status_code == 200, f"Response: {response.text}"
+    assert response.headers["content-type"] == "application/x-parquet"
+    df = pq.read_table(io.BytesIO(response.content)).to_pandas()
+    assert list(df.columns) == ["date", "open", "high", "low", "close", "volume", "data_source"]
+    assert df["volume"].tolist() == [3000, 2000]
+
+    # Explicit ?format= works without headers; unknown Accept types fall back to JSON records
+    assert client.get("/stocks/ARROW?format=parquet", headers=superuser_auth_headers).headers["content-type"] == "application/x-parquet"
+    json_response = client.get("/stocks/ARROW", headers={**superuser_auth_headers, "Accept": "text/html, */*"})
+    assert len(json_response.json()) == 3
+
+def test_stream_stock_prices_ndjson(client: TestClient, superuser_auth_headers: dict, db_session: Session):
+    db_session.add_all([
+        models.StockPrice(symbol="STREAM", date=datetime.date(2020,1,1) + datetime.timedelta(days=i), open=1,high=1,low=1,close=1+i,volume=i, data_source="S1")
+        for i in range(1500) # More than the 1000-row cap of the paged endpoint
+    ])
+    db_session.commit()
+
+    response = client.get("/stocks/STREAM/stream?batch_size=400", headers=superuser_auth_headers)
+    assert response.status_code == 200, f"Response: {response.text}"
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 1500
+    assert lines[0]["date"] == "2024-02-08" and lines[0]["close"] == 1500
+    assert lines[-1]["date"] == "2020-01-01"
+    assert set(lines[0]) == {"id", "symbol", "date", "open", "high", "low", "close", "volume", "data_source", "created_at"}
+
+    filtered = client.get("/stocks/STREAM/stream?start_date=2024-02-07", headers=superuser_auth_headers)
+    assert [json.loads(line)["date"] for line in filtered.text.splitlines()] == ["2024-02-08", "2024-02-07"]
+
+def test_get_stock_prices_sparse_fieldsets(client: TestClient, superuser_auth_headers: dict, db_session: Session):
+    db_session.add_all([
+        models.StockPrice(symbol="SPARSE", date=datetime.date(2023,10,d), open=d,high=d+1,low=d-0.5,close=d+0.5,volume=1000*d, data_source="S1")
+        for d in range(1, 4)
+    ])
+    db_session.commit()
+
+    records = client.get("/stocks/SPARSE?fields=date,close", headers=superuser_auth_headers)
+    assert records.status_code == 200, f"Response: {records.text}"
+    assert records.json() == [
+        {"date": "2023-10-03", "close": 3.5}, {"date": "2023-10-02", "close": 2.5}, {"date": "2023-10-01", "close": 1.5}
+    ]
+
+    paged = client.get("/stocks/SPARSE?fields=close&limit=2", headers=superuser_auth_headers)
+    assert paged.json() == [{"close": 3.5}, {"close": 2.5}]
+    assert "X-Next-Cursor" in paged.headers # Pagination keys are still read even when not returned
+
+    columnar = client.get("/stocks/SPARSE?format=columnar&fields=close,volume", headers=superuser_auth_headers).json()
+    assert columnar["close"] == [3.5, 2.5, 1.5]
+    assert columnar["volume"] == [3000, 2000, 1000]
+    assert "open" not in columnar and columnar["data_source"] is None
+    assert len(columnar["dates"]) == 3
+
+    arrow = client.get("/stocks/SPARSE?format=arrow&fields=date,close", headers=superuser_auth_headers)
+    assert pa.ipc.open_stream(arrow.content).read_all().column_names == ["date", "close"]
+
+    stream = client.get("/stocks/SPARSE/stream?fields=date,volume", headers=superuser_auth_headers)
+    assert json.loads(stream.text.splitlines()[0]) == {"date": "2023-10-03", "volume": 3000}
+
+    unknown = client.get("/stocks/SPARSE?fields=date,bogus", headers=superuser_auth_headers)
+    assert unknown.status_code == 400
+    assert "bogus" in unknown.json()["detail"]
+    # The symbol is implied for columnar output, so it cannot be projected there
+    assert client.get("/stocks/SPARSE?format=columnar&fields=symbol", headers=superuser_auth_headers).status_code == 400
+
+def test_get_stock_prices_etag_not_modified(client: TestClient, superuser_auth_headers: dict):
+    payload = {"symbol": "ETAG", "date": "2023-10-01", "open": 1, "high": 2, "low": 1, "close": 2, "volume": 100, "data_source": "E1"}
+    assert client.post("/stocks/", headers=superuser_auth_headers, json=payload).status_code == 201
+
+    first = client.get("/stocks/ETAG", headers=superuser_auth_headers)
+    etag = first.headers["ETag"]
+    revalidated = client.get("/stocks/ETAG", headers={**superuser_auth_headers, "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag and revalidated.content == b""
+    # Another representation of the same data has its own validator
+    columnar = client.get("/stocks/ETAG?format=columnar", headers={**superuser_auth_headers, "If-None-Match": etag})
+    assert columnar.status_code == 200 and columnar.headers["ETag"] != etag
+
+    # Any write to the symbol changes the ETag
+    payload["date"] = "2023-10-02"
+    assert client.post("/stocks/", headers=superuser_auth_headers, json=payload).status_code == 201
+    changed = client.get("/stocks/ETAG", headers={**superuser_auth_headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert len(changed.json()) == 2 and changed.headers["ETag"] != etag
+
+def test_get_stock_prices_for_symbols(client: TestClient, superuser_auth_headers: dict, db_session: Session):
+    db_session.add_all([
+        models.StockPrice(symbol=symbol, date=datetime.date(2023,10,d), open=d,high=d+1,low=d-0.5,close=base+d,volume=100*d, data_source="M1")
+        for symbol, base in (("MULTA", 10), ("MULTB", 20)) for d in range(1, 5)
+    ])
+    db_session.commit()
+
+    response = client.get("/stocks?symbols=multb,MULTA,NOSUCH,MULTB&limit=2&fields=date,close", headers=superuser_auth_headers)
+    assert response.status_code == 200, f"Response: {response.text}"
+    series = response.json()["series"]
+    assert [s["symbol"] for s in series] == ["MULTB", "MULTA", "NOSUCH"] # Request order, duplicates dropped
+    assert series[0]["dates"] == ["2023-10-04", "2023-10-03"] # limit applies per symbol, newest first
+    assert series[0]["close"] == [24, 23] and series[1]["close"] == [14, 13]
+    assert series[2]["dates"] == []
+
+    dated = client.get("/stocks/?symbols=MULTA,MULTB&end_date=2023-10-02", headers=superuser_auth_headers).json()
+    assert [s["dates"] for s in dated["series"]] == [["2023-10-02", "2023-10-01"]] * 2
+    assert dated["series"][0]["data_source"] == "M1"
+
+    arrow = client.get("/stocks?symbols=MULTA,MULTB&limit=3", headers={**superuser_auth_headers, "Accept": "application/vnd.apache.arrow.stream"})
+    table = pa.ipc.open_stream(arrow.content).read_all()
+    assert table.column_names[0] == "symbol"
+    assert table.column("symbol").to_pylist() == ["MULTA"] * 3 + ["MULTB"] * 3
+
+    many = ",".join(f"S{i:03d}" for i in range(600)) + ",MULTA"
+    assert len(client.get(f"/stocks?symbols={many}", headers=superuser_auth_headers).json()["series"]) == 601
+    assert client.get("/stocks?symbols=,", headers=superuser_auth_headers).status_code == 400
+
+def test_get_stock_prices_max_points(client: TestClient, superuser_auth_headers: dict, db_session: Session):
+    start = datetime.date(2020, 1, 1)
+    db_session.add_all([
+        models.StockPrice(symbol="DOWNS", date=start + datetime.timedelta(days=i), open=100, high=101 + (50 if i == 777 else 0),
+                          low=99, close=100 + i % 7, volume=10, data_source="D1")
+        for i in range(2000)
+    ])
+    db_session.commit()
+
+    candles = client.get("/stocks/DOWNS?max_points=100&format=columnar", headers=superuser_auth_headers)
+    assert candles.status_code == 200, f"Response: {candles.text}"
+    body = candles.json()
+    assert len(body["dates"]) == 100 and body["next_cursor"] is None # Whole range despite the default limit of 100 rows
+    assert max(body["high"]) == 151 and sum(body["volume"]) == 20000
+
+    lttb = client.get("/stocks/DOWNS?max_points=50&downsample=lttb&fields=date,volume", headers=superuser_auth_headers).json()
+    assert len(lttb) == 50 and set(lttb[0]) == {"date", "volume"}
+    assert lttb[0]["date"] == "2025-06-22" and lttb[-1]["date"] == "2020-01-01"
+
+    assert client.get("/stocks/DOWNS?max_points=50&skip=10", headers=superuser_auth_headers).status_code == 400
+
+def test_get_stock_prices_interval(client: TestClient, superuser_auth_headers: dict):
+    start = datetime.date(2004, 1, 1)
+    payload = {
+        "prices": [
+            {"symbol": "LONGRUN", "date": (start + datetime.timedelta(days=i)).isoformat(), "open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": 10}
+            for i in range(0, 20 * 365, 3)
+        ],
+        "data_source": "R1"
+    }
+    assert client.post("/stocks/bulk", headers=superuser_auth_headers, json=payload).status_code == 201
+
+    monthly = client.get("/stocks/LONGRUN?interval=1mo&format=columnar&limit=1000", headers=superuser_auth_headers).json()
+    assert len(monthly["dates"]) == 240
+    assert monthly["dates"][-1] == "2004-01-01" and all(d.endswith("-01") for d in monthly["dates"])
+    yearly = client.get("/stocks/LONGRUN?interval=1y", headers=superuser_auth_headers).json()
+    assert len(yearly) == 20 and yearly[0]["date"] == "2023-01-01"
+    assert set(yearly[0]) == set(schemas.StockPricePublic.model_fields)
+
+    assert client.get("/stocks/LONGRUN?interval=2h", headers=superuser_auth_headers).status_code == 400
+
+def test_get_stock_indicators(client: TestClient, superuser_auth_headers: dict, db_session: Session):
+    start = datetime.date(2023, 1, 1)
+    db_session.add_all([
+        models.StockPrice(symbol="INDIC", date=start + datetime.timedelta(days=i), open=1, high=1, low=1, close=100 + i, volume=1, data_source="I1")
+        for i in range(100)
+    ])
+    db_session.commit()
+
+    response = client.get("/stocks/INDIC/indicators?names=sma,macd&window=5", headers=superuser_auth_headers)
+    assert response.status_code == 200, f"Response: {response.text}"
+    body = response.json()
+    assert body["dates"][0] == "2023-01-01" and len(body["close"]) == 100
+    assert set(body["indicators"]) == {"sma", "macd", "macd_signal", "macd_hist"}
+    assert body["indicators"]["sma"][:5] == [None, None, None, None, 102.0]
+
+    # History before start_date warms the indicators up
+    ranged = client.get("/stocks/INDIC/indicators?names=sma&window=5&start_date=2023-03-01", headers=superuser_auth_headers).json()
+    assert ranged["dates"][0] == "2023-03-01"
+    assert ranged["indicators"]["sma"][0] == ranged["close"][0] - 2
+
+    assert client.get("/stocks/INDIC/indicators?names=bogus", headers=superuser_auth_headers).status_code == 400
+
+def test_get_stock_risk(client: TestClient, superuser_auth_headers: dict, db_session: Session):
+    start = datetime.date(2023, 1, 1)
+    db_session.add_all([
+        models.StockPrice(symbol=symbol, date=start + datetime.timedelta(days=i), open=1, high=1, low=1, close=close, volume=1, data_source="R1")
+        for symbol, closes in (("RISKA", [100, 110, 99, 120, 90, 95]), ("RISKB", [10, 11, 12, 13, 14, 15]))
+        for i, close in enumerate(closes)
+    ])
+    db_session.commit()
+
+    response = client.get("/stocks/RISKA/risk?windows=2,3", headers=superuser_auth_headers)
+    assert response.status_code == 200, f"Response: {response.text}"
+    body = response.json()
+    assert body["dates"][0] == "2023-01-02" and len(body["returns"]) == 5
+    assert body["rolling_volatility"]["3"][:3] == [None, None, body["rolling_volatility"]["3"][2]]
+    assert body["summary"]["max_drawdown"] == pytest.approx(-0.25)
+    assert body["summary"]["max_drawdown_trough"] == "2023-01-05"
+
+    batch = client.get("/stocks/risk?symbols=riskb,RISKA,NOPE&windows=2", headers=superuser_auth_headers)
+    assert batch.status_code == 200, f"Response: {batch.text}"
+    results = batch.json()["results"]
+    assert [r["symbol"] for r in results] == ["RISKB", "RISKA", "NOPE"]
+    assert results[0]["max_drawdown"] == 0.0 and results[2]["bars"] == 0
+    assert results[1]["var_historical"] == body["summary"]["var_historical"]
+
+    assert client.get("/stocks/risk?symbols=RISKA", headers={**superuser_auth_headers, "If-None-Match": batch.headers["ETag"]}).status_code == 200
+    assert client.get("/stocks/risk?symbols=riskb,RISKA,NOPE&windows=2", headers={**superuser_auth_headers, "If-None-Match": batch.headers["ETag"]}).status_code == 304
+    assert client.get("/stocks/RISKA/risk?windows=1", headers=superuser_auth_headers).status_code == 400
+
+def two_source_history(client: TestClient, headers: dict, symbol: str, days: int = 30) -> list[float]:
+    """`days` bars from source A, then the same dates from source B (newer rows, twice the close). Returns B's closes."""
+    start = datetime.date(2024, 1, 1)
+    closes = [100.0 + (i % 7) - (i % 3) for i in range(days)]
+    for source, factor in (("A", 1), ("B", 2)):
+        client.post("/stocks/bulk", json={"prices": [
+            {"symbol": symbol, "date": (start + datetime.timedelta(days=i)).isoformat(), "open": 1, "high": 1, "low": 1,
+             "close": close * factor, "volume": 1}
+            for i, close in enumerate(closes)
+        ], "data_source": source}, headers=headers)
+    return [close * 2 for close in closes]
+
+def test_get_stock_risk_uses_one_bar_per_date(client: TestClient, superuser_auth_headers: dict):
+    closes = two_source_history(client, superuser_auth_headers, "RISKMS")
+    body = client.get("/stocks/RISKMS/risk?windows=5").json()
+    assert body["summary"]["bars"] == 30 and len(body["returns"]) == 29
+    assert body["returns"][0] == pytest.approx(np.log(closes[1] / closes[0])) # Day over day within source B
+    batch = client.get("/stocks/risk?symbols=RISKMS&windows=5").json()["results"][0]
+    assert batch["bars"] == 30 and batch["max_drawdown"] == body["summary"]["max_drawdown"]
+
+def test_get_stock_correlation(client: TestClient, superuser_auth_headers: dict, db_session: Session):
+    start = datetime.date(2023, 1, 1)
+    closes = {"CORA": [10, 11, 12, 11, 13, 14], "CORB": [20, 22, 24, 22, 26, 28], "CORC": [5, 4, 5, 6, 5, 4]}
+    db_session.add_all([
+        models.StockPrice(symbol=symbol, date=start + datetime.timedelta(days=i), open=1, high=1, low=1, close=close, volume=1, data_source="C1")
+        for symbol, values in closes.items()
+        for i, close in enumerate(values)
+        if not (symbol == "CORC" and i == 0) # CORC starts a day later
+    ])
+    db_session.commit()
+
+    response = client.get("/stocks/correlation?symbols=corb,CORA,CORC,NOPE", headers=superuser_auth_headers)
+    assert response.status_code == 200, f"Response: {response.text}"
+    body = response.json()
+    assert body["symbols"] == ["CORB", "CORA", "CORC"] and body["missing"] == ["NOPE"]
+    assert body["start_date"] == "2023-01-02" and body["observations"] == 4
+    # CORB moves exactly with CORA
+    assert body["correlation"][0][1] == pytest.approx(1.0)
+    assert body["covariance"][0][0] == pytest.approx(body["covariance"][1][1])
+    assert body["correlation"][2][0] < 0
+
+    etag = response.headers["ETag"]
+    assert client.get("/stocks/correlation?symbols=corb,CORA,CORC,NOPE", headers={**superuser_auth_headers, "If-None-Match": etag}).status_code == 304
+    hits = matrix_cache.hits
+    assert client.get("/stocks/correlation?symbols=CORC,NOPE,CORA,CORB", headers=superuser_auth_headers).json()["symbols"] == ["CORC", "CORA", "CORB"]
+    assert matrix_cache.hits == hits + 1 # Same symbol set, served from memory
+    # Writes change the data version, so neither the ETag nor the cached matrices are reused
+    client.post("/stocks/", json={"symbol": "CORA", "date": "2023-01-07", "open": 1, "high": 1, "low": 1, "close": 15, "volume": 1, "data_source": "C1"}, headers=superuser_auth_headers)
+    client.post("/stocks/", json={"symbol": "CORB", "date": "2023-01-07", "open": 1, "high": 1, "low": 1, "close": 15, "volume": 1, "data_source": "C1"}, headers=superuser_auth_headers)
+    client.post("/stocks/", json={"symbol": "CORC", "date": "2023-01-07", "open": 1, "high": 1, "low": 1, "close": 15, "volume": 1, "data_source": "C1"}, headers=superuser_auth_headers)
+    refreshed = client.get("/stocks/correlation?symbols=corb,CORA,CORC,NOPE", headers={**superuser_auth_headers, "If-None-Match": etag})
+    assert refreshed.status_code == 200 and refreshed.json()["observations"] == 5
+
+def test_stock_backtest(client: TestClient, superuser_auth_headers: dict, db_session: Session):
+    start = datetime.date(2023, 1, 1)
+    closes = [10, 11, 12, 13, 12, 11, 10, 11, 12, 13, 14, 15]
+    db_session.add_all([
+        models.StockPrice(symbol="BTEST", date=start + datetime.timedelta(days=i), open=1, high=1, low=1, close=close, volume=1, data_source="B1")
+        for i, close in enumerate(closes)
+    ])
+    db_session.commit()
+
+    response = client.post("/stocks/btest/backtest", json={"strategy": "ma_crossover", "params": {"fast": 2, "slow": 3}})
+    assert response.status_code == 200, f"Response: {response.text}"
+    body = response.json()
+    assert body["params"] == {"fast": 2, "slow": 3} and len(body["equity"]) == len(closes)
+    assert body["trades"][0]["entry_date"] == "2023-01-03" and body["trades"][-1]["open"] is True
+    assert body["summary"]["trades"] == len(body["trades"])
+
+    held = client.post("/stocks/BTEST/backtest", json={"strategy": "buy_and_hold"}).json()
+    assert held["summary"]["total_return"] == pytest.approx(0.5)
+
+    sweep = client.post("/stocks/BTEST/backtest/sweep", json={
+        "strategy": "ma_crossover", "grid": {"fast": [2, 3], "slow": [3, 4, 5]}, "sort_by": "total_return", "top": 2
+    })
+    assert sweep.status_code == 200, f"Response: {sweep.text}"
+    sweep_body = sweep.json()
+    assert sweep_body["evaluated"] == 5 and len(sweep_body["results"]) == 2
+    assert sweep_body["results"][0]["summary"]["total_return"] >= sweep_body["results"][1]["summary"]["total_return"]
+
+    assert client.post("/stocks/BTEST/backtest", json={"strategy": "martingale"}).status_code == 400
+    assert client.post("/stocks/NOPE/backtest", json={"strategy": "buy_and_hold"}).status_code == 404
+
+def test_screen_stocks(client: TestClient, superuser_auth_headers: dict):
+    for symbol, closes in (("SCRA", [10, 11, 12, 13]), ("SCRB", [20, 18, 16, 14])):
+        client.post("/stocks/bulk", json={"prices": [
+            {"symbol": symbol, "date": f"2024-01-0{i + 1}", "open": c, "high": c, "low": c, "close": c, "volume": 100}
+            for i, c in enumerate(closes)
+        ], "data_source": "SC"}, headers=superuser_auth_headers)
+
+    response = client.get("/stocks/screen?where=pct_from_high_52w>=-0.01&sort=-last_close")
+    assert response.status_code == 200, f"Response: {response.text}"
+    assert [row["symbol"] for row in response.json()] == ["SCRA"]
+    assert response.json()[0]["last_date"] == "2024-01-04"
+    ranked = client.get("/stocks/screen?sort=change_pct&symbols=SCRA,SCRB").json()
+    assert [row["symbol"] for row in ranked] == ["SCRB", "SCRA"]
+    assert client.get("/stocks/screen?where=nonsense").status_code == 400
+
+def test_get_latest_quotes(client: TestClient, superuser_auth_headers: dict):
+    client.post("/stocks/bulk", json={"prices": [
+        {"symbol": "TILEA", "date": "2024-01-02", "open": 1, "high": 1, "low": 1, "close": 10, "volume": 5},
+        {"symbol": "TILEA", "date": "2024-01-03", "open": 1, "high": 1, "low": 1, "close": 12, "volume": 7},
+        {"symbol": "TILEB", "date": "2024-01-03", "open": 1, "high": 1, "low": 1, "close": 3, "volume": 9},
+    ], "data_source": "T"}, headers=superuser_auth_headers)
+
+    response = client.get("/stocks/latest?symbols=tileb,TILEA,NOPE")
+    assert response.status_code == 200, f"Response: {response.text}"
+    quotes = response.json()
+    assert [q["symbol"] for q in quotes] == ["TILEB", "TILEA"]
+    assert quotes[1]["date"] == "2024-01-03" and quotes[1]["change"] == 2 and quotes[1]["volume"] == 7
+    assert quotes[0]["prev_date"] is None
+    assert client.get("/stocks/latest?symbols=tileb,TILEA,NOPE", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+def test_get_stock_prices_asof(client: TestClient, superuser_auth_headers: dict):
+    client.post("/stocks/bulk", json={"prices": [
+        {"symbol": "ASOFA", "date": "2024-01-02", "open": 1, "high": 1, "low": 1, "close": 10, "volume": 5},
+        {"symbol": "ASOFA", "date": "2024-01-05", "open": 1, "high": 1, "low": 1, "close": 12, "volume": 7},
+    ], "data_source": "T"}, headers=superuser_auth_headers)
+
+    queries = [
+        {"symbol": "asofa", "date": "2024-01-04"}, {"symbol": "ASOFA", "date": "2024-01-05"},
+        {"symbol": "ASOFA", "date": "2024-01-01"}, {"symbol": "NOPE", "date": "2024-01-05"},
+    ]
+    response = client.post("/stocks/asof", json={"queries": queries})
+    assert response.status_code == 200, f"Response: {response.text}"
+    results = response.json()["results"]
+    assert [(r["symbol"], r["price_date"], r["close"]) for r in results] == [
+        ("ASOFA", "2024-01-02", 10.0), ("ASOFA", "2024-01-05", 12.0), ("ASOFA", None, None), ("NOPE", None, None),
+    ]
+    assert results[0]["date"] == "2024-01-04"
+    assert client.post("/stocks/asof", json={"queries": [{"symbol": "ASOFA", "date": "not a date"}]}).status_code == 422
+
 def test_get_stock_prices_not_found(client: TestClient, superuser_auth_headers: dict):
     response = client.get("/stocks/NOSUCHSYMBOL", headers=superuser_auth_headers)
     assert response.status_code == 200 # Endpoint returns empty list, not 404
@@ -137,7 +593,7 @@ def test_fetch_and_store_stock_data_success(
 
     response = client.post(f"/stocks/fetch/{symbol_to_fetch}?output_size=compact&refresh_data=true", headers=superuser_auth_headers)
     assert response.status_code == 200, f"Response: {response.text}"
-    assert f"Successfully fetched and stored 2 data points for symbol {symbol_to_fetch}" in response.json()["message"]
+    assert response.json()["message"] == f"Fetched 2 data points for symbol {symbol_to_fetch} from Alpha Vantage: 2 inserted, 0 updated, 0 unchanged."
 
     mock_get_daily_data.assert_called_once_with(symbol=symbol_to_fetch, output_size="compact")
 
@@ -171,6 +627,55 @@ def test_fetch_and_store_stock_data_av_http_exception(
     assert "Alpha Vantage API Error: Invalid API Call" in response.json()["detail"]
 
 
+@patch("backend.services.financial_data_service.AlphaVantageService.get_daily_adjusted_stock_data")
+def test_fetch_and_store_stock_data_refetch_is_idempotent(
+    mock_get_daily_data, client: TestClient, superuser_auth_headers: dict, db_session: Session
+):
+    symbol_to_fetch = "UPSERTMOCK"
+    mock_get_daily_data.return_value = [
+        schemas.StockPriceCreate(symbol=symbol_to_fetch, date=datetime.date(2023,10,1), open=1,high=2,low=1,close=2,volume=100, data_source="AlphaVantage"),
+        schemas.StockPriceCreate(symbol=symbol_to_fetch, date=datetime.date(2023,10,2), open=2,high=3,low=2,close=3,volume=200, data_source="AlphaVantage")
+    ]
+    first = client.post(f"/stocks/fetch/{symbol_to_fetch}", headers=superuser_auth_headers)
+    assert first.status_code == 200, f"Response: {first.text}"
+    assert (first.json()["inserted"], first.json()["updated"], first.json()["unchanged"]) == (2, 0, 0)
+
+    # Second fetch: one bar revised, one new bar, one identical bar
+    mock_get_daily_data.return_value = [
+        schemas.StockPriceCreate(symbol=symbol_to_fetch, date=datetime.date(2023,10,1), open=1,high=2,low=1,close=2,volume=100, data_source="AlphaVantage"),
+        schemas.StockPriceCreate(symbol=symbol_to_fetch, date=datetime.date(2023,10,2), open=2,high=3,low=2,close=3.5,volume=250, data_source="AlphaVantage"),
+        schemas.StockPriceCreate(symbol=symbol_to_fetch, date=datetime.date(2023,10,3), open=3,high=4,low=3,close=4,volume=300, data_source="AlphaVantage")
+    ]
+    second = client.post(f"/stocks/fetch/{symbol_to_fetch}", headers=superuser_auth_headers)
+    assert second.status_code == 200, f"Response: {second.text}"
+    assert (second.json()["inserted"], second.json()["updated"], second.json()["unchanged"]) == (1, 1, 1)
+
+    prices_in_db = db_session.query(models.StockPrice).filter(models.StockPrice.symbol == symbol_to_fetch).order_by(models.StockPrice.date).all()
+    assert len(prices_in_db) == 3 # No duplicates
+    assert prices_in_db[1].close == 3.5
+    assert prices_in_db[1].volume == 250
+
+    # refresh_data=false only adds missing dates and leaves stored bars alone
+    mock_get_daily_data.return_value = [
+        schemas.StockPriceCreate(symbol=symbol_to_fetch, date=datetime.date(2023,10,2), open=2,high=3,low=2,close=9,volume=999, data_source="AlphaVantage"),
+    ]
+    third = client.post(f"/stocks/fetch/{symbol_to_fetch}?refresh_data=false", headers=superuser_auth_headers)
+    assert third.status_code == 200, f"Response: {third.text}"
+    assert (third.json()["inserted"], third.json()["updated"], third.json()["unchanged"]) == (0, 0, 1)
+    assert third.json()["message"].endswith("0 inserted, 0 updated, 1 unchanged (nothing stored).")
+    db_session.expire_all()
+    assert db_session.query(models.StockPrice).filter(
+        models.StockPrice.symbol == symbol_to_fetch, models.StockPrice.date == datetime.date(2023,10,2)
+    ).one().close == 3.5
+
+def test_create_duplicate_stock_price_conflict(client: TestClient, superuser_auth_headers: dict, db_session: Session):
+    payload = { "symbol": "DUPE", "date": "2023-10-01", "open": 1, "high": 2, "low": 1, "close": 2, "volume": 100, "data_source": "TestSource" }
+    assert client.post("/stocks/", headers=superuser_auth_headers, json=payload).status_code == 201
+    response = client.post("/stocks/", headers=superuser_auth_headers, json=payload)
+    assert response.status_code == 409
+    assert db_session.query(models.StockPrice).filter(models.StockPrice.symbol == "DUPE").count() == 1
+
+
 # --- Test Delete Stock Data ---
 def test_delete_stock_data_by_symbol_and_source(client: TestClient, superuser_auth_headers: dict, db_session: Session):
     symbol_to_delete = "DELETEME"
@@ -0,0 +1,32 @@
+import datetime
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from backend import crud, schemas
+from backend.services.price_cache import price_cache
+from conftest import price
+
+
+def test_close_asof_matches_last_bar_on_or_before(db_session: Session):
+    crud.create_stock_prices_bulk(db_session, schemas.StockPriceBulkCreate(prices=[
+        price("ASA", datetime.date(2024, 5, 2), 1.0), price("ASA", datetime.date(2024, 5, 3), 2.0), price("ASA", datetime.date(2024, 5, 6), 3.0),
+        price("ASA", datetime.date(2024, 5, 6), 4.0, source="S2"), price("ASB", datetime.date(2024, 5, 3), 9.0),
+    ]))
+    symbols = ["ASA", "asb", "ASA", "ASA", "ASB", "ASX"]
+    dates = [datetime.date(2024, 5, d) for d in (5, 10, 1, 6, 2, 6)]
+    price_dates, closes = crud.get_close_asof(db_session, symbols, dates)
+    assert np.datetime_as_string(price_dates).tolist() == ["2024-05-03", "2024-05-03", "NaT", "2024-05-06", "NaT", "NaT"]
+    np.testing.assert_array_equal(closes, [2.0, 9.0, np.nan, 4.0, np.nan, np.nan]) # Newest source wins on 05-06
+
+
+def test_close_arrays_are_cached_until_a_write(db_session: Session):
+    crud.create_stock_price(db_session, price("ASC", datetime.date(2024, 5, 2), 1.0))
+    crud.get_close_arrays(db_session, ["ASC"])
+    hits = price_cache.stats()["hits"]
+    crud.get_close_arrays(db_session, ["ASC"])
+    assert price_cache.stats()["hits"] == hits + 1
+
+    crud.create_stock_price(db_session, price("ASC", datetime.date(2024, 5, 4), 5.0))
+    _price_dates, closes = crud.get_close_asof(db_session, ["ASC"], [datetime.date(2024, 5, 30)])
+    assert closes.tolist() == [5.0]
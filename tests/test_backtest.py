@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from backend.services import backtest, indicators
+
+
+@pytest.fixture
+def close() -> np.ndarray:
+    rng = np.random.default_rng(11)
+    return 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.015, size=2000)))
+
+
+def loop_equity(close: np.ndarray, signal: np.ndarray, cost: float) -> np.ndarray:
+    """Reference implementation: one bar at a time."""
+    equity, held, curve = 1.0, 0, [1.0]
+    for t in range(1, len(close)):
+        position = int(signal[t - 1])
+        equity *= 1 + position * (close[t] / close[t - 1] - 1) - abs(position - held) * cost
+        held = position
+        curve.append(equity)
+    return np.array(curve)
+
+
+def test_buy_and_hold_tracks_the_close(close):
+    result = backtest.run("buy_and_hold", close, [{}])
+    np.testing.assert_allclose(result["equity"][0], close / close[0])
+    assert result["summary"]["trades"][0] == 1 and result["trade_exit"][0] == len(close) - 1
+
+
+def test_ma_crossover_matches_bar_loop(close):
+    params = backtest.validate_params("ma_crossover", {"fast": 10, "slow": 40})
+    result = backtest.run("ma_crossover", close, [params], cost_bps=5)
+    signal = np.nan_to_num(indicators.sma(close, 10)) > np.nan_to_num(indicators.sma(close, 40), nan=np.inf)
+    np.testing.assert_allclose(result["equity"][0], loop_equity(close, signal, 5e-4))
+
+
+def test_rsi_thresholds_match_bar_loop(close):
+    params = backtest.validate_params("rsi", {"window": 14, "lower": 35, "upper": 60})
+    result = backtest.run("rsi", close, [params])
+    rsi, holding, signal = indicators.rsi(close, 14), False, []
+    for value in rsi:
+        holding = True if value < 35 else False if value > 60 else holding
+        signal.append(holding)
+    np.testing.assert_allclose(result["equity"][0], loop_equity(close, np.array(signal), 0.0))
+    # Every trade return is the equity change across the trade
+    trades = backtest.trades_of(result, 0, np.datetime64("2020-01-01") + np.arange(len(close)), close)
+    assert len(trades) == result["summary"]["trades"][0]
+    assert np.prod([1 + t["return"] for t in trades]) == pytest.approx(result["equity"][0][-1])
+
+
+def test_sweep_rows_equal_single_runs(close):
+    param_sets = backtest.expand_grid("ma_crossover", {"fast": [5, 20, 60], "slow": [20, 50, 100]})
+    assert len(param_sets) == 6 # fast >= slow combinations are skipped
+    sweep = backtest.run("ma_crossover", close, param_sets, cost_bps=2)
+    for i, params in enumerate(param_sets):
+        single = backtest.run("ma_crossover", close, [params], cost_bps=2)
+        np.testing.assert_array_equal(sweep["equity"][i], single["equity"][0])
+        assert backtest.summary_of(sweep, i) == backtest.summary_of(single, 0)
+
+
+def test_parameter_validation():
+    assert backtest.validate_params("rsi", {"window": 10.0}) == {"window": 10, "lower": 30.0, "upper": 70.0}
+    for strategy, params in (("nope", {}), ("ma_crossover", {"fast": 50, "slow": 20}), ("ma_crossover", {"span": 3}), ("rsi", {"window": 2.5})):
+        with pytest.raises(ValueError):
+            backtest.validate_params(strategy, params)
+    with pytest.raises(ValueError):
+        backtest.expand_grid("ma_crossover", {"fast": list(range(2, 40)), "slow": list(range(40, 80))})
+    with pytest.raises(ValueError):
+        backtest.run("buy_and_hold", np.array([1.0, 2.0]), [{}])
@@ -0,0 +1,49 @@
+import datetime
+
+import pytest
+from sqlalchemy.orm import Session
+
+from backend import bulk_ingest, crud, models, schemas, symbol_stats
+from conftest import daily_bars
+
+
+START = datetime.date(2020, 1, 1)
+
+
+def test_create_stock_prices_bulk_returns_ids_in_input_order_across_chunks(db_session: Session):
+    created = crud.create_stock_prices_bulk(db_session, daily_bars("CHUNKED", START, [1.5 + i for i in range(7)]), chunk_size=3)
+    assert len(created) == 7
+    assert all(p.id is not None and p.created_at is not None for p in created)
+    assert len({p.id for p in created}) == 7
+
+    stored = {p.id: p for p in db_session.query(models.StockPrice).filter(models.StockPrice.symbol == "CHUNKED")}
+    assert len(stored) == 7
+    for price in created:
+        assert stored[price.id].date == price.date
+        assert stored[price.id].close == price.close
+        assert stored[price.id].data_source == "S1"
+
+
+def test_upsert_stock_prices_chunked(db_session: Session):
+    counts = crud.upsert_stock_prices(db_session, daily_bars("UPCHUNK", START, [1.5 + i for i in range(5)]), chunk_size=2)
+    assert counts == {"inserted": 5, "updated": 0, "unchanged": 0}
+    counts = crud.upsert_stock_prices(db_session, daily_bars("UPCHUNK", START, [1.5 + i for i in range(6)]), chunk_size=2)
+    assert counts == {"inserted": 1, "updated": 0, "unchanged": 5}
+    assert db_session.query(models.StockPrice).filter(models.StockPrice.symbol == "UPCHUNK").count() == 6
+
+
+def test_failed_upsert_raises_its_own_error(db_session: Session, monkeypatch, capsys):
+    def failing_write(db, rows, **kwargs):
+        raise ConnectionError("database went away")
+    def failing_refresh(db, symbols):
+        raise RuntimeError("bookkeeping failed too")
+    monkeypatch.setattr(bulk_ingest, "upsert_stock_price_rows", failing_write)
+    monkeypatch.setattr(symbol_stats, "refresh_symbols", failing_refresh)
+
+    with pytest.raises(ConnectionError, match="database went away"):
+        crud.upsert_stock_prices(db_session, daily_bars("UPFAIL", START, [1.5, 2.5, 3.5]))
+    assert "bookkeeping failed too" in capsys.readouterr().out
+
+
+def test_create_stock_prices_bulk_empty(db_session: Session):
+    assert crud.create_stock_prices_bulk(db_session, schemas.StockPriceBulkCreate(prices=[])) == []
@@ -0,0 +1,209 @@
+import datetime
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend import cold_storage, column_store, crud, models, schemas
+from conftest import price
+
+RECENT = datetime.date.today() - datetime.timedelta(days=10)
+
+
+def history(symbol: str) -> list[schemas.StockPriceCreate]:
+    """Three archivable years (2001-2003, a few bars each) and bars from the last days."""
+    old = [price(symbol, datetime.date(year, month, 2), year + month / 100) for year in (2001, 2002, 2003) for month in (3, 6, 9)]
+    return old + [price(symbol, RECENT + datetime.timedelta(days=d), 50.0 + d) for d in range(4)]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch) -> cold_storage.ColdStorage:
+    store = cold_storage.ColdStorage(str(tmp_path / "cold"))
+    monkeypatch.setattr(cold_storage, "store", store)
+    return store
+
+
+def read(db: Session, symbol: str, **kwargs) -> list[tuple]:
+    prices = crud.get_stock_prices_by_symbol(db, symbol, **{"limit": None, **kwargs})
+    return [(p.id, p.date, p.close, p.data_source) for p in prices]
+
+
+def hot_count(db: Session, symbol: str) -> int:
+    return db.query(models.StockPrice).filter(models.StockPrice.symbol == symbol).count()
+
+
+def test_archived_rows_are_merged_into_reads(db_session: Session, store: cold_storage.ColdStorage):
+    crud.create_stock_prices_bulk(db_session, schemas.StockPriceBulkCreate(prices=history("COLDA")))
+    crud.create_stock_price(db_session, price("COLDA", datetime.date(2002, 6, 2), 99.0, source="S2"))
+    everything = read(db_session, "COLDA")
+    ranged = read(db_session, "COLDA", start_date=datetime.date(2002, 1, 1), end_date=RECENT)
+
+    assert crud.archive_stock_prices(db_session, 730) == {"COLDA": 10}
+    assert store.years("COLDA") == [2001, 2002, 2003] and hot_count(db_session, "COLDA") == 4
+    assert cold_storage.get_archived_before(db_session, "COLDA") == cold_storage.cutoff_date(730)
+    assert read(db_session, "COLDA") == everything
+    assert read(db_session, "COLDA", start_date=datetime.date(2002, 1, 1), end_date=RECENT) == ranged
+    assert read(db_session, "COLDA", skip=3, limit=4) == everything[3:7]
+    assert read(db_session, "COLDA", limit=2) == everything[:2] # Served from the hot tier alone
+
+    # Keyset pages cross from hot to cold rows, including the two sources of 2002-06-02
+    pages, cursor = [], None
+    while True:
+        page, cursor = crud.get_stock_prices_page(db_session, "COLDA", limit=3, cursor=cursor)
+        pages += [(p.id, p.date, p.close, p.data_source) for p in page]
+        if cursor is None:
+            break
+    assert pages == everything
+
+    # A second run has nothing left to move
+    assert crud.archive_stock_prices(db_session, 730) == {}
+
+
+def test_late_writes_and_deletes_in_the_archived_range(db_session: Session, store: cold_storage.ColdStorage):
+    crud.create_stock_prices_bulk(db_session, schemas.StockPriceBulkCreate(prices=history("COLDB")))
+    crud.create_stock_price(db_session, price("COLDB", datetime.date(2002, 6, 2), 7.0, source="S2"))
+    crud.archive_stock_prices(db_session, 730)
+
+    # A bar written into an archived year stays hot and is readable until the next run moves it
+    crud.upsert_stock_prices(db_session, schemas.StockPriceBulkCreate(prices=[price("COLDB", datetime.date(2002, 7, 1), 8.0)]))
+    assert (datetime.date(2002, 7, 1), 8.0) in [(p[1], p[2]) for p in read(db_session, "COLDB")]
+    assert crud.archive_stock_prices(db_session, 730) == {"COLDB": 1}
+    assert [p[2] for p in read(db_session, "COLDB", start_date=datetime.date(2002, 6, 2), end_date=datetime.date(2002, 7, 1))] == [8.0, 7.0, 2002.06]
+
+    assert crud.delete_stock_prices_by_symbol_and_source(db_session, "COLDB", "S2") == 1
+    assert all(p[3] == "S1" for p in read(db_session, "COLDB"))
+    assert crud.delete_stock_prices_by_symbol_and_source(db_session, "COLDB", "S1") == 14
+    assert store.years("COLDB") == [] and cold_storage.get_archived_before(db_session, "COLDB") is None
+
+
+def test_rows_past_the_boundary_in_archive_files_are_ignored(db_session: Session, store: cold_storage.ColdStorage):
+    crud.create_stock_prices_bulk(db_session, schemas.StockPriceBulkCreate(prices=history("COLDC")))
+    before = read(db_session, "COLDC")
+    assert crud.archive_stock_prices(db_session, (datetime.date.today() - datetime.date(2002, 6, 1)).days) == {"COLDC": 3} # 2001
+    # A run interrupted after writing the 2003 file: its rows were neither deleted nor covered by the boundary
+    table = cold_storage.TABLE
+    rows_2003 = db_session.execute(select(*(table.c[name] for name in cold_storage.COLUMNS)).where(
+        table.c.symbol == "COLDC", table.c.date >= datetime.date(2003, 1, 1), table.c.date < datetime.date(2004, 1, 1)
+    )).all()
+    store._write_year("COLDC", 2003, [row._asdict() for row in rows_2003])
+    assert read(db_session, "COLDC") == before # 2003 is still hot and not duplicated
+    assert crud.archive_stock_prices(db_session, 730) == {"COLDC": 6}
+    assert read(db_session, "COLDC") == before
+
+
+@pytest.mark.parametrize("with_column_store", [False, True])
+def test_endpoints_keep_returning_archived_bars(
+    client: TestClient, superuser_auth_headers: dict, db_session: Session, store: cold_storage.ColdStorage,
+    with_column_store: bool, tmp_path, monkeypatch
+):
+    if with_column_store: # Hot rows then come from the memory maps
+        monkeypatch.setattr(column_store, "store", column_store.ColumnStore(str(tmp_path / "columns")))
+    crud.create_stock_prices_bulk(db_session, schemas.StockPriceBulkCreate(prices=history("COLDD") + history("COLDE")))
+    crud.create_stock_price(db_session, price("COLDD", datetime.date(2002, 6, 2), 99.0, source="S2"))
+    urls = [
+        "/stocks/COLDD?limit=1000",
+        "/stocks/COLDD?skip=3&limit=4&format=columnar&fields=date,close",
+        "/stocks/COLDD?start_date=2002-01-01&end_date=2002-12-31&format=arrow",
+        "/stocks/COLDD/stream?batch_size=2",
+        "/stocks/COLDD/stream?start_date=2002-06-02&end_date=2003-06-02&fields=date,close",
+        "/stocks?symbols=COLDE,COLDD&limit=5",
+        "/stocks/COLDD?max_points=5",
+    ]
+    before = [client.get(url).content for url in urls]
+    assert len(client.get(urls[0]).json()) == 14
+
+    response = client.post("/stocks/archive?horizon_days=730", headers=superuser_auth_headers)
+    assert response.status_code == 200 and response.json()["rows"] == 19
+    assert hot_count(db_session, "COLDD") == 4
+    assert [client.get(url).content for url in urls] == before
+
+    # Keyset pages walk from the hot rows into the archive
+    dates, cursor = [], None
+    while True:
+        response = client.get("/stocks/COLDD?limit=5&fields=date" + (f"&cursor={cursor}" if cursor else ""))
+        dates += [p["date"] for p in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert dates == [p["date"] for p in client.get(urls[0]).json()]
+
+
+def test_upserts_of_archived_keys(db_session: Session, store: cold_storage.ColdStorage):
+    crud.create_stock_prices_bulk(db_session, schemas.StockPriceBulkCreate(prices=history("COLDF")))
+    crud.archive_stock_prices(db_session, 730)
+    everything = read(db_session, "COLDF")
+    version = crud.get_stock_data_version(db_session, "COLDF")
+
+    # Re-fetching the full history writes nothing: archived bars count as existing
+    assert crud.upsert_stock_prices(db_session, schemas.StockPriceBulkCreate(prices=history("COLDF"))) == {
+        "inserted": 0, "updated": 0, "unchanged": 13
+    }
+    assert hot_count(db_session, "COLDF") == 4 and crud.get_stock_data_version(db_session, "COLDF") == version
+
+    # A corrected archived bar is written to stock_prices and replaces the archived one in reads
+    corrected = price("COLDF", datetime.date(2002, 6, 2), 5.0)
+    assert crud.upsert_stock_prices(db_session, schemas.StockPriceBulkCreate(prices=[corrected])) == {
+        "inserted": 0, "updated": 1, "unchanged": 0
+    }
+    prices = read(db_session, "COLDF")
+    assert len(prices) == len(everything) and [p[2] for p in prices if p[1] == corrected.date] == [5.0]
+    assert [p[2] for p in read(db_session, "COLDF", skip=7, limit=3)] == [p[2] for p in prices[7:10]]
+    rows = crud.get_stock_price_rows(db_session, "COLDF", ("close",), limit=None)
+    assert [row.close for row in rows] == [p[2] for p in prices]
+    streamed = [row.close for batch in crud.stream_stock_price_rows(db_session, "COLDF", ("close",), batch_size=4) for row in batch]
+    assert streamed == [p[2] for p in prices]
+    assert crud.upsert_stock_prices(db_session, schemas.StockPriceBulkCreate(prices=[corrected])) == {
+        "inserted": 0, "updated": 0, "unchanged": 1
+    }
+
+    # The next run folds the correction into the archive
+    assert crud.archive_stock_prices(db_session, 730) == {"COLDF": 1}
+    assert read(db_session, "COLDF") == prices
+
+
+@pytest.mark.parametrize("with_column_store", [False, True])
+def test_array_reads_and_indicators_keep_archived_bars(
+    db_session: Session, store: cold_storage.ColdStorage, with_column_store: bool, tmp_path, monkeypatch
+):
+    if with_column_store:
+        monkeypatch.setattr(column_store, "store", column_store.ColumnStore(str(tmp_path / "columns")))
+    start = datetime.date(2005, 1, 3)
+    bars = [price("COLDI", start + datetime.timedelta(days=d), 100 + d % 37) for d in range(3000)]
+    bars += [price("COLDI", RECENT + datetime.timedelta(days=d), 90.0 + d) for d in range(3)]
+    crud.create_stock_prices_bulk(db_session, schemas.StockPriceBulkCreate(prices=bars))
+    crud.create_stock_prices_bulk(db_session, schemas.StockPriceBulkCreate(prices=history("COLDJ")))
+    ranged = {"start_date": datetime.date(2010, 1, 1), "end_date": datetime.date(2010, 12, 31)}
+
+    def reads():
+        return {
+            "full": crud.get_stock_price_arrays(db_session, "COLDI", ("close", "volume")),
+            "ranged": crud.get_stock_price_arrays(db_session, "COLDI", ("close",), **ranged, lookback=20),
+            "recent": crud.get_stock_price_arrays(db_session, "COLDI", ("close",), start_date=RECENT, lookback=5),
+            **{f"many {symbol}": arrays for symbol, arrays in crud.get_stock_price_arrays_for_symbols(
+                db_session, ["COLDI", "COLDJ"], ("close",), start_date=datetime.date(2002, 1, 1)
+            ).items()},
+        }
+
+    before = reads()
+    _dates, rsi_before = crud.get_indicator_series(db_session, "COLDI", ("rsi",))
+    assert crud.archive_stock_prices(db_session, 730) == {"COLDI": 3000, "COLDJ": 9}
+    after = reads()
+    for name, arrays in before.items():
+        assert after[name].keys() == arrays.keys(), name
+        for column, values in arrays.items():
+            np.testing.assert_array_equal(after[name][column], values, err_msg=f"{name} {column}")
+    assert len(after["ranged"]["date"]) == 365 + 20 and len(after["recent"]["date"]) == 3 + 5
+
+    # A stored series and one computed after the archive run both cover the whole history
+    dates, series = crud.get_indicator_series(db_session, "COLDI", ("rsi", "sma"))
+    assert len(dates) == 3003
+    np.testing.assert_allclose(series["rsi"], rsi_before["rsi"])
+    np.testing.assert_allclose(series["close"], before["full"]["close"])
+
+    # A corrected archived bar is read once, with its new close
+    crud.upsert_stock_prices(db_session, schemas.StockPriceBulkCreate(prices=[price("COLDI", datetime.date(2010, 3, 1), 5.0)]))
+    corrected = crud.get_stock_price_arrays(db_session, "COLDI", ("close",), **ranged)
+    assert len(corrected["date"]) == 365
+    assert corrected["close"][corrected["date"] == np.datetime64("2010-03-01")].tolist() == [5.0]
@@ -0,0 +1,119 @@
+import datetime
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from backend import column_store, crud, schemas
+from backend.services.price_cache import price_cache
+from conftest import daily_bars, price
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch) -> column_store.ColumnStore:
+    store = column_store.ColumnStore(str(tmp_path / "columns"))
+    monkeypatch.setattr(column_store, "store", store)
+    return store
+
+
+def from_sql(db: Session, symbol: str, **kwargs) -> list[tuple]:
+    """The same read with the store disabled."""
+    saved, column_store.store = column_store.store, None
+    try:
+        prices = crud.get_stock_prices_by_symbol(db, symbol, limit=None, **kwargs)
+    finally:
+        column_store.store = saved
+    return [(p.id, p.date, p.close, p.volume, p.data_source) for p in prices]
+
+
+def from_store(db: Session, symbol: str, **kwargs) -> list[tuple]:
+    prices = crud.get_stock_prices_by_symbol(db, symbol, limit=None, **kwargs)
+    return [(p.id, p.date, p.close, p.volume, p.data_source) for p in prices]
+
+
+def test_writes_keep_the_store_equal_to_sql(db_session: Session, store: column_store.ColumnStore):
+    crud.create_stock_prices_bulk(db_session, schemas.StockPriceBulkCreate(prices=[price("COLA", datetime.date(2024, 6, d), 10.0 + d) for d in (3, 4, 5)]))
+    generation = store._load_index()["COLA"]["generation"]
+
+    # Appends keep the generation; a second source on the last date sorts after it by id
+    crud.create_stock_price(db_session, price("COLA", datetime.date(2024, 6, 5), 20.0, source="S2"))
+    crud.create_stock_prices_bulk(db_session, schemas.StockPriceBulkCreate(prices=[price("COLA", datetime.date(2024, 6, 6), 16.0)]))
+    assert store._load_index()["COLA"]["generation"] == generation
+    assert from_store(db_session, "COLA") == from_sql(db_session, "COLA")
+
+    # A backfill and an update rebuild the symbol
+    crud.create_stock_prices_bulk(db_session, schemas.StockPriceBulkCreate(prices=[price("COLA", datetime.date(2024, 6, 1), 9.0)]))
+    crud.upsert_stock_prices(db_session, schemas.StockPriceBulkCreate(prices=[price("COLA", datetime.date(2024, 6, 4), 30.0)]))
+    assert store._load_index()["COLA"]["generation"] == generation + 2
+    assert from_store(db_session, "COLA") == from_sql(db_session, "COLA")
+    assert store.sync_all(db_session) == 0 # Versions match
+
+    crud.delete_stock_prices_by_symbol_and_source(db_session, "COLA", "S2")
+    assert from_store(db_session, "COLA") == from_sql(db_session, "COLA")
+    crud.delete_stock_prices_by_symbol_and_source(db_session, "COLA", "S1")
+    assert store.symbols() == []
+
+
+def test_store_reads_match_sql_slices(db_session: Session, store: column_store.ColumnStore):
+    crud.create_stock_prices_bulk(db_session, daily_bars("COLB", datetime.date(2024, 6, 1), [float(d) for d in range(1, 21)]))
+    crud.create_stock_price(db_session, price("COLB", datetime.date(2024, 6, 10), 99.0, source="S2"))
+    start, end = datetime.date(2024, 6, 5), datetime.date(2024, 6, 15)
+    assert from_store(db_session, "COLB", start_date=start, end_date=end) == from_sql(db_session, "COLB", start_date=start, end_date=end)
+
+    # Keyset pages: the first page ends on the newer (S2) row of 06-10, the next one starts on the older
+    page, cursor = crud.get_stock_prices_page(db_session, "COLB", limit=11)
+    assert [(p.date.day, p.data_source) for p in page][-1] == (10, "S2")
+    rest, _ = crud.get_stock_prices_page(db_session, "COLB", limit=100, cursor=cursor)
+    assert [(p.date.day, p.data_source) for p in rest][:2] == [(10, "S1"), (9, "S1")] and len(rest) == 10
+
+    arrays = crud.get_stock_price_arrays(db_session, "COLB", ("close", "volume"), start_date=start, lookback=2)
+    assert arrays["date"][0] == np.datetime64("2024-06-03") and arrays["volume"].dtype == np.float64
+    assert arrays["close"].tolist() == [3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 99.0] + [float(d) for d in range(11, 21)] # 06-10: S2 only
+    assert not crud.get_stock_price_arrays(db_session, "COLB", ("close",), end_date=datetime.date(2024, 6, 9))["close"].flags.writeable # A view of the map
+    both = crud.get_stock_price_arrays_for_symbols(db_session, ["COLB", "NOPE"], ("close",), end_date=start)
+    assert both["COLB"]["close"].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0] and len(both["NOPE"]["close"]) == 0
+
+
+def test_endpoints_read_the_store(client: TestClient, db_session: Session, store: column_store.ColumnStore, monkeypatch):
+    crud.create_stock_prices_bulk(db_session, daily_bars("COLF", datetime.date(2024, 6, 1), [float(d) for d in range(1, 11)]))
+    crud.create_stock_price(db_session, price("COLF", datetime.date(2024, 6, 5), 50.0, source="S2"))
+    crud.create_stock_price(db_session, price("COLG", datetime.date(2024, 6, 5), 1.0))
+    urls = [
+        "/stocks/COLF?limit=4",
+        "/stocks/COLF?limit=3&skip=2&format=columnar&fields=date,close&start_date=2024-06-03",
+        "/stocks/COLF?format=arrow&end_date=2024-06-08",
+        "/stocks/COLF/stream?batch_size=4",
+        "/stocks?symbols=COLG,COLF,NOPE&limit=3&fields=date,close,data_source",
+    ]
+    column_store.store = None
+    expected = [client.get(url).content for url in urls]
+    column_store.store = store
+    price_cache.clear()
+
+    reads = []
+    read = store.read
+    monkeypatch.setattr(store, "read", lambda symbol, *args, **kwargs: reads.append(symbol) or read(symbol, *args, **kwargs))
+    assert [client.get(url).content for url in urls] == expected
+    assert reads.count("COLF") == len(urls) and reads.count("COLG") == 1
+
+
+def test_sync_all_rebuilds_symbols_written_while_disabled(db_session: Session, store: column_store.ColumnStore):
+    crud.create_stock_price(db_session, price("COLC", datetime.date(2024, 6, 3), 1.0))
+    column_store.store = None
+    crud.create_stock_price(db_session, price("COLC", datetime.date(2024, 6, 4), 2.0))
+    crud.create_stock_price(db_session, price("COLD", datetime.date(2024, 6, 4), 2.0))
+    column_store.store = store
+    assert store.sync_all(db_session) == 2
+    assert from_store(db_session, "COLC") == from_sql(db_session, "COLC")
+    assert store.symbols() == ["COLC", "COLD"]
+
+
+def test_torn_append_is_invisible(db_session: Session, store: column_store.ColumnStore):
+    crud.create_stock_price(db_session, price("COLE", datetime.date(2024, 6, 3), 1.0))
+    entry = store._load_index()["COLE"]
+    with open(store._directory("COLE", entry["generation"]) + "/close.bin", "ab") as f:
+        f.write(np.float64(7.0).tobytes()) # Bytes past the indexed rows
+    assert len(store.read("COLE", ("close",))["close"]) == 1
+    crud.create_stock_price(db_session, price("COLE", datetime.date(2024, 6, 4), 2.0))
+    assert store.read("COLE", ("close",))["close"].tolist() == [1.0, 2.0]
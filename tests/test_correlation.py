@@ -0,0 +1,36 @@
+import numpy as np
+
+from backend.services import correlation
+
+
+def day(n: int) -> np.datetime64:
+    return np.datetime64("2024-01-01") + n
+
+
+def test_align_closes_keeps_common_dates_only():
+    a = (day(np.arange(5)), np.array([1.0, 2, 3, 4, 5]))
+    b = (day(np.array([1, 2, 4, 6])), np.array([10.0, 21, 40, 60]))
+    dates, matrix = correlation.align_closes([a, b])
+    np.testing.assert_array_equal(dates, day(np.array([1, 2, 4])))
+    np.testing.assert_array_equal(matrix, [[2, 10], [3, 21], [5, 40]])
+
+
+def test_return_matrices_match_numpy():
+    rng = np.random.default_rng(3)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(500, 40)), axis=0))
+    covariance, corr = correlation.return_matrices(closes)
+    returns = np.diff(np.log(closes), axis=0)
+    np.testing.assert_allclose(covariance, np.cov(returns, rowvar=False), atol=1e-14)
+    np.testing.assert_allclose(corr, np.corrcoef(returns, rowvar=False), atol=1e-12)
+    assert (np.diag(corr) == 1.0).all()
+
+
+def test_return_matrices_degenerate_inputs():
+    flat = np.column_stack([np.full(10, 5.0), np.arange(1.0, 11.0)])
+    covariance, corr = correlation.return_matrices(flat)
+    assert covariance[0, 0] == 0.0 and np.isnan(corr[0]).all() and corr[1, 1] == 1.0
+    # Fewer than two returns
+    assert np.isnan(correlation.return_matrices(np.ones((2, 3)))[1]).all()
+    dates, matrix = correlation.align_closes([])
+    assert matrix.shape == (0, 0)
+    assert correlation.return_matrices(matrix)[0].shape == (0, 0)
@@ -0,0 +1,76 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from backend import crud, migrations, models, schemas
+from backend.database import Base
+
+
+def test_symbols_and_sources_are_stored_once(db_session: Session):
+    crud.create_stock_prices_bulk(db_session, schemas.StockPriceBulkCreate(prices=[
+        schemas.StockPriceCreate(symbol="DIMA", date=datetime.date(2024, 1, d), open=1, high=1, low=1, close=d, volume=1)
+        for d in (1, 2, 3)
+    ], data_source="DimSource"))
+    db_session.add(models.StockPrice(symbol="DIMA", date=datetime.date(2024, 1, 4), open=1, high=1, low=1, close=4, volume=1))
+    db_session.commit()
+
+    stocks = db_session.query(models.Stock).filter(models.Stock.symbol == "DIMA").all()
+    assert len(stocks) == 1
+    prices = db_session.query(models.StockPrice).filter(models.StockPrice.symbol == "DIMA").order_by(models.StockPrice.date).all()
+    assert {p.stock_id for p in prices} == {stocks[0].id}
+    assert [p.data_source for p in prices] == ["DimSource"] * 3 + [None]
+    assert db_session.query(models.StockPrice).filter(models.StockPrice.data_source == None).count() == 1 # noqa: E711
+
+
+def test_upgrade_moves_string_keyed_prices_to_dimension_ids(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE stock_prices (id INTEGER PRIMARY KEY, symbol VARCHAR NOT NULL, date DATE NOT NULL,"
+            " open FLOAT NOT NULL, high FLOAT NOT NULL, low FLOAT NOT NULL, close FLOAT NOT NULL, volume INTEGER NOT NULL,"
+            " data_source VARCHAR, created_at DATETIME)"
+        ))
+        conn.execute(text("CREATE INDEX ix_stock_prices_date ON stock_prices (date)"))
+        conn.execute(text(
+            "INSERT INTO stock_prices (id, symbol, date, open, high, low, close, volume, data_source) VALUES"
+            " (5, 'OLDA', '2024-01-02', 1, 1, 1, 10, 1, 'S1'), (7, 'OLDA', '2024-01-02', 1, 1, 1, 11, 1, 'S1'),"
+            " (9, 'OLDA', '2024-01-03', 1, 1, 1, 12, 1, NULL), (10, 'OLDA', '2024-01-03', 1, 1, 1, 13, 1, NULL),"
+            " (11, 'OLDB', '2024-01-03', 1, 1, 1, 20, 1, 'S2')"
+        ))
+    Base.metadata.create_all(bind=engine)
+    with pytest.raises(RuntimeError, match="migrate-dimension-ids"): # Startup never rewrites the table itself
+        migrations.upgrade_schema(engine)
+    with pytest.raises(RuntimeError, match="OLDA 2024-01-02 S1: 2 rows"):
+        migrations.migrate_to_dimension_ids(engine)
+    assert migrations.dedupe_stock_prices(engine) == 1 # Rows without a source are not duplicates
+
+    copy_batch = migrations._copy_legacy_prices
+    batches = []
+    def interrupted(conn, batch_rows):
+        batches.append(batch_rows)
+        if len(batches) == 3:
+            raise KeyboardInterrupt
+        return copy_batch(conn, batch_rows)
+    monkeypatch.setattr(migrations, "_copy_legacy_prices", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        migrations.migrate_to_dimension_ids(engine, batch_rows=1)
+    with pytest.raises(RuntimeError, match="interrupted"):
+        migrations.upgrade_schema(engine)
+    monkeypatch.setattr(migrations, "_copy_legacy_prices", copy_batch)
+    assert migrations.migrate_to_dimension_ids(engine, batch_rows=1) == 4 # Resumes after the two rows already moved
+    migrations.upgrade_schema(engine)
+    migrations.upgrade_schema(engine) # Nothing left to do
+
+    assert "symbol" not in {column["name"] for column in inspect(engine).get_columns("stock_prices")}
+    assert not inspect(engine).has_table("stock_prices_legacy")
+    with Session(engine) as db:
+        prices = crud.get_stock_prices_by_symbol(db, "OLDA", limit=None)
+        assert [(p.id, p.close, p.data_source) for p in prices] == [(10, 13.0, None), (9, 12.0, None), (7, 11.0, "S1")]
+        assert db.get(models.LatestQuote, "OLDB").close == 20.0 # Derived tables are backfilled from the moved rows
+        crud.create_stock_price(db, schemas.StockPriceCreate(
+            symbol="OLDB", date=datetime.date(2024, 1, 4), open=1, high=1, low=1, close=21, volume=1, data_source="S2"
+        ))
+        assert crud.get_stock_prices_by_symbol(db, "OLDB", limit=1)[0].id > 11
+    engine.dispose()
@@ -0,0 +1,54 @@
+import datetime
+from collections import namedtuple
+
+import numpy as np
+
+from backend.services import downsampling
+
+Row = namedtuple("Row", ["id", "date", "open", "high", "low", "close", "volume"])
+
+def _rows(n: int) -> list:
+    """n daily rows, newest first like crud.get_stock_price_rows, with a single spike at index 500."""
+    start = datetime.date(2000, 1, 1)
+    rows = []
+    for i in range(n):
+        close = 100 + np.sin(i / 50) * 10 + (80 if i == 500 else 0)
+        rows.append(Row(i + 1, start + datetime.timedelta(days=i), close - 1, close + 2, close - 3, close, 1000 + i))
+    return rows[::-1]
+
+def test_lttb_indices_keeps_endpoints_and_spike():
+    x = np.arange(2000, dtype=np.float64)
+    y = np.sin(x / 50)
+    y[1234] = 50
+    idx = downsampling.lttb_indices(x, y, 100)
+    assert len(idx) == 100
+    assert idx[0] == 0 and idx[-1] == 1999
+    assert 1234 in idx
+    assert np.all(np.diff(idx) > 0)
+
+def test_lttb_rows_returns_real_rows_newest_first():
+    rows = _rows(3000)
+    sampled = downsampling.lttb_rows(rows, 200)
+    assert len(sampled) == 200
+    assert sampled[0] == rows[0] and sampled[-1] == rows[-1]
+    assert all(a.date > b.date for a, b in zip(sampled, sampled[1:]))
+    assert max(r.close for r in sampled) == max(r.close for r in rows)
+    assert set(sampled) <= set(rows)
+
+def test_ohlc_bucket_rows_preserves_extremes_and_volume():
+    rows = _rows(1001)
+    candles = downsampling.ohlc_bucket_rows(rows, 100)
+    assert len(candles) == 100
+    assert all(a.date > b.date for a, b in zip(candles, candles[1:]))
+    assert max(c.high for c in candles) == max(r.high for r in rows)
+    assert min(c.low for c in candles) == min(r.low for r in rows)
+    assert sum(c.volume for c in candles) == sum(r.volume for r in rows)
+    # The oldest candle opens on the first row's date and open; the newest closes on the last row's close
+    assert candles[-1].date == rows[-1].date and candles[-1].open == rows[-1].open
+    assert candles[0].close == rows[0].close
+    assert isinstance(candles[0].volume, int) and isinstance(candles[0].high, float)
+
+def test_downsample_rows_short_series_untouched():
+    rows = _rows(10)
+    assert downsampling.downsample_rows(rows, 50, "ohlc") == rows
+    assert downsampling.downsample_rows(rows, 50, "lttb") == rows
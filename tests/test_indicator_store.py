@@ -0,0 +1,85 @@
+import datetime
+import numpy as np
+from sqlalchemy.orm import Session
+
+from backend import crud, indicator_store, models, schemas
+from backend.services import indicators
+from conftest import daily_bars, price
+
+NAMES = indicators.INDICATORS
+
+
+START = datetime.date(2020, 1, 1)
+CLOSES = 100 + np.cumsum(np.random.default_rng(7).normal(size=400))
+
+
+def _bars(symbol: str, start_day: int, days: int, bump: float = 0) -> schemas.StockPriceBulkCreate:
+    """Days start_day.. of one random walk, so overlapping writes repeat the same bars unless bumped."""
+    return daily_bars(symbol, START + datetime.timedelta(days=start_day), list(CLOSES[start_day:start_day + days] + bump))
+
+def _stored(db: Session, symbol: str) -> list[models.IndicatorSeries]:
+    db.expire_all()
+    return db.query(models.IndicatorSeries).filter(models.IndicatorSeries.symbol == symbol).all()
+
+def _assert_matches_full_recompute(db: Session, symbol: str, window=None):
+    dates, series = crud.get_indicator_series(db, symbol, NAMES, window)
+    close = crud.get_stock_price_arrays(db, symbol)["close"]
+    expected = indicators.compute(close, NAMES, window)
+    assert len(dates) == len(close)
+    np.testing.assert_allclose(series["close"], close)
+    for key, values in expected.items():
+        np.testing.assert_allclose(series[key], values, atol=1e-8, err_msg=key)
+
+
+def test_series_are_stored_on_first_read_and_advanced_on_append(db_session: Session):
+    crud.create_stock_prices_bulk(db_session, _bars("STORE", 0, 300))
+    _assert_matches_full_recompute(db_session, "STORE")
+    assert {(e.name, e.bar_count) for e in _stored(db_session, "STORE")} == {(n, 300) for n in ("close",) + NAMES}
+
+    # New bars through the fetch path (upsert) and a single create advance the stored state
+    crud.upsert_stock_prices(db_session, _bars("STORE", 290, 15)) # 10 unchanged, 5 new
+    bar = price("STORE", datetime.date(2020, 11, 1), 123.0)
+    crud.create_stock_price(db_session, bar)
+    stored = _stored(db_session, "STORE")
+    assert {e.bar_count for e in stored} == {306}
+    assert {e.last_date for e in stored} == {datetime.date(2020, 11, 1)}
+    _assert_matches_full_recompute(db_session, "STORE")
+
+
+def _chunks(db: Session, series: models.IndicatorSeries) -> list[models.IndicatorSeriesChunk]:
+    return db.query(models.IndicatorSeriesChunk).filter(models.IndicatorSeriesChunk.series_id == series.id).order_by(models.IndicatorSeriesChunk.first_bar).all()
+
+def test_appends_insert_chunks_and_fold_them(db_session: Session, monkeypatch):
+    monkeypatch.setattr(indicator_store, "MAX_CHUNKS", 3)
+    crud.create_stock_prices_bulk(db_session, _bars("CHUNK", 0, 100))
+    crud.get_indicator_series(db_session, "CHUNK", ("rsi",), 7)
+    rsi = next(e for e in _stored(db_session, "CHUNK") if e.name == "rsi")
+    first = _chunks(db_session, rsi)[0].values
+
+    crud.upsert_stock_prices(db_session, _bars("CHUNK", 100, 2))
+    crud.upsert_stock_prices(db_session, _bars("CHUNK", 102, 1))
+    chunks = _chunks(db_session, rsi)
+    assert [c.first_bar for c in chunks] == [0, 100, 102]
+    assert chunks[0].values == first # Appends never rewrite the stored bars
+    _assert_matches_full_recompute(db_session, "CHUNK", window=7)
+
+    crud.upsert_stock_prices(db_session, _bars("CHUNK", 103, 1)) # Fourth chunk: all are folded into one
+    assert [(c.first_bar, len(c.dates) // 4) for c in _chunks(db_session, rsi)] == [(0, 104)]
+    assert {e.bar_count for e in _stored(db_session, "CHUNK")} == {104}
+    _assert_matches_full_recompute(db_session, "CHUNK", window=7)
+
+
+def test_rewrites_and_deletes_drop_stored_series(db_session: Session):
+    crud.create_stock_prices_bulk(db_session, _bars("REWRITE", 0, 100))
+    crud.get_indicator_series(db_session, "REWRITE", ("rsi",), 7)
+    assert len(_stored(db_session, "REWRITE")) == 2
+
+    crud.upsert_stock_prices(db_session, _bars("REWRITE", 50, 5, bump=3)) # Historical bars change
+    assert _stored(db_session, "REWRITE") == []
+    assert db_session.query(models.IndicatorSeriesChunk).join(models.IndicatorSeries, models.IndicatorSeries.id == models.IndicatorSeriesChunk.series_id, isouter=True).filter(models.IndicatorSeries.id == None).count() == 0 # noqa: E711
+    _assert_matches_full_recompute(db_session, "REWRITE", window=7)
+
+    crud.delete_stock_prices_by_symbol_and_source(db_session, "REWRITE", "S1")
+    assert _stored(db_session, "REWRITE") == []
+    dates, series = crud.get_indicator_series(db_session, "REWRITE", ("rsi",), 7)
+    assert len(dates) == 0 and len(series["rsi"]) == 0
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.services import indicators
+
+
+@pytest.fixture
+def close() -> np.ndarray:
+    rng = np.random.default_rng(42)
+    return 100 + np.cumsum(rng.normal(size=5000))
+
+
+def test_sma_and_ema_match_pandas(close):
+    series = pd.Series(close)
+    np.testing.assert_allclose(indicators.sma(close, 20), series.rolling(20).mean(), atol=1e-8)
+    for span in (2, 20, 500):
+        np.testing.assert_allclose(indicators.ema(close, span), series.ewm(span=span, adjust=False).mean(), atol=1e-8)
+
+
+def test_rsi_matches_wilder_smoothing(close):
+    delta = pd.Series(close).diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / 14, adjust=False).mean()
+    expected = (100 - 100 / (1 + gain / loss)).to_numpy()
+    expected[:14] = np.nan
+    np.testing.assert_allclose(indicators.rsi(close, 14), expected, atol=1e-8)
+    # Monotonic rises have no losses
+    assert indicators.rsi(np.arange(30.0), 14)[-1] == 100.0
+
+
+def test_macd_and_bollinger(close):
+    series = pd.Series(close)
+    line, signal, hist = indicators.macd(close)
+    expected_line = series.ewm(span=12, adjust=False).mean() - series.ewm(span=26, adjust=False).mean()
+    np.testing.assert_allclose(line, expected_line, atol=1e-8)
+    np.testing.assert_allclose(signal, expected_line.ewm(span=9, adjust=False).mean(), atol=1e-8)
+    np.testing.assert_allclose(hist, line - signal)
+
+    middle, upper, lower = indicators.bollinger(close, 20)
+    std = series.rolling(20).std(ddof=0)
+    np.testing.assert_allclose(upper, series.rolling(20).mean() + 2 * std, atol=1e-8)
+    np.testing.assert_allclose(lower, middle - 2 * std.to_numpy(), atol=1e-8)
+
+
+def test_compute_short_series_and_names():
+    results = indicators.compute(np.array([1.0, 2.0, 3.0]), indicators.parse_names("bollinger, RSI"))
+    assert set(results) == {"rsi", "bb_middle", "bb_upper", "bb_lower"}
+    assert all(np.isnan(values).all() for values in results.values())
+    assert indicators.to_json_list(results["rsi"]) == [None, None, None]
+    with pytest.raises(ValueError):
+        indicators.parse_names("rsi,stochastic")
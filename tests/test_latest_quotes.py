@@ -0,0 +1,46 @@
+import datetime
+
+import pytest
+from sqlalchemy.orm import Session
+
+from backend import crud, models, schemas
+from conftest import price
+
+
+def quote(db: Session, symbol: str) -> models.LatestQuote:
+    db.expire_all()
+    return db.get(models.LatestQuote, symbol)
+
+
+def test_writers_keep_latest_quote_current(db_session: Session):
+    crud.create_stock_price(db_session, price("QUOT", datetime.date(2024, 3, 5), 10.0))
+    first = quote(db_session, "QUOT")
+    assert (first.close, first.prev_close, first.change) == (10.0, None, None)
+
+    # An earlier day becomes the previous close
+    crud.create_stock_prices_bulk(db_session, schemas.StockPriceBulkCreate(prices=[price("QUOT", datetime.date(2024, 3, 4), 8.0)]))
+    row = quote(db_session, "QUOT")
+    assert (row.date, row.prev_date, row.change) == (datetime.date(2024, 3, 5), datetime.date(2024, 3, 4), 2.0)
+    assert row.change_pct == pytest.approx(0.25)
+
+    # A newer day, then a second source for it (the newest row wins), then a rewrite through upsert
+    crud.create_stock_prices_bulk(db_session, schemas.StockPriceBulkCreate(prices=[price("QUOT", datetime.date(2024, 3, 6), 11.0, volume=700)]))
+    crud.create_stock_price(db_session, price("QUOT", datetime.date(2024, 3, 6), 12.0, source="S2"))
+    row = quote(db_session, "QUOT")
+    assert (row.close, row.prev_close, row.data_source) == (12.0, 10.0, "S2")
+    crud.upsert_stock_prices(db_session, schemas.StockPriceBulkCreate(prices=[price("QUOT", datetime.date(2024, 3, 6), 9.0, source="S2")]))
+    assert quote(db_session, "QUOT").change == -1.0
+
+    # Deleting a source falls back to the other one; deleting everything removes the quote
+    crud.delete_stock_prices_by_symbol_and_source(db_session, "QUOT", "S2")
+    assert (quote(db_session, "QUOT").close, quote(db_session, "QUOT").volume) == (11.0, 700)
+    crud.delete_stock_prices_by_symbol_and_source(db_session, "QUOT", "S1")
+    assert quote(db_session, "QUOT") is None
+
+
+def test_get_latest_quotes_in_request_order(db_session: Session):
+    crud.create_stock_prices_bulk(db_session, schemas.StockPriceBulkCreate(prices=[
+        price("QA", datetime.date(2024, 3, 1), 1.0), price("QB", datetime.date(2024, 3, 1), 2.0), price("QB", datetime.date(2024, 3, 2), 3.0),
+    ]))
+    rows = crud.get_latest_quotes(db_session, ["qb", "NOPE", "QA", "QB"])
+    assert [(row.symbol, row.close) for row in rows] == [("QB", 3.0), ("QA", 1.0)]
@@ -0,0 +1,33 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from backend import crud, migrations, models
+from backend.database import Base
+
+
+def test_startup_lists_duplicate_keys_and_the_dedupe_is_explicit(tmp_path, capsys):
+    engine = create_engine(f"sqlite:///{tmp_path}/dupes.db")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn: # A table from before the unique index, holding duplicate keys
+        conn.execute(text("DROP INDEX uq_stock_prices_stock_date_source"))
+    with Session(engine) as db:
+        for close, source in ((10, "S1"), (11, "S1"), (12, None), (13, None), (14, "S2")):
+            db.add(models.StockPrice(symbol="DUPA", date=datetime.date(2024, 1, 2), open=1, high=1, low=1, close=close,
+                                     volume=1, data_source=source))
+        db.commit()
+
+    with pytest.raises(RuntimeError, match=r"1 \(symbol, date, data_source\) keys.*\n  DUPA 2024-01-02 S1: 2 rows\n"):
+        migrations.upgrade_schema(engine)
+    assert "uq_stock_prices_stock_date_source" not in {ix["name"] for ix in inspect(engine).get_indexes("stock_prices")}
+
+    assert migrations.dedupe_stock_prices(engine) == 1
+    assert "Keeping the newest of 2 stock_prices rows for DUPA 2024-01-02 S1." in capsys.readouterr().out
+    migrations.upgrade_schema(engine)
+    assert "uq_stock_prices_stock_date_source" in {ix["name"] for ix in inspect(engine).get_indexes("stock_prices")}
+    with Session(engine) as db:
+        prices = crud.get_stock_prices_by_symbol(db, "DUPA", limit=None)
+        assert sorted((p.close, p.data_source or "") for p in prices) == [(11, "S1"), (12, ""), (13, ""), (14, "S2")]
+    engine.dispose()
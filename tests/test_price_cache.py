@@ -0,0 +1,86 @@
+import time
+from fastapi.testclient import TestClient
+
+from backend.services.price_cache import PriceCache
+
+
+class _Row(tuple):
+    """Stand-in for a SQLAlchemy Row: a tuple of column values."""
+
+
+def _page(n: int):
+    return [_Row((i, "2023-10-01", 1.0)) for i in range(n)], None
+
+
+def test_price_cache_hits_misses_and_invalidation():
+    cache = PriceCache(max_bytes=1_000_000, ttl_seconds=60)
+    loads = []
+    load = lambda: loads.append(1) or _page(3)
+
+    first = cache.get_or_load(("AAPL", 100), load)
+    second = cache.get_or_load(("AAPL", 100), load)
+    assert first is second
+    assert len(loads) == 1
+    cache.get_or_load(("MSFT", 100), load)
+
+    assert cache.invalidate_symbols(["aapl"]) == 1 # Only AAPL entries are dropped
+    cache.get_or_load(("AAPL", 100), load)
+    cache.get_or_load(("MSFT", 100), load)
+    assert len(loads) == 3
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (2, 3, 1)
+    assert stats["entries"] == 2
+    assert 0 < stats["current_bytes"] <= stats["max_bytes"]
+
+
+def test_price_cache_evicts_least_recently_used_within_budget():
+    one_page = PriceCache(max_bytes=10_000_000, ttl_seconds=60)
+    one_page.get_or_load(("A",), lambda: _page(50))
+    budget = one_page.stats()["current_bytes"] * 2 + 1 # Room for two pages
+
+    cache = PriceCache(max_bytes=budget, ttl_seconds=60)
+    for symbol in ("A", "B", "C"):
+        cache.get_or_load((symbol,), lambda: _page(50))
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["current_bytes"] <= budget
+
+    # Pages larger than the whole budget are served but not cached
+    assert len(cache.get_or_load(("HUGE",), lambda: _page(5000))[0]) == 5000
+    assert cache.stats()["entries"] == 2
+
+
+def test_price_cache_ttl_and_disabled():
+    cache = PriceCache(max_bytes=1_000_000, ttl_seconds=0.05)
+    cache.get_or_load(("A",), lambda: _page(1))
+    time.sleep(0.1)
+    assert cache.stats()["entries"] == 0
+
+    disabled = PriceCache(max_bytes=0, ttl_seconds=60)
+    loads = []
+    disabled.get_or_load(("A",), lambda: loads.append(1) or _page(1))
+    disabled.get_or_load(("A",), lambda: loads.append(1) or _page(1))
+    assert len(loads) == 2
+
+
+def test_stock_writes_invalidate_cached_reads(client: TestClient, superuser_auth_headers: dict, db_session):
+    payload = {"symbol": "CACHED", "date": "2023-10-01", "open": 1, "high": 2, "low": 1, "close": 2, "volume": 100, "data_source": "S1"}
+    assert client.post("/stocks/", headers=superuser_auth_headers, json=payload).status_code == 201
+    assert len(client.get("/stocks/CACHED", headers=superuser_auth_headers).json()) == 1
+    hits_before = client.get("/stocks/cache/stats", headers=superuser_auth_headers).json()["hits"]
+    assert len(client.get("/stocks/CACHED", headers=superuser_auth_headers).json()) == 1
+    assert client.get("/stocks/cache/stats", headers=superuser_auth_headers).json()["hits"] == hits_before + 1
+
+    bulk = {"prices": [dict(payload, date="2023-10-02"), dict(payload, date="2023-10-03")]}
+    assert client.post("/stocks/bulk", headers=superuser_auth_headers, json=bulk).status_code == 201
+    assert len(client.get("/stocks/CACHED", headers=superuser_auth_headers).json()) == 3
+
+    assert client.delete("/stocks/CACHED?data_source=S1", headers=superuser_auth_headers).status_code == 200
+    assert client.get("/stocks/CACHED", headers=superuser_auth_headers).json() == []
+
+
+def test_cache_stats_requires_superuser(client: TestClient, auth_token_for_test_user: str):
+    response = client.get("/stocks/cache/stats", headers={"Authorization": f"Bearer {auth_token_for_test_user}"})
+    assert response.status_code == 403
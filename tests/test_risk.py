@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.services import risk
+
+
+@pytest.fixture
+def close() -> np.ndarray:
+    rng = np.random.default_rng(7)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=3000)))
+
+
+@pytest.fixture
+def dates(close) -> np.ndarray:
+    return np.datetime64("2010-01-01") + np.arange(len(close))
+
+
+def test_rolling_volatility_matches_pandas(close):
+    returns = risk.log_returns(close)
+    volatility = risk.rolling_volatility(returns, (20, 60, 252), 252)
+    for window, series in volatility.items():
+        expected = pd.Series(returns).rolling(window).std() * np.sqrt(252)
+        np.testing.assert_allclose(series, expected, atol=1e-10)
+    # Windows longer than the history stay empty
+    assert np.isnan(risk.rolling_volatility(returns[:10], (20,), 252)[20]).all()
+
+
+def test_rolling_var_matches_pandas(close):
+    returns = risk.log_returns(close)
+    expected = -pd.Series(returns).rolling(60).quantile(0.05, interpolation="linear")
+    np.testing.assert_allclose(risk.rolling_var(returns, 60, 0.95), expected, atol=1e-12)
+
+
+def test_summary_drawdown_and_var(dates):
+    close = np.array([100.0, 120.0, 90.0, 60.0, 80.0, 130.0])
+    summary = risk.summarize(dates[:6], close, windows=(2,), confidence=0.8)
+    assert summary["max_drawdown"] == pytest.approx(-0.5)
+    assert (summary["max_drawdown_peak"], summary["max_drawdown_trough"]) == ("2010-01-02", "2010-01-04")
+    assert summary["total_return"] == pytest.approx(0.3)
+
+    returns = np.diff(np.log(close))
+    assert summary["var_historical"] == pytest.approx(-np.quantile(returns, 0.2))
+    # z(0.2) = -0.8416
+    assert summary["var_parametric"] == pytest.approx(-(returns.mean() - 0.8416212 * returns.std(ddof=1)))
+    assert summary["expected_shortfall"] >= summary["var_historical"]
+
+
+def test_summary_of_short_series(dates):
+    assert risk.summarize(dates[:0], np.array([]))["bars"] == 0
+    single = risk.summarize(dates[:1], np.array([10.0]))
+    assert single["max_drawdown"] == 0.0 and single["volatility"] is None
+
+
+def test_compute_series_alignment(dates, close):
+    result = risk.compute(dates, close, windows=(20, 60))
+    assert len(result["dates"]) == len(result["returns"]) == len(result["drawdown"]) == len(close) - 1
+    assert result["rolling_volatility"]["20"][18] is None and result["rolling_volatility"]["20"][19] is not None
+    assert result["summary"]["rolling_volatility"]["60"] == result["rolling_volatility"]["60"][-1]
+
+
+def test_parse_windows():
+    assert risk.parse_windows("60, 20,20") == (20, 60)
+    for invalid in ("", "1", "abc", "20,9999"):
+        with pytest.raises(ValueError):
+            risk.parse_windows(invalid)
@@ -0,0 +1,109 @@
+import datetime
+from sqlalchemy.orm import Session
+
+from backend import cold_storage, crud, models, rollups, schemas
+from conftest import daily_bars, price
+
+
+def _rollups(db: Session, symbol: str, interval: str) -> list[models.StockPriceRollup]:
+    return db.query(models.StockPriceRollup).filter(
+        models.StockPriceRollup.symbol == symbol, models.StockPriceRollup.interval == interval
+    ).order_by(models.StockPriceRollup.date).all()
+
+
+def test_period_bounds():
+    day = datetime.date(2024, 2, 15) # Thursday
+    assert rollups.period_bounds(day, "1w") == (datetime.date(2024, 2, 12), datetime.date(2024, 2, 18))
+    assert rollups.period_bounds(day, "1mo") == (datetime.date(2024, 2, 1), datetime.date(2024, 2, 29))
+    assert rollups.period_bounds(day, "1y") == (datetime.date(2024, 1, 1), datetime.date(2024, 12, 31))
+
+
+def test_bulk_create_maintains_rollups(db_session: Session):
+    crud.create_stock_prices_bulk(db_session, daily_bars("ROLL", datetime.date(2024, 1, 1), [11.0 + i for i in range(60)])) # Jan 1 - Feb 29
+
+    months = _rollups(db_session, "ROLL", "1mo")
+    assert [m.date for m in months] == [datetime.date(2024, 1, 1), datetime.date(2024, 2, 1)]
+    jan, feb = months
+    assert (jan.open, jan.high, jan.low, jan.close, jan.volume, jan.bar_count) == (11, 42, 5.5, 41, 3100, 31)
+    assert (feb.open, feb.close, feb.bar_count) == (42, 70, 29)
+    assert len(_rollups(db_session, "ROLL", "1w")) == 9 # 2024-01-01 is a Monday
+    assert len(_rollups(db_session, "ROLL", "1y")) == 1
+
+
+def test_upsert_recomputes_only_touched_periods(db_session: Session):
+    crud.create_stock_prices_bulk(db_session, daily_bars("ROLLUP", datetime.date(2024, 1, 1), [11.0 + i for i in range(60)]))
+    untouched_jan = _rollups(db_session, "ROLLUP", "1mo")[0].id
+
+    # A revised February bar and a new March bar
+    revised = daily_bars("ROLLUP", datetime.date(2024, 2, 10), [151.0 + i for i in range(30)])
+    counts = crud.upsert_stock_prices(db_session, revised)
+    assert counts == {"inserted": 10, "updated": 20, "unchanged": 0}
+    db_session.expire_all()
+
+    jan, feb, mar = _rollups(db_session, "ROLLUP", "1mo")
+    assert jan.id == untouched_jan
+    assert feb.high == 151 + 19 + 1 and feb.bar_count == 29
+    assert mar.date == datetime.date(2024, 3, 1) and mar.bar_count == 10
+    assert _rollups(db_session, "ROLLUP", "1y")[0].bar_count == 70
+
+
+def test_writes_recompute_only_the_periods_of_their_dates(db_session: Session):
+    crud.create_stock_prices_bulk(db_session, daily_bars("ROLLGAP", datetime.date(2022, 1, 1), [11.0 + i for i in range(3 * 365)]))
+    before = {(r.interval, r.date): r.id for i in rollups.INTERVALS for r in _rollups(db_session, "ROLLGAP", i)}
+
+    # Two bars years apart: only their own weeks, months and years are rewritten
+    crud.upsert_stock_prices(db_session, schemas.StockPriceBulkCreate(prices=[
+        price("ROLLGAP", datetime.date(2022, 3, 2), 500.0), price("ROLLGAP", datetime.date(2024, 11, 6), 500.0)
+    ]))
+    db_session.expire_all()
+    after = {(r.interval, r.date): r.id for i in rollups.INTERVALS for r in _rollups(db_session, "ROLLGAP", i)}
+    changed = sorted(key for key in after if before.get(key) != after[key])
+    assert changed == [
+        ("1mo", datetime.date(2022, 3, 1)), ("1mo", datetime.date(2024, 11, 1)),
+        ("1w", datetime.date(2022, 2, 28)), ("1w", datetime.date(2024, 11, 4)),
+        ("1y", datetime.date(2022, 1, 1)), ("1y", datetime.date(2024, 1, 1)),
+    ]
+    assert {r.date: r.high for r in _rollups(db_session, "ROLLGAP", "1y")}[datetime.date(2023, 1, 1)] == 11 + 729 + 1
+
+
+def test_writes_before_the_archive_boundary_keep_archived_bars(db_session: Session, tmp_path, monkeypatch):
+    monkeypatch.setattr(cold_storage, "store", cold_storage.ColdStorage(str(tmp_path / "cold")))
+    crud.create_stock_prices_bulk(db_session, daily_bars("ROLLCOLD", datetime.date(2001, 1, 1), [11.0 + i for i in range(60)]))
+    recent = datetime.date.today() - datetime.timedelta(days=3)
+    crud.create_stock_prices_bulk(db_session, daily_bars("ROLLCOLD", recent, [11.0, 12.0]))
+    months = [(m.date, m.open, m.high, m.close, m.bar_count) for m in _rollups(db_session, "ROLLCOLD", "1mo")]
+    assert crud.archive_stock_prices(db_session, 730) == {"ROLLCOLD": 60}
+
+    # A revised archived bar: its periods are recomputed over the archived bars plus the revision
+    crud.upsert_stock_prices(db_session, daily_bars("ROLLCOLD", datetime.date(2001, 1, 10), [120.0]))
+    db_session.expire_all()
+    jan, feb = _rollups(db_session, "ROLLCOLD", "1mo")[:2]
+    assert (jan.date, jan.open, jan.high, jan.close, jan.bar_count) == months[0][:2] + (121, 41, 31)
+    assert (feb.date, feb.open, feb.high, feb.close, feb.bar_count) == months[1]
+    year = _rollups(db_session, "ROLLCOLD", "1y")[0]
+    assert (year.date, year.bar_count, year.volume) == (datetime.date(2001, 1, 1), 60, 6000)
+
+
+def test_single_create_and_delete_maintain_rollups(db_session: Session):
+    price = schemas.StockPriceCreate(symbol="ROLLONE", date=datetime.date(2024, 5, 6), open=1, high=2, low=0.5, close=1.5, volume=7, data_source=None)
+    crud.create_stock_price(db_session, price)
+    assert [w.volume for w in _rollups(db_session, "ROLLONE", "1w")] == [7] # NULL data_source is its own series
+
+    crud.create_stock_prices_bulk(db_session, daily_bars("ROLLONE", datetime.date(2024, 5, 6), [11.0, 12.0, 13.0]))
+    assert len(_rollups(db_session, "ROLLONE", "1w")) == 2
+    crud.delete_stock_prices_by_symbol_and_source(db_session, "ROLLONE", "S1")
+    assert [w.data_source for w in _rollups(db_session, "ROLLONE", "1w")] == [None]
+
+
+def test_rebuild_all_rollups_backfills(db_session: Session):
+    db_session.add_all([
+        models.StockPrice(symbol="LEGACY", date=datetime.date(2023, m, 1), open=m, high=m, low=m, close=m, volume=m, data_source="Old")
+        for m in range(1, 13)
+    ])
+    db_session.commit()
+    assert _rollups(db_session, "LEGACY", "1mo") == []
+    rollups.rebuild_all_rollups(db_session)
+    db_session.commit()
+    assert len(_rollups(db_session, "LEGACY", "1mo")) == 12
+    year = _rollups(db_session, "LEGACY", "1y")[0]
+    assert (year.open, year.close, year.volume) == (1, 12, 78)
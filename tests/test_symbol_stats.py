@@ -0,0 +1,63 @@
+import datetime
+
+import numpy as np
+import pytest
+from sqlalchemy.orm import Session
+
+from backend import crud, models, schemas, symbol_stats
+from conftest import daily_bars
+
+
+def stats(db: Session, symbol: str) -> models.SymbolStats:
+    db.expire_all()
+    return db.get(models.SymbolStats, symbol)
+
+
+def test_compute_stats_horizons_and_volume():
+    dates = np.datetime64("2023-01-01") + np.arange(400)
+    close = np.arange(400, dtype=float) + 100
+    volume = np.full(400, 10)
+    volume[-1] = 40
+    row = symbol_stats.compute_stats("X", dates, close + 1, close - 1, close, volume)
+    assert row["last_date"] == datetime.date(2024, 2, 4)
+    assert row["change_pct"] == pytest.approx(499 / 498 - 1)
+    assert row["high_52w"] == 500 and row["low_52w"] == 499 - 364 + 1 - 1
+    assert row["pct_from_high_52w"] == pytest.approx(499 / 500 - 1)
+    assert row["avg_volume_20"] == 10 and row["volume_ratio_20"] == 4
+    assert row["return_1w"] == pytest.approx(499 / 492 - 1)
+    assert row["return_1y"] == pytest.approx(499 / 134 - 1)
+    assert row["return_ytd"] == pytest.approx(499 / 464 - 1) # Close of 2023-12-31
+    short = symbol_stats.compute_stats("X", dates[:3], close[:3] + 1, close[:3] - 1, close[:3], volume[:3])
+    assert short["return_1w"] is None and short["avg_volume_20"] is None
+
+
+def test_writers_keep_stats_current(db_session: Session):
+    start = datetime.date(2024, 1, 1)
+    crud.create_stock_prices_bulk(db_session, daily_bars("STAT", start, [10.0 + i for i in range(30)]))
+    assert stats(db_session, "STAT").last_close == 39.0
+
+    # A new bar from the single-row writer, then a rewrite through upsert
+    crud.create_stock_price(db_session, schemas.StockPriceCreate(symbol="STAT", date=start + datetime.timedelta(days=30), open=1, high=50, low=1, close=45, volume=500, data_source="S1"))
+    row = stats(db_session, "STAT")
+    assert (row.last_close, row.high_52w, row.volume_ratio_20) == (45.0, 50.0, 5.0)
+    crud.upsert_stock_prices(db_session, daily_bars("STAT", start + datetime.timedelta(days=30), [20.0]))
+    assert stats(db_session, "STAT").change_pct == pytest.approx(20 / 39 - 1)
+
+    # Deleting the only source removes the row
+    crud.delete_stock_prices_by_symbol_and_source(db_session, "STAT", "S1")
+    assert stats(db_session, "STAT") is None
+
+
+def test_screen(db_session: Session):
+    start = datetime.date(2024, 1, 1)
+    crud.create_stock_prices_bulk(db_session, daily_bars("NEARHI", start, [10.0 + i for i in range(30)]))
+    crud.create_stock_prices_bulk(db_session, daily_bars("FALLEN", start, [40.0 - i for i in range(30)], volumes=[100] * 29 + [400]))
+    near_high = crud.screen_symbol_stats(db_session, ["pct_from_high_52w>=-0.05"])
+    assert [row.symbol for row in near_high] == ["NEARHI"]
+    spikes = crud.screen_symbol_stats(db_session, ["volume_ratio_20 >= 3"], sort="-return_1w")
+    assert [row.symbol for row in spikes] == ["FALLEN"]
+    ordered = crud.screen_symbol_stats(db_session, [], sort="-change_pct")
+    assert [row.symbol for row in ordered] == ["NEARHI", "FALLEN"]
+    for bad in (["bogus>1"], ["last_close>>1"], ["last_close>abc"]):
+        with pytest.raises(ValueError):
+            crud.screen_symbol_stats(db_session, bad)